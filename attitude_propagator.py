@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Quaternion Attitude Propagator for ARS Rates
+
+Propagates attitude from ARS body angular rates (prime ports 50038-50040 or
+redundant ports 50041-50043) using the real time step between samples from
+the capture timestamps. Everything is batched with NumPy: the per-sample
+rotation increments are built in one pass and chained with a parallel prefix
+product, so N samples take O(log N) vectorized passes rather than an N-step
+Python loop.
+
+Quaternions are scalar-first [w, x, y, z] and rotate body vectors into the
+reference frame, matching the Rz @ Ry @ Rx convention of the visualizers.
+
+The consistency check integrates the rates per axis and compares them with
+MATLAB's summed incremental angles (ports 50044-50046 prime, 50047-50049
+redundant).
+"""
+
+import argparse
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from capture_store import load_capture, NS_PER_SECOND
+
+ARS_RATE_PORTS = {
+    'prime': (50038, 50039, 50040),
+    'redundant': (50041, 50042, 50043),
+}
+ARS_ANGLE_PORTS = {
+    'prime': (50044, 50045, 50046),
+    'redundant': (50047, 50048, 50049),
+}
+
+IDENTITY_QUATERNION = np.array([1.0, 0.0, 0.0, 0.0])
+
+def quaternion_multiply(p: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """Hamilton product p * q over matching (..., 4) batches"""
+    pw, px, py, pz = np.moveaxis(p, -1, 0)
+    qw, qx, qy, qz = np.moveaxis(q, -1, 0)
+    return np.stack((
+        pw * qw - px * qx - py * qy - pz * qz,
+        pw * qx + px * qw + py * qz - pz * qy,
+        pw * qy - px * qz + py * qw + pz * qx,
+        pw * qz + px * qy - py * qx + pz * qw,
+    ), axis=-1)
+
+def rotation_increments(rates: np.ndarray, dt: np.ndarray) -> np.ndarray:
+    """Quaternions for body rotations rates * dt (N x 3 rad/s, N s) -> N x 4"""
+    rotation = rates * dt[:, None]
+    angle = np.linalg.norm(rotation, axis=1)
+    increments = np.empty((len(rates), 4))
+    increments[:, 0] = np.cos(angle / 2)
+    # sin(angle/2) / angle without dividing by zero for tiny rotations
+    increments[:, 1:] = rotation * (0.5 * np.sinc(angle / (2 * np.pi)))[:, None]
+    return increments
+
+def cumulative_quaternion_product(increments: np.ndarray) -> np.ndarray:
+    """Running products q1, q1*q2, q1*q2*q3, ... as a parallel prefix scan"""
+    result = increments.copy()
+    offset = 1
+    while offset < len(result):
+        # Earlier products on the left keep the body-frame order
+        result[offset:] = quaternion_multiply(result[:-offset], result[offset:])
+        offset *= 2
+    return result / np.linalg.norm(result, axis=1, keepdims=True)
+
+def propagate_attitude(timestamps_ns: np.ndarray, rates: np.ndarray,
+                       q0: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Propagate attitude quaternions from body angular rates
+
+    Args:
+        timestamps_ns: Sample times in ns (N)
+        rates: Body angular rates in rad/s (N x 3)
+        q0: Attitude at the first sample (default: identity)
+
+    Returns:
+        Attitude quaternion at every sample (N x 4); step k applies the mean
+        of rates k-1 and k over the actual interval between their timestamps
+    """
+    timestamps_ns = np.asarray(timestamps_ns, dtype=np.int64)
+    rates = np.asarray(rates, dtype=np.float64)
+    q0 = IDENTITY_QUATERNION if q0 is None else np.asarray(q0, dtype=np.float64)
+
+    quaternions = np.empty((len(rates), 4))
+    if len(rates) == 0:
+        return quaternions
+    quaternions[0] = q0
+
+    dt = np.diff(timestamps_ns) / NS_PER_SECOND
+    mean_rates = 0.5 * (rates[1:] + rates[:-1])
+    if len(dt):
+        quaternions[1:] = quaternion_multiply(q0, cumulative_quaternion_product(rotation_increments(mean_rates, dt)))
+    return quaternions
+
+def quaternion_to_rotation_matrix(quaternions: np.ndarray) -> np.ndarray:
+    """Rotation matrices (N x 3 x 3) for unit quaternions (N x 4)"""
+    w, x, y, z = np.moveaxis(np.asarray(quaternions, dtype=np.float64), -1, 0)
+    R = np.empty(w.shape + (3, 3))
+    R[..., 0, 0] = 1 - 2 * (y * y + z * z)
+    R[..., 0, 1] = 2 * (x * y - w * z)
+    R[..., 0, 2] = 2 * (x * z + w * y)
+    R[..., 1, 0] = 2 * (x * y + w * z)
+    R[..., 1, 1] = 1 - 2 * (x * x + z * z)
+    R[..., 1, 2] = 2 * (y * z - w * x)
+    R[..., 2, 0] = 2 * (x * z - w * y)
+    R[..., 2, 1] = 2 * (y * z + w * x)
+    R[..., 2, 2] = 1 - 2 * (x * x + y * y)
+    return R
+
+def quaternion_to_euler(quaternions: np.ndarray) -> np.ndarray:
+    """Roll, pitch, yaw in rad (N x 3) such that R = Rz(yaw) @ Ry(pitch) @ Rx(roll)"""
+    w, x, y, z = np.moveaxis(np.asarray(quaternions, dtype=np.float64), -1, 0)
+    roll = np.arctan2(2 * (w * x + y * z), 1 - 2 * (x * x + y * y))
+    pitch = np.arcsin(np.clip(2 * (w * y - z * x), -1.0, 1.0))
+    yaw = np.arctan2(2 * (w * z + x * y), 1 - 2 * (y * y + z * z))
+    return np.stack((roll, pitch, yaw), axis=-1)
+
+def integrate_rates(timestamps_ns: np.ndarray, rates: np.ndarray) -> np.ndarray:
+    """Per-axis trapezoidal integral of the rates from the first sample (N x 3 rad)"""
+    dt = np.diff(np.asarray(timestamps_ns, dtype=np.int64)) / NS_PER_SECOND
+    rates = np.asarray(rates, dtype=np.float64)
+    angles = np.zeros_like(rates)
+    np.cumsum(0.5 * (rates[1:] + rates[:-1]) * dt[:, None], axis=0, out=angles[1:])
+    return angles
+
+def load_ars_channel(filename: str, channel: str = 'prime') -> Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]:
+    """
+    Load one ARS channel from a capture
+
+    Returns:
+        (timestamps_ns, rates N x 3, summed angles N x 3 or None when the
+        angle ports are not in the capture), truncated to a common length
+    """
+    store = load_capture(filename, verbose=True)
+    rate_ports = ARS_RATE_PORTS[channel]
+    missing_ports = [port for port in rate_ports if port not in store]
+    if missing_ports:
+        raise ValueError(f"Ports {missing_ports} not present in capture")
+
+    columns = [store.values(port) for port in rate_ports]
+    angle_ports = ARS_ANGLE_PORTS[channel]
+    has_angles = all(port in store for port in angle_ports)
+    if has_angles:
+        columns += [store.values(port) for port in angle_ports]
+
+    length = min(len(column) for column in columns)
+    timestamps = np.asarray(store.timestamps_ns(rate_ports[0])[:length])
+    rates = np.column_stack([column[:length] for column in columns[:3]])
+    angles = np.column_stack([column[:length] for column in columns[3:]]) if has_angles else None
+    return timestamps, rates, angles
+
+def check_consistency(timestamps_ns: np.ndarray, rates: np.ndarray, summed_angles: np.ndarray) -> Dict[str, Dict[str, float]]:
+    """
+    Compare integrated rates with MATLAB's summed incremental angles
+
+    Both are taken relative to the first sample. Returns per-axis maximum and
+    RMS differences and the final drift, all in rad.
+    """
+    integrated = integrate_rates(timestamps_ns, rates)
+    summed = np.asarray(summed_angles, dtype=np.float64)
+    difference = integrated - (summed - summed[0])
+
+    report = {}
+    for axis, name in enumerate('xyz'):
+        report[name] = {
+            "max_abs_diff_rad": float(np.abs(difference[:, axis]).max()),
+            "rms_diff_rad": float(np.sqrt(np.mean(difference[:, axis] ** 2))),
+            "final_drift_rad": float(difference[-1, axis]),
+            "integrated_rad": float(integrated[-1, axis]),
+            "summed_rad": float(summed[-1, axis] - summed[0, axis]),
+        }
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description='ARS Quaternion Attitude Propagator and Consistency Check')
+    parser.add_argument('input_file', help='Input capture file (.dmp or .raw)')
+    parser.add_argument('--channel', choices=sorted(ARS_RATE_PORTS.keys()), default='prime',
+                       help='ARS channel to propagate (default: prime)')
+
+    args = parser.parse_args()
+
+    timestamps, rates, angles = load_ars_channel(args.input_file, args.channel)
+    if len(timestamps) < 2:
+        print("Not enough ARS samples to propagate")
+        return
+
+    quaternions = propagate_attitude(timestamps, rates)
+    roll, pitch, yaw = np.degrees(quaternion_to_euler(quaternions[-1]))
+    duration = (timestamps[-1] - timestamps[0]) / NS_PER_SECOND
+    print(f"\nPropagated {len(timestamps)} {args.channel} samples over {duration:.3f}s")
+    print(f"Final attitude: Roll {roll:.4f}° | Pitch {pitch:.4f}° | Yaw {yaw:.4f}°")
+    print(f"Final quaternion: {np.array2string(quaternions[-1], precision=8)}")
+
+    if angles is None:
+        print("Summed incremental angle ports not in capture - skipping consistency check")
+        return
+
+    print("\nIntegrated rates vs MATLAB summed incremental angles:")
+    print(f"{'Axis':<6} {'Integrated (rad)':<18} {'Summed (rad)':<18} {'Max diff (rad)':<16} {'RMS diff (rad)':<16} {'Final drift (rad)':<18}")
+    for axis, stats in check_consistency(timestamps, rates, angles).items():
+        print(f"{axis:<6} {stats['integrated_rad']:<18.9f} {stats['summed_rad']:<18.9f} "
+              f"{stats['max_abs_diff_rad']:<16.9f} {stats['rms_diff_rad']:<16.9f} {stats['final_drift_rad']:<18.9f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Attitude Tap - Local Publish/Subscribe Feed of Simulator Ingest Frames
+
+The simulator publishes every MATLAB frame it ingests (ARS rates and summed
+angles, magnetometer field, reaction wheel data) as one UDP datagram to a
+local port. Publishing is a single non-blocking sendto: when nobody listens
+or the socket buffer is full the frame is dropped and counted, so a slow or
+absent viewer can never back-pressure the ingest threads.
+
+Subscribers receive frames on a background thread into preallocated
+per-device ring buffers that a UI reads at its own rate.
+
+Datagram layout (little-endian):
+    magic      4s   b'FSTP'
+    device_id  B    see TAP_DEVICE_IDS
+    count      B    number of float64 values
+    timestamp  q    ingest time in ns since the epoch
+    values     count x d
+"""
+
+import socket
+import struct
+import threading
+import time
+import logging
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TAP_MAGIC = b'FSTP'
+TAP_HEADER = struct.Struct('<4sBBq')
+DEFAULT_TAP_HOST = '127.0.0.1'
+DEFAULT_TAP_PORT = 50100
+
+TAP_DEVICE_IDS = {
+    'ars': 1,
+    'magnetometer': 2,
+    'reaction_wheel': 3,
+}
+TAP_DEVICE_NAMES = {device_id: name for name, device_id in TAP_DEVICE_IDS.items()}
+
+def encode_frame(device_name: str, values: Sequence[float], timestamp_ns: Optional[int] = None) -> bytes:
+    """Encode one ingest frame as a tap datagram"""
+    if timestamp_ns is None:
+        timestamp_ns = time.time_ns()
+    count = len(values)
+    return (TAP_HEADER.pack(TAP_MAGIC, TAP_DEVICE_IDS[device_name], count, timestamp_ns) +
+            struct.pack(f'<{count}d', *values))
+
+def decode_frame(packet: bytes) -> Optional[Tuple[str, int, Tuple[float, ...]]]:
+    """Decode a tap datagram into (device_name, timestamp_ns, values); None if malformed"""
+    if len(packet) < TAP_HEADER.size:
+        return None
+    magic, device_id, count, timestamp_ns = TAP_HEADER.unpack_from(packet)
+    device_name = TAP_DEVICE_NAMES.get(device_id)
+    if magic != TAP_MAGIC or device_name is None or len(packet) != TAP_HEADER.size + 8 * count:
+        return None
+    return device_name, timestamp_ns, struct.unpack_from(f'<{count}d', packet, TAP_HEADER.size)
+
+class AttitudeTap:
+    """Publishes ingest frames to a local UDP port without ever blocking"""
+
+    def __init__(self, host: str = DEFAULT_TAP_HOST, port: int = DEFAULT_TAP_PORT):
+        self.address = (host, port)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.stats_lock = threading.Lock()  # Every device processing thread publishes
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        logger.info(f"Attitude tap publishing to {host}:{port}")
+
+    def publish(self, device_name: str, values: Sequence[float], timestamp_ns: Optional[int] = None):
+        """Publish one frame; dropped (and counted) if it cannot be sent immediately"""
+        if device_name not in TAP_DEVICE_IDS:
+            return
+        try:
+            self.sock.sendto(encode_frame(device_name, values, timestamp_ns), self.address)
+            sent = True
+        except OSError:
+            # No subscriber (ICMP refused) or socket buffer full - never wait
+            sent = False
+        with self.stats_lock:
+            if sent:
+                self.frames_sent += 1
+            else:
+                self.frames_dropped += 1
+
+    def get_status(self) -> Dict[str, int]:
+        """Get tap statistics"""
+        with self.stats_lock:
+            return {
+                "frames_sent": self.frames_sent,
+                "frames_dropped": self.frames_dropped
+            }
+
+    def close(self):
+        """Close the publishing socket"""
+        self.sock.close()
+
+class SampleRing:
+    """
+    Preallocated ring of timestamped samples for one device
+
+    A single writer appends; readers copy the most recent samples. Readers
+    never lock the writer out, so a reader racing the writer may see the
+    slot being overwritten - harmless for display.
+    """
+
+    def __init__(self, capacity: int, width: int):
+        self.capacity = capacity
+        self.width = width
+        self.timestamps = np.zeros(capacity, dtype=np.int64)
+        self.values = np.zeros((capacity, width), dtype=np.float64)
+        self.count = 0  # Total samples ever appended
+
+    def append(self, timestamp_ns: int, values: Sequence[float]):
+        """Append one sample, overwriting the oldest when full"""
+        index = self.count % self.capacity
+        self.timestamps[index] = timestamp_ns
+        self.values[index, :len(values)] = values[:self.width]
+        self.count += 1
+
+    def latest(self, max_samples: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Copy up to max_samples most recent samples in time order"""
+        count = self.count
+        available = min(count, self.capacity)
+        if max_samples is not None:
+            available = min(available, max_samples)
+        if available == 0:
+            return self.timestamps[:0].copy(), self.values[:0].copy()
+
+        indices = np.arange(count - available, count) % self.capacity
+        return self.timestamps[indices], self.values[indices]
+
+class TapSubscriber:
+    """Receives tap frames on a background thread into per-device rings"""
+
+    def __init__(self, host: str = DEFAULT_TAP_HOST, port: int = DEFAULT_TAP_PORT,
+                 capacity: int = 65536, widths: Optional[Dict[str, int]] = None):
+        self.address = (host, port)
+        widths = widths or {'ars': 12, 'magnetometer': 3, 'reaction_wheel': 4}
+        self.rings: Dict[str, SampleRing] = {name: SampleRing(capacity, width) for name, width in widths.items()}
+        self.frames_received = 0
+        self.frames_malformed = 0
+        self.running = False
+        self.sock: Optional[socket.socket] = None
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Bind the tap port and start receiving"""
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+        self.sock.bind(self.address)
+        self.sock.settimeout(0.2)
+        self.running = True
+        self.thread = threading.Thread(target=self._receive_loop, daemon=True)
+        self.thread.start()
+        logger.info(f"Subscribed to attitude tap on {self.address[0]}:{self.address[1]}")
+
+    def _receive_loop(self):
+        """Receive datagrams until stopped"""
+        while self.running:
+            try:
+                packet = self.sock.recv(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+
+            frame = decode_frame(packet)
+            if frame is None:
+                self.frames_malformed += 1
+                continue
+
+            device_name, timestamp_ns, values = frame
+            ring = self.rings.get(device_name)
+            if ring is not None:
+                ring.append(timestamp_ns, values)
+            self.frames_received += 1
+
+    def stop(self):
+        """Stop receiving and close the socket"""
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=1.0)
+        if self.sock:
+            self.sock.close()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+MATLAB Stand-In for Benchmarks
+
+Connects to every simulator MATLAB port like the real simulator does and sends
+one 8-byte float per port per tick at a fixed rate. Ticks are paced against
+absolute deadlines, so a late tick does not push every later one back; the
+achieved rate is reported with the results.
+"""
+
+import os
+import sys
+import time
+import socket
+import struct
+import threading
+import logging
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from matlab_bridge_sender import MATLABBridgeSender
+
+logger = logging.getLogger(__name__)
+
+class MatlabStandIn(MATLABBridgeSender):
+    """Paced multi-port MATLAB sender running on a background thread"""
+
+    def __init__(self, ars_ports: List[int], mag_ports: List[int], rw_ports: List[int],
+                 host: str = "127.0.0.1", rate_hz: float = 100.0):
+        super().__init__(ars_ports, mag_ports, rw_ports, host)
+        self.rate_hz = rate_hz
+        self.ticks = 0
+        self.samples_sent = 0
+        self.late_ticks = 0  # Ticks that started after their deadline had passed
+        self.thread: Optional[threading.Thread] = None
+
+    def connect_to_ports(self, timeout: float = 10.0) -> bool:
+        """Connect to every port, retrying until the simulator is listening"""
+        deadline = time.time() + timeout
+        for port in self.all_ports:
+            while True:
+                try:
+                    sock = socket.create_connection((self.host, port), timeout=1.0)
+                    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                    self.sockets[port] = sock
+                    break
+                except OSError:
+                    if time.time() > deadline:
+                        logger.error(f"Stand-in could not connect to port {port}")
+                        return False
+                    time.sleep(0.1)
+        return True
+
+    def start(self):
+        """Start sending on a background thread"""
+        self.running = True
+        self.thread = threading.Thread(target=self._send_loop, daemon=True)
+        self.thread.start()
+
+    def _send_loop(self):
+        """Send one value to every port per tick"""
+        period = 1.0 / self.rate_hz
+        self.start_time = time.perf_counter()
+        next_tick = self.start_time
+        packer = struct.Struct('<d')
+
+        while self.running:
+            offset = time.perf_counter() - self.start_time
+            for port, sock in self.sockets.items():
+                try:
+                    sock.sendall(packer.pack(self.generate_realistic_device_data(port, offset)))
+                    self.samples_sent += 1
+                except OSError:
+                    pass
+            self.ticks += 1
+
+            next_tick += period
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                self.late_ticks += 1
+
+    def stop(self):
+        """Stop sending and close every connection"""
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=2.0)
+        for sock in self.sockets.values():
+            try:
+                sock.close()
+            except OSError:
+                pass
+        self.sockets.clear()
+
+    def get_stats(self) -> Dict[str, float]:
+        """Ticks, samples and achieved tick rate so far"""
+        elapsed = time.perf_counter() - self.start_time if self.start_time else 0.0
+        return {
+            "ticks": self.ticks,
+            "samples_sent": self.samples_sent,
+            "late_ticks": self.late_ticks,
+            "achieved_rate_hz": self.ticks / elapsed if elapsed > 0 else 0.0
+        }
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+End-to-End Simulator Benchmark
+
+Runs the real FlatSatDeviceSimulator against the MATLAB stand-in, with each
+device's output going to a local sink (ARS -> pty serial, magnetometer ->
+python-can virtual bus, reaction wheel -> TCP by default). After a warmup
+it measures, per device:
+
+    - sustained throughput: packets written to the wire per second
+    - CPU seconds and % of one core used by the device's processing thread
+    - age-at-emission percentiles of the oldest contributing sample
+    - drop rate: frames the encoder or transmitter refused / frames processed
+
+plus process RSS growth over the run. Results are written as JSON and
+compared against a stored baseline; any regression beyond the tolerance
+makes the run exit non-zero.
+
+Usage:
+    python benchmarks/run_benchmarks.py --rate 200 --duration 20 --output results.json
+    python benchmarks/run_benchmarks.py --save-baseline
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import logging
+import platform
+import argparse
+from typing import Any, Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flatsat_device_simulator import FlatSatDeviceSimulator, SimulatorConfig, DeviceConfig, device_type
+from performance_monitor import performance_monitor, LatencyHistogram
+from latency_tracer import AGE_COMPONENT
+from benchmarks.matlab_standin import MatlabStandIn
+from benchmarks.sinks import SINK_TYPES
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+DEVICE_PORT_COUNTS = {"ars": 12, "magnetometer": 3, "reaction_wheel": 4}
+DEFAULT_SINKS = {"ars": "pty", "magnetometer": "can", "reaction_wheel": "tcp"}
+OUTPUT_MODES = {"pty": "serial", "can": "can", "tcp": "tcp"}
+
+# Absolute slack so tiny baseline values do not turn noise into regressions
+AGE_SLACK_MS = 0.5
+DROP_RATE_SLACK = 0.01
+
+def free_port_block(count: int, host: str = "127.0.0.1") -> int:
+    """First port of `count` consecutive ports that are free right now"""
+    for _ in range(50):
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+            probe.bind((host, 0))
+            start = probe.getsockname()[1]
+        if start + count >= 65536:
+            continue
+        try:
+            for port in range(start, start + count):
+                with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+                    probe.bind((host, port))
+            return start
+        except OSError:
+            continue
+    raise RuntimeError(f"No block of {count} free ports found")
+
+def thread_cpu_seconds(native_id: int) -> Optional[float]:
+    """User + system CPU time of one thread of this process (Linux /proc)"""
+    try:
+        with open(f"/proc/self/task/{native_id}/stat") as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        # utime and stime are fields 14 and 15; the split starts at field 3
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError):
+        return None
+
+def rss_bytes() -> Optional[int]:
+    """Resident set size of this process (Linux /proc)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+def build_config(base_port: int, sinks: Dict[str, Any]) -> SimulatorConfig:
+    """Simulator configuration with every device fed from local ports and writing to its sink"""
+    devices = {}
+    port = base_port
+    for device_name, port_count in DEVICE_PORT_COUNTS.items():
+        sink = sinks.get(device_name)
+        devices[device_name] = DeviceConfig(
+            enabled=sink is not None,
+            matlab_ports=list(range(port, port + port_count)),
+            output_mode=OUTPUT_MODES[sink.kind] if sink else "serial",
+            output_config=sink.output_config() if sink else {}
+        )
+        port += port_count
+    return SimulatorConfig(tcp_mode="server", matlab_server_ip="127.0.0.1",
+                           matlab_server_port=base_port, devices=devices)
+
+def snapshot(simulator: FlatSatDeviceSimulator, sinks: Dict[str, Any]) -> Dict[str, Any]:
+    """Counters, CPU and age histograms at one instant"""
+    return {
+        "time": time.perf_counter(),
+        "process_cpu": time.process_time(),
+        "rss": rss_bytes(),
+        "counters": {device_name: dict(counters) for device_name, counters in simulator.device_counters.items()},
+        "sinks": {device_name: sink.get_stats() for device_name, sink in sinks.items()},
+        "cpu": {type_name: thread_cpu_seconds(thread.native_id)
+                for type_name, thread in simulator.processing_threads.items()},
+        "ages": {device_name: performance_monitor.get_component_metrics(AGE_COMPONENT.format(device=device_name)).histogram()
+                 for device_name in sinks}
+    }
+
+def summarize(start: Dict[str, Any], end: Dict[str, Any]) -> Dict[str, Any]:
+    """Per-device and process results over the measurement window"""
+    elapsed = end["time"] - start["time"]
+    devices = {}
+    instance_counts: Dict[str, int] = {}
+    for device_name in end["counters"]:
+        instance_counts[device_type(device_name)] = instance_counts.get(device_type(device_name), 0) + 1
+    for device_name, counters in end["counters"].items():
+        before = start["counters"][device_name]
+        delta = {key: counters[key] - before[key] for key in counters}
+        ages: LatencyHistogram = end["ages"][device_name].subtract(start["ages"][device_name])
+        # Instances share their type's processing thread; split its CPU evenly between them
+        type_name = device_type(device_name)
+        cpu_start, cpu_end = start["cpu"].get(type_name), end["cpu"].get(type_name)
+        cpu_seconds = ((cpu_end - cpu_start) / instance_counts[type_name]
+                       if cpu_start is not None and cpu_end is not None else None)
+        sink_bytes = end["sinks"][device_name]["bytes_received"] - start["sinks"][device_name]["bytes_received"]
+        refused = delta["send_drops"] + delta["encode_failures"]
+
+        devices[device_name] = {
+            "frames_processed": delta["frames_processed"],
+            "frames_sent": delta["frames_sent"],
+            "packets_emitted": ages.count,
+            "throughput_pps": ages.count / elapsed,
+            "sink_bytes_per_second": sink_bytes / elapsed,
+            "drop_rate": refused / delta["frames_processed"] if delta["frames_processed"] else 0.0,
+            "cpu_seconds": cpu_seconds,
+            "cpu_percent": 100.0 * cpu_seconds / elapsed if cpu_seconds is not None else None,
+            "age_at_emission_ms": ages.summary()
+        }
+
+    rss_growth = end["rss"] - start["rss"] if start["rss"] is not None and end["rss"] is not None else None
+    return {
+        "elapsed_seconds": elapsed,
+        "devices": devices,
+        "process": {
+            "cpu_percent": 100.0 * (end["process_cpu"] - start["process_cpu"]) / elapsed,
+            "rss_start_bytes": start["rss"],
+            "rss_end_bytes": end["rss"],
+            "rss_growth_bytes": rss_growth
+        }
+    }
+
+def run_benchmark(rate_hz: float = 100.0, duration: float = 10.0, warmup: float = 2.0,
+                  sink_kinds: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Run the simulator end to end and return the results dictionary"""
+    sink_kinds = DEFAULT_SINKS if sink_kinds is None else sink_kinds
+    sinks = {device_name: SINK_TYPES[kind]() for device_name, kind in sink_kinds.items()}
+    for sink in sinks.values():
+        sink.start()
+
+    base_port = free_port_block(sum(DEVICE_PORT_COUNTS.values()))
+    config = build_config(base_port, sinks)
+    ports = {device_name: device.matlab_ports if device.enabled else []
+             for device_name, device in config.devices.items()}
+
+    simulator = FlatSatDeviceSimulator(config)
+    standin = MatlabStandIn(ports["ars"], ports["magnetometer"], ports["reaction_wheel"], rate_hz=rate_hz)
+    try:
+        simulator.start()
+        if not standin.connect_to_ports():
+            raise RuntimeError("MATLAB stand-in could not connect to the simulator")
+        standin.start()
+
+        time.sleep(warmup)
+        start = snapshot(simulator, sinks)
+        standin_start = standin.get_stats()
+        time.sleep(duration)
+        end = snapshot(simulator, sinks)
+        standin_end = standin.get_stats()
+    finally:
+        standin.stop()
+        simulator.stop()
+        for sink in sinks.values():
+            sink.stop()
+
+    results = summarize(start, end)
+    for device_name, kind in sink_kinds.items():
+        results["devices"][device_name]["sink"] = kind
+    results["standin"] = {
+        "rate_hz": rate_hz,
+        "achieved_rate_hz": (standin_end["ticks"] - standin_start["ticks"]) / results["elapsed_seconds"],
+        "samples_sent": standin_end["samples_sent"] - standin_start["samples_sent"],
+        "late_ticks": standin_end["late_ticks"] - standin_start["late_ticks"]
+    }
+    results["environment"] = {
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "duration_seconds": duration,
+        "warmup_seconds": warmup
+    }
+    return results
+
+def compare_to_baseline(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.2) -> List[str]:
+    """Regressions of results against a baseline run, as readable lines"""
+    regressions = []
+    for device_name, base in baseline.get("devices", {}).items():
+        current = results["devices"].get(device_name)
+        if current is None:
+            regressions.append(f"{device_name}: missing from results")
+            continue
+
+        if current["throughput_pps"] < base["throughput_pps"] * (1 - tolerance):
+            regressions.append(f"{device_name}: throughput {current['throughput_pps']:.1f} pps "
+                               f"< baseline {base['throughput_pps']:.1f} pps")
+
+        current_p99 = current["age_at_emission_ms"]["p99_ms"]
+        base_p99 = base["age_at_emission_ms"]["p99_ms"]
+        if current_p99 > base_p99 * (1 + tolerance) + AGE_SLACK_MS:
+            regressions.append(f"{device_name}: p99 age at emission {current_p99:.3f} ms "
+                               f"> baseline {base_p99:.3f} ms")
+
+        if current["drop_rate"] > base["drop_rate"] + DROP_RATE_SLACK:
+            regressions.append(f"{device_name}: drop rate {current['drop_rate']:.2%} "
+                               f"> baseline {base['drop_rate']:.2%}")
+
+        if current["cpu_percent"] is not None and base.get("cpu_percent") is not None:
+            if current["cpu_percent"] > base["cpu_percent"] * (1 + tolerance) + 1.0:
+                regressions.append(f"{device_name}: CPU {current['cpu_percent']:.1f}% "
+                                   f"> baseline {base['cpu_percent']:.1f}%")
+    return regressions
+
+def print_results(results: Dict[str, Any]):
+    """Print a results table"""
+    standin = results["standin"]
+    print(f"\n📊 Benchmark over {results['elapsed_seconds']:.1f}s - stand-in {standin['achieved_rate_hz']:.1f}/"
+          f"{standin['rate_hz']:.0f} Hz, {standin['late_ticks']} late ticks")
+    print(f"{'Device':<16} {'Sink':<5} {'Thru (pps)':>11} {'CPU %':>7} {'Drop %':>7} "
+          f"{'Age p50':>9} {'Age p99':>9} {'Age p99.9':>10} {'Age max':>9}")
+    for device_name, device in results["devices"].items():
+        age = device["age_at_emission_ms"]
+        cpu = f"{device['cpu_percent']:.1f}" if device["cpu_percent"] is not None else "n/a"
+        print(f"{device_name:<16} {device['sink']:<5} {device['throughput_pps']:>11.1f} {cpu:>7} "
+              f"{device['drop_rate'] * 100:>7.2f} {age['p50_ms']:>8.3f}ms {age['p99_ms']:>8.3f}ms "
+              f"{age['p99_9_ms']:>9.3f}ms {age['max_ms']:>8.3f}ms")
+    process = results["process"]
+    if process["rss_growth_bytes"] is not None:
+        print(f"Process CPU {process['cpu_percent']:.1f}%, RSS growth {process['rss_growth_bytes'] / 1024:.0f} KiB")
+
+def main():
+    parser = argparse.ArgumentParser(description='FlatSat Simulator End-to-End Benchmark')
+    parser.add_argument('--rate', type=float, default=100.0, help='Stand-in send rate per port in Hz (default: 100)')
+    parser.add_argument('--duration', type=float, default=10.0, help='Measured seconds (default: 10)')
+    parser.add_argument('--warmup', type=float, default=2.0, help='Seconds before measuring (default: 2)')
+    parser.add_argument('--devices', nargs='+', choices=sorted(DEVICE_PORT_COUNTS), default=sorted(DEVICE_PORT_COUNTS),
+                       help='Devices to enable (default: all)')
+    for device_name, kind in DEFAULT_SINKS.items():
+        parser.add_argument(f'--{device_name.replace("_", "-")}-sink', choices=sorted(SINK_TYPES), default=kind,
+                           help=f'Sink for {device_name} (default: {kind})')
+    parser.add_argument('--output', help='Write results JSON here')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline results JSON to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed relative regression (default: 0.2)')
+    parser.add_argument('--log-level', default='WARNING', help='Simulator log level during the run (default: WARNING)')
+
+    args = parser.parse_args()
+    logging.getLogger().setLevel(args.log_level)
+
+    sink_kinds = {device_name: getattr(args, f'{device_name}_sink') for device_name in args.devices}
+    results = run_benchmark(args.rate, args.duration, args.warmup, sink_kinds)
+    print_results(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline} - run with --save-baseline to store one")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare_to_baseline(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) against {args.baseline}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print(f"\n✅ No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Receiver Stand-Ins for Benchmarks
+
+Each sink plays the flight hardware on one simulator output and counts what
+arrives on a background thread:
+
+    TCPSink  - listening socket for tcp output (target_ip/target_port)
+    PtySink  - pty:// serial port; the simulator writes through pyserial at
+               the emulated baud rate and the sink reads the far end
+    CANSink  - python-can virtual bus on a named channel; the simulator
+               transmits on the same channel with interface "virtual"
+"""
+
+import os
+import sys
+import socket
+import threading
+import logging
+from typing import Any, Dict, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from output_transmitters.protocol_pty import get_pty_pair, close_pty_pair
+
+logger = logging.getLogger(__name__)
+
+class Sink:
+    """Counts received bytes and reads on a background thread"""
+
+    kind = "sink"
+
+    def __init__(self):
+        self.bytes_received = 0
+        self.reads = 0
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+
+    def output_config(self) -> Dict[str, Any]:
+        """Simulator output_config that targets this sink"""
+        raise NotImplementedError
+
+    def start(self):
+        """Start receiving"""
+        self.running = True
+        self.thread = threading.Thread(target=self._receive_loop, daemon=True)
+        self.thread.start()
+
+    def _receive_loop(self):
+        raise NotImplementedError
+
+    def stop(self):
+        """Stop receiving and release the endpoint"""
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=2.0)
+        self.close()
+
+    def close(self):
+        pass
+
+    def get_stats(self) -> Dict[str, int]:
+        """Bytes and reads received so far"""
+        return {"bytes_received": self.bytes_received, "reads": self.reads}
+
+class TCPSink(Sink):
+    """Accepts one TCP connection and drains it"""
+
+    kind = "tcp"
+
+    def __init__(self, host: str = "127.0.0.1"):
+        super().__init__()
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind((host, 0))
+        self.server.listen(1)
+        self.server.settimeout(0.2)
+        self.host, self.port = self.server.getsockname()
+
+    def output_config(self) -> Dict[str, Any]:
+        return {"target_ip": self.host, "target_port": self.port}
+
+    def _receive_loop(self):
+        connection = None
+        while self.running and connection is None:
+            try:
+                connection, _ = self.server.accept()
+            except socket.timeout:
+                continue
+        if connection is None:
+            return
+        connection.settimeout(0.2)
+        with connection:
+            while self.running:
+                try:
+                    data = connection.recv(65536)
+                except socket.timeout:
+                    continue
+                if not data:
+                    break
+                self.bytes_received += len(data)
+                self.reads += 1
+
+    def close(self):
+        self.server.close()
+
+class PtySink(Sink):
+    """Far end of a pty:// serial port standing in for an RS422/RS485 line"""
+
+    kind = "pty"
+
+    def __init__(self, name: str = "flatsat_benchmark", baud_rate: int = 921600):
+        super().__init__()
+        self.name = name
+        self.baud_rate = baud_rate
+        self.pair = get_pty_pair(name)
+
+    def output_config(self) -> Dict[str, Any]:
+        # The simulator's writes are paced at baud_rate, as on a real line
+        return {"port": f"pty://{self.name}", "baud_rate": self.baud_rate}
+
+    def _receive_loop(self):
+        while self.running:
+            data = self.pair.read(timeout=0.2)
+            if data:
+                self.bytes_received += len(data)
+                self.reads += 1
+
+    def close(self):
+        close_pty_pair(self.name)
+
+class CANSink(Sink):
+    """Listener on a python-can virtual bus channel"""
+
+    kind = "can"
+
+    def __init__(self, channel: str = "flatsat_benchmark"):
+        super().__init__()
+        import can
+        self.channel = channel
+        self.bus = can.Bus(interface="virtual", channel=channel)
+        self.messages_received = 0
+
+    def output_config(self) -> Dict[str, Any]:
+        return {"interface": "virtual", "channel": self.channel, "bitrate": 500000}
+
+    def _receive_loop(self):
+        while self.running:
+            message = self.bus.recv(timeout=0.2)
+            if message is None:
+                continue
+            self.messages_received += 1
+            self.bytes_received += len(message.data)
+            self.reads += 1
+
+    def close(self):
+        self.bus.shutdown()
+
+    def get_stats(self) -> Dict[str, int]:
+        stats = super().get_stats()
+        stats["messages_received"] = self.messages_received
+        return stats
+
+SINK_TYPES = {"tcp": TCPSink, "pty": PtySink, "can": CANSink}
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Columnar Capture Store for TCP Data Dumper Captures
+
+Converts tcp_data_dumper text output (PORT:HH:MM:SS.mmm: HEX ... = FLOAT) or
+--raw record captures in a single pass into per-port columns of timestamp_ns (int64) and value (float64)
+stored as raw little-endian files next to a JSON manifest. The loader maps the
+columns with numpy.memmap so repeat analyses start instantly and only touch the
+pages they read.
+
+Usage:
+    python3 capture_store.py x.dmp
+    python3 capture_store.py x.dmp --output x.cols --endianness big
+"""
+
+import os
+import re
+import json
+import struct
+import argparse
+from array import array
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from tcp_data_dumper import RAW_MAGIC, iter_raw_records
+
+# Bumped whenever the on-disk layout changes so stale caches get rebuilt
+STORE_FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+CACHE_SUFFIX = ".cols"
+
+NS_PER_MS = 1_000_000
+NS_PER_SECOND = 1_000_000_000
+NS_PER_DAY = 86_400 * NS_PER_SECOND
+
+# Entries buffered per port before they are appended to the column files
+FLUSH_EVERY = 65536
+
+# PORT:HH:MM:SS.mmm: [HEX x8] ... [= FLOAT]
+_LINE_PATTERN = re.compile(
+    r'^(\d+):(\d{2}):(\d{2}):(\d{2})\.(\d{3}):\s*'
+    r'((?:[0-9A-F]{2} ){7}[0-9A-F]{2})?'
+    r'.*?(?:=\s*([+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?))?\s*$'
+)
+
+
+def format_timestamp_ns(timestamp_ns: int) -> str:
+    """Format nanoseconds since capture midnight as HH:MM:SS.mmm"""
+    timestamp_ns = int(timestamp_ns) % NS_PER_DAY
+    total_ms = timestamp_ns // NS_PER_MS
+    seconds, millis = divmod(total_ms, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}.{millis:03d}"
+
+
+def default_store_path(dump_path: str) -> str:
+    """Columnar cache location used for a given .dmp file"""
+    return dump_path + CACHE_SUFFIX
+
+
+class _PortColumnWriter:
+    """Buffers one port's columns and appends them to disk in blocks"""
+
+    def __init__(self, directory: str, port: int, value_dtype: str):
+        self.port = port
+        self.value_dtype = value_dtype
+        self.timestamps = array('q')
+        self.raw_values = bytearray()
+        self.count = 0
+        self.ts_file = open(os.path.join(directory, f"{port}.ts"), 'wb')
+        self.value_file = open(os.path.join(directory, f"{port}.val"), 'wb')
+
+    def append(self, timestamp_ns: int, raw_value: bytes):
+        self.timestamps.append(timestamp_ns)
+        self.raw_values += raw_value
+        if len(self.timestamps) >= FLUSH_EVERY:
+            self.flush()
+
+    def flush(self):
+        if not self.timestamps:
+            return
+        np.frombuffer(self.timestamps, dtype=np.int64).astype('<i8', copy=False).tofile(self.ts_file)
+        values = np.frombuffer(bytes(self.raw_values), dtype=self.value_dtype)
+        values.astype('<f8').tofile(self.value_file)
+        self.count += len(self.timestamps)
+        self.timestamps = array('q')
+        self.raw_values = bytearray()
+
+    def close(self):
+        self.flush()
+        self.ts_file.close()
+        self.value_file.close()
+
+
+def is_raw_capture(dump_path: str) -> bool:
+    """Check whether a capture was written by the dumper's --raw mode"""
+    with open(dump_path, 'rb') as f:
+        return f.read(len(RAW_MAGIC)) == RAW_MAGIC
+
+
+def _local_midnight_ns(timestamp_ns: int) -> int:
+    """Epoch nanoseconds of local midnight on the day of timestamp_ns"""
+    local = datetime.fromtimestamp(timestamp_ns / NS_PER_SECOND)
+    midnight = local.replace(hour=0, minute=0, second=0, microsecond=0)
+    return int(midnight.timestamp()) * NS_PER_SECOND
+
+
+def _convert_raw_records(dump_path: str, writers: Dict[int, _PortColumnWriter],
+                         make_writer) -> Tuple[int, int]:
+    """Split raw records into 8-byte words stamped with their record's receive time"""
+    pending: Dict[int, bytes] = {}
+    midnight_ns = None
+    records = 0
+    words = 0
+    for port, timestamp_ns, payload in iter_raw_records(dump_path):
+        records += 1
+        if midnight_ns is None:
+            midnight_ns = _local_midnight_ns(timestamp_ns)
+        if port in pending:
+            payload = pending.pop(port) + payload
+        aligned = len(payload) - len(payload) % 8
+        if aligned < len(payload):
+            pending[port] = payload[aligned:]
+
+        writer = writers.get(port)
+        if writer is None:
+            writer = make_writer(port)
+            writers[port] = writer
+        relative_ns = timestamp_ns - midnight_ns
+        for offset in range(0, aligned, 8):
+            writer.append(relative_ns, payload[offset:offset + 8])
+        words += aligned // 8
+    return records, words
+
+
+def _convert_text_lines(dump_path: str, writers: Dict[int, _PortColumnWriter], make_writer,
+                        pack_format: str, verbose: bool) -> Tuple[int, int]:
+    """Parse dumper text lines into the per-port column writers"""
+    nan_bytes = struct.pack(pack_format, float('nan'))
+    day_offset = 0
+    last_time_of_day = None
+    total_lines = 0
+    parsed_lines = 0
+
+    with open(dump_path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            total_lines += 1
+            match = _LINE_PATTERN.match(line)
+            if not match:
+                continue
+
+            port_str, hh, mm, ss, ms, hex_str, float_str = match.groups()
+            time_of_day = ((int(hh) * 60 + int(mm)) * 60 + int(ss)) * NS_PER_SECOND + int(ms) * NS_PER_MS
+
+            # Lines are appended in arrival order; a jump backwards of more
+            # than half a day means the capture crossed midnight
+            if last_time_of_day is not None and last_time_of_day - time_of_day > NS_PER_DAY // 2:
+                day_offset += NS_PER_DAY
+            last_time_of_day = time_of_day
+
+            if hex_str:
+                raw_value = bytes.fromhex(hex_str)
+            elif float_str:
+                raw_value = struct.pack(pack_format, float(float_str))
+            else:
+                raw_value = nan_bytes
+
+            port = int(port_str)
+            writer = writers.get(port)
+            if writer is None:
+                writer = make_writer(port)
+                writers[port] = writer
+            writer.append(day_offset + time_of_day, raw_value)
+            parsed_lines += 1
+
+            if verbose and total_lines % 1_000_000 == 0:
+                print(f"Processed {total_lines} lines...")
+
+    return total_lines, parsed_lines
+
+
+def convert_capture(dump_path: str, output_dir: Optional[str] = None,
+                    endianness: str = 'little', verbose: bool = False) -> str:
+    """
+    Convert a dumper capture into a columnar store in one pass
+
+    Values are decoded from the 8 hex bytes when present (lossless); lines
+    captured without hex output fall back to the printed float. Timestamps are
+    nanoseconds since midnight of the first line, with midnight rollovers
+    carried forward. Raw captures are detected by their magic header and
+    every word takes its record's receive timestamp. Returns the store
+    directory.
+    """
+    output_dir = output_dir or default_store_path(dump_path)
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Remove a previous manifest first so an interrupted conversion is never
+    # mistaken for a complete store
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+    value_dtype = '>f8' if endianness == 'big' else '<f8'
+    pack_format = '>d' if endianness == 'big' else '<d'
+    writers: Dict[int, _PortColumnWriter] = {}
+
+    def make_writer(port: int) -> _PortColumnWriter:
+        return _PortColumnWriter(output_dir, port, value_dtype)
+
+    try:
+        if is_raw_capture(dump_path):
+            total_lines, parsed_lines = _convert_raw_records(dump_path, writers, make_writer)
+        else:
+            total_lines, parsed_lines = _convert_text_lines(dump_path, writers, make_writer,
+                                                            pack_format, verbose)
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    stat = os.stat(dump_path)
+    manifest = {
+        "format_version": STORE_FORMAT_VERSION,
+        "source": os.path.abspath(dump_path),
+        "source_size": stat.st_size,
+        "source_mtime_ns": stat.st_mtime_ns,
+        "endianness": endianness,
+        "total_lines": total_lines,
+        "parsed_lines": parsed_lines,
+        "ports": {str(port): writers[port].count for port in sorted(writers)}
+    }
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    if verbose:
+        print(f"Converted {parsed_lines}/{total_lines} lines from {dump_path} "
+              f"into {len(writers)} port columns at {output_dir}")
+    return output_dir
+
+
+class CaptureStore:
+    """Read-only, memory-mapped view of a converted capture"""
+
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, MANIFEST_NAME), 'r') as f:
+            self.manifest = json.load(f)
+        self._counts = {int(port): count for port, count in self.manifest["ports"].items()}
+        self._columns: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+
+    @property
+    def ports(self) -> List[int]:
+        """Sorted list of ports present in the capture"""
+        return sorted(self._counts)
+
+    def __contains__(self, port: int) -> bool:
+        return port in self._counts
+
+    def count(self, port: int) -> int:
+        """Number of samples captured on a port"""
+        return self._counts.get(port, 0)
+
+    def _map(self, port: int, suffix: str, dtype: str) -> np.ndarray:
+        count = self._counts[port]
+        if count == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(os.path.join(self.store_dir, f"{port}.{suffix}"),
+                         dtype=dtype, mode='r', shape=(count,))
+
+    def port(self, port: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (timestamps_ns, values) for a port as memory-mapped arrays"""
+        if port not in self._counts:
+            raise KeyError(f"Port {port} not present in capture")
+        if port not in self._columns:
+            self._columns[port] = (self._map(port, "ts", '<i8'), self._map(port, "val", '<f8'))
+        return self._columns[port]
+
+    def timestamps_ns(self, port: int) -> np.ndarray:
+        return self.port(port)[0]
+
+    def values(self, port: int) -> np.ndarray:
+        return self.port(port)[1]
+
+    def iter_port_chunks(self, port: int, chunk_size: int = FLUSH_EVERY):
+        """Yield (timestamps_ns, values) slices of a port in bounded-size chunks"""
+        timestamps, values = self.port(port)
+        for start in range(0, len(timestamps), chunk_size):
+            yield timestamps[start:start + chunk_size], values[start:start + chunk_size]
+
+
+def _store_is_current(store_dir: str, dump_path: str, endianness: str) -> bool:
+    """Check whether an existing store was built from the current dump file"""
+    manifest_path = os.path.join(store_dir, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return False
+    try:
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+        stat = os.stat(dump_path)
+        return (manifest.get("format_version") == STORE_FORMAT_VERSION and
+                manifest.get("source_size") == stat.st_size and
+                manifest.get("source_mtime_ns") == stat.st_mtime_ns and
+                manifest.get("endianness") == endianness)
+    except (OSError, ValueError):
+        return False
+
+
+def load_capture(path: str, endianness: str = 'little', rebuild: bool = False,
+                 verbose: bool = False) -> CaptureStore:
+    """
+    Load a capture through the columnar store
+
+    Accepts either a store directory or a .dmp file. For a .dmp file the cached
+    store next to it is reused when it is up to date, otherwise it is
+    (re)built first.
+    """
+    if os.path.isdir(path):
+        return CaptureStore(path)
+
+    store_dir = default_store_path(path)
+    if rebuild or not _store_is_current(store_dir, path, endianness):
+        if verbose:
+            print(f"Converting {path} to columnar store...")
+        convert_capture(path, store_dir, endianness=endianness, verbose=verbose)
+    elif verbose:
+        print(f"Using cached columnar store {store_dir}")
+    return CaptureStore(store_dir)
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Convert TCP data dumper captures to a columnar store')
+    parser.add_argument('input_file', help='Input capture file (.dmp)')
+    parser.add_argument('--output', '-o', help=f'Output store directory (default: <input>{CACHE_SUFFIX})')
+    parser.add_argument('--endianness', choices=['little', 'big'], default='little',
+                        help='Endianness of the captured 8-byte words (default: little)')
+
+    args = parser.parse_args()
+
+    store_dir = convert_capture(args.input_file, args.output, endianness=args.endianness, verbose=True)
+    store = CaptureStore(store_dir)
+    for port in store.ports:
+        timestamps = store.timestamps_ns(port)
+        span = format_timestamp_ns(timestamps[0]) + " - " + format_timestamp_ns(timestamps[-1]) if len(timestamps) else "--"
+        print(f"  Port {port}: {store.count(port)} samples ({span})")
+
+
+if __name__ == "__main__":
+    main()
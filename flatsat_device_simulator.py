@@ -14,7 +14,7 @@ import time
 import logging
 import argparse
 import threading
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass
 from pathlib import Path
 
@@ -30,9 +30,14 @@ from output_transmitters.serial_transmitter import SerialTransmitterManager, Ser
 from output_transmitters.can_transmitter import CANTransmitterManager, CANConfig
 from output_transmitters.tcp_transmitter import TCPTransmitterManager, TCPConfig
 from usb_loopback_tester import USBLoopbackTester, USBPortConfig
+from magnetometer_responder import MagnetometerPollResponder, ResponderConfig
+from reaction_wheel_responder import ReactionWheelResponder, RWResponderConfig
 from packet_logger import PacketLogger
 from error_handler import error_handler, handle_error, ErrorType, ErrorSeverity
 from performance_monitor import performance_monitor, measure_performance
+from attitude_tap import AttitudeTap, DEFAULT_TAP_HOST, DEFAULT_TAP_PORT
+from metrics_server import MetricsServer, DEFAULT_METRICS_HOST, DEFAULT_METRICS_PORT
+from latency_tracer import emission_tracer
 
 # Configure logging
 logging.basicConfig(
@@ -58,8 +63,13 @@ class DeviceConfig:
     redundant_variation_percent: float = 0.1  # For ARS: variation percentage
     usb_loopback_enabled: bool = False  # Enable USB loopback testing
     usb_loopback_port: str = ""  # USB port for loopback testing
+    usb_loopback_monitor_port: str = ""  # Port the echo arrives on (empty: same as usb_loopback_port)
     log_packets_to_file: bool = False  # Log sent packets to file when loopback disabled
     packet_log_file: str = ""  # File path for packet logging
+    poll_responder: bool = False  # Magnetometer/reaction wheel: answer polls on the output link instead of pushing frames
+    responder_turnaround_ms: float = 2.0  # Poll responder delay from request to reply
+    rwa_address: int = 0x01  # Reaction wheel: bus address of this wheel
+    rwa_addresses: List[int] = None  # Reaction wheel: bus addresses the responder answers (default: rwa_address)
     status_cycling_enabled: bool = False  # Enable status cycling
     status_cycle_interval: float = 10.0  # Status cycle interval in seconds
     status_scenarios: List[str] = None  # List of status scenarios
@@ -71,6 +81,30 @@ class DeviceConfig:
             self.output_config = {}
         if self.status_scenarios is None:
             self.status_scenarios = ["normal"]
+        if self.rwa_addresses is None:
+            self.rwa_addresses = [self.rwa_address]
+
+def device_type(device_name: str) -> str:
+    """Device type of a device or instance name ("reaction_wheel[2]" -> "reaction_wheel")"""
+    return device_name.split('[', 1)[0]
+
+def expand_instances(device_name: str, device_data: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Split a device entry with an "instances" list into one entry per instance
+    
+    Instances are named "<device>[<index>]". Each takes the entry's shared
+    settings and overrides them with its own; output_config is merged key by key.
+    """
+    instances = device_data.get("instances")
+    if not instances:
+        return [(device_name, device_data)]
+    shared = {key: value for key, value in device_data.items() if key != "instances"}
+    expanded = []
+    for index, overrides in enumerate(instances):
+        instance_data = {**shared, **overrides}
+        instance_data["output_config"] = {**shared.get("output_config", {}), **overrides.get("output_config", {})}
+        expanded.append((f"{device_name}[{index}]", instance_data))
+    return expanded
 
 @dataclass
 class SimulatorConfig:
@@ -79,6 +113,10 @@ class SimulatorConfig:
     matlab_server_ip: str = "192.168.1.100"
     matlab_server_port: int = 5000
     devices: Dict[str, DeviceConfig] = None
+    attitude_tap_port: int = 0  # Publish ingest frames to this local UDP port (0 disables)
+    metrics_port: int = 0  # Serve Prometheus/JSON metrics on this HTTP port (0 disables)
+    kernel_timestamps: bool = False  # Stamp MATLAB samples with SO_TIMESTAMPNS (Linux)
+    trace_file: str = ""  # Per-packet age-at-emission CSV (empty disables)
     
     def __post_init__(self):
         if self.devices is None:
@@ -94,8 +132,21 @@ class FlatSatDeviceSimulator:
         self.output_transmitters: Dict[str, Any] = {}
         self.usb_loopback_tester: Optional[USBLoopbackTester] = None
         self.packet_logger: Optional[PacketLogger] = None
+        self.attitude_tap: Optional[AttitudeTap] = None
+        self.metrics_server: Optional[MetricsServer] = None
+        self.poll_responders: Dict[str, Any] = {}
         self.running = False
         self.threads: List[threading.Thread] = []
+        self.processing_threads: Dict[str, threading.Thread] = {}  # Device type -> its processing thread
+        self.start_time = time.time()
+        
+        # Per-device counters, each written only by that device's processing thread
+        self.device_counters: Dict[str, Dict[str, int]] = {
+            device_name: {"frames_processed": 0, "encode_failures": 0, "frames_sent": 0, "send_drops": 0}
+            for device_name, device_config in self.config.devices.items() if device_config.enabled
+        }
+        # (time, samples received per port) from the previous metrics snapshot
+        self._last_port_samples: Dict[str, Any] = {}
         
         # Initialize enabled devices
         self._initialize_devices()
@@ -103,6 +154,10 @@ class FlatSatDeviceSimulator:
         # Initialize packet logger and USB loopback tester
         self._initialize_logging_and_testing()
         
+        # Live viewers subscribe to ingest frames through the attitude tap
+        if self.config.attitude_tap_port:
+            self.attitude_tap = AttitudeTap(DEFAULT_TAP_HOST, self.config.attitude_tap_port)
+        
     def _initialize_devices(self):
         """Initialize enabled devices"""
         for device_name, device_config in self.config.devices.items():
@@ -110,7 +165,8 @@ class FlatSatDeviceSimulator:
                 logger.info(f"Initializing device: {device_name}")
                 
                 # Initialize encoder
-                if device_name == "ars":
+                type_name = device_type(device_name)
+                if type_name == "ars":
                     # Get duplication settings from device config
                     # Check if attributes exist, otherwise use defaults
                     duplicate = getattr(device_config, 'duplicate_primary_to_redundant', False)
@@ -120,17 +176,57 @@ class FlatSatDeviceSimulator:
                         variation_percent=variation
                     )
                     logger.info(f"ARS encoder: duplication={duplicate}, variation={variation}%")
-                elif device_name == "magnetometer":
+                elif type_name == "magnetometer":
                     self.device_encoders[device_name] = MagnetometerEncoder()
-                elif device_name == "reaction_wheel":
-                    self.device_encoders[device_name] = ReactionWheelEncoder()
+                elif type_name == "reaction_wheel":
+                    self.device_encoders[device_name] = ReactionWheelEncoder(device_config.rwa_address)
                 else:
                     logger.error(f"Unknown device type: {device_name}")
                     continue
                 
+                # Polled devices answer on their output link instead of pushing frames
+                if type_name in ("magnetometer", "reaction_wheel") and device_config.poll_responder:
+                    self._initialize_poll_responder(device_name, device_config)
+                    continue
+                
                 # Initialize output transmitter
                 self._initialize_output_transmitter(device_name, device_config)
     
+    def _initialize_poll_responder(self, device_name: str, device_config: DeviceConfig):
+        """Initialize a poll responder on the device's serial or CAN link"""
+        output_config = device_config.output_config
+        if device_type(device_name) == "reaction_wheel":
+            # The RWA command/response protocol runs on RS485 only; wheels on one bus share a responder
+            port = output_config.get("port", "/dev/ttyUSB2")
+            for responder in self.poll_responders.values():
+                if isinstance(responder, ReactionWheelResponder) and responder.config.port == port:
+                    responder.serve(device_config.rwa_addresses)
+                    break
+            else:
+                responder = ReactionWheelResponder(RWResponderConfig(
+                    port=port,
+                    baud_rate=output_config.get("baud_rate", 115200),
+                    addresses=list(device_config.rwa_addresses),
+                    turnaround_ms=device_config.responder_turnaround_ms
+                ), device_type(device_name))
+            self.poll_responders[device_name] = responder
+            logger.info(f"{device_name} will answer commands on {port}")
+            return
+        self.poll_responders[device_name] = MagnetometerPollResponder(ResponderConfig(
+            link="can" if device_config.output_mode == "can" else "serial",
+            port=output_config.get("port", "/dev/ttyUSB1"),
+            baud_rate=output_config.get("baud_rate", 115200),
+            interface=output_config.get("interface", "socketcan"),
+            channel=output_config.get("channel", "can0"),
+            bitrate=output_config.get("bitrate", 500000),
+            turnaround_ms=device_config.responder_turnaround_ms
+        ), device_name)
+        logger.info(f"{device_name} will answer polls on its {device_config.output_mode} link")
+    
+    def _unique_responders(self) -> List[Any]:
+        """Poll responders, once each even when instances on one bus share a responder"""
+        return list({id(responder): responder for responder in self.poll_responders.values()}.values())
+    
     def _initialize_logging_and_testing(self):
         """Initialize packet logger and USB loopback tester based on device configurations"""
         # Check if any device needs USB loopback testing
@@ -142,7 +238,8 @@ class FlatSatDeviceSimulator:
                 if device_config.usb_loopback_enabled and device_config.usb_loopback_port:
                     loopback_devices[device_name] = USBPortConfig(
                         port=device_config.usb_loopback_port,
-                        baud_rate=device_config.output_config.get("baud_rate", 115200)
+                        baud_rate=device_config.output_config.get("baud_rate", 115200),
+                        monitor_port=device_config.usb_loopback_monitor_port
                     )
                 
                 if device_config.log_packets_to_file and device_config.packet_log_file:
@@ -169,6 +266,7 @@ class FlatSatDeviceSimulator:
         if output_mode == "serial":
             if "serial_transmitters" not in self.output_transmitters:
                 self.output_transmitters["serial_transmitters"] = SerialTransmitterManager()
+                self.output_transmitters["serial_transmitters"].emission_callback = emission_tracer.record_emission
             
             serial_config = SerialConfig(
                 port=output_config.get("port", "/dev/ttyUSB0"),
@@ -180,6 +278,7 @@ class FlatSatDeviceSimulator:
         elif output_mode == "can":
             if "can_transmitters" not in self.output_transmitters:
                 self.output_transmitters["can_transmitters"] = CANTransmitterManager()
+                self.output_transmitters["can_transmitters"].emission_callback = emission_tracer.record_emission
             
             can_config = CANConfig(
                 interface=output_config.get("interface", "socketcan"),
@@ -192,6 +291,7 @@ class FlatSatDeviceSimulator:
         elif output_mode == "tcp":
             if "tcp_transmitters" not in self.output_transmitters:
                 self.output_transmitters["tcp_transmitters"] = TCPTransmitterManager()
+                self.output_transmitters["tcp_transmitters"].emission_callback = emission_tracer.record_emission
             
             tcp_config = TCPConfig(
                 target_ip=output_config.get("target_ip", "192.168.1.200"),
@@ -210,6 +310,9 @@ class FlatSatDeviceSimulator:
         # Set running to True before starting threads
         self.running = True
         
+        if self.config.trace_file:
+            emission_tracer.open_trace(self.config.trace_file)
+        
         # Start TCP receiver
         self._start_tcp_receiver()
         
@@ -219,9 +322,19 @@ class FlatSatDeviceSimulator:
         # Start performance monitoring
         performance_monitor.start_monitoring()
         
+        # Start answering polls
+        for responder in self._unique_responders():
+            if not responder.start():
+                logger.warning(f"Failed to start {responder.device_name} poll responder")
+        
         # Start data processing threads
         self._start_data_processing()
         
+        # Start metrics endpoint
+        if self.config.metrics_port:
+            self.metrics_server = MetricsServer(self.collect_metrics, DEFAULT_METRICS_HOST, self.config.metrics_port)
+            self.metrics_server.start()
+        
         logger.info("FlatSat Device Simulator started successfully")
     
     def _start_tcp_receiver(self):
@@ -229,7 +342,8 @@ class FlatSatDeviceSimulator:
         tcp_config = TCPReceiverConfig(
             mode=self.config.tcp_mode,
             ip_address=self.config.matlab_server_ip,
-            port=self.config.matlab_server_port
+            port=self.config.matlab_server_port,
+            kernel_timestamps=self.config.kernel_timestamps
         )
         
         self.tcp_receiver = TCPReceiver(tcp_config)
@@ -259,79 +373,116 @@ class FlatSatDeviceSimulator:
                 logger.warning("Failed to start USB loopback tester")
     
     def _start_data_processing(self):
-        """Start data processing threads for each device"""
+        """Start one data processing thread per device type, shared by all of its instances"""
+        groups: Dict[str, List[Tuple[str, DeviceConfig]]] = {}
         for device_name, device_config in self.config.devices.items():
             if device_config.enabled:
-                thread = threading.Thread(
-                    target=self._process_device_data,
-                    args=(device_name, device_config),
-                    daemon=True
-                )
-                thread.start()
-                self.threads.append(thread)
-                logger.info(f"Started data processing thread for {device_name}")
+                groups.setdefault(device_type(device_name), []).append((device_name, device_config))
+        
+        for type_name, instances in groups.items():
+            thread = threading.Thread(
+                target=self._process_device_data,
+                args=(type_name, instances),
+                daemon=True
+            )
+            thread.start()
+            self.threads.append(thread)
+            self.processing_threads[type_name] = thread
+            logger.info(f"Started data processing thread for {', '.join(name for name, _ in instances)}")
     
-    def _process_device_data(self, device_name: str, device_config: DeviceConfig):
-        """Process data for a specific device"""
-        encoder = self.device_encoders.get(device_name)
-        if not encoder:
-            logger.error(f"No encoder found for device {device_name}")
+    def _process_device_data(self, type_name: str, instances: List[Tuple[str, DeviceConfig]]):
+        """Process data for every instance of a device type in one loop"""
+        active = []
+        for device_name, device_config in instances:
+            encoder = self.device_encoders.get(device_name)
+            if not encoder:
+                logger.error(f"No encoder found for device {device_name}")
+                continue
+            active.append((device_name, device_config, encoder))
+        
+        logger.info(f"🔄 Starting data processing thread for {type_name} ({len(active)} instances)")
+        iteration_count = 0
+        
+        while self.running and active:
+            iteration_count += 1
+            
+            # Debug logging
+            if iteration_count % 1000 == 0:
+                logger.info(f"⏳ {type_name} processing thread iteration {iteration_count}")
+            
+            for instance in list(active):
+                device_name, device_config, encoder = instance
+                try:
+                    self._process_instance(device_name, device_config, encoder, iteration_count)
+                except Exception as e:
+                    if not handle_error(e, device_name, "data_processor", "process_data", 
+                                      ErrorType.DATA_PROCESSING, ErrorSeverity.MEDIUM):
+                        logger.error(f"Critical error processing data for {device_name}, stopping its processing")
+                        active.remove(instance)
+                        continue
+                    time.sleep(0.1)
+            
+            time.sleep(0.001)  # Small delay to prevent busy waiting
+    
+    def _process_instance(self, device_name: str, device_config: DeviceConfig, encoder: Any, iteration_count: int):
+        """Encode and send the latest MATLAB frame of one device instance"""
+        counters = self.device_counters[device_name]
+        
+        # Get data from TCP receiver
+        with measure_performance(f"{device_name}_receiver", "get_data"):
+            data = self.tcp_receiver.get_data(device_name)
+            ingest_ns = self.tcp_receiver.get_ingest_window(device_name)
+        
+        # Debug logging
+        if iteration_count % 1000 == 0:
+            logger.info(f"🔍 {device_name} get_data returned: {data[:3] if data else None}")
+        
+        if not data:
+            if iteration_count % 100 == 0:  # Log every 100 iterations to avoid spam
+                logger.debug(f"⏳ {device_name} waiting for data (iteration {iteration_count})")
             return
         
-        logger.info(f"🔄 Starting data processing thread for {device_name}")
-        iteration_count = 0
+        if self.attitude_tap:
+            # The tap feed is per device type; instances share their type's channel
+            self.attitude_tap.publish(device_type(device_name), data)
         
-        while self.running:
-            try:
-                iteration_count += 1
-                
-                # Debug logging
-                if iteration_count % 1000 == 0:
-                    logger.info(f"⏳ {device_name} processing thread iteration {iteration_count}")
-                
-                # Get data from TCP receiver
-                with measure_performance(f"{device_name}_receiver", "get_data"):
-                    data = self.tcp_receiver.get_data(device_name)
-                
-                # Debug logging
-                if iteration_count % 1000 == 0:
-                    logger.info(f"🔍 {device_name} get_data returned: {data[:3] if data else None}")
-                
-                if data:
-                    non_zero_count = sum(1 for x in data if abs(x) > 1e-10)
-                    logger.info(f"📊 {device_name} data received: {non_zero_count}/12 non-zero values, sample: {[f'{x:.6f}' for x in data[:3]]}")
-                    
-                    # Process data based on device type
-                    with measure_performance(f"{device_name}_encoder", "encode_data"):
-                        encoded_data = self._encode_device_data(device_name, encoder, data, device_config)
-                    
-                    if encoded_data:
-                        logger.debug(f"📦 {device_name} encoded data: {len(encoded_data)} bytes")
-                        
-                        # Send to output transmitter
-                        with measure_performance(f"{device_name}_transmitter", "send_data"):
-                            self._send_to_output(device_name, device_config, encoded_data)
-                    else:
-                        logger.warning(f"⚠️ {device_name} encoding failed")
-                else:
-                    if iteration_count % 100 == 0:  # Log every 100 iterations to avoid spam
-                        logger.debug(f"⏳ {device_name} waiting for data (iteration {iteration_count})")
-                
-                time.sleep(0.001)  # Small delay to prevent busy waiting
-                
-            except Exception as e:
-                if not handle_error(e, device_name, "data_processor", "process_data", 
-                                  ErrorType.DATA_PROCESSING, ErrorSeverity.MEDIUM):
-                    logger.error(f"Critical error processing data for {device_name}, stopping thread")
-                    break
-                time.sleep(0.1)
+        counters["frames_processed"] += 1
+        
+        responder = self.poll_responders.get(device_name)
+        if responder:
+            # Replies are pre-encoded now and sent when the flight computer polls
+            if device_type(device_name) == "reaction_wheel":
+                updated = responder.update(data, ingest_ns, addresses=device_config.rwa_addresses)
+            else:
+                updated = responder.update(data, ingest_ns)
+            counters["frames_sent" if updated else "encode_failures"] += 1
+            return
+        
+        non_zero_count = sum(1 for x in data if abs(x) > 1e-10)
+        logger.info(f"📊 {device_name} data received: {non_zero_count}/12 non-zero values, sample: {[f'{x:.6f}' for x in data[:3]]}")
+        
+        # Process data based on device type
+        with measure_performance(f"{device_name}_encoder", "encode_data"):
+            encoded_data = self._encode_device_data(device_name, encoder, data, device_config)
+        
+        if encoded_data:
+            logger.debug(f"📦 {device_name} encoded data: {len(encoded_data)} bytes")
+            
+            # Send to output transmitter
+            with measure_performance(f"{device_name}_transmitter", "send_data"):
+                sent = self._send_to_output(device_name, device_config, encoded_data, ingest_ns)
+            counters["frames_sent" if sent else "send_drops"] += 1
+        else:
+            counters["encode_failures"] += 1
+            logger.warning(f"⚠️ {device_name} encoding failed")
     
     def _encode_device_data(self, device_name: str, encoder: Any, data: List[float], device_config: DeviceConfig) -> Optional[bytes]:
         """Encode device data based on device type and output mode"""
         try:
-            if device_name == "ars":
+            type_name = device_type(device_name)
+            if type_name == "ars":
                 return encoder.process_matlab_data(data)
-            elif device_name == "magnetometer":
+            elif type_name == "magnetometer":
                 output_mode = device_config.output_mode
                 if output_mode == "can":
                     result = encoder.process_matlab_data_can(data)
@@ -342,7 +493,7 @@ class FlatSatDeviceSimulator:
                     return None
                 else:  # rs485
                     return encoder.process_matlab_data_rs485(data)
-            elif device_name == "reaction_wheel":
+            elif type_name == "reaction_wheel":
                 # Default to health status telemetry
                 return encoder.process_matlab_data_health(data)
             else:
@@ -354,23 +505,24 @@ class FlatSatDeviceSimulator:
                         ErrorType.ENCODING, ErrorSeverity.HIGH)
             return None
     
-    def _send_to_output(self, device_name: str, device_config: DeviceConfig, encoded_data: bytes):
-        """Send encoded data to output transmitter"""
+    def _send_to_output(self, device_name: str, device_config: DeviceConfig, encoded_data: bytes,
+                        ingest_ns: Optional[Tuple[int, int]] = None) -> bool:
+        """Send encoded data to output transmitter; returns False if the frame was dropped"""
         output_mode = device_config.output_mode
         
         # Log packet if logging is enabled
         if device_config.log_packets_to_file and self.packet_logger:
             self.packet_logger.log_packet(device_name, encoded_data)
         
-        # Test USB loopback if enabled
+        # Queue for USB loopback verification if enabled; the echo is matched on the tester's threads
         if device_config.usb_loopback_enabled and self.usb_loopback_tester:
-            self.usb_loopback_tester.test_device_packet(device_name, encoded_data)
+            self.usb_loopback_tester.submit_packet(device_name, encoded_data)
         
         try:
             if output_mode == "serial":
                 transmitter_manager = self.output_transmitters.get("serial_transmitters")
                 if transmitter_manager:
-                    transmitter_manager.send_data(device_name, encoded_data)
+                    return transmitter_manager.send_data(device_name, encoded_data, ingest_ns)
                     
             elif output_mode == "can":
                 transmitter_manager = self.output_transmitters.get("can_transmitters")
@@ -380,26 +532,35 @@ class FlatSatDeviceSimulator:
                         can_id_str, data_hex = encoded_data.split(b":", 1)
                         can_id = int(can_id_str.decode())
                         data_bytes = bytes.fromhex(data_hex.decode())
-                        transmitter_manager.send_message(device_name, can_id, data_bytes)
+                        return transmitter_manager.send_message(device_name, can_id, data_bytes, ingest_ns)
                     
             elif output_mode == "tcp":
                 transmitter_manager = self.output_transmitters.get("tcp_transmitters")
                 if transmitter_manager:
-                    transmitter_manager.send_data(device_name, encoded_data)
+                    return transmitter_manager.send_data(device_name, encoded_data, ingest_ns)
                     
         except Exception as e:
             handle_error(e, device_name, "transmitter", "send_data", 
                         ErrorType.TRANSMISSION, ErrorSeverity.MEDIUM)
+        return False
     
     def stop(self):
         """Stop the simulator"""
         logger.info("Stopping FlatSat Device Simulator")
         self.running = False
         
+        # Stop metrics endpoint
+        if self.metrics_server:
+            self.metrics_server.stop()
+        
         # Stop TCP receiver
         if self.tcp_receiver:
             self.tcp_receiver.stop()
         
+        # Stop poll responders
+        for responder in self._unique_responders():
+            responder.stop()
+        
         # Stop output transmitters
         for transmitter_manager in self.output_transmitters.values():
             if hasattr(transmitter_manager, 'disconnect_all'):
@@ -413,8 +574,13 @@ class FlatSatDeviceSimulator:
         if self.packet_logger:
             self.packet_logger.close_all_logging()
         
+        # Close attitude tap
+        if self.attitude_tap:
+            self.attitude_tap.close()
+        
         # Stop performance monitoring
         performance_monitor.stop_monitoring()
+        emission_tracer.close_trace()
         
         # Wait for threads to finish
         for thread in self.threads:
@@ -433,6 +599,13 @@ class FlatSatDeviceSimulator:
                    f"CPU: {perf_summary['system_metrics']['cpu_usage']:.1f}%, "
                    f"Memory: {perf_summary['system_metrics']['memory_usage']:.1f}%")
         
+        # Print age of samples when their packets left the simulator
+        for device_name, ages in emission_tracer.get_summary().items():
+            age = ages["oldest_sample"]
+            logger.info(f"Age at emission {device_name}: {age['count']} packets, "
+                       f"p50 {age['p50_ms']:.3f}ms, p99 {age['p99_ms']:.3f}ms, "
+                       f"p99.9 {age['p99_9_ms']:.3f}ms, max {age['max_ms']:.3f}ms")
+        
         logger.info("FlatSat Device Simulator stopped")
     
     def get_status(self) -> Dict[str, Any]:
@@ -447,7 +620,92 @@ class FlatSatDeviceSimulator:
             if hasattr(transmitter_manager, 'get_status'):
                 status["output_transmitters"][transmitter_type] = transmitter_manager.get_status()
         
+        if self.attitude_tap:
+            status["attitude_tap"] = self.attitude_tap.get_status()
+        
+        if self.metrics_server:
+            status["metrics_server"] = self.metrics_server.get_status()
+        
+        if self.usb_loopback_tester:
+            status["usb_loopback"] = self.usb_loopback_tester.get_status()
+        
+        if self.poll_responders:
+            status["poll_responders"] = {device_name: responder.get_status()
+                                         for device_name, responder in self.poll_responders.items()}
+        
+        status["age_at_emission"] = emission_tracer.get_summary()
+        
         return status
+    
+    def collect_metrics(self) -> Dict[str, Any]:
+        """
+        Aggregate device, latency and error metrics into one snapshot
+        
+        Called by the metrics endpoint's refresh thread; rates and frame
+        completeness are measured against the previous call.
+        """
+        now = time.time()
+        receiver_stats = {}
+        if self.tcp_receiver and self.tcp_receiver.matlab_receiver:
+            receiver_stats = self.tcp_receiver.matlab_receiver.get_stats()
+        
+        output_status = {}
+        for transmitter_manager in self.output_transmitters.values():
+            if hasattr(transmitter_manager, 'get_status'):
+                output_status.update(transmitter_manager.get_status())
+        
+        devices = {}
+        for device_name, counters in self.device_counters.items():
+            port_stats = receiver_stats.get(device_name, [])
+            port_samples = [stats['packets_received'] for stats in port_stats]
+            device = dict(counters)
+            device["samples_received"] = sum(port_samples)
+            device["receive_drops"] = self.tcp_receiver.get_overwrites(device_name) if self.tcp_receiver else 0
+            device["parse_errors"] = sum(stats['parse_errors'] for stats in port_stats)
+            device["receiver_connections"] = sum(stats.get('connections', 0) for stats in port_stats)
+            
+            last = self._last_port_samples.get(device_name)
+            if last and now > last[0] and len(last[1]) == len(port_samples):
+                device["ingest_rate_hz"] = (sum(port_samples) - sum(last[1])) / (now - last[0])
+                updated = sum(1 for current, previous in zip(port_samples, last[1]) if current > previous)
+                device["frame_completeness"] = updated / len(port_samples) if port_samples else 0.0
+            else:
+                device["ingest_rate_hz"] = 0.0
+                device["frame_completeness"] = 0.0
+            self._last_port_samples[device_name] = (now, port_samples)
+            
+            transmitter = output_status.get(device_name)
+            if transmitter:
+                device["output_queue_depth"] = transmitter.get("queue_size", 0)
+                device["output_connected"] = bool(transmitter.get("connected"))
+                device["output_reconnects"] = transmitter.get("reconnects", 0)
+            devices[device_name] = device
+        
+        latency = {}
+        for component_name, metrics in performance_monitor.metrics.items():
+            histogram = metrics.histogram()
+            latency[component_name] = {
+                "count": histogram.count,
+                "sum_seconds": histogram.total_ns / 1e9,
+                "quantiles": {str(q): histogram.percentile_ns(q * 100) / 1e9 for q in (0.5, 0.9, 0.99, 0.999)}
+            }
+        
+        error_stats = error_handler.get_error_statistics()
+        snapshot = {
+            "timestamp": now,
+            "uptime_seconds": now - self.start_time,
+            "devices": devices,
+            "latency": latency,
+            "errors": {
+                "total_errors": error_stats["total_errors"],
+                "recovered_errors": error_stats["recovered_errors"],
+                "failed_recoveries": error_stats["failed_recoveries"],
+                "error_types": {error_type: dict(stats) for error_type, stats in error_stats["error_types"].items()}
+            }
+        }
+        if self.attitude_tap:
+            snapshot["attitude_tap"] = self.attitude_tap.get_status()
+        return snapshot
 
 def load_config(config_file: str) -> SimulatorConfig:
     """Load configuration from JSON file"""
@@ -457,31 +715,41 @@ def load_config(config_file: str) -> SimulatorConfig:
         
         # Parse device configurations
         devices = {}
-        for device_name, device_data in config_data.get("devices", {}).items():
-            device_config = DeviceConfig(
-                enabled=device_data.get("enabled", False),
-                matlab_ports=device_data.get("matlab_ports", []),
-                output_mode=device_data.get("output_mode", "serial"),
-                output_config=device_data.get("output_config", {}),
-                endianness=device_data.get("endianness", "little"),
-                duplicate_primary_to_redundant=device_data.get("duplicate_primary_to_redundant", False),
-                redundant_variation_percent=device_data.get("redundant_variation_percent", 0.1),
-                usb_loopback_enabled=device_data.get("usb_loopback_enabled", False),
-                usb_loopback_port=device_data.get("usb_loopback_port", ""),
-                log_packets_to_file=device_data.get("log_packets_to_file", False),
-                packet_log_file=device_data.get("packet_log_file", ""),
-                status_cycling_enabled=device_data.get("status_cycling_enabled", False),
-                status_cycle_interval=device_data.get("status_cycle_interval", 10.0),
-                status_scenarios=device_data.get("status_scenarios", ["normal"])
-            )
-            devices[device_name] = device_config
+        for base_name, base_data in config_data.get("devices", {}).items():
+            for device_name, device_data in expand_instances(base_name, base_data):
+                device_config = DeviceConfig(
+                    enabled=device_data.get("enabled", False),
+                    matlab_ports=device_data.get("matlab_ports", []),
+                    output_mode=device_data.get("output_mode", "serial"),
+                    output_config=device_data.get("output_config", {}),
+                    endianness=device_data.get("endianness", "little"),
+                    duplicate_primary_to_redundant=device_data.get("duplicate_primary_to_redundant", False),
+                    redundant_variation_percent=device_data.get("redundant_variation_percent", 0.1),
+                    usb_loopback_enabled=device_data.get("usb_loopback_enabled", False),
+                    usb_loopback_port=device_data.get("usb_loopback_port", ""),
+                    usb_loopback_monitor_port=device_data.get("usb_loopback_monitor_port", ""),
+                    log_packets_to_file=device_data.get("log_packets_to_file", False),
+                    packet_log_file=device_data.get("packet_log_file", ""),
+                    poll_responder=device_data.get("poll_responder", False),
+                    responder_turnaround_ms=device_data.get("responder_turnaround_ms", 2.0),
+                    rwa_address=device_data.get("rwa_address", 0x01),
+                    rwa_addresses=device_data.get("rwa_addresses"),
+                    status_cycling_enabled=device_data.get("status_cycling_enabled", False),
+                    status_cycle_interval=device_data.get("status_cycle_interval", 10.0),
+                    status_scenarios=device_data.get("status_scenarios", ["normal"])
+                )
+                devices[device_name] = device_config
         
         # Create main configuration
         config = SimulatorConfig(
             tcp_mode=config_data.get("tcp_mode", "server"),
             matlab_server_ip=config_data.get("matlab_server_ip", "192.168.1.100"),
             matlab_server_port=config_data.get("matlab_server_port", 5000),
-            devices=devices
+            devices=devices,
+            attitude_tap_port=config_data.get("attitude_tap_port", 0),
+            metrics_port=config_data.get("metrics_port", 0),
+            kernel_timestamps=config_data.get("kernel_timestamps", False),
+            trace_file=config_data.get("trace_file", "")
         )
         
         return config
@@ -490,6 +758,11 @@ def load_config(config_file: str) -> SimulatorConfig:
         logger.error(f"Failed to load configuration from {config_file}: {e}")
         raise
 
+def devices_of_type(config: SimulatorConfig, type_name: str) -> List[DeviceConfig]:
+    """Configurations of every instance of a device type"""
+    return [device_config for device_name, device_config in config.devices.items()
+            if device_type(device_name) == type_name]
+
 def create_default_config() -> SimulatorConfig:
     """Create default configuration"""
     devices = {
@@ -533,8 +806,19 @@ def main():
     parser.add_argument('--ars-output', choices=['serial', 'can', 'tcp'], help='ARS output mode')
     parser.add_argument('--mag-output', choices=['serial', 'can', 'tcp'], help='Magnetometer output mode')
     parser.add_argument('--rw-output', choices=['serial', 'can', 'tcp'], help='Reaction Wheel output mode')
+    parser.add_argument('--mag-responder', action='store_true',
+                       help='Answer magnetometer polls on its output link instead of pushing frames')
+    parser.add_argument('--rw-responder', action='store_true',
+                       help='Answer reaction wheel telemetry commands on its serial link instead of pushing frames')
     parser.add_argument('--tcp-mode', choices=['server', 'client'], help='TCP mode')
     parser.add_argument('--listen-port', type=int, help='TCP listen port')
+    parser.add_argument('--attitude-tap', type=int, nargs='?', const=DEFAULT_TAP_PORT, metavar='PORT',
+                       help='Publish ingest frames for live_attitude_viewer.py (default port: 50100)')
+    parser.add_argument('--metrics-port', type=int, nargs='?', const=DEFAULT_METRICS_PORT, metavar='PORT',
+                       help=f'Serve Prometheus metrics at /metrics and JSON at /metrics.json (default port: {DEFAULT_METRICS_PORT})')
+    parser.add_argument('--kernel-timestamps', action='store_true',
+                       help='Stamp MATLAB samples with kernel receive times (SO_TIMESTAMPNS, Linux)')
+    parser.add_argument('--trace-file', help='Write per-packet age-at-emission trace CSV')
     parser.add_argument('--debug', action='store_true', help='Enable debug logging')
     parser.add_argument('--log-file', help='Log file path')
     
@@ -557,24 +841,50 @@ def main():
             config = create_default_config()
         
         # Override with command line arguments
+        # Device overrides apply to every instance of the device type
+        ars_devices = devices_of_type(config, "ars")
+        mag_devices = devices_of_type(config, "magnetometer")
+        rw_devices = devices_of_type(config, "reaction_wheel")
+        
         if args.enable_ars:
-            config.devices["ars"].enabled = True
+            for device_config in ars_devices:
+                device_config.enabled = True
         if args.enable_mag:
-            config.devices["magnetometer"].enabled = True
+            for device_config in mag_devices:
+                device_config.enabled = True
         if args.enable_rw:
-            config.devices["reaction_wheel"].enabled = True
+            for device_config in rw_devices:
+                device_config.enabled = True
         
         if args.ars_output:
-            config.devices["ars"].output_mode = args.ars_output
+            for device_config in ars_devices:
+                device_config.output_mode = args.ars_output
         if args.mag_output:
-            config.devices["magnetometer"].output_mode = args.mag_output
+            for device_config in mag_devices:
+                device_config.output_mode = args.mag_output
         if args.rw_output:
-            config.devices["reaction_wheel"].output_mode = args.rw_output
+            for device_config in rw_devices:
+                device_config.output_mode = args.rw_output
+        
+        if args.mag_responder:
+            for device_config in mag_devices:
+                device_config.poll_responder = True
+        if args.rw_responder:
+            for device_config in rw_devices:
+                device_config.poll_responder = True
         
         if args.tcp_mode:
             config.tcp_mode = args.tcp_mode
         if args.listen_port:
             config.matlab_server_port = args.listen_port
+        if args.attitude_tap:
+            config.attitude_tap_port = args.attitude_tap
+        if args.metrics_port:
+            config.metrics_port = args.metrics_port
+        if args.kernel_timestamps:
+            config.kernel_timestamps = True
+        if args.trace_file:
+            config.trace_file = args.trace_file
         
         # Create and start simulator
         simulator = FlatSatDeviceSimulator(config)
@@ -17,7 +17,8 @@ from typing import Optional, Tuple, Dict, Any, List
 from dataclasses import dataclass
 from enum import Enum
 import threading
-import queue
+from collections import deque
+from concurrent.futures import Future
 # CRC implementation without external dependencies
 
 def calculate_crc16(data: bytes) -> int:
@@ -49,6 +50,22 @@ except ImportError:
     SERIAL_AVAILABLE = False
     print("Warning: pyserial not available. RS485 communication disabled.")
 
+try:
+    # NumPy block calibration, ellipsoid fitting and the reading ring
+    from magnetometer_calibration import (CalibrationSet, fit_ellipsoid, fit_min_max, readings_to_array,
+                                          save_calibration, load_calibration)
+    from magnetometer_ring import ReadingRing
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+try:
+    # Registers pty:// ports (pseudo-terminal stand-ins) with pyserial
+    import output_transmitters.protocol_pty  # noqa: F401
+except ImportError:
+    pass
+
 
 class MagnetometerStatus(Enum):
     """Magnetometer status codes based on ICD specifications"""
@@ -131,11 +148,111 @@ class DeviceInfo:
     status: MagnetometerStatus
 
 
+# Reply data length per command; MEMREAD replies are variable and found by their CRC
+RESPONSE_DATA_LENGTHS = {
+    MessageType.MAGDATA.value: 17,
+    MessageType.MAGTEMP.value: 5,
+    MessageType.MAGID.value: 25,
+    MessageType.STATUS.value: 1,
+}
+
+VALID_MESSAGE_TYPES = {message_type.value for message_type in MessageType}
+
+
+class MessageFramer:
+    """
+    Splits a byte stream into CRC-checked messages, resynchronizing on bad bytes
+    
+    Messages are [type][command][sequence (2)][command][data][CRC-16 (2)].
+    data_lengths gives the data length per command; messages with other
+    commands are variable length and end at the first matching CRC.
+    """
+    
+    MIN_SIZE = 7  # Header, command echo and CRC
+    MAX_SIZE = MIN_SIZE + 64
+    
+    def __init__(self, data_lengths: Dict[int, int], frame_gap: float = 0.05):
+        self.data_lengths = data_lengths
+        self.frame_gap = frame_gap  # Seconds of silence after which a partial message is discarded
+        self.buffer = bytearray()
+        self.last_byte_time = 0.0
+        self.malformed = 0
+    
+    def feed(self, data: bytes) -> List[bytes]:
+        """Add received bytes and return the messages they complete"""
+        now = time.monotonic()
+        if self.buffer and data and now - self.last_byte_time > self.frame_gap:
+            # A partial message followed by silence never completes
+            self.buffer.clear()
+            self.malformed += 1
+        if data:
+            self.buffer += data
+            self.last_byte_time = now
+        
+        messages = []
+        while len(self.buffer) >= self.MIN_SIZE:
+            message_type, command = self.buffer[0], self.buffer[1]
+            if message_type not in VALID_MESSAGE_TYPES or self.buffer[4] != command:
+                self._resync()
+                continue
+            
+            size = self._message_size(command)
+            if size is None:
+                break  # Variable-length message still arriving
+            if size == 0:
+                self._resync()
+                continue
+            if len(self.buffer) < size:
+                break
+            
+            message = bytes(self.buffer[:size])
+            if calculate_crc16(message[:-2]) != struct.unpack('<H', message[-2:])[0]:
+                self._resync()
+                continue
+            messages.append(message)
+            del self.buffer[:size]
+        return messages
+    
+    def expire(self):
+        """Drop a partial message that has been silent for longer than the frame gap"""
+        if self.buffer and time.monotonic() - self.last_byte_time > self.frame_gap:
+            self.buffer.clear()
+            self.malformed += 1
+    
+    def _message_size(self, command: int) -> Optional[int]:
+        """Bytes in the message at the head of the buffer; None to wait for more, 0 if none fits"""
+        data_length = self.data_lengths.get(command)
+        if data_length is not None:
+            return self.MIN_SIZE + data_length
+        # Variable length: the shortest candidate whose CRC checks out
+        for size in range(self.MIN_SIZE, min(len(self.buffer), self.MAX_SIZE) + 1):
+            if calculate_crc16(bytes(self.buffer[:size - 2])) == struct.unpack('<H', self.buffer[size - 2:size])[0]:
+                return size
+        return 0 if len(self.buffer) >= self.MAX_SIZE else None
+    
+    def _resync(self):
+        del self.buffer[:1]
+        self.malformed += 1
+
+
+@dataclass
+class PendingRequest:
+    """A request waiting for the reply with its sequence number"""
+    command: int
+    future: Future
+    sent_at: float  # time.monotonic() when it was written
+
+
 class HoneywellMagnetometerError(Exception):
     """Custom exception for magnetometer communication errors"""
     pass
 
 
+class RequestSlotsExhausted(HoneywellMagnetometerError):
+    """All max_outstanding request slots stayed busy for the whole wait"""
+    pass
+
+
 class HoneywellMagnetometer:
     """
     Honeywell Dual Space Magnetometer Communication Class
@@ -177,19 +294,31 @@ class HoneywellMagnetometer:
     MEMORY_USER_START = 0x2000
     MEMORY_USER_END = 0x3FFF
     
-    def __init__(self, interface_type: str = "CAN", **kwargs):
+    def __init__(self, interface_type: str = "CAN", max_outstanding: int = 8, request_timeout: float = 1.0,
+                 buffer_capacity: int = 65536, raw_capacity: int = 0, **kwargs):
         """
         Initialize magnetometer communication
         
         Args:
             interface_type: "CAN" or "RS485"
+            max_outstanding: Requests allowed in flight before submit_request waits
+            request_timeout: Seconds a request waits for its reply
+            buffer_capacity: Readings kept before the oldest are overwritten
+            raw_capacity: Bytes of raw messages kept alongside the readings (0: none)
             **kwargs: Interface-specific parameters
         """
         self.interface_type = interface_type.upper()
         self.logger = logging.getLogger(__name__)
         self.is_connected = False
         self.interface = None
-        self.data_queue = queue.Queue()
+        
+        # Calibrated readings in a bounded ring; the oldest are overwritten when full
+        if NUMPY_AVAILABLE:
+            self.readings = ReadingRing(buffer_capacity, raw_capacity)
+        else:
+            self.readings = deque(maxlen=buffer_capacity)
+        self.readings_dropped = 0  # Without numpy; the ring counts its own
+        self.read_seq = 0  # Next reading for get_latest_reading/get_all_readings
         self.reading_thread = None
         self.stop_thread = False
         
@@ -200,6 +329,11 @@ class HoneywellMagnetometer:
         self.offset = [0.0, 0.0, 0.0]
         self.scale_factors = [1.0, 1.0, 1.0]
         
+        # Continuous readings are parsed raw and calibrated in blocks
+        self.calibration_block_size = 64
+        self.raw_block: List[MagnetometerReading] = []
+        self.raw_block_lock = threading.Lock()
+        
         # Device information
         self.device_info = None
         self.current_mode = OperationMode.NORMAL
@@ -210,6 +344,17 @@ class HoneywellMagnetometer:
         # Message sequence counter
         self.sequence_counter = 0
         
+        # Pipelined request/response core: replies are matched to requests by sequence number
+        self.max_outstanding = max_outstanding
+        self.request_timeout = request_timeout
+        self.pending: Dict[int, PendingRequest] = {}
+        self.pending_lock = threading.Lock()
+        self.request_slots = threading.BoundedSemaphore(max_outstanding)
+        self.framer = MessageFramer(RESPONSE_DATA_LENGTHS)
+        self.reader_thread = None
+        self.reader_running = False
+        self.pipeline_stats = {'requests': 0, 'replies': 0, 'timeouts': 0, 'unmatched': 0, 'malformed': 0}
+        
         if self.interface_type == "CAN":
             self._init_can_interface(**kwargs)
         elif self.interface_type == "RS485":
@@ -234,8 +379,10 @@ class HoneywellMagnetometer:
             raise HoneywellMagnetometerError("RS485 interface not available. Install pyserial.")
         
         try:
-            self.interface = serial.Serial(
-                port=port,
+            # URL ports such as pty://name go through serial_for_url
+            open_port = serial.serial_for_url if "://" in port else serial.Serial
+            self.interface = open_port(
+                port,
                 baudrate=baudrate,
                 bytesize=serial.EIGHTBITS,
                 parity=serial.PARITY_NONE,
@@ -248,7 +395,7 @@ class HoneywellMagnetometer:
             raise HoneywellMagnetometerError(f"Failed to initialize RS485 interface: {e}")
     
     def connect(self) -> bool:
-        """Connect to the magnetometer"""
+        """Connect to the magnetometer and start the reply reader"""
         try:
             if self.interface_type == "CAN":
                 # Test CAN connection
@@ -264,6 +411,7 @@ class HoneywellMagnetometer:
                     self.interface.open()
                     self.is_connected = True
             
+            self._start_reader()
             self.logger.info(f"Connected to magnetometer via {self.interface_type}")
             return True
             
@@ -274,6 +422,7 @@ class HoneywellMagnetometer:
     def disconnect(self):
         """Disconnect from the magnetometer"""
         self.stop_continuous_reading()
+        self._stop_reader()
         
         if self.interface_type == "CAN" and self.interface:
             self.interface.shutdown()
@@ -290,27 +439,40 @@ class HoneywellMagnetometer:
         
         try:
             # Create message with header and CRC
-            message = self._create_message(command, data, message_type)
-            
-            if self.interface_type == "CAN":
-                msg = can.Message(arbitration_id=self.CAN_CMD_ID, data=message)
-                self.interface.send(msg)
-                
-            elif self.interface_type == "RS485":
-                self.interface.write(message)
-                self.interface.flush()
-            
-            self.sequence_counter = (self.sequence_counter + 1) % 256
+            with self.pending_lock:
+                message = self._create_message(command, data, message_type, self._next_sequence())
+            self._write(message)
             return True
             
         except Exception as e:
             self.logger.error(f"Failed to send command: {e}")
             return False
     
-    def _create_message(self, command: int, data: bytes, message_type: MessageType) -> bytes:
+    def _next_sequence(self) -> int:
+        """Take the next sequence number not held by an outstanding request (call with pending_lock held)"""
+        while True:
+            sequence = self.sequence_counter
+            self.sequence_counter = (self.sequence_counter + 1) % 0x10000
+            if sequence not in self.pending:
+                return sequence
+    
+    def _write(self, message: bytes):
+        """Write one message to the link"""
+        if self.interface_type == "CAN":
+            msg = can.Message(arbitration_id=self.CAN_CMD_ID, data=message, is_fd=len(message) > 8)
+            self.interface.send(msg)
+            
+        elif self.interface_type == "RS485":
+            self.interface.write(message)
+            self.interface.flush()
+    
+    def _create_message(self, command: int, data: bytes, message_type: MessageType,
+                        sequence: Optional[int] = None) -> bytes:
         """Create properly formatted message with header and CRC"""
         # Message format: [Header][Command][Data][CRC]
-        header = struct.pack('<BBH', message_type.value, command, self.sequence_counter)
+        if sequence is None:
+            sequence = self.sequence_counter
+        header = struct.pack('<BBH', message_type.value, command, sequence)
         
         # Ensure data doesn't exceed maximum size
         if len(data) > self.MAX_DATA_SIZE:
@@ -339,62 +501,139 @@ class HoneywellMagnetometer:
         
         return received_crc == calculated_crc
     
-    def read_data(self) -> Optional[MagnetometerReading]:
-        """Read magnetometer data"""
+    def submit_request(self, command: int, data: bytes = b'', message_type: MessageType = MessageType.MAGDATA,
+                       wait: Optional[float] = None) -> Future:
+        """
+        Send a request without waiting for its reply
+        
+        Blocks up to `wait` seconds (default: request_timeout) for one of the
+        max_outstanding request slots. The returned future resolves to the
+        validated reply bytes, or None if no reply arrived within request_timeout.
+        """
         if not self.is_connected:
             raise HoneywellMagnetometerError("Not connected to magnetometer")
+        if not self.request_slots.acquire(timeout=self.request_timeout if wait is None else wait):
+            raise RequestSlotsExhausted(f"{self.max_outstanding} requests already outstanding")
         
+        future = Future()
+        with self.pending_lock:
+            sequence = self._next_sequence()
+            self.pending[sequence] = PendingRequest(command, future, time.monotonic())
+            message = self._create_message(command, data, message_type, sequence)
         try:
-            if self.interface_type == "CAN":
-                return self._read_can_data()
-            elif self.interface_type == "RS485":
-                return self._read_rs485_data()
+            self._write(message)
         except Exception as e:
-            self.logger.error(f"Failed to read data: {e}")
-            return None
+            with self.pending_lock:
+                self.pending.pop(sequence, None)
+            self.request_slots.release()
+            raise HoneywellMagnetometerError(f"Failed to send request: {e}")
+        self.pipeline_stats['requests'] += 1
+        return future
     
-    def _read_can_data(self) -> Optional[MagnetometerReading]:
-        """Read data from CAN interface"""
+    def _transact(self, command: int, data: bytes = b'', message_type: MessageType = MessageType.MAGDATA) -> Optional[bytes]:
+        """Send a request and wait for its reply; None on timeout"""
+        future = self.submit_request(command, data, message_type)
         try:
-            # Request data
-            self.send_command(self.CMD_MAGDATA, message_type=MessageType.MAGDATA)
-            time.sleep(0.01)  # Small delay for response
-            
-            # Read response
-            msg = self.interface.recv(timeout=1.0)
-            if msg and msg.arbitration_id == self.CAN_DATA_ID:
-                if self._validate_message(msg.data):
-                    return self._parse_data_message(msg.data)
+            # The reader resolves every request within request_timeout; the margin covers a stalled reader
+            return future.result(timeout=self.request_timeout + 1.0)
+        except Exception:
+            return None
+    
+    def _start_reader(self):
+        """Start the thread that matches replies to outstanding requests"""
+        if self.reader_thread and self.reader_thread.is_alive():
+            return
+        if self.interface_type == "RS485":
+            # Short reads keep request timeouts and shutdown responsive
+            self.interface.timeout = self.framer.frame_gap / 5
+        self.reader_running = True
+        self.reader_thread = threading.Thread(target=self._reader_loop, daemon=True)
+        self.reader_thread.start()
+    
+    def _stop_reader(self):
+        """Stop the reply reader and fail any outstanding requests"""
+        self.reader_running = False
+        if self.reader_thread:
+            self.reader_thread.join(timeout=2.0)
+            self.reader_thread = None
+        with self.pending_lock:
+            pending = list(self.pending.values())
+            self.pending.clear()
+        for request in pending:
+            self.request_slots.release()
+            request.future.set_result(None)
+    
+    def _reader_loop(self):
+        """Parse the incoming byte stream into replies and hand each to its request"""
+        while self.reader_running:
+            try:
+                if self.interface_type == "CAN":
+                    msg = self.interface.recv(timeout=self.framer.frame_gap / 5)
+                    data = bytes(msg.data) if msg and msg.arbitration_id != self.CAN_CMD_ID else b''
                 else:
-                    self.logger.error("Invalid CRC in CAN message")
-            
-        except Exception as e:
-            self.logger.error(f"CAN read error: {e}")
-        
-        return None
+                    data = self.interface.read(self.interface.in_waiting or 1)
+                
+                if data:
+                    for message in self.framer.feed(data):
+                        self._dispatch(message)
+                else:
+                    self.framer.expire()
+                self.pipeline_stats['malformed'] = self.framer.malformed
+                self._expire_pending()
+                
+            except Exception as e:
+                if not self.reader_running:
+                    break
+                self.logger.error(f"Reply reader error: {e}")
+                time.sleep(0.1)
+    
+    def _dispatch(self, message: bytes):
+        """Resolve the outstanding request whose sequence number the reply carries"""
+        _, command, sequence = struct.unpack('<BBH', message[:self.HEADER_SIZE])
+        with self.pending_lock:
+            request = self.pending.get(sequence)
+            if request is None or request.command != command:
+                self.pipeline_stats['unmatched'] += 1
+                return
+            del self.pending[sequence]
+        self.request_slots.release()
+        self.pipeline_stats['replies'] += 1
+        request.future.set_result(message)
+    
+    def _expire_pending(self):
+        """Resolve requests older than request_timeout with None"""
+        deadline = time.monotonic() - self.request_timeout
+        with self.pending_lock:
+            expired = [sequence for sequence, request in self.pending.items() if request.sent_at < deadline]
+            requests = [self.pending.pop(sequence) for sequence in expired]
+        for request in requests:
+            self.request_slots.release()
+            self.pipeline_stats['timeouts'] += 1
+            request.future.set_result(None)
+    
+    def get_pipeline_stats(self) -> Dict[str, int]:
+        """Request, reply, timeout and framing counts of the driver core"""
+        stats = dict(self.pipeline_stats)
+        stats['outstanding'] = len(self.pending)
+        stats['max_outstanding'] = self.max_outstanding
+        return stats
     
-    def _read_rs485_data(self) -> Optional[MagnetometerReading]:
-        """Read data from RS485 interface"""
+    def read_data(self) -> Optional[MagnetometerReading]:
+        """Read magnetometer data"""
+        if not self.is_connected:
+            raise HoneywellMagnetometerError("Not connected to magnetometer")
+        
         try:
-            # Request data
-            self.send_command(self.CMD_MAGDATA, message_type=MessageType.MAGDATA)
-            time.sleep(0.01)
-            
-            # Read response with proper timeout
-            response = self.interface.read(32)  # Expected response length
-            if len(response) >= self.HEADER_SIZE + self.CRC_SIZE:
-                if self._validate_message(response):
-                    return self._parse_data_message(response)
-                else:
-                    self.logger.error("Invalid CRC in RS485 message")
-            
+            response = self._transact(self.CMD_MAGDATA, message_type=MessageType.MAGDATA)
+            if response:
+                return self._parse_data_message(response)
+            self.logger.error("No MAGDATA reply")
         except Exception as e:
-            self.logger.error(f"RS485 read error: {e}")
-        
+            self.logger.error(f"Failed to read data: {e}")
         return None
     
-    def _parse_data_message(self, data: bytes) -> MagnetometerReading:
-        """Parse magnetometer data message based on ICD specifications"""
+    def _parse_data_message(self, data: bytes, calibrate: bool = True) -> MagnetometerReading:
+        """Parse magnetometer data message based on ICD specifications; calibrate=False keeps raw fields"""
         try:
             # Parse header
             if len(data) < self.HEADER_SIZE:
@@ -435,7 +674,10 @@ class HoneywellMagnetometer:
                 status = MagnetometerStatus.NORMAL
             
             # Apply calibration
-            x_cal, y_cal, z_cal = self._apply_calibration(x_field, y_field, z_field)
+            if calibrate:
+                x_cal, y_cal, z_cal = self._apply_calibration(x_field, y_field, z_field)
+            else:
+                x_cal, y_cal, z_cal = x_field, y_field, z_field
             
             return MagnetometerReading(
                 timestamp=time.time(),
@@ -489,80 +731,219 @@ class HoneywellMagnetometer:
         self.reading_thread.start()
         self.logger.info(f"Started continuous reading with {interval}s interval")
     
+    def start_streaming(self) -> bool:
+        """
+        Read as fast as the sensor answers
+        
+        Keeps max_outstanding MAGDATA requests in flight; every reply is parsed
+        on the reader thread and stored for get_latest_reading/get_all_readings.
+        Returns False if not connected or already reading.
+        """
+        if not self.is_connected:
+            self.logger.error("Cannot start streaming: not connected to magnetometer")
+            return False
+        if self.reading_thread and self.reading_thread.is_alive():
+            self.logger.warning("Continuous reading already active")
+            return False
+        
+        self.stop_thread = False
+        self.reading_thread = threading.Thread(target=self._streaming_loop, daemon=True)
+        self.reading_thread.start()
+        self.logger.info(f"Started streaming with {self.max_outstanding} requests in flight")
+        return True
+    
     def stop_continuous_reading(self):
-        """Stop continuous reading"""
+        """Stop continuous reading or streaming"""
         self.stop_thread = True
         if self.reading_thread:
             self.reading_thread.join(timeout=2.0)
+        self._flush_readings()
         self.logger.info("Stopped continuous reading")
     
     def _continuous_reading_loop(self, interval: float):
         """Background thread for continuous reading"""
         while not self.stop_thread:
             try:
-                reading = self.read_data()
-                if reading:
-                    self.data_queue.put(reading)
-                time.sleep(interval)
+                response = self._transact(self.CMD_MAGDATA, message_type=MessageType.MAGDATA)
+                if response:
+                    self._queue_reading(self._parse_data_message(response, calibrate=False))
+                if interval > 0:
+                    # Nothing else arrives while sleeping, so calibrate what is buffered now
+                    self._flush_readings()
+                    time.sleep(interval)
             except Exception as e:
                 self.logger.error(f"Continuous reading error: {e}")
                 time.sleep(interval)
     
-    def get_latest_reading(self) -> Optional[MagnetometerReading]:
-        """Get latest reading from queue (non-blocking)"""
+    def _streaming_loop(self):
+        """Refill request slots as replies free them"""
+        backoff = 0.0
+        while not self.stop_thread:
+            try:
+                future = self.submit_request(self.CMD_MAGDATA, message_type=MessageType.MAGDATA, wait=0.1)
+            except RequestSlotsExhausted:
+                continue  # All slots busy; stop_thread is rechecked
+            except Exception as e:
+                # Disconnected or the write failed (e.g. adapter unplugged): back off up to 1 s
+                backoff = min(1.0, backoff * 2 or 0.05)
+                self.logger.error(f"Streaming error: {e}; retrying in {backoff:.2f}s")
+                time.sleep(backoff)
+                continue
+            backoff = 0.0
+            future.add_done_callback(self._queue_streamed_reading)
+    
+    def _queue_streamed_reading(self, future: Future):
+        """Parse a streamed reply and queue the reading"""
+        response = future.result()
+        if not response:
+            return
         try:
-            return self.data_queue.get_nowait()
-        except queue.Empty:
+            self._queue_reading(self._parse_data_message(response, calibrate=False))
+        except HoneywellMagnetometerError:
+            pass
+    
+    def _queue_reading(self, reading: MagnetometerReading):
+        """Buffer a raw reading; a full block is calibrated and stored"""
+        with self.raw_block_lock:
+            self.raw_block.append(reading)
+            full = len(self.raw_block) >= self.calibration_block_size
+        if full:
+            self._flush_readings()
+    
+    def _flush_readings(self):
+        """Calibrate the buffered raw readings in one operation and store them"""
+        with self.raw_block_lock:
+            block, self.raw_block = self.raw_block, []
+            if not block:
+                return
+            if NUMPY_AVAILABLE:
+                raws = [r.raw_data for r in block] if self.readings.raw_capacity else None
+                self.readings.extend([r.timestamp for r in block],
+                                     self.get_calibration().apply(readings_to_array(block)),
+                                     [r.temperature for r in block], [r.status.value for r in block], raws)
+                return
+            for reading in block:
+                reading.x_field, reading.y_field, reading.z_field = self._apply_calibration(
+                    reading.x_field, reading.y_field, reading.z_field)
+                if len(self.readings) == self.readings.maxlen:
+                    self.readings_dropped += 1
+                self.readings.append(reading)
+    
+    def _record_to_reading(self, record) -> MagnetometerReading:
+        """MagnetometerReading from a ring record"""
+        return MagnetometerReading(
+            timestamp=float(record['timestamp']),
+            x_field=float(record['x']),
+            y_field=float(record['y']),
+            z_field=float(record['z']),
+            temperature=float(record['temperature']),
+            status=MagnetometerStatus(int(record['status'])),
+            raw_data=self.readings.raw_bytes(record) or b''
+        )
+    
+    def get_latest_reading(self) -> Optional[MagnetometerReading]:
+        """Get the next unread reading (non-blocking)"""
+        self._flush_readings()
+        if not NUMPY_AVAILABLE:
+            return self.readings.popleft() if self.readings else None
+        records, _ = self.readings.read_since(self.read_seq)
+        if not len(records):
             return None
+        self.read_seq = int(records['seq'][0]) + 1
+        return self._record_to_reading(records[0])
     
     def get_all_readings(self) -> list:
-        """Get all readings from queue"""
-        readings = []
-        while not self.data_queue.empty():
-            try:
-                readings.append(self.data_queue.get_nowait())
-            except queue.Empty:
-                break
-        return readings
+        """Get all unread readings"""
+        self._flush_readings()
+        if not NUMPY_AVAILABLE:
+            readings = list(self.readings)
+            self.readings.clear()
+            return readings
+        records, self.read_seq = self.readings.read_since(self.read_seq)
+        return [self._record_to_reading(record) for record in records]
+    
+    def read_since(self, seq: int = 0):
+        """
+        Readings from sequence number seq on as a structured NumPy view
+        (fields seq, timestamp, x, y, z, temperature, status, raw_offset,
+        raw_length), and the sequence number to pass next time. Does not
+        affect get_latest_reading/get_all_readings.
+        """
+        if not NUMPY_AVAILABLE:
+            raise HoneywellMagnetometerError("read_since needs numpy")
+        self._flush_readings()
+        return self.readings.read_since(seq)
+    
+    def get_buffer_stats(self) -> Dict[str, int]:
+        """Capacity, fill level, unread and dropped counts of the reading store"""
+        if not NUMPY_AVAILABLE:
+            return {'capacity': self.readings.maxlen, 'buffered': len(self.readings),
+                    'unread': len(self.readings), 'dropped': self.readings_dropped}
+        return {
+            'capacity': self.readings.capacity,
+            'buffered': len(self.readings),
+            'unread': self.readings.count - max(self.read_seq, self.readings.count - self.readings.capacity),
+            'appended': self.readings.count,
+            'dropped': self.readings.dropped
+        }
+    
+    def get_calibration(self) -> "CalibrationSet":
+        """The current scale factors, calibration matrix and offset as a CalibrationSet"""
+        return CalibrationSet(scale=self.scale_factors, matrix=self.calibration_matrix, offset=self.offset)
     
-    def calibrate(self, readings: list) -> bool:
-        """Perform magnetometer calibration using collected readings"""
+    def set_calibration(self, calibration: "CalibrationSet"):
+        """Use a CalibrationSet for all further readings"""
+        self.scale_factors = calibration.scale.tolist()
+        self.calibration_matrix = calibration.matrix.tolist()
+        self.offset = calibration.offset.tolist()
+    
+    def calibrate(self, readings, field_strength: Optional[float] = None) -> bool:
+        """
+        Perform magnetometer calibration using collected readings
+        
+        readings: MagnetometerReading objects or an (N, 3) array, calibrated
+        with the current parameters as the driver returns them. Hard- and
+        soft-iron parameters come from a least-squares ellipsoid fit, or from
+        per-axis min/max when the readings do not span an ellipsoid, and are
+        combined with the current calibration.
+        """
+        if not NUMPY_AVAILABLE:
+            self.logger.error("Calibration needs numpy")
+            return False
         if len(readings) < 10:
             self.logger.warning("Need at least 10 readings for calibration")
             return False
         
         try:
-            # Simple calibration algorithm (adjust based on requirements)
-            x_values = [r.x_field for r in readings]
-            y_values = [r.y_field for r in readings]
-            z_values = [r.z_field for r in readings]
-            
-            # Calculate offsets (hard iron correction)
-            self.offset = [
-                -(max(x_values) + min(x_values)) / 2,
-                -(max(y_values) + min(y_values)) / 2,
-                -(max(z_values) + min(z_values)) / 2
-            ]
-            
-            # Calculate scale factors (soft iron correction)
-            x_range = max(x_values) - min(x_values)
-            y_range = max(y_values) - min(y_values)
-            z_range = max(z_values) - min(z_values)
-            avg_range = (x_range + y_range + z_range) / 3
-            
-            self.scale_factors = [
-                avg_range / x_range if x_range > 0 else 1.0,
-                avg_range / y_range if y_range > 0 else 1.0,
-                avg_range / z_range if z_range > 0 else 1.0
-            ]
+            fields = readings if hasattr(readings, 'shape') else readings_to_array(readings)
+            try:
+                fit = fit_ellipsoid(fields, field_strength)
+            except (ValueError, np.linalg.LinAlgError) as e:
+                self.logger.warning(f"Ellipsoid fit failed ({e}); using per-axis min/max")
+                fit = fit_min_max(fields)
             
-            self.logger.info("Calibration completed successfully")
+            self.set_calibration(self.get_calibration().then(fit))
+            self.logger.info(f"Calibration completed successfully: {fit.samples} samples, "
+                             f"residual {fit.residual_rms:.1f} nT RMS")
             return True
             
         except Exception as e:
             self.logger.error(f"Calibration failed: {e}")
             return False
     
+    def save_calibration(self, path: str, name: str = "default"):
+        """Store the current calibration as a named set in a JSON file"""
+        save_calibration(path, self.get_calibration(), name)
+    
+    def load_calibration(self, path: str, name: str = "default") -> bool:
+        """Use a named calibration set from a JSON file"""
+        try:
+            self.set_calibration(load_calibration(path, name))
+            return True
+        except (OSError, KeyError, ValueError) as e:
+            self.logger.error(f"Failed to load calibration '{name}' from {path}: {e}")
+            return False
+    
     def reset(self) -> bool:
         """Reset magnetometer"""
         return self.send_command(self.CMD_MEMCMD, message_type=MessageType.MEMCMD)
@@ -570,21 +951,10 @@ class HoneywellMagnetometer:
     def get_status(self) -> Optional[MagnetometerStatus]:
         """Get magnetometer status"""
         try:
-            self.send_command(self.CMD_STATUS, message_type=MessageType.STATUS)
-            time.sleep(0.01)
-            
-            if self.interface_type == "CAN":
-                msg = self.interface.recv(timeout=1.0)
-                if msg and msg.arbitration_id == self.CAN_STATUS_ID:
-                    if self._validate_message(msg.data):
-                        payload = msg.data[self.HEADER_SIZE + 1:-self.CRC_SIZE]
-                        return MagnetometerStatus(payload[0])
-            elif self.interface_type == "RS485":
-                response = self.interface.read(8)
-                if len(response) >= self.HEADER_SIZE + self.CRC_SIZE:
-                    if self._validate_message(response):
-                        payload = response[self.HEADER_SIZE + 1:-self.CRC_SIZE]
-                        return MagnetometerStatus(payload[0])
+            response = self._transact(self.CMD_STATUS, message_type=MessageType.STATUS)
+            if response:
+                payload = response[self.HEADER_SIZE + 1:-self.CRC_SIZE]
+                return MagnetometerStatus(payload[0])
                     
         except Exception as e:
             self.logger.error(f"Status read error: {e}")
@@ -594,19 +964,9 @@ class HoneywellMagnetometer:
     def get_device_info(self) -> Optional[DeviceInfo]:
         """Get device information"""
         try:
-            self.send_command(self.CMD_MAGID, message_type=MessageType.MAGID)
-            time.sleep(0.01)
-            
-            if self.interface_type == "CAN":
-                msg = self.interface.recv(timeout=1.0)
-                if msg and msg.arbitration_id == self.CAN_DATA_ID:
-                    if self._validate_message(msg.data):
-                        return self._parse_device_info(msg.data)
-            elif self.interface_type == "RS485":
-                response = self.interface.read(32)
-                if len(response) >= self.HEADER_SIZE + self.CRC_SIZE:
-                    if self._validate_message(response):
-                        return self._parse_device_info(response)
+            response = self._transact(self.CMD_MAGID, message_type=MessageType.MAGID)
+            if response:
+                return self._parse_device_info(response)
                     
         except Exception as e:
             self.logger.error(f"Device info read error: {e}")
@@ -642,19 +1002,9 @@ class HoneywellMagnetometer:
         try:
             # Create memory read command
             cmd_data = struct.pack('<HH', address, length)
-            self.send_command(self.CMD_MEMREAD, cmd_data, MessageType.MEMREAD)
-            time.sleep(0.01)
-            
-            if self.interface_type == "CAN":
-                msg = self.interface.recv(timeout=1.0)
-                if msg and msg.arbitration_id == self.CAN_MEMORY_ID:
-                    if self._validate_message(msg.data):
-                        return self._parse_memory_data(msg.data)
-            elif self.interface_type == "RS485":
-                response = self.interface.read(32)
-                if len(response) >= self.HEADER_SIZE + self.CRC_SIZE:
-                    if self._validate_message(response):
-                        return self._parse_memory_data(response)
+            response = self._transact(self.CMD_MEMREAD, cmd_data, MessageType.MEMREAD)
+            if response:
+                return self._parse_memory_data(response)
                     
         except Exception as e:
             self.logger.error(f"Memory read error: {e}")
@@ -707,21 +1057,10 @@ class HoneywellMagnetometer:
     def get_temperature(self) -> Optional[float]:
         """Get temperature reading"""
         try:
-            self.send_command(self.CMD_MAGTEMP, message_type=MessageType.MAGTEMP)
-            time.sleep(0.01)
-            
-            if self.interface_type == "CAN":
-                msg = self.interface.recv(timeout=1.0)
-                if msg and msg.arbitration_id == self.CAN_DATA_ID:
-                    if self._validate_message(msg.data):
-                        payload = msg.data[self.HEADER_SIZE + 1:-self.CRC_SIZE]
-                        return struct.unpack('<f', payload[0:4])[0]
-            elif self.interface_type == "RS485":
-                response = self.interface.read(12)
-                if len(response) >= self.HEADER_SIZE + self.CRC_SIZE:
-                    if self._validate_message(response):
-                        payload = response[self.HEADER_SIZE + 1:-self.CRC_SIZE]
-                        return struct.unpack('<f', payload[0:4])[0]
+            response = self._transact(self.CMD_MAGTEMP, message_type=MessageType.MAGTEMP)
+            if response:
+                payload = response[self.HEADER_SIZE + 1:-self.CRC_SIZE]
+                return struct.unpack('<f', payload[0:4])[0]
                     
         except Exception as e:
             self.logger.error(f"Temperature read error: {e}")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+End-to-End Latency Tracer - MATLAB Ingest to Wire Emission
+
+Every MATLAB float is stamped when it is read from its socket (optionally
+with the kernel's SO_TIMESTAMPNS receive time). A device frame carries the
+oldest and newest stamps of the values it was built from through encoding
+and the transmit queue; the transmitter calls record_emission right after
+the write. The age of the oldest and newest contributing sample at that
+moment goes into the performance monitor's latency histograms as
+"<device>_age_at_emission" and "<device>_newest_age_at_emission", so it shows
+up in get_performance_summary, the histogram export and the metrics endpoint.
+
+An optional CSV trace file keeps one row per emitted packet for outlier
+analysis:
+    device,ingest_oldest_ns,ingest_newest_ns,enqueue_ns,emit_ns,bytes
+
+All stamps are CLOCK_REALTIME nanoseconds (time.time_ns), the clock the
+kernel uses for SO_TIMESTAMPNS.
+"""
+
+import time
+import threading
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from performance_monitor import PerformanceMonitor, performance_monitor
+
+logger = logging.getLogger(__name__)
+
+AGE_COMPONENT = "{device}_age_at_emission"
+NEWEST_AGE_COMPONENT = "{device}_newest_age_at_emission"
+TRACE_HEADER = "device,ingest_oldest_ns,ingest_newest_ns,enqueue_ns,emit_ns,bytes\n"
+
+class EmissionTracer:
+    """Records ingest-to-emission age per device"""
+
+    def __init__(self, monitor: PerformanceMonitor = performance_monitor):
+        self.monitor = monitor
+        self.devices = set()
+        self.trace_file = None
+        self._trace_lock = threading.Lock()  # Only taken while a trace file is open
+
+    def open_trace(self, filename: str):
+        """Start writing one CSV row per emitted packet"""
+        with self._trace_lock:
+            self.trace_file = open(filename, 'w', buffering=1 << 16)
+            self.trace_file.write(TRACE_HEADER)
+        logger.info(f"Tracing packet emission ages to {filename}")
+
+    def close_trace(self):
+        """Flush and close the trace file"""
+        with self._trace_lock:
+            if self.trace_file:
+                self.trace_file.close()
+                self.trace_file = None
+
+    def record_emission(self, device_name: str, ingest_ns: Optional[Tuple[int, int]],
+                        enqueue_ns: int = 0, size: int = 0, emit_ns: Optional[int] = None):
+        """
+        Record a packet leaving the simulator
+
+        Args:
+            device_name: Device the packet belongs to
+            ingest_ns: (oldest, newest) receive stamps of the contributing samples;
+                untraced packets (None) are ignored
+            enqueue_ns: When the packet entered the transmit queue (0 if it was not queued)
+            size: Bytes written
+            emit_ns: Emission time (default: now)
+        """
+        if ingest_ns is None:
+            return
+        emit_ns = time.time_ns() if emit_ns is None else emit_ns
+        oldest_ns, newest_ns = ingest_ns
+        self.devices.add(device_name)
+        self.monitor.record(AGE_COMPONENT.format(device=device_name), emit_ns - oldest_ns)
+        self.monitor.record(NEWEST_AGE_COMPONENT.format(device=device_name), emit_ns - newest_ns)
+
+        if self.trace_file:
+            with self._trace_lock:
+                if self.trace_file:
+                    self.trace_file.write(f"{device_name},{oldest_ns},{newest_ns},{enqueue_ns},{emit_ns},{size}\n")
+
+    def get_summary(self) -> Dict[str, Dict[str, Any]]:
+        """Age-at-emission summaries (count, mean, p50/p90/p99/p99.9/max in ms) per device"""
+        summary = {}
+        for device_name in sorted(self.devices):
+            summary[device_name] = {
+                "oldest_sample": self.monitor.get_component_metrics(AGE_COMPONENT.format(device=device_name)).histogram().summary(),
+                "newest_sample": self.monitor.get_component_metrics(NEWEST_AGE_COMPONENT.format(device=device_name)).histogram().summary()
+            }
+        return summary
+
+# Global tracer used by the transmitters
+emission_tracer = EmissionTracer()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Live Attitude Viewer
+Shows satellite attitude, ARS rates and magnetometer field live from the
+running simulator's attitude tap (start it with --attitude-tap)
+
+Attitude is propagated as a quaternion from the ARS rates as they arrive.
+Frames land in ring buffers on a background thread; the UI redraws at a fixed
+rate from the newest samples, decimated to a bounded number of points, so the
+redraw cost does not depend on the data rate and the simulator never waits.
+"""
+
+import math
+import argparse
+from datetime import datetime
+
+import numpy as np
+import matplotlib.pyplot as plt
+import matplotlib.animation as animation
+
+from attitude_tap import TapSubscriber, DEFAULT_TAP_HOST, DEFAULT_TAP_PORT
+from capture_store import NS_PER_SECOND
+from realistic_satellite_visualizer import RealisticSatelliteVisualizer, PART_STYLES
+from attitude_propagator import propagate_attitude, quaternion_to_euler, quaternion_to_rotation_matrix
+from mpl_toolkits.mplot3d.art3d import Poly3DCollection
+
+class LiveAttitudeViewer:
+    def __init__(self, subscriber: TapSubscriber, ui_fps=20, window_seconds=10.0, max_points=500, channel='prime'):
+        self.subscriber = subscriber
+        self.rate_columns = slice(0, 3) if channel == 'prime' else slice(3, 6)
+        self.attitude = None  # Quaternion propagated from the ARS rates
+        self.propagated_count = 0  # ARS samples already folded into the attitude
+        self.ui_fps = ui_fps
+        self.window_seconds = window_seconds
+        self.max_points = max_points  # Points per trace, whatever the data rate
+        self.model = RealisticSatelliteVisualizer(None)  # Satellite model and rotation helpers
+
+    def recent(self, device_name):
+        """Newest samples within the time window, decimated to at most max_points"""
+        timestamps, values = self.subscriber.rings[device_name].latest()
+        if len(timestamps) == 0:
+            return timestamps, values
+
+        start = np.searchsorted(timestamps, timestamps[-1] - int(self.window_seconds * NS_PER_SECOND))
+        stride = max(1, math.ceil((len(timestamps) - start) / self.max_points))
+        # Step back from the newest sample so it is always drawn
+        indices = np.arange(len(timestamps) - 1, start - 1, -stride)[::-1]
+        return timestamps[indices], values[indices]
+
+    def propagate(self):
+        """Fold ARS samples received since the last redraw into the attitude quaternion"""
+        ring = self.subscriber.rings['ars']
+        count = ring.count
+        new_samples = count - self.propagated_count
+        if new_samples <= 0:
+            return
+        
+        if self.attitude is None:
+            timestamps, values = ring.latest(new_samples)
+            quaternions = propagate_attitude(timestamps, values[:, self.rate_columns])
+        else:
+            # Include the last propagated sample so the first step has its time step
+            timestamps, values = ring.latest(new_samples + 1)
+            quaternions = propagate_attitude(timestamps, values[:, self.rate_columns], q0=self.attitude)
+        self.attitude = quaternions[-1]
+        self.propagated_count = count
+    
+    def setup_figure(self):
+        """Create the attitude, rate and field axes"""
+        fig = plt.figure(figsize=(15, 9))
+        grid = fig.add_gridspec(2, 2, width_ratios=(1.2, 1))
+
+        ax3d = fig.add_subplot(grid[:, 0], projection='3d')
+        ax3d.set_xlim(-2, 2)
+        ax3d.set_ylim(-2, 2)
+        ax3d.set_zlim(-2, 2)
+        ax3d.set_xlabel('X Axis (Roll)')
+        ax3d.set_ylabel('Y Axis (Pitch)')
+        ax3d.set_zlabel('Z Axis (Yaw)')
+        ax3d.set_title('Live Satellite Attitude', fontweight='bold')
+
+        polys = {}
+        for part, style in PART_STYLES.items():
+            polys[part] = Poly3DCollection([], edgecolor='black', linewidth=1, **style)
+            ax3d.add_collection3d(polys[part])
+
+        ax_rates = fig.add_subplot(grid[0, 1])
+        ax_rates.set_title('ARS Angular Rates')
+        ax_rates.set_ylabel('Rate (mrad/s)')
+        ax_rates.grid(True, alpha=0.3)
+        rate_lines = [ax_rates.plot([], [], color=color, label=axis)[0]
+                      for axis, color in zip('XYZ', ('r', 'g', 'b'))]
+        ax_rates.legend(loc='upper left')
+
+        ax_field = fig.add_subplot(grid[1, 1])
+        ax_field.set_title('Magnetometer Field')
+        ax_field.set_xlabel('Time (s)')
+        ax_field.set_ylabel('Field (µT)')
+        ax_field.grid(True, alpha=0.3)
+        field_lines = [ax_field.plot([], [], color=color, label=axis)[0]
+                       for axis, color in zip('XYZ', ('r', 'g', 'b'))]
+        ax_field.legend(loc='upper left')
+
+        status = fig.text(0.01, 0.01, '', fontsize=9, family='monospace')
+
+        return fig, {
+            'ax3d': ax3d, 'polys': polys,
+            'ax_rates': ax_rates, 'rate_lines': rate_lines,
+            'ax_field': ax_field, 'field_lines': field_lines,
+            'status': status
+        }
+
+    def draw(self, artists):
+        """Redraw every artist from the newest ring buffer samples"""
+        self.propagate()
+        ars_times, ars_values = self.recent('ars')
+        if len(ars_times):
+            roll, pitch, yaw = quaternion_to_euler(self.attitude)
+            faces = self.model.transform_model(quaternion_to_rotation_matrix(self.attitude[None, :]))
+            for part, poly in artists['polys'].items():
+                poly.set_verts(faces[part][0])
+            timestamp_str = datetime.fromtimestamp(ars_times[-1] / NS_PER_SECOND).strftime('%H:%M:%S.%f')[:-3]
+            artists['ax3d'].set_title(
+                f'Live Satellite Attitude\n{timestamp_str}\n'
+                f'Roll: {np.degrees(roll):.3f}° | Pitch: {np.degrees(pitch):.3f}° | Yaw: {np.degrees(yaw):.3f}°',
+                fontweight='bold')
+            self._update_traces(artists['ax_rates'], artists['rate_lines'], ars_times, ars_values[:, self.rate_columns] * 1e3)
+
+        mag_times, mag_values = self.recent('magnetometer')
+        if len(mag_times):
+            self._update_traces(artists['ax_field'], artists['field_lines'], mag_times, mag_values[:, 0:3] * 1e6)
+
+        artists['status'].set_text(
+            f"Frames received: {self.subscriber.frames_received}  "
+            f"malformed: {self.subscriber.frames_malformed}  "
+            f"ARS: {self.subscriber.rings['ars'].count}  "
+            f"MAG: {self.subscriber.rings['magnetometer'].count}")
+
+    def _update_traces(self, ax, lines, timestamps, values):
+        """Update one axis' traces in place, time relative to the newest sample"""
+        seconds = (timestamps - timestamps[-1]) / NS_PER_SECOND
+        for axis, line in enumerate(lines):
+            line.set_data(seconds, values[:, axis])
+        ax.set_xlim(-self.window_seconds, 0)
+        ax.relim()
+        ax.autoscale_view(scalex=False)
+
+    def run(self):
+        """Show the viewer until its window is closed"""
+        fig, artists = self.setup_figure()
+
+        def update(frame):
+            self.draw(artists)
+
+        # Keep a reference so the timer is not garbage collected
+        self.anim = animation.FuncAnimation(fig, update, interval=1000 // self.ui_fps,
+                                            blit=False, cache_frame_data=False)
+        plt.show()
+
+def main():
+    parser = argparse.ArgumentParser(description='Live Attitude Viewer')
+    parser.add_argument('--host', default=DEFAULT_TAP_HOST, help=f'Tap address (default: {DEFAULT_TAP_HOST})')
+    parser.add_argument('--port', type=int, default=DEFAULT_TAP_PORT, help=f'Tap port (default: {DEFAULT_TAP_PORT})')
+    parser.add_argument('--ui-fps', type=int, default=20, help='Redraw rate (default: 20)')
+    parser.add_argument('--window', type=float, default=10.0, help='Seconds of history shown (default: 10)')
+    parser.add_argument('--max-points', type=int, default=500, help='Points per trace (default: 500)')
+    parser.add_argument('--channel', choices=['prime', 'redundant'], default='prime',
+                       help='ARS channel to propagate attitude from (default: prime)')
+    parser.add_argument('--capacity', type=int, default=65536, help='Ring buffer samples per device (default: 65536)')
+
+    args = parser.parse_args()
+
+    subscriber = TapSubscriber(args.host, args.port, capacity=args.capacity)
+    subscriber.start()
+    print(f"Listening for simulator frames on {args.host}:{args.port}")
+
+    try:
+        viewer = LiveAttitudeViewer(subscriber, ui_fps=args.ui_fps, window_seconds=args.window,
+                                    max_points=args.max_points, channel=args.channel)
+        viewer.run()
+    finally:
+        subscriber.stop()
+        print(f"Received {subscriber.frames_received} frames")
+
+if __name__ == "__main__":
+    main()
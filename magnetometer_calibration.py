@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Vectorized Magnetometer Calibration
+
+Calibrates magnetometer readings in NumPy blocks instead of one reading at a
+time. A CalibrationSet holds the same parameters as HoneywellMagnetometer
+(per-axis scale factors, a 3x3 matrix and an offset):
+
+    calibrated = matrix @ (scale * raw) + offset
+
+Hard-iron (offset) and soft-iron (matrix) parameters are fitted with a
+least-squares ellipsoid fit: a sensor rotated through many attitudes in a
+constant field traces an ellipsoid, and the fit finds the transform that
+maps it back onto a sphere of the field strength. When the samples do not
+span an ellipsoid, fit_min_max gives the per-axis min/max estimate instead.
+
+Calibration sets are saved by name in JSON files, so one file can hold the
+sets of several sensors or temperatures.
+"""
+
+import os
+import json
+import time
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MIN_FIT_SAMPLES = 10
+
+@dataclass
+class CalibrationSet:
+    """Scale, matrix and offset applied as matrix @ (scale * raw) + offset"""
+    scale: np.ndarray = field(default_factory=lambda: np.ones(3))
+    matrix: np.ndarray = field(default_factory=lambda: np.eye(3))
+    offset: np.ndarray = field(default_factory=lambda: np.zeros(3))
+    field_strength: float = 0.0  # Field magnitude the fit normalized to, nT (0: not fitted)
+    residual_rms: float = 0.0  # RMS of |calibrated| - field_strength over the fit samples, nT
+    samples: int = 0
+    created: str = ""
+
+    def __post_init__(self):
+        self.scale = np.asarray(self.scale, dtype=np.float64).reshape(3)
+        self.matrix = np.asarray(self.matrix, dtype=np.float64).reshape(3, 3)
+        self.offset = np.asarray(self.offset, dtype=np.float64).reshape(3)
+
+    def linear(self) -> np.ndarray:
+        """The combined linear part, matrix @ diag(scale)"""
+        return self.matrix * self.scale
+
+    def apply(self, fields: np.ndarray) -> np.ndarray:
+        """Calibrate an (N, 3) array of raw x, y, z fields in one operation"""
+        return np.asarray(fields, dtype=np.float64) @ self.linear().T + self.offset
+
+    def then(self, later: "CalibrationSet") -> "CalibrationSet":
+        """The calibration equal to applying this one and then `later`"""
+        linear = later.linear()
+        return CalibrationSet(
+            scale=np.ones(3),
+            matrix=linear @ self.linear(),
+            offset=linear @ self.offset + later.offset,
+            field_strength=later.field_strength,
+            residual_rms=later.residual_rms,
+            samples=later.samples,
+            created=later.created
+        )
+
+    def to_dict(self) -> Dict:
+        """JSON-serializable form"""
+        return {
+            'scale': self.scale.tolist(),
+            'matrix': self.matrix.tolist(),
+            'offset': self.offset.tolist(),
+            'field_strength': self.field_strength,
+            'residual_rms': self.residual_rms,
+            'samples': self.samples,
+            'created': self.created
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "CalibrationSet":
+        return cls(
+            scale=data.get('scale', [1.0, 1.0, 1.0]),
+            matrix=data.get('matrix', np.eye(3).tolist()),
+            offset=data.get('offset', [0.0, 0.0, 0.0]),
+            field_strength=data.get('field_strength', 0.0),
+            residual_rms=data.get('residual_rms', 0.0),
+            samples=data.get('samples', 0),
+            created=data.get('created', "")
+        )
+
+def readings_to_array(readings: Iterable) -> np.ndarray:
+    """(N, 3) array of x, y, z fields from MagnetometerReading objects"""
+    readings = list(readings)
+    fields = np.empty((len(readings), 3))
+    for index, reading in enumerate(readings):
+        fields[index] = (reading.x_field, reading.y_field, reading.z_field)
+    return fields
+
+def _finish_fit(calibration: CalibrationSet, fields: np.ndarray) -> CalibrationSet:
+    """Fill in the fit statistics"""
+    magnitudes = np.linalg.norm(calibration.apply(fields), axis=1)
+    if not calibration.field_strength:
+        calibration.field_strength = float(magnitudes.mean())
+    calibration.residual_rms = float(np.sqrt(np.mean((magnitudes - calibration.field_strength) ** 2)))
+    calibration.samples = len(fields)
+    calibration.created = time.strftime('%Y-%m-%dT%H:%M:%S')
+    return calibration
+
+def fit_ellipsoid(fields: np.ndarray, field_strength: Optional[float] = None) -> CalibrationSet:
+    """
+    Hard- and soft-iron calibration from a least-squares ellipsoid fit
+
+    Fits a x² + b y² + c z² + 2d xy + 2e xz + 2f yz + 2g x + 2h y + 2i z = 1
+    to the (N, 3) samples. The fitted ellipsoid's center is the hard-iron
+    offset, and the symmetric square root of its shape matrix is the
+    soft-iron correction. Calibrated fields lie on a sphere of radius
+    field_strength (default: the ellipsoid's mean radius). Raises ValueError
+    if the samples do not describe an ellipsoid.
+    """
+    fields = np.asarray(fields, dtype=np.float64)
+    if fields.ndim != 2 or fields.shape[1] != 3 or len(fields) < MIN_FIT_SAMPLES:
+        raise ValueError(f"Need an (N, 3) array with at least {MIN_FIT_SAMPLES} samples")
+
+    # Center and scale the samples so the normal equations stay well conditioned
+    mean = fields.mean(axis=0)
+    spread = np.abs(fields - mean).max() or 1.0
+    x, y, z = ((fields - mean) / spread).T
+    design = np.column_stack([x * x, y * y, z * z, 2 * x * y, 2 * x * z, 2 * y * z, 2 * x, 2 * y, 2 * z])
+    coefficients, _, rank, _ = np.linalg.lstsq(design, np.ones(len(fields)), rcond=None)
+    if rank < 9:
+        raise ValueError("Samples do not span an ellipsoid; rotate the sensor through more attitudes")
+
+    a, b, c, d, e, f, g, h, i = coefficients
+    shape = np.array([[a, d, e], [d, b, f], [e, f, c]])
+    center = -np.linalg.solve(shape, [g, h, i])
+    shape /= 1.0 + center @ shape @ center  # Now (p - center)^T shape (p - center) = 1
+    eigenvalues, eigenvectors = np.linalg.eigh(shape)
+    if np.any(eigenvalues <= 0):
+        raise ValueError("Samples fit a hyperboloid, not an ellipsoid")
+
+    # Undo the normalization: shape and radii back in nT
+    center = center * spread + mean
+    eigenvalues = eigenvalues / spread ** 2
+    if field_strength is None:
+        field_strength = float(np.prod(1.0 / np.sqrt(eigenvalues)) ** (1.0 / 3.0))
+    soft_iron = eigenvectors @ np.diag(np.sqrt(eigenvalues) * field_strength) @ eigenvectors.T
+
+    return _finish_fit(CalibrationSet(matrix=soft_iron, offset=-soft_iron @ center,
+                                      field_strength=field_strength), fields)
+
+def fit_min_max(fields: np.ndarray) -> CalibrationSet:
+    """Per-axis hard-iron offset and scale from the min/max of each axis"""
+    fields = np.asarray(fields, dtype=np.float64)
+    if fields.ndim != 2 or fields.shape[1] != 3 or len(fields) < MIN_FIT_SAMPLES:
+        raise ValueError(f"Need an (N, 3) array with at least {MIN_FIT_SAMPLES} samples")
+    low, high = fields.min(axis=0), fields.max(axis=0)
+    ranges = high - low
+    scale = np.where(ranges > 0, ranges.mean() / np.where(ranges > 0, ranges, 1.0), 1.0)
+    return _finish_fit(CalibrationSet(scale=scale, offset=-scale * (high + low) / 2), fields)
+
+def save_calibration(path: str, calibration: CalibrationSet, name: str = "default"):
+    """Store a calibration set under a name, keeping the file's other sets"""
+    sets = {}
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            sets = json.load(f).get('calibration_sets', {})
+    sets[name] = calibration.to_dict()
+    with open(path, 'w') as f:
+        json.dump({'calibration_sets': sets}, f, indent=2)
+    logger.info(f"Saved calibration set '{name}' to {path}")
+
+def load_calibration(path: str, name: str = "default") -> CalibrationSet:
+    """Load a named calibration set; KeyError if the file has no set of that name"""
+    with open(path, 'r') as f:
+        sets = json.load(f).get('calibration_sets', {})
+    if name not in sets:
+        raise KeyError(f"No calibration set '{name}' in {path} (have: {', '.join(sorted(sets)) or 'none'})")
+    return CalibrationSet.from_dict(sets[name])
+
+def list_calibrations(path: str) -> List[str]:
+    """Names of the calibration sets in a file"""
+    with open(path, 'r') as f:
+        return sorted(json.load(f).get('calibration_sets', {}))
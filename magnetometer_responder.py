@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Magnetometer Poll Responder
+
+The Honeywell magnetometer only talks when polled. In responder mode the
+simulator listens on the magnetometer's RS485 or CAN link and answers
+MAGDATA, MAGTEMP, MAGID and STATUS requests in the HoneywellMagnetometer
+message format:
+
+    [type][command][sequence (2, LE)][command][payload][CRC-16 (2, LE)]
+
+Replies are pre-encoded whenever a new MATLAB frame arrives, so answering a
+poll only patches in the request's sequence number. The CRC is affine in
+the message bits, so the reply CRC is the pre-computed CRC for sequence 0
+XORed with two table lookups for the sequence bytes. The reply goes out a
+configurable turnaround time after the request's last byte arrived. The time
+from request arrival to the end of the reply write is recorded in a latency
+histogram and as the "magnetometer_poll_response" performance component.
+
+OPMODE and MEMCMD requests are accepted without a reply, as the driver
+expects. Malformed requests (bad header, CRC mismatch, or a partial frame
+followed by a silent gap) are dropped and counted.
+"""
+
+import struct
+import time
+import threading
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from honeywell_magnetometer import (HoneywellMagnetometer, MessageFramer, MessageType, VALID_MESSAGE_TYPES,
+                                    calculate_crc16)
+from device_encoders.magnetometer_encoder import MagnetometerEncoder
+from performance_monitor import LatencyHistogram, performance_monitor
+from latency_tracer import emission_tracer
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct('<BBH')
+MIN_REQUEST_SIZE = HoneywellMagnetometer.HEADER_SIZE + 1 + HoneywellMagnetometer.CRC_SIZE
+FRAME_GAP = 0.05  # Seconds of silence after which a partial request is discarded
+
+# Request data length per command; MEMWRITE is variable and found by its CRC
+REQUEST_DATA_LENGTHS = {
+    HoneywellMagnetometer.CMD_MAGDATA: 0,
+    HoneywellMagnetometer.CMD_MAGTEMP: 0,
+    HoneywellMagnetometer.CMD_MAGID: 0,
+    HoneywellMagnetometer.CMD_STATUS: 0,
+    HoneywellMagnetometer.CMD_MEMCMD: 0,
+    HoneywellMagnetometer.CMD_OPMODE: 1,
+    HoneywellMagnetometer.CMD_MEMREAD: 4,
+}
+
+# CAN arbitration ID each reply is sent on
+CAN_REPLY_IDS = {
+    HoneywellMagnetometer.CMD_MAGDATA: HoneywellMagnetometer.CAN_DATA_ID,
+    HoneywellMagnetometer.CMD_MAGTEMP: HoneywellMagnetometer.CAN_DATA_ID,
+    HoneywellMagnetometer.CMD_MAGID: HoneywellMagnetometer.CAN_DATA_ID,
+    HoneywellMagnetometer.CMD_STATUS: HoneywellMagnetometer.CAN_STATUS_ID,
+}
+
+@lru_cache(maxsize=None)
+def sequence_crc_tables(length: int) -> Tuple[Tuple[int, ...], Tuple[int, ...]]:
+    """
+    CRC change caused by each value of the sequence low and high byte
+
+    For a message of `length` bytes (without CRC) with the sequence at bytes
+    2-3: crc(message) == crc(message with sequence 0) ^ low[seq & 0xFF] ^ high[seq >> 8].
+    """
+    zero_crc = calculate_crc16(bytes(length))
+    tables = []
+    for position in (2, 3):
+        bit_deltas = []
+        for bit in range(8):
+            message = bytearray(length)
+            message[position] = 1 << bit
+            bit_deltas.append(calculate_crc16(bytes(message)) ^ zero_crc)
+        table = []
+        for value in range(256):
+            delta = 0
+            for bit in range(8):
+                if value & (1 << bit):
+                    delta ^= bit_deltas[bit]
+            table.append(delta)
+        tables.append(tuple(table))
+    return tables[0], tables[1]
+
+class ReplyTemplate:
+    """A reply encoded up front, completed with the request's sequence number"""
+
+    def __init__(self, message_type: int, command: int, payload: bytes):
+        self.message_type = message_type
+        self.command = command
+        self.head = bytes([message_type, command])
+        self.body = bytes([command]) + payload
+        self.base_crc = calculate_crc16(self.head + b'\x00\x00' + self.body)
+        self.low_table, self.high_table = sequence_crc_tables(len(self.head) + 2 + len(self.body))
+
+    def render(self, sequence: int) -> bytes:
+        """Reply bytes for a request sequence number"""
+        crc = self.base_crc ^ self.low_table[sequence & 0xFF] ^ self.high_table[(sequence >> 8) & 0xFF]
+        return self.head + struct.pack('<H', sequence) + self.body + struct.pack('<H', crc)
+
+@dataclass
+class PollRequest:
+    """A decoded poll from the flight computer"""
+    message_type: int
+    command: int
+    sequence: int
+    data: bytes
+    arrival_ns: int  # perf_counter_ns when its last byte was read
+
+def decode_request(message: bytes, arrival_ns: int = 0) -> Optional[PollRequest]:
+    """Decode one complete request; None if its header or CRC is wrong"""
+    if len(message) < MIN_REQUEST_SIZE:
+        return None
+    message_type, command, sequence = HEADER.unpack_from(message)
+    if message_type not in VALID_MESSAGE_TYPES or message[4] != command:
+        return None
+    if calculate_crc16(message[:-2]) != struct.unpack('<H', message[-2:])[0]:
+        return None
+    return PollRequest(message_type, command, sequence, bytes(message[5:-2]), arrival_ns)
+
+class RequestFramer(MessageFramer):
+    """Splits a serial byte stream into requests, resynchronizing on bad bytes"""
+
+    def __init__(self):
+        super().__init__(REQUEST_DATA_LENGTHS, FRAME_GAP)
+
+    def feed(self, data: bytes, arrival_ns: int) -> List[PollRequest]:
+        """Add received bytes and return the requests they complete"""
+        return [decode_request(message, arrival_ns) for message in super().feed(data)]
+
+@dataclass
+class ResponderConfig:
+    """Poll responder configuration"""
+    link: str = "serial"  # serial (RS485) or can
+    port: str = "/dev/ttyUSB1"  # Serial port or pyserial URL (e.g. pty://magnetometer)
+    baud_rate: int = 115200
+    interface: str = "socketcan"  # python-can interface
+    channel: str = "can0"
+    bitrate: int = 500000
+    turnaround_ms: float = 2.0  # Delay from the end of a request to the start of its reply
+    device_id: int = 0x4D41474E
+    firmware_version: str = "1.00"
+    serial_number: str = "HWMAG001"
+    calibration_date: str = "20250101"
+    temperature: float = 25.0  # Reported until MATLAB supplies one
+
+class MagnetometerPollResponder:
+    """Answers magnetometer polls from replies pre-encoded per MATLAB frame"""
+
+    def __init__(self, config: ResponderConfig, device_name: str = "magnetometer"):
+        self.config = config
+        self.device_name = device_name
+        self.encoder = MagnetometerEncoder()
+        self.turnaround_ns = int(config.turnaround_ms * 1e6)
+        self.operation_mode = 0
+        # Command -> ReplyTemplate; replaced as a whole so the I/O thread never sees a half-updated set
+        self.replies: Dict[int, ReplyTemplate] = {}
+        self.ingest_ns: Optional[Tuple[int, int]] = None  # Ingest stamps of the frame behind the replies
+        self.response_latency = LatencyHistogram()
+        self.framer = RequestFramer()
+        self.stats = {
+            'frames_encoded': 0,
+            'polls': 0,
+            'replies': 0,
+            'unanswered': 0,  # Valid polls with no reply yet (no MATLAB frame) or no reply defined
+            'malformed': 0
+        }
+        self.link = None
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+        self._encode_static_replies()
+
+    def _encode_static_replies(self):
+        """MAGID never changes; STATUS and MAGTEMP start from the configured defaults"""
+        magid = HoneywellMagnetometer.CMD_MAGID
+        payload = (struct.pack('<I', self.config.device_id)
+                   + self.config.firmware_version.encode('ascii')[:4].ljust(4, b'\x00')
+                   + self.config.serial_number.encode('ascii')[:8].ljust(8, b'\x00')
+                   + self.config.calibration_date.encode('ascii')[:8].ljust(8, b'\x00')
+                   + bytes([0]))
+        self.static_replies = {magid: ReplyTemplate(MessageType.MAGID.value, magid, payload)}
+        self.replies = dict(self.static_replies)
+
+    def update(self, matlab_data: List[float], ingest_ns: Optional[Tuple[int, int]] = None) -> bool:
+        """Pre-encode the replies for a new MATLAB frame (x, y, z in nT)"""
+        packet = self.encoder.convert_matlab_data(matlab_data)
+        if packet is None:
+            return False
+        temperature = self.config.temperature
+        status = packet.status.value
+        replies = dict(self.static_replies)
+        replies[HoneywellMagnetometer.CMD_MAGDATA] = ReplyTemplate(
+            MessageType.MAGDATA.value, HoneywellMagnetometer.CMD_MAGDATA,
+            struct.pack('<ffffB', packet.x_field, packet.y_field, packet.z_field, temperature, status))
+        replies[HoneywellMagnetometer.CMD_MAGTEMP] = ReplyTemplate(
+            MessageType.MAGTEMP.value, HoneywellMagnetometer.CMD_MAGTEMP, struct.pack('<fB', temperature, status))
+        replies[HoneywellMagnetometer.CMD_STATUS] = ReplyTemplate(
+            MessageType.STATUS.value, HoneywellMagnetometer.CMD_STATUS, bytes([status]))
+        self.replies = replies
+        self.ingest_ns = ingest_ns
+        self.stats['frames_encoded'] += 1
+        return True
+
+    def reply_for(self, request: PollRequest) -> Optional[bytes]:
+        """Reply bytes for a request, or None if it takes no reply"""
+        if request.command == HoneywellMagnetometer.CMD_OPMODE and request.data:
+            self.operation_mode = request.data[0]
+        template = self.replies.get(request.command)
+        return template.render(request.sequence) if template else None
+
+    def start(self) -> bool:
+        """Open the link and start answering polls"""
+        try:
+            if self.config.link == "can":
+                import can
+                self.link = can.Bus(interface=self.config.interface, channel=self.config.channel,
+                                    bitrate=self.config.bitrate)
+                target = self._can_loop
+            else:
+                import serial
+                try:
+                    import output_transmitters.protocol_pty  # noqa: F401  Registers pty:// ports
+                except ImportError:
+                    pass
+                self.link = serial.serial_for_url(self.config.port, baudrate=self.config.baud_rate,
+                                                  timeout=FRAME_GAP / 5)
+                target = self._serial_loop
+        except Exception as e:
+            logger.error(f"Failed to open {self.device_name} responder link: {e}")
+            return False
+
+        self.running = True
+        self.thread = threading.Thread(target=target, daemon=True)
+        self.thread.start()
+        logger.info(f"{self.device_name} poll responder listening on "
+                    f"{self.config.channel if self.config.link == 'can' else self.config.port}")
+        return True
+
+    def stop(self):
+        """Stop answering and close the link"""
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=2.0)
+        if self.link is not None:
+            try:
+                if self.config.link == "can":
+                    self.link.shutdown()
+                else:
+                    self.link.close()
+            except Exception:
+                pass
+            self.link = None
+
+    def _wait_turnaround(self, request: PollRequest):
+        delay = (request.arrival_ns + self.turnaround_ns - time.perf_counter_ns()) / 1e9
+        if delay > 0:
+            time.sleep(delay)
+
+    def _record_reply(self, request: PollRequest, size: int):
+        latency_ns = time.perf_counter_ns() - request.arrival_ns
+        self.response_latency.record(latency_ns)
+        performance_monitor.record(f"{self.device_name}_poll_response", latency_ns)
+        emission_tracer.record_emission(self.device_name, self.ingest_ns, 0, size)
+        self.stats['replies'] += 1
+
+    def _handle(self, request: PollRequest, send):
+        self.stats['polls'] += 1
+        reply = self.reply_for(request)
+        if reply is None:
+            if request.command in CAN_REPLY_IDS:
+                self.stats['unanswered'] += 1
+            return
+        self._wait_turnaround(request)
+        send(request, reply)
+        self._record_reply(request, len(reply))
+
+    def _serial_loop(self):
+        """Read requests from the RS485 link and answer them in order"""
+        def send(request, reply):
+            self.link.write(reply)
+
+        while self.running:
+            try:
+                data = self.link.read(max(1, self.link.in_waiting))
+                arrival_ns = time.perf_counter_ns()
+                requests = self.framer.feed(data, arrival_ns) if data else []
+                if not data:
+                    self.framer.expire()
+                self.stats['malformed'] = self.framer.malformed
+                for request in requests:
+                    self._handle(request, send)
+            except Exception as e:
+                if not self.running:
+                    break
+                logger.error(f"Error in {self.device_name} responder: {e}")
+                time.sleep(0.1)
+
+    def _can_loop(self):
+        """Answer requests arriving on the command ID, one per CAN message"""
+        import can
+
+        def send(request, reply):
+            self.link.send(can.Message(arbitration_id=CAN_REPLY_IDS[request.command], data=reply,
+                                       is_extended_id=False, is_fd=len(reply) > 8))
+
+        while self.running:
+            try:
+                message = self.link.recv(timeout=0.1)
+                if message is None or message.arbitration_id != HoneywellMagnetometer.CAN_CMD_ID:
+                    continue
+                request = decode_request(bytes(message.data), time.perf_counter_ns())
+                if request is None:
+                    self.stats['malformed'] += 1
+                    continue
+                self._handle(request, send)
+            except Exception as e:
+                if not self.running:
+                    break
+                logger.error(f"Error in {self.device_name} responder: {e}")
+                time.sleep(0.1)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Poll counts and response latency percentiles"""
+        status = dict(self.stats)
+        status['link'] = self.config.link
+        status['turnaround_ms'] = self.config.turnaround_ms
+        status['operation_mode'] = self.operation_mode
+        status['response_latency'] = self.response_latency.summary()
+        return status
+
+def main():
+    """Run a standalone responder fed with a fixed field"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Magnetometer Poll Responder')
+    parser.add_argument('--link', choices=['serial', 'can'], default='serial', help='Link to listen on')
+    parser.add_argument('--port', default='/dev/ttyUSB1', help='Serial port or pty://name')
+    parser.add_argument('--baud', type=int, default=115200, help='Baud rate')
+    parser.add_argument('--interface', default='socketcan', help='python-can interface')
+    parser.add_argument('--channel', default='can0', help='CAN channel')
+    parser.add_argument('--turnaround-ms', type=float, default=2.0, help='Reply turnaround in ms')
+    parser.add_argument('--field', type=float, nargs=3, default=[25000.0, -5000.0, 40000.0],
+                        metavar=('X', 'Y', 'Z'), help='Magnetic field to report in nT')
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds to run')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    responder = MagnetometerPollResponder(ResponderConfig(
+        link=args.link, port=args.port, baud_rate=args.baud, interface=args.interface,
+        channel=args.channel, turnaround_ms=args.turnaround_ms))
+    responder.update(args.field)
+    if not responder.start():
+        return
+    try:
+        time.sleep(args.duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        responder.stop()
+    status = responder.get_status()
+    latency = status['response_latency']
+    print(f"📡 {status['polls']} polls, {status['replies']} replies, {status['malformed']} malformed")
+    print(f"⏱️  Response latency p50 {latency['p50_ms']:.3f}ms, p99 {latency['p99_ms']:.3f}ms, max {latency['max_ms']:.3f}ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Bounded Magnetometer Reading Store
+
+A fixed-capacity ring of magnetometer readings in one preallocated NumPy
+structured array. Each record has a sequence number, timestamp, calibrated
+x, y, z field, temperature and status. Raw message bytes can also be kept
+in a byte ring beside it, and each record holds their offset there.
+
+The ring is mirrored: slot i is written at both i and i + capacity. Any run
+of up to capacity consecutive readings is then one contiguous slice, so
+read_since() returns a view without copying, even across the wrap. When the
+ring is full the oldest reading is overwritten and counted in `dropped`.
+
+One thread writes; any thread reads. The views share memory with the ring,
+so copy them if they must outlive the next capacity appends.
+"""
+
+from typing import Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+READING_DTYPE = np.dtype([
+    ('seq', np.int64),
+    ('timestamp', np.float64),
+    ('x', np.float64),
+    ('y', np.float64),
+    ('z', np.float64),
+    ('temperature', np.float64),
+    ('status', np.uint8),
+    ('raw_offset', np.int64),  # Position in the raw byte ring, -1 if not kept
+    ('raw_length', np.uint16),
+])
+
+class ReadingRing:
+    """Preallocated overwrite-oldest ring of magnetometer readings"""
+
+    def __init__(self, capacity: int = 65536, raw_capacity: int = 0):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.records = np.zeros(2 * capacity, dtype=READING_DTYPE)
+        self.raw_capacity = raw_capacity
+        self.raw = np.zeros(raw_capacity, dtype=np.uint8)
+        self.count = 0  # Total readings ever appended; the next sequence number
+        self.raw_count = 0  # Total raw bytes ever appended
+
+    @property
+    def dropped(self) -> int:
+        """Readings overwritten by newer ones"""
+        return max(0, self.count - self.capacity)
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def append(self, timestamp: float, x: float, y: float, z: float, temperature: float,
+               status: int, raw: Optional[bytes] = None) -> int:
+        """Append one reading, overwriting the oldest when full; returns its sequence number"""
+        seq = self.count
+        index = seq % self.capacity
+        raw_offset, raw_length = self._store_raw(raw)
+        record = (seq, timestamp, x, y, z, temperature, status, raw_offset, raw_length)
+        self.records[index] = record
+        self.records[index + self.capacity] = record
+        self.count = seq + 1
+        return seq
+
+    def extend(self, timestamps: Sequence[float], fields: np.ndarray, temperatures: Sequence[float],
+               statuses: Sequence[int], raws: Optional[Iterable[bytes]] = None) -> int:
+        """Append a block of readings (fields is (N, 3)); returns the first sequence number"""
+        first = self.count
+        size = len(timestamps)
+        if size == 0:
+            return first
+        block = np.empty(size, dtype=READING_DTYPE)
+        block['seq'] = np.arange(first, first + size)
+        block['timestamp'] = timestamps
+        block['x'], block['y'], block['z'] = np.asarray(fields, dtype=np.float64).reshape(size, 3).T
+        block['temperature'] = temperatures
+        block['status'] = statuses
+        block['raw_offset'] = -1
+        block['raw_length'] = 0
+        if raws is not None:
+            for index, raw in enumerate(raws):
+                block['raw_offset'][index], block['raw_length'][index] = self._store_raw(raw)
+
+        # Only the newest capacity readings of an oversized block survive
+        keep = block[-self.capacity:]
+        start = int(keep['seq'][0]) % self.capacity
+        head = min(len(keep), self.capacity - start)
+        for offset in (0, self.capacity):
+            self.records[offset + start:offset + start + head] = keep[:head]
+            self.records[offset:offset + len(keep) - head] = keep[head:]
+        self.count = first + size
+        return first
+
+    def _store_raw(self, raw: Optional[bytes]) -> Tuple[int, int]:
+        """Copy raw bytes into the byte ring; (-1, 0) if not kept"""
+        if raw is None or not self.raw_capacity or len(raw) > self.raw_capacity:
+            return -1, 0
+        offset = self.raw_count
+        start = offset % self.raw_capacity
+        data = np.frombuffer(raw, dtype=np.uint8)
+        head = min(len(data), self.raw_capacity - start)
+        self.raw[start:start + head] = data[:head]
+        self.raw[:len(data) - head] = data[head:]
+        self.raw_count = offset + len(data)
+        return offset, len(data)
+
+    def raw_bytes(self, record) -> Optional[bytes]:
+        """Raw message bytes of a record, or None if not kept or already overwritten"""
+        offset, length = int(record['raw_offset']), int(record['raw_length'])
+        if offset < 0 or self.raw_count - offset > self.raw_capacity:
+            return None
+        start = offset % self.raw_capacity
+        head = min(length, self.raw_capacity - start)
+        return self.raw[start:start + head].tobytes() + self.raw[:length - head].tobytes()
+
+    def read_since(self, seq: int) -> Tuple[np.ndarray, int]:
+        """
+        View of the readings from sequence number seq on, and the sequence
+        number to pass next time. Readings already overwritten are skipped;
+        the view's first 'seq' shows where it starts.
+        """
+        count = self.count
+        start = max(seq, count - self.capacity, 0)
+        if start >= count:
+            return self.records[:0], count
+        index = start % self.capacity
+        return self.records[index:index + count - start], count
+
+    def latest(self) -> Optional[np.void]:
+        """The newest reading, or None if empty"""
+        if self.count == 0:
+            return None
+        return self.records[(self.count - 1) % self.capacity]
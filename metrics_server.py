@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Metrics Endpoint for the FlatSat Device Simulator
+
+Serves simulator telemetry over HTTP (stdlib http.server on a background
+thread) in Prometheus exposition format and as JSON:
+
+    GET /metrics        Prometheus text format
+    GET /metrics.json   Same snapshot as JSON
+
+A refresh thread calls the simulator's collector once per interval and
+renders both bodies up front. Scrapes only send the most recent pre-rendered
+bytes, so a scrape never touches the device threads or takes a lock they use.
+"""
+
+import json
+import threading
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_METRICS_HOST = '0.0.0.0'
+DEFAULT_METRICS_PORT = 9108
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Per-device snapshot keys -> (metric name, type, help)
+DEVICE_METRICS = {
+    "ingest_rate_hz": ("flatsat_device_ingest_rate_hz", "gauge", "MATLAB samples received per second"),
+    "samples_received": ("flatsat_device_samples_received_total", "counter", "MATLAB samples received"),
+    "frame_completeness": ("flatsat_device_frame_completeness", "gauge", "Fraction of device ports updated during the last interval"),
+    "frames_processed": ("flatsat_device_frames_processed_total", "counter", "Frames taken from the receiver for encoding"),
+    "encode_failures": ("flatsat_device_encode_failures_total", "counter", "Frames the encoder rejected"),
+    "frames_sent": ("flatsat_device_frames_sent_total", "counter", "Encoded frames handed to the output transmitter"),
+    "send_drops": ("flatsat_device_send_drops_total", "counter", "Encoded frames dropped by the output transmitter"),
+    "receive_drops": ("flatsat_device_receive_drops_total", "counter", "MATLAB samples overwritten before the simulator read them"),
+    "parse_errors": ("flatsat_device_parse_errors_total", "counter", "MATLAB samples that failed to parse"),
+    "receiver_connections": ("flatsat_device_receiver_connections_total", "counter", "MATLAB connections accepted or made"),
+    "output_queue_depth": ("flatsat_device_output_queue_depth", "gauge", "Frames waiting in the output transmit queue"),
+    "output_connected": ("flatsat_device_output_connected", "gauge", "Whether the output transmitter is connected"),
+    "output_reconnects": ("flatsat_device_output_reconnects_total", "counter", "Output transmitter reconnections"),
+}
+
+def _escape_label(value: Any) -> str:
+    """Escape a Prometheus label value"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_value(value: Any) -> str:
+    """Format a sample value, booleans as 0/1"""
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def format_prometheus(snapshot: Dict[str, Any]) -> str:
+    """Render a collector snapshot in Prometheus text exposition format"""
+    lines = []
+
+    def family(name, metric_type, help_text, samples):
+        if not samples:
+            return
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for suffix, labels, value in samples:
+            label_text = ','.join(f'{key}="{_escape_label(label)}"' for key, label in labels.items())
+            lines.append(f"{name}{suffix}{{{label_text}}} {_format_value(value)}" if label_text
+                         else f"{name}{suffix} {_format_value(value)}")
+
+    family("flatsat_uptime_seconds", "gauge", "Seconds since the simulator started",
+           [("", {}, snapshot.get("uptime_seconds", 0.0))])
+
+    devices = snapshot.get("devices", {})
+    for key, (name, metric_type, help_text) in DEVICE_METRICS.items():
+        family(name, metric_type, help_text,
+               [("", {"device": device}, stats[key]) for device, stats in devices.items() if key in stats])
+
+    latency_samples = []
+    for component, stats in snapshot.get("latency", {}).items():
+        for quantile, seconds in stats["quantiles"].items():
+            latency_samples.append(("", {"component": component, "quantile": quantile}, seconds))
+        latency_samples.append(("_sum", {"component": component}, stats["sum_seconds"]))
+        latency_samples.append(("_count", {"component": component}, stats["count"]))
+    family("flatsat_latency_seconds", "summary", "Receive, encode and send latency per component", latency_samples)
+
+    errors = snapshot.get("errors", {})
+    for key, help_text in (("total_errors", "Errors handled"),
+                           ("recovered_errors", "Errors recovered from"),
+                           ("failed_recoveries", "Errors that could not be recovered")):
+        family(f"flatsat_{key}_total", "counter", f"{help_text} by error type",
+               [("", {"error_type": error_type}, stats[key])
+                for error_type, stats in errors.get("error_types", {}).items()])
+
+    tap = snapshot.get("attitude_tap")
+    if tap:
+        family("flatsat_attitude_tap_frames_sent_total", "counter", "Frames published on the attitude tap",
+               [("", {}, tap["frames_sent"])])
+        family("flatsat_attitude_tap_frames_dropped_total", "counter", "Frames the attitude tap could not publish",
+               [("", {}, tap["frames_dropped"])])
+
+    return '\n'.join(lines) + '\n'
+
+class MetricsServer:
+    """Serves pre-rendered metrics snapshots over HTTP"""
+
+    def __init__(self, collector: Callable[[], Dict[str, Any]], host: str = DEFAULT_METRICS_HOST,
+                 port: int = DEFAULT_METRICS_PORT, interval: float = 1.0):
+        self.collector = collector
+        self.host = host
+        self.port = port
+        self.interval = interval
+        # (prometheus body, json body); swapped as a whole so readers never see a half-built pair
+        self.rendered: Tuple[bytes, bytes] = (b'', b'{}')
+        self.snapshots_taken = 0
+        self.scrapes = 0
+        self.stop_event = threading.Event()
+        self.httpd: Optional[ThreadingHTTPServer] = None
+        self.server_thread: Optional[threading.Thread] = None
+        self.refresh_thread: Optional[threading.Thread] = None
+
+    def refresh(self):
+        """Collect a new snapshot and render both formats"""
+        snapshot = self.collector()
+        self.rendered = (format_prometheus(snapshot).encode(), json.dumps(snapshot, indent=2).encode())
+        self.snapshots_taken += 1
+
+    def _refresh_loop(self):
+        """Refresh the snapshot once per interval"""
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Error collecting metrics: {e}")
+
+    def _make_handler(self):
+        server = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                prometheus_body, json_body = server.rendered
+                path = self.path.split('?', 1)[0]
+                if path == '/metrics':
+                    body, content_type = prometheus_body, PROMETHEUS_CONTENT_TYPE
+                elif path == '/metrics.json':
+                    body, content_type = json_body, 'application/json'
+                else:
+                    self.send_error(404, "Try /metrics or /metrics.json")
+                    return
+
+                server.scrapes += 1
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(f"Metrics request from {self.address_string()}: {format % args}")
+
+        return MetricsHandler
+
+    def start(self):
+        """Take a first snapshot, bind the port and start serving"""
+        self.refresh()
+        self.httpd = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]  # Resolves port 0 to the bound port
+        self.stop_event.clear()
+
+        self.server_thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.server_thread.start()
+        self.refresh_thread = threading.Thread(target=self._refresh_loop, daemon=True)
+        self.refresh_thread.start()
+        logger.info(f"Metrics endpoint serving on http://{self.host}:{self.port}/metrics")
+
+    def stop(self):
+        """Stop serving"""
+        self.stop_event.set()
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+        if self.server_thread:
+            self.server_thread.join(timeout=2.0)
+        if self.refresh_thread:
+            self.refresh_thread.join(timeout=2.0)
+        logger.info("Metrics endpoint stopped")
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get endpoint statistics"""
+        return {
+            "port": self.port,
+            "snapshots_taken": self.snapshots_taken,
+            "scrapes": self.scrapes
+        }
@@ -10,7 +10,7 @@ import can
 import time
 import logging
 import threading
-from typing import Optional, Dict, Any, Tuple
+from typing import Optional, Dict, Any, Callable, Tuple
 from queue import Queue, Empty
 from dataclasses import dataclass
 
@@ -35,14 +35,16 @@ class CANTransmitter:
         self.transmit_queue = Queue()
         self.transmit_thread: Optional[threading.Thread] = None
         self.stop_event = threading.Event()
+        # Called as (device_name, ingest_ns, enqueue_ns, bytes) after each traced write
+        self.emission_callback: Optional[Callable] = None
         
     def connect(self) -> bool:
         """Connect to CAN bus"""
         try:
-            # Check if CAN interface exists
+            # Check if the SocketCAN interface exists (other python-can interfaces have no netdev)
             import os
             can_interface_path = f"/sys/class/net/{self.config.channel}"
-            if not os.path.exists(can_interface_path):
+            if self.config.interface == "socketcan" and not os.path.exists(can_interface_path):
                 logger.warning(f"CAN interface {self.config.channel} does not exist - running in simulation mode")
                 self.is_connected = False
                 return False
@@ -89,8 +91,9 @@ class CANTransmitter:
         logger.info("Started CAN transmission thread")
         return True
     
-    def send_message(self, can_id: int, data: bytes, device_name: str = "unknown") -> bool:
-        """Queue CAN message for transmission"""
+    def send_message(self, can_id: int, data: bytes, device_name: str = "unknown",
+                     ingest_ns: Optional[Tuple[int, int]] = None) -> bool:
+        """Queue CAN message for transmission; ingest_ns is the (oldest, newest) receive time of its samples"""
         if not self.is_connected:
             logger.debug(f"Simulation mode: would send CAN message ID 0x{can_id:03X} for {device_name}: {data.hex().upper()}")
             return True  # Return True in simulation mode
@@ -102,7 +105,7 @@ class CANTransmitter:
                 is_extended_id=False
             )
             
-            self.transmit_queue.put((message, device_name, time.time()), timeout=0.1)
+            self.transmit_queue.put((message, device_name, time.time_ns(), ingest_ns), timeout=0.1)
             return True
         except:
             logger.warning(f"Transmit queue full, dropping message from {device_name}")
@@ -113,11 +116,13 @@ class CANTransmitter:
         while not self.stop_event.is_set():
             try:
                 # Get message from queue with timeout
-                message, device_name, timestamp = self.transmit_queue.get(timeout=0.1)
+                message, device_name, enqueue_ns, ingest_ns = self.transmit_queue.get(timeout=0.1)
                 
                 # Send message
                 if self.can_bus:
                     self.can_bus.send(message)
+                    if self.emission_callback and ingest_ns:
+                        self.emission_callback(device_name, ingest_ns, enqueue_ns, len(message.data))
                     logger.debug(f"Sent CAN message ID 0x{message.arbitration_id:03X} for {device_name}")
                     
                     # Log transmission rate
@@ -154,6 +159,7 @@ class CANTransmitterManager:
     
     def __init__(self):
         self.transmitters: Dict[str, CANTransmitter] = {}
+        self.emission_callback: Optional[Callable] = None  # Passed on to every transmitter
         
     def add_transmitter(self, device_name: str, config: CANConfig) -> bool:
         """Add a CAN transmitter for a device"""
@@ -162,6 +168,7 @@ class CANTransmitterManager:
             return False
         
         transmitter = CANTransmitter(config)
+        transmitter.emission_callback = self.emission_callback
         if transmitter.connect():
             transmitter.start_transmission()
             self.transmitters[device_name] = transmitter
@@ -171,13 +178,14 @@ class CANTransmitterManager:
             logger.error(f"Failed to add CAN transmitter for {device_name}")
             return False
     
-    def send_message(self, device_name: str, can_id: int, data: bytes) -> bool:
+    def send_message(self, device_name: str, can_id: int, data: bytes,
+                     ingest_ns: Optional[Tuple[int, int]] = None) -> bool:
         """Send CAN message for a specific device"""
         if device_name not in self.transmitters:
             logger.error(f"No transmitter found for device {device_name}")
             return False
         
-        return self.transmitters[device_name].send_message(can_id, data, device_name)
+        return self.transmitters[device_name].send_message(can_id, data, device_name, ingest_ns)
     
     def disconnect_all(self):
         """Disconnect all transmitters"""
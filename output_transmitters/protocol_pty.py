@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Pseudo-Terminal Serial Ports for Hardware-Free Testing
+
+A pyserial URL handler for ports named "pty://<name>". The first open of a
+name creates a pty pair. The serial side is the slave tty, opened through
+pyserial's normal POSIX Serial class, so the code under test runs its real
+serial path. The far end (the master) is available in-process from
+get_pty_pair(name), so a test harness can read what the device sent and write
+what a flight computer would send.
+
+A pty moves bytes instantly, so writes are paced at the port's baud rate:
+each byte costs start + data + parity + stop bits on an emulated line, and a
+write's bytes reach the far end once the last of them has been sent. Append
+"?throttle=0" to the URL to disable the pacing.
+
+    serial.serial_for_url("pty://ars", baudrate=115200)
+
+Importing this module registers its package with pyserial's URL handlers.
+"""
+
+import os
+import pty
+import tty
+import time
+import select
+import threading
+import functools
+import logging
+import urllib.parse
+from typing import Dict, Optional, Tuple
+
+import serial
+
+logger = logging.getLogger(__name__)
+
+_pairs: Dict[str, "PtyPair"] = {}
+_pairs_lock = threading.Lock()
+
+class PtyPair:
+    """A named pty pair; the slave is the serial port, the master is the far end"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.master_fd, self.slave_fd = pty.openpty()
+        self.slave_path = os.ttyname(self.slave_fd)
+        # Raw mode so the line discipline passes binary frames through untouched;
+        # the slave fd stays open so the master never sees a hang-up between opens
+        tty.setraw(self.slave_fd)
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.closed = False
+
+    def read(self, size: int = 65536, timeout: Optional[float] = None) -> bytes:
+        """Read what the serial side sent; b"" if nothing arrived within the timeout"""
+        ready, _, _ = select.select([self.master_fd], [], [], timeout)
+        if not ready:
+            return b""
+        try:
+            data = os.read(self.master_fd, size)
+        except OSError:
+            return b""
+        self.bytes_read += len(data)
+        return data
+
+    def write(self, data: bytes) -> int:
+        """Send bytes to the serial side"""
+        view = memoryview(data)
+        while view:
+            written = os.write(self.master_fd, view)
+            view = view[written:]
+        self.bytes_written += len(data)
+        return len(data)
+
+    def fileno(self) -> int:
+        return self.master_fd
+
+    def close(self):
+        """Close both ends"""
+        if self.closed:
+            return
+        self.closed = True
+        for fd in (self.master_fd, self.slave_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+def get_pty_pair(name: str) -> PtyPair:
+    """The pty pair for a name, created on first use"""
+    with _pairs_lock:
+        pair = _pairs.get(name)
+        if pair is None or pair.closed:
+            pair = PtyPair(name)
+            _pairs[name] = pair
+            logger.info(f"Created pty pair pty://{name} on {pair.slave_path}")
+        return pair
+
+def close_pty_pair(name: str):
+    """Close and forget a pty pair"""
+    with _pairs_lock:
+        pair = _pairs.pop(name, None)
+    if pair:
+        pair.close()
+
+def bits_per_character(bytesize: int, parity: str, stopbits: float) -> float:
+    """Bits on the line per character: start + data + parity + stop"""
+    return 1 + bytesize + (0 if parity == serial.PARITY_NONE else 1) + stopbits
+
+class Serial(serial.Serial):
+    """POSIX serial port on a pty slave with writes paced at the emulated baud rate"""
+
+    def __init__(self, *args, pair: Optional[PtyPair] = None, throttle: bool = True, **kwargs):
+        self.pair = pair
+        self.throttle = throttle
+        self.line_free_at = 0.0  # perf_counter time the emulated line finishes its last write
+        super().__init__(*args, **kwargs)
+
+    def write(self, data) -> int:
+        if not self.throttle or not data:
+            return super().write(data)
+
+        duration = len(data) * bits_per_character(self.bytesize, self.parity, self.stopbits) / self.baudrate
+        done_at = max(time.perf_counter(), self.line_free_at) + duration
+        self.line_free_at = done_at
+        delay = done_at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        return super().write(data)
+
+def parse_url(url: str) -> Tuple[str, bool]:
+    """(name, throttle) from pty://<name>[?throttle=0|1]"""
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme != 'pty':
+        raise serial.SerialException(f'expected a string in the form "pty://<name>[?throttle=0]": {url!r}')
+    name = parts.netloc + parts.path
+    if not name:
+        raise serial.SerialException(f'pty URL needs a name: {url!r}')
+    throttle = True
+    for option, values in urllib.parse.parse_qs(parts.query).items():
+        if option == 'throttle':
+            throttle = values[0].lower() not in ('0', 'false', 'off', 'no')
+        else:
+            raise ValueError(f'unknown option: {option!r}')
+    return name, throttle
+
+def serial_class_for_url(url: str):
+    """pyserial URL hook: resolve the name to its slave tty and a paced Serial class"""
+    name, throttle = parse_url(url)
+    pair = get_pty_pair(name)
+    return pair.slave_path, functools.partial(Serial, pair=pair, throttle=throttle)
+
+# Let serial.serial_for_url find this module for pty:// ports
+_package = __name__.rpartition('.')[0]
+if _package and _package not in serial.protocol_handler_packages:
+    serial.protocol_handler_packages.append(_package)
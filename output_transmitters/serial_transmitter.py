@@ -10,16 +10,22 @@ import serial
 import time
 import logging
 import threading
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, Tuple
 from queue import Queue, Empty
 from dataclasses import dataclass
 
+try:
+    # Registers pty:// ports (pseudo-terminal stand-ins) with pyserial
+    import output_transmitters.protocol_pty  # noqa: F401
+except ImportError:
+    pass
+
 logger = logging.getLogger(__name__)
 
 @dataclass
 class SerialConfig:
     """Serial communication configuration"""
-    port: str = "/dev/ttyUSB0"
+    port: str = "/dev/ttyUSB0"  # Device path or pyserial URL, e.g. "pty://ars" for a pseudo-terminal
     baud_rate: int = 115200
     data_bits: int = 8
     stop_bits: int = 1
@@ -37,19 +43,21 @@ class SerialTransmitter:
         self.transmit_queue = Queue()
         self.transmit_thread: Optional[threading.Thread] = None
         self.stop_event = threading.Event()
+        # Called as (device_name, ingest_ns, enqueue_ns, bytes) after each traced write
+        self.emission_callback: Optional[Callable] = None
         
     def connect(self) -> bool:
         """Connect to serial port"""
         try:
-            # Check if port exists
+            # Check if port exists (URL ports such as pty:// are resolved by pyserial)
             import os
-            if not os.path.exists(self.config.port):
+            if "://" not in self.config.port and not os.path.exists(self.config.port):
                 logger.warning(f"Serial port {self.config.port} does not exist - running in simulation mode")
                 self.is_connected = False
                 return False
             
-            self.serial_port = serial.Serial(
-                port=self.config.port,
+            self.serial_port = serial.serial_for_url(
+                self.config.port,
                 baudrate=self.config.baud_rate,
                 bytesize=self.config.data_bits,
                 stopbits=self.config.stop_bits,
@@ -98,14 +106,14 @@ class SerialTransmitter:
         logger.info("Started serial transmission thread")
         return True
     
-    def send_data(self, data: bytes, device_name: str = "unknown"):
-        """Queue data for transmission"""
+    def send_data(self, data: bytes, device_name: str = "unknown", ingest_ns: Optional[Tuple[int, int]] = None):
+        """Queue data for transmission; ingest_ns is the (oldest, newest) receive time of its samples"""
         if not self.is_connected:
             logger.debug(f"Simulation mode: would send {len(data)} bytes for {device_name}: {data.hex().upper()}")
             return True  # Return True in simulation mode
         
         try:
-            self.transmit_queue.put((data, device_name, time.time()), timeout=0.1)
+            self.transmit_queue.put((data, device_name, time.time_ns(), ingest_ns), timeout=0.1)
             return True
         except:
             logger.warning(f"Transmit queue full, dropping data from {device_name}")
@@ -116,12 +124,14 @@ class SerialTransmitter:
         while not self.stop_event.is_set():
             try:
                 # Get data from queue with timeout
-                data, device_name, timestamp = self.transmit_queue.get(timeout=0.1)
+                data, device_name, enqueue_ns, ingest_ns = self.transmit_queue.get(timeout=0.1)
                 
                 # Send data
                 if self.serial_port and self.serial_port.is_open:
                     bytes_written = self.serial_port.write(data)
                     self.serial_port.flush()
+                    if self.emission_callback and ingest_ns:
+                        self.emission_callback(device_name, ingest_ns, enqueue_ns, bytes_written)
                     
                     logger.debug(f"Sent {bytes_written} bytes for {device_name}")
                     
@@ -158,6 +168,7 @@ class SerialTransmitterManager:
     
     def __init__(self):
         self.transmitters: Dict[str, SerialTransmitter] = {}
+        self.emission_callback: Optional[Callable] = None  # Passed on to every transmitter
         
     def add_transmitter(self, device_name: str, config: SerialConfig) -> bool:
         """Add a serial transmitter for a device"""
@@ -166,6 +177,7 @@ class SerialTransmitterManager:
             return False
         
         transmitter = SerialTransmitter(config)
+        transmitter.emission_callback = self.emission_callback
         if transmitter.connect():
             transmitter.start_transmission()
             self.transmitters[device_name] = transmitter
@@ -175,13 +187,13 @@ class SerialTransmitterManager:
             logger.error(f"Failed to add serial transmitter for {device_name}")
             return False
     
-    def send_data(self, device_name: str, data: bytes) -> bool:
+    def send_data(self, device_name: str, data: bytes, ingest_ns: Optional[Tuple[int, int]] = None) -> bool:
         """Send data for a specific device"""
         if device_name not in self.transmitters:
             logger.error(f"No transmitter found for device {device_name}")
             return False
         
-        return self.transmitters[device_name].send_data(data, device_name)
+        return self.transmitters[device_name].send_data(data, device_name, ingest_ns)
     
     def disconnect_all(self):
         """Disconnect all transmitters"""
@@ -10,7 +10,7 @@ import socket
 import time
 import logging
 import threading
-from typing import Optional, Dict, Any, Tuple
+from typing import Optional, Dict, Any, Callable, Tuple
 from queue import Queue, Empty
 from dataclasses import dataclass
 
@@ -36,6 +36,9 @@ class TCPTransmitter:
         self.transmit_thread: Optional[threading.Thread] = None
         self.stop_event = threading.Event()
         self.reconnect_thread: Optional[threading.Thread] = None
+        self.reconnects = 0
+        # Called as (device_name, ingest_ns, enqueue_ns, bytes) after each traced write
+        self.emission_callback: Optional[Callable] = None
         
     def connect(self) -> bool:
         """Connect to TCP target"""
@@ -96,14 +99,14 @@ class TCPTransmitter:
         self.reconnect_thread.start()
         logger.info("Started TCP reconnection thread")
     
-    def send_data(self, data: bytes, device_name: str = "unknown") -> bool:
-        """Queue data for transmission"""
+    def send_data(self, data: bytes, device_name: str = "unknown", ingest_ns: Optional[Tuple[int, int]] = None) -> bool:
+        """Queue data for transmission; ingest_ns is the (oldest, newest) receive time of its samples"""
         if not self.is_connected:
             logger.warning(f"Cannot send data: not connected to TCP target")
             return False
         
         try:
-            self.transmit_queue.put((data, device_name, time.time()), timeout=0.1)
+            self.transmit_queue.put((data, device_name, time.time_ns(), ingest_ns), timeout=0.1)
             return True
         except:
             logger.warning(f"Transmit queue full, dropping data from {device_name}")
@@ -114,11 +117,13 @@ class TCPTransmitter:
         while not self.stop_event.is_set():
             try:
                 # Get data from queue with timeout
-                data, device_name, timestamp = self.transmit_queue.get(timeout=0.1)
+                data, device_name, enqueue_ns, ingest_ns = self.transmit_queue.get(timeout=0.1)
                 
                 # Send data
                 if self.socket and self.is_connected:
                     bytes_sent = self.socket.send(data)
+                    if self.emission_callback and ingest_ns:
+                        self.emission_callback(device_name, ingest_ns, enqueue_ns, bytes_sent)
                     logger.debug(f"Sent {bytes_sent} bytes for {device_name}")
                     
                     # Log transmission rate
@@ -146,6 +151,7 @@ class TCPTransmitter:
             if not self.is_connected:
                 logger.info("Attempting to reconnect to TCP target...")
                 if self.connect():
+                    self.reconnects += 1
                     self.start_transmission()
                 else:
                     time.sleep(5.0)  # Wait before retry
@@ -159,6 +165,7 @@ class TCPTransmitter:
             "target_ip": self.config.target_ip,
             "target_port": self.config.target_port,
             "queue_size": self.transmit_queue.qsize(),
+            "reconnects": self.reconnects,
             "transmitting": self.transmit_thread and self.transmit_thread.is_alive()
         }
 
@@ -167,6 +174,7 @@ class TCPTransmitterManager:
     
     def __init__(self):
         self.transmitters: Dict[str, TCPTransmitter] = {}
+        self.emission_callback: Optional[Callable] = None  # Passed on to every transmitter
         
     def add_transmitter(self, device_name: str, config: TCPConfig) -> bool:
         """Add a TCP transmitter for a device"""
@@ -175,6 +183,7 @@ class TCPTransmitterManager:
             return False
         
         transmitter = TCPTransmitter(config)
+        transmitter.emission_callback = self.emission_callback
         if transmitter.connect():
             transmitter.start_transmission()
             transmitter.start_reconnection()
@@ -185,13 +194,13 @@ class TCPTransmitterManager:
             logger.error(f"Failed to add TCP transmitter for {device_name}")
             return False
     
-    def send_data(self, device_name: str, data: bytes) -> bool:
+    def send_data(self, device_name: str, data: bytes, ingest_ns: Optional[Tuple[int, int]] = None) -> bool:
         """Send data for a specific device"""
         if device_name not in self.transmitters:
             logger.error(f"No transmitter found for device {device_name}")
             return False
         
-        return self.transmitters[device_name].send_data(data, device_name)
+        return self.transmitters[device_name].send_data(data, device_name, ingest_ns)
     
     def disconnect_all(self):
         """Disconnect all transmitters"""
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Parallel Chunked Video Rendering for Satellite Visualizers
+
+Splits an animation timeline into chunks of frames and renders them in a
+process pool. The parent prepares the frames once and hands the visualizer
+and frames to each worker when it starts; chunks then carry only their frame
+range. Every worker builds its own Agg figure through the visualizer's
+setup_figure/draw_frame hooks and writes numbered PNG frames; ffmpeg then
+encodes the frames in order into the final mp4. Matplotlib rendering is the
+bottleneck, so wall time scales with the number of cores.
+
+A visualizer must provide:
+    prepare_frames(**frame_kwargs) -> dict with a 'timestamps' array (one per frame)
+    setup_figure() -> (fig, ax, artists)
+    draw_frame(ax, artists, frames, frame)
+"""
+
+import os
+import math
+import shutil
+import tempfile
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+FRAME_PATTERN = "frame_%07d.png"
+CHUNKS_PER_WORKER = 4  # Smaller chunks keep every worker busy until the end
+
+# Set once per worker process by _init_worker
+_worker_visualizer = None
+_worker_frames = None
+
+def _init_worker(visualizer, frames: Dict):
+    """Keep the visualizer and prepared frames for every chunk this worker renders"""
+    global _worker_visualizer, _worker_frames
+    _worker_visualizer = visualizer
+    _worker_frames = frames
+
+def _render_chunk(start: int, stop: int, frames_dir: str) -> int:
+    """Render frames [start, stop) with a private Agg figure; returns frames written"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    visualizer, frames = _worker_visualizer, _worker_frames
+    fig, ax, artists = visualizer.setup_figure()
+    for frame in range(start, stop):
+        visualizer.draw_frame(ax, artists, frames, frame)
+        fig.savefig(os.path.join(frames_dir, FRAME_PATTERN % frame), dpi=fig.dpi)
+    plt.close(fig)
+    return stop - start
+
+def encode_frames(frames_dir: str, output_file: str, fps: int, bitrate: int):
+    """Encode numbered PNG frames into an mp4 with ffmpeg"""
+    if shutil.which('ffmpeg') is None:
+        raise RuntimeError("ffmpeg not found - install it or keep the PNG frames with frames_dir")
+
+    subprocess.run([
+        'ffmpeg', '-y', '-loglevel', 'error',
+        '-framerate', str(fps),
+        '-i', os.path.join(frames_dir, FRAME_PATTERN),
+        '-c:v', 'libx264', '-pix_fmt', 'yuv420p',
+        '-b:v', f'{bitrate}k',
+        output_file
+    ], check=True)
+
+def render_parallel(visualizer, output_file: Optional[str], fps: int = 30, bitrate: int = 2000,
+                    workers: Optional[int] = None, chunk_size: Optional[int] = None,
+                    frames_dir: Optional[str] = None, frame_kwargs: Optional[Dict] = None) -> int:
+    """
+    Render a visualizer's animation in parallel chunks
+
+    Args:
+        visualizer: Visualizer with prepare_frames/setup_figure/draw_frame
+        output_file: mp4 to write (None only writes the PNG frames)
+        fps: Output frame rate
+        bitrate: Output bitrate in kbps
+        workers: Worker processes (default: CPU count)
+        chunk_size: Frames per chunk (default: spread over CHUNKS_PER_WORKER chunks per worker)
+        frames_dir: Keep the PNG frames here (default: a temporary directory)
+        frame_kwargs: Keyword arguments for visualizer.prepare_frames
+
+    Returns:
+        Number of frames rendered
+    """
+    frame_kwargs = frame_kwargs or {}
+    frames = visualizer.prepare_frames(**frame_kwargs)
+    frame_count = len(frames['timestamps'])
+    workers = workers or os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = max(1, math.ceil(frame_count / (workers * CHUNKS_PER_WORKER)))
+    chunks = [(start, min(start + chunk_size, frame_count)) for start in range(0, frame_count, chunk_size)]
+
+    temp_dir = None
+    if frames_dir is None:
+        temp_dir = tempfile.mkdtemp(prefix="render_")
+        frames_dir = temp_dir
+    else:
+        os.makedirs(frames_dir, exist_ok=True)
+
+    try:
+        print(f"Rendering {frame_count} frames in {len(chunks)} chunks on {workers} workers...")
+        rendered = 0
+        # Spawned workers start without the parent's figures or GUI backend
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker, initargs=(visualizer, frames)) as executor:
+            futures = [executor.submit(_render_chunk, start, stop, frames_dir)
+                       for start, stop in chunks]
+            for future in futures:
+                rendered += future.result()
+
+        if output_file:
+            print(f"Encoding {rendered} frames into {output_file}...")
+            encode_frames(frames_dir, output_file, fps, bitrate)
+        return rendered
+    finally:
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
@@ -6,50 +6,244 @@ Monitors and optimizes performance of the device simulator.
 Tracks latency, throughput, and resource usage.
 """
 
+import json
+import math
 import time
 import threading
 import logging
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass, field
 from collections import deque
-import statistics
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+class LatencyHistogram:
+    """
+    Log-linear (HDR-style) latency histogram in nanoseconds
+    
+    Exact below 32 ns, then 32 sub-buckets per power of two (<= 3.2% relative
+    error) up to 2^40 ns (~18 minutes). Recording is O(1); histograms of the
+    same layout merge and subtract bucket by bucket, which is how per-thread
+    shards are combined and how windows are cut from cumulative snapshots.
+    """
+    SUB_BUCKET_BITS = 5
+    SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+    MAX_EXPONENT = 40
+    BUCKETS = SUB_BUCKETS * (MAX_EXPONENT - SUB_BUCKET_BITS + 1)
+    
+    __slots__ = ('counts', 'count', 'total_ns', 'min_ns', 'max_ns')
+    
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.count = 0
+        self.total_ns = 0
+        self.min_ns: Optional[int] = None  # Exact extremes; None for subtracted windows
+        self.max_ns: Optional[int] = None
+    
+    @classmethod
+    def bucket_index(cls, value_ns: int) -> int:
+        """Bucket holding a latency in nanoseconds"""
+        if value_ns < cls.SUB_BUCKETS:
+            return max(value_ns, 0)
+        shift = value_ns.bit_length() - 1 - cls.SUB_BUCKET_BITS
+        index = cls.SUB_BUCKETS * shift + (value_ns >> shift)
+        return min(index, cls.BUCKETS - 1)
+    
+    @classmethod
+    def bucket_bounds(cls, index: int) -> Tuple[int, int]:
+        """[lower, upper) nanosecond range of a bucket"""
+        if index < cls.SUB_BUCKETS:
+            return index, index + 1
+        shift = index // cls.SUB_BUCKETS - 1
+        sub_bucket = index % cls.SUB_BUCKETS + cls.SUB_BUCKETS
+        return sub_bucket << shift, (sub_bucket + 1) << shift
+    
+    def record(self, value_ns: int):
+        """Record one latency"""
+        self.counts[self.bucket_index(value_ns)] += 1
+        self.count += 1
+        self.total_ns += value_ns
+        if self.min_ns is None or value_ns < self.min_ns:
+            self.min_ns = value_ns
+        if self.max_ns is None or value_ns > self.max_ns:
+            self.max_ns = value_ns
+    
+    def merge(self, other: 'LatencyHistogram'):
+        """Add another histogram's samples into this one"""
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total_ns += other.total_ns
+        if other.min_ns is not None:
+            self.min_ns = other.min_ns if self.min_ns is None else min(self.min_ns, other.min_ns)
+        if other.max_ns is not None:
+            self.max_ns = other.max_ns if self.max_ns is None else max(self.max_ns, other.max_ns)
+    
+    def subtract(self, earlier: 'LatencyHistogram') -> 'LatencyHistogram':
+        """Samples recorded since an earlier cumulative snapshot of this histogram"""
+        window = LatencyHistogram()
+        window.counts = [a - b for a, b in zip(self.counts, earlier.counts)]
+        window.count = self.count - earlier.count
+        window.total_ns = self.total_ns - earlier.total_ns
+        return window
+    
+    def copy(self) -> 'LatencyHistogram':
+        """Independent copy of this histogram"""
+        duplicate = LatencyHistogram()
+        duplicate.merge(self)
+        return duplicate
+    
+    def mean_ns(self) -> float:
+        """Mean latency"""
+        return self.total_ns / self.count if self.count else 0.0
+    
+    def percentile_ns(self, percentile: float) -> int:
+        """Latency at a percentile (highest value in its bucket, clamped to the exact extremes)"""
+        if self.count <= 0:
+            return 0
+        rank = max(1, math.ceil(self.count * percentile / 100.0))
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                value = self.bucket_bounds(index)[1] - 1
+                break
+        if self.max_ns is not None:
+            value = min(value, self.max_ns)
+        if self.min_ns is not None:
+            value = max(value, self.min_ns)
+        return value
+    
+    def max_value_ns(self) -> int:
+        """Exact maximum, or the top of the highest occupied bucket for windows"""
+        if self.max_ns is not None:
+            return self.max_ns
+        for index in range(self.BUCKETS - 1, -1, -1):
+            if self.counts[index] > 0:
+                return self.bucket_bounds(index)[1] - 1
+        return 0
+    
+    def summary(self) -> Dict[str, float]:
+        """Count, mean and p50/p90/p99/p99.9/max latencies in milliseconds"""
+        summary = {"count": self.count, "mean_ms": self.mean_ns() / 1e6}
+        for name, percentile in LATENCY_PERCENTILES.items():
+            summary[f"{name}_ms"] = self.percentile_ns(percentile) / 1e6
+        summary["max_ms"] = self.max_value_ns() / 1e6
+        return summary
+
+LATENCY_PERCENTILES = {"p50": 50.0, "p90": 90.0, "p99": 99.0, "p99_9": 99.9}
+
+# Windows cut from the once-a-second snapshots taken by the monitor thread
+LATENCY_WINDOWS = {"1s": 1, "1m": 60}
+
 class PerformanceMetrics:
-    """Performance metrics for a component"""
-    component_name: str
-    total_operations: int = 0
-    total_time: float = 0.0
-    min_latency: float = float('inf')
-    max_latency: float = 0.0
-    recent_latencies: deque = field(default_factory=lambda: deque(maxlen=100))
-    throughput_samples: deque = field(default_factory=lambda: deque(maxlen=60))  # 1 minute at 1Hz
+    """
+    Performance metrics for a component, recorded into per-thread histogram shards
+    
+    Each recording thread owns one shard, registered once; only the owner
+    writes it. Readers merge the shards, so recording never takes a lock.
+    """
+    
+    def __init__(self, component_name: str):
+        self.component_name = component_name
+        self.throughput_samples: deque = deque(maxlen=60)  # 1 minute at 1Hz
+        self._shards: List[LatencyHistogram] = []
+        self._local = threading.local()
+        self._register_lock = threading.Lock()
+        # (monotonic ns, cumulative histogram) once a second, enough for the longest window
+        self._snapshots: deque = deque(maxlen=max(LATENCY_WINDOWS.values()) + 1)
+        self.recent_average_ns: Optional[float] = None  # Mean over the last snapshot interval
+    
+    def shard(self) -> LatencyHistogram:
+        """The calling thread's histogram, registered on first use"""
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = LatencyHistogram()
+            with self._register_lock:
+                # Replace rather than append so readers iterate a list nobody mutates
+                self._shards = self._shards + [shard]
+            self._local.shard = shard
+        return shard
+    
+    def record_ns(self, latency_ns: int):
+        """Record a latency in nanoseconds into the calling thread's shard"""
+        self.shard().record(latency_ns)
     
     def add_sample(self, latency: float):
-        """Add a latency sample"""
-        self.total_operations += 1
-        self.total_time += latency
-        self.min_latency = min(self.min_latency, latency)
-        self.max_latency = max(self.max_latency, latency)
-        self.recent_latencies.append(latency)
+        """Add a latency sample in seconds"""
+        self.record_ns(int(latency * 1e9))
+    
+    def histogram(self) -> LatencyHistogram:
+        """All shards merged into one cumulative histogram"""
+        merged = LatencyHistogram()
+        for shard in self._shards:
+            merged.merge(shard)
+        return merged
+    
+    def take_snapshot(self, now_ns: Optional[int] = None):
+        """Store the cumulative histogram for windowed views (called once a second)"""
+        now_ns = time.monotonic_ns() if now_ns is None else now_ns
+        current = self.histogram()
+        if self._snapshots:
+            last_ns, last = self._snapshots[-1]
+            elapsed = (now_ns - last_ns) / 1e9
+            if elapsed > 0:
+                self.throughput_samples.append((current.count - last.count) / elapsed)
+            interval = current.subtract(last)
+            self.recent_average_ns = interval.mean_ns()
+        self._snapshots.append((now_ns, current))
+    
+    def window(self, seconds: float, current: Optional[LatencyHistogram] = None) -> LatencyHistogram:
+        """Samples recorded during about the last `seconds` (all of them until a snapshot is that old)"""
+        current = current or self.histogram()
+        
+        # Newest snapshot at least `seconds` old; once history is full the oldest is close enough
+        cutoff_ns = time.monotonic_ns() - int(seconds * 1e9)
+        snapshots = list(self._snapshots)
+        base = snapshots[0][1] if len(snapshots) == self._snapshots.maxlen else None
+        for snapshot_ns, snapshot in reversed(snapshots):
+            if snapshot_ns <= cutoff_ns:
+                base = snapshot
+                break
+        return current if base is None else current.subtract(base)
+    
+    def windowed_summaries(self, current: Optional[LatencyHistogram] = None) -> Dict[str, Dict[str, float]]:
+        """Latency summaries for every window and the total"""
+        current = current or self.histogram()
+        summaries = {name: self.window(seconds, current).summary() for name, seconds in LATENCY_WINDOWS.items()}
+        summaries["total"] = current.summary()
+        return summaries
+    
+    @property
+    def total_operations(self) -> int:
+        return sum(shard.count for shard in self._shards)
+    
+    @property
+    def total_time(self) -> float:
+        return sum(shard.total_ns for shard in self._shards) / 1e9
+    
+    @property
+    def min_latency(self) -> float:
+        minimums = [shard.min_ns for shard in self._shards if shard.min_ns is not None]
+        return min(minimums) / 1e9 if minimums else float('inf')
+    
+    @property
+    def max_latency(self) -> float:
+        maximums = [shard.max_ns for shard in self._shards if shard.max_ns is not None]
+        return max(maximums) / 1e9 if maximums else 0.0
     
     def get_average_latency(self) -> float:
         """Get average latency"""
-        return self.total_time / self.total_operations if self.total_operations > 0 else 0.0
+        return self.histogram().mean_ns() / 1e9
     
     def get_recent_average_latency(self) -> float:
-        """Get average latency of recent samples"""
-        return statistics.mean(self.recent_latencies) if self.recent_latencies else 0.0
+        """Get average latency over the last snapshot interval (all samples before two snapshots)"""
+        if self.recent_average_ns is not None:
+            return self.recent_average_ns / 1e9
+        return self.window(LATENCY_WINDOWS["1s"]).mean_ns() / 1e9
     
     def get_latency_percentile(self, percentile: float) -> float:
-        """Get latency percentile"""
-        if not self.recent_latencies:
-            return 0.0
-        sorted_latencies = sorted(self.recent_latencies)
-        index = int(len(sorted_latencies) * percentile / 100)
-        return sorted_latencies[min(index, len(sorted_latencies) - 1)]
+        """Get latency percentile over all samples"""
+        return self.histogram().percentile_ns(percentile) / 1e9
 
 @dataclass
 class SystemPerformanceMetrics:
@@ -66,7 +260,10 @@ class PerformanceMonitor:
     """Monitors and optimizes system performance"""
     
     def __init__(self):
+        # Replaced (never mutated) under _registry_lock so the monitor thread can iterate it
         self.metrics: Dict[str, PerformanceMetrics] = {}
+        self._registry_lock = threading.Lock()
+        self._local = threading.local()  # Per-thread component name -> shard cache
         self.system_metrics = SystemPerformanceMetrics()
         self.monitoring_active = False
         self.monitor_thread: Optional[threading.Thread] = None
@@ -99,6 +296,7 @@ class PerformanceMonitor:
         while self.monitoring_active:
             try:
                 self._update_system_metrics()
+                self._snapshot_metrics()
                 self._check_performance_thresholds()
                 self._apply_optimizations()
                 time.sleep(1.0)  # Monitor every second
@@ -116,6 +314,12 @@ class PerformanceMonitor:
             # psutil not available, skip system metrics
             pass
     
+    def _snapshot_metrics(self):
+        """Snapshot every component's histogram for the windowed views"""
+        now_ns = time.monotonic_ns()
+        for metrics in self.metrics.values():
+            metrics.take_snapshot(now_ns)
+    
     def _check_performance_thresholds(self):
         """Check if performance thresholds are exceeded"""
         for component_name, metrics in self.metrics.items():
@@ -171,9 +375,25 @@ class PerformanceMonitor:
     
     def get_component_metrics(self, component_name: str) -> PerformanceMetrics:
         """Get metrics for a specific component"""
-        if component_name not in self.metrics:
-            self.metrics[component_name] = PerformanceMetrics(component_name)
-        return self.metrics[component_name]
+        metrics = self.metrics.get(component_name)
+        if metrics is None:
+            with self._registry_lock:
+                metrics = self.metrics.get(component_name)
+                if metrics is None:
+                    metrics = PerformanceMetrics(component_name)
+                    self.metrics = {**self.metrics, component_name: metrics}
+        return metrics
+    
+    def record(self, component_name: str, latency_ns: int):
+        """Record a latency into the calling thread's shard for a component"""
+        shards = getattr(self._local, 'shards', None)
+        if shards is None:
+            shards = self._local.shards = {}
+        shard = shards.get(component_name)
+        if shard is None:
+            # First sample from this thread: register once, then stay thread-local
+            shard = shards[component_name] = self.get_component_metrics(component_name).shard()
+        shard.record(latency_ns)
     
     def get_performance_summary(self) -> Dict[str, any]:
         """Get comprehensive performance summary"""
@@ -189,17 +409,44 @@ class PerformanceMonitor:
         }
         
         for component_name, metrics in self.metrics.items():
+            # Merge the shards once per component
+            histogram = metrics.histogram()
             summary["component_metrics"][component_name] = {
-                "total_operations": metrics.total_operations,
-                "average_latency_ms": metrics.get_average_latency() * 1000,
+                "total_operations": histogram.count,
+                "average_latency_ms": histogram.mean_ns() / 1e6,
                 "recent_average_latency_ms": metrics.get_recent_average_latency() * 1000,
-                "min_latency_ms": metrics.min_latency * 1000 if metrics.min_latency != float('inf') else 0,
-                "max_latency_ms": metrics.max_latency * 1000,
-                "p95_latency_ms": metrics.get_latency_percentile(95) * 1000,
-                "p99_latency_ms": metrics.get_latency_percentile(99) * 1000
+                "min_latency_ms": (histogram.min_ns or 0) / 1e6,
+                "max_latency_ms": (histogram.max_ns or 0) / 1e6,
+                "p95_latency_ms": histogram.percentile_ns(95) / 1e6,
+                "p99_latency_ms": histogram.percentile_ns(99) / 1e6,
+                "latency_windows": metrics.windowed_summaries(histogram)
             }
         
         return summary
+    
+    def export_histograms(self, filename: str):
+        """
+        Write every component's windowed percentiles and cumulative histogram to JSON
+        
+        Buckets are [lower_ns, upper_ns, count] for occupied buckets only, so
+        exports from several runs or processes can be merged offline.
+        """
+        export = {
+            "timestamp": time.time(),
+            "sub_bucket_bits": LatencyHistogram.SUB_BUCKET_BITS,
+            "components": {}
+        }
+        for component_name, metrics in self.metrics.items():
+            histogram = metrics.histogram()
+            export["components"][component_name] = {
+                "latency_windows": metrics.windowed_summaries(histogram),
+                "buckets": [list(LatencyHistogram.bucket_bounds(index)) + [bucket_count]
+                            for index, bucket_count in enumerate(histogram.counts) if bucket_count]
+            }
+        
+        with open(filename, 'w') as f:
+            json.dump(export, f, indent=2)
+        logger.info(f"Latency histograms exported to {filename}")
 
 class LatencyTimer:
     """Context manager for measuring latency"""
@@ -208,19 +455,18 @@ class LatencyTimer:
         self.monitor = monitor
         self.component_name = component_name
         self.operation_name = operation_name
-        self.start_time = 0.0
+        self.start_ns = 0
     
     def __enter__(self):
-        self.start_time = time.time()
+        self.start_ns = time.perf_counter_ns()
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
-        latency = time.time() - self.start_time
-        metrics = self.monitor.get_component_metrics(self.component_name)
-        metrics.add_sample(latency)
+        latency_ns = time.perf_counter_ns() - self.start_ns
+        self.monitor.record(self.component_name, latency_ns)
         
         if exc_type is not None:
-            logger.debug(f"Operation {self.operation_name} in {self.component_name} failed after {latency*1000:.2f}ms")
+            logger.debug(f"Operation {self.operation_name} in {self.component_name} failed after {latency_ns/1e6:.2f}ms")
 
 # Global performance monitor instance
 performance_monitor = PerformanceMonitor()
@@ -236,6 +482,7 @@ def main():
     parser = argparse.ArgumentParser(description='Performance Monitor Test')
     parser.add_argument('--test-duration', type=float, default=10.0, help='Test duration')
     parser.add_argument('--enable-monitoring', action='store_true', help='Enable monitoring')
+    parser.add_argument('--export', help='Write latency histograms to this JSON file')
     
     args = parser.parse_args()
     
@@ -259,6 +506,9 @@ def main():
     summary = performance_monitor.get_performance_summary()
     logger.info(f"Performance Summary: {summary}")
     
+    if args.export:
+        performance_monitor.export_histograms(args.export)
+    
     if args.enable_monitoring:
         performance_monitor.stop_monitoring()
     
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Inter-Port Skew and Frame Alignment Analyzer
+
+MATLAB sends one float per port per frame, in port order, so a device's X/Y/Z
+(or wheel) samples arrive a few ms apart on separate sockets. This tool
+reconstructs frames across a device's port set from a TCP data dumper capture
+and reports the intra-frame skew distribution, out-of-order arrivals and
+missing ports, plus the smallest frame-assembly wait window that reaches a
+target completeness.
+
+Captures are loaded through the correlation tool (and so the columnar capture
+store); all frame reconstruction is vectorized with numpy, so multi-million
+sample captures are analyzed in seconds.
+"""
+
+import sys
+import json
+import math
+import argparse
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from capture_store import NS_PER_MS
+from tcp_correlation_tool import TimestampCorrelator
+
+# MATLAB port sets per device (see matlab_bridge_sender.py)
+DEVICE_PORT_SETS: Dict[str, List[int]] = {
+    'ars': list(range(50038, 50050)),            # 50038-50049 (12 ports)
+    'magnetometer': list(range(50050, 50053)),   # 50050-50052 (3 ports)
+    'reaction_wheel': list(range(50053, 50057)), # 50053-50056 (4 ports)
+}
+
+SKEW_PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+COMPLETENESS_WINDOWS_MS = (0.0, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0)
+
+@dataclass
+class PortAlignmentStats:
+    """Per-port alignment statistics within a device's frames"""
+    port: int
+    samples: int = 0
+    missing_frames: int = 0
+    duplicate_samples: int = 0
+    out_of_order: int = 0
+    mean_lag_ms: float = 0.0
+    p99_lag_ms: float = 0.0
+    max_lag_ms: float = 0.0
+
+@dataclass
+class FrameAlignmentStats:
+    """Frame alignment statistics for one device port set"""
+    device: str
+    ports: List[int]
+    samples: int = 0
+    frames: int = 0
+    complete_frames: int = 0
+    frame_period_ms: float = 0.0
+    gap_threshold_ms: float = 0.0
+    skew_percentiles_ms: Dict[str, float] = field(default_factory=dict)
+    max_skew_ms: float = 0.0
+    out_of_order: int = 0
+    duplicate_samples: int = 0
+    target_completeness: float = 0.999
+    recommended_window_ms: Optional[float] = None  # None when the target cannot be reached
+    achievable_completeness: float = 0.0
+    completeness_by_window: Dict[str, float] = field(default_factory=dict)
+    port_stats: List[PortAlignmentStats] = field(default_factory=list)
+
+    def to_dict(self) -> Dict:
+        """Return the statistics as a JSON-serializable dictionary"""
+        return asdict(self)
+
+class PortSkewAnalyzer(TimestampCorrelator):
+    """Reconstructs frames across device port sets and measures their alignment"""
+
+    def __init__(self, target_completeness: float = 0.999, gap_ms: Optional[float] = None):
+        super().__init__()
+        self.target_completeness = target_completeness
+        self.gap_ms = gap_ms  # Frame split threshold (default: half the frame period)
+        self.results: List[FrameAlignmentStats] = []
+
+    def estimate_frame_period_ns(self, ports: List[int]) -> int:
+        """Estimate the frame period as the median inter-arrival time across ports"""
+        medians = []
+        for port in ports:
+            if port in self.port_data and len(self.port_data[port][0]) > 1:
+                medians.append(np.median(np.diff(np.asarray(self.port_data[port][0], dtype=np.int64))))
+        return int(np.median(medians)) if medians else 0
+
+    def analyze_ports(self, device: str, ports: List[int]) -> Optional[FrameAlignmentStats]:
+        """
+        Reconstruct frames for one port set and compute their alignment
+
+        All samples of the port set are merged in time order and a new frame
+        starts wherever consecutive samples are more than the gap threshold
+        apart. Within a frame only each port's earliest sample counts; later
+        ones are duplicates (usually two frames merged by a too-large gap).
+        """
+        present = [port for port in ports if port in self.port_data and len(self.port_data[port][0])]
+        if not present:
+            return None
+
+        # Merge the port set into one time-ordered column with port ranks
+        timestamps = np.concatenate([np.asarray(self.port_data[port][0], dtype=np.int64) for port in present])
+        ranks = np.concatenate([np.full(len(self.port_data[port][0]), ports.index(port), dtype=np.int32)
+                                for port in present])
+        order = np.argsort(timestamps, kind='stable')
+        timestamps = timestamps[order]
+        ranks = ranks[order]
+
+        period_ns = self.estimate_frame_period_ns(present)
+        if self.gap_ms is not None:
+            gap_ns = int(round(self.gap_ms * NS_PER_MS))
+        else:
+            gap_ns = period_ns // 2
+
+        # Frames split on arrival gaps; frame ids are sorted like the timestamps
+        frame_ids = np.zeros(len(timestamps), dtype=np.int64)
+        np.cumsum(np.diff(timestamps) > gap_ns, out=frame_ids[1:])
+        frame_count = int(frame_ids[-1]) + 1
+
+        # Earliest sample of every (frame, port) pair
+        order = np.lexsort((timestamps, ranks, frame_ids))
+        pair_frames = frame_ids[order]
+        pair_ranks = ranks[order]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = (pair_frames[1:] != pair_frames[:-1]) | (pair_ranks[1:] != pair_ranks[:-1])
+        earliest = timestamps[order][first]
+        pair_frames = pair_frames[first]
+        pair_ranks = pair_ranks[first]
+        duplicates_per_port = np.bincount(ranks, minlength=len(ports)) - np.bincount(pair_ranks, minlength=len(ports))
+
+        frame_bounds = np.flatnonzero(np.r_[True, pair_frames[1:] != pair_frames[:-1]])
+        frame_starts = np.minimum.reduceat(earliest, frame_bounds)
+        frame_skews = np.maximum.reduceat(earliest, frame_bounds) - frame_starts
+        ports_per_frame = np.diff(np.r_[frame_bounds, len(earliest)])
+        complete = ports_per_frame == len(ports)
+        lags = earliest - frame_starts[pair_frames]
+
+        # Within a frame ports are sent in ascending order; a port that arrives
+        # before an earlier-sent port is out of order. Frames are separated by
+        # more than the gap, so a running maximum never leaks across frames.
+        running_max = np.maximum.accumulate(earliest)
+        out_of_order = np.zeros(len(earliest), dtype=bool)
+        out_of_order[1:] = earliest[1:] < running_max[:-1]
+
+        stats = FrameAlignmentStats(
+            device=device,
+            ports=list(ports),
+            samples=len(timestamps),
+            frames=frame_count,
+            complete_frames=int(np.count_nonzero(complete)),
+            frame_period_ms=period_ns / NS_PER_MS,
+            gap_threshold_ms=gap_ns / NS_PER_MS,
+            out_of_order=int(np.count_nonzero(out_of_order)),
+            duplicate_samples=int(duplicates_per_port.sum()),
+            target_completeness=self.target_completeness,
+        )
+
+        multi_port_skews = frame_skews[ports_per_frame > 1]
+        if len(multi_port_skews):
+            for percentile in SKEW_PERCENTILES:
+                stats.skew_percentiles_ms[f"p{percentile:g}"] = float(np.percentile(multi_port_skews, percentile)) / NS_PER_MS
+            stats.max_skew_ms = float(multi_port_skews.max()) / NS_PER_MS
+
+        self._recommend_wait_window(stats, np.sort(frame_skews[complete]))
+
+        frames_per_port = np.bincount(pair_ranks, minlength=len(ports))
+        out_of_order_per_port = np.bincount(pair_ranks[out_of_order], minlength=len(ports))
+        for rank, port in enumerate(ports):
+            port_lags = lags[pair_ranks == rank]
+            port_stats = PortAlignmentStats(
+                port=port,
+                samples=int(frames_per_port[rank] + duplicates_per_port[rank]),
+                missing_frames=int(frame_count - frames_per_port[rank]),
+                duplicate_samples=int(duplicates_per_port[rank]),
+                out_of_order=int(out_of_order_per_port[rank]),
+            )
+            if len(port_lags):
+                port_stats.mean_lag_ms = float(port_lags.mean()) / NS_PER_MS
+                port_stats.p99_lag_ms = float(np.percentile(port_lags, 99.0)) / NS_PER_MS
+                port_stats.max_lag_ms = float(port_lags.max()) / NS_PER_MS
+            stats.port_stats.append(port_stats)
+
+        return stats
+
+    def _recommend_wait_window(self, stats: FrameAlignmentStats, complete_skews: np.ndarray):
+        """
+        Find the smallest wait window that completes the target fraction of frames
+
+        A frame assembler that waits W after a frame's first sample completes
+        the frame when every port has arrived and the frame skew is <= W, so
+        completeness(W) is a searchsorted over the sorted complete-frame skews.
+        Frames with missing ports can never complete and cap what is achievable.
+        """
+        stats.achievable_completeness = len(complete_skews) / stats.frames
+        for window_ms in COMPLETENESS_WINDOWS_MS:
+            completed = np.searchsorted(complete_skews, window_ms * NS_PER_MS, side='right')
+            stats.completeness_by_window[f"{window_ms:g}"] = completed / stats.frames
+
+        required = math.ceil(self.target_completeness * stats.frames - 1e-9)
+        if 0 < required <= len(complete_skews):
+            stats.recommended_window_ms = float(complete_skews[required - 1]) / NS_PER_MS
+        elif required == 0:
+            stats.recommended_window_ms = 0.0
+
+    def analyze(self, port_sets: Dict[str, List[int]]):
+        """Analyze every port set with data in the loaded capture"""
+        for device, ports in port_sets.items():
+            print(f"Reconstructing {device} frames across ports {ports[0]}-{ports[-1]}...")
+            stats = self.analyze_ports(device, ports)
+            if stats is None:
+                print(f"  No data for {device}")
+                continue
+            print(f"  {stats.frames} frames, {stats.complete_frames} complete")
+            self.results.append(stats)
+
+    def generate_report(self, output_file: Optional[str] = None):
+        """Generate frame alignment report"""
+        if not self.results:
+            print("No device port sets found in capture!")
+            return
+
+        # Determine output destination
+        if output_file:
+            f = open(output_file, 'w')
+            print(f"Writing report to {output_file}...")
+        else:
+            f = sys.stdout
+            print("\n" + "="*80)
+            print("INTER-PORT SKEW AND FRAME ALIGNMENT REPORT")
+            print("="*80)
+
+        for stats in self.results:
+            f.write(f"\nDevice: {stats.device} (ports {stats.ports[0]}-{stats.ports[-1]})\n")
+            f.write("-"*80 + "\n")
+            f.write(f"Samples: {stats.samples}\n")
+            f.write(f"Frame period: {stats.frame_period_ms:.2f}ms (frames split on gaps > {stats.gap_threshold_ms:.2f}ms)\n")
+            f.write(f"Frames: {stats.frames} ({stats.complete_frames} complete, "
+                    f"{stats.frames - stats.complete_frames} with missing ports)\n")
+            f.write(f"Out-of-order arrivals: {stats.out_of_order}\n")
+            f.write(f"Duplicate samples in a frame: {stats.duplicate_samples}\n")
+
+            if stats.skew_percentiles_ms:
+                skews = "  ".join(f"{name}={value:.2f}ms" for name, value in stats.skew_percentiles_ms.items())
+                f.write(f"Intra-frame skew: {skews}  max={stats.max_skew_ms:.2f}ms\n")
+
+            f.write("Completeness by wait window:")
+            for window_ms, completeness in stats.completeness_by_window.items():
+                f.write(f"  {window_ms}ms={completeness*100:.2f}%")
+            f.write("\n")
+
+            target = stats.target_completeness * 100
+            if stats.recommended_window_ms is not None:
+                f.write(f"Recommended wait window for {target:g}% completeness: {stats.recommended_window_ms:.2f}ms\n")
+            else:
+                f.write(f"Target {target:g}% completeness not reachable "
+                        f"(missing ports cap it at {stats.achievable_completeness*100:.2f}%)\n")
+
+            header = f"{'Port':<8} {'Samples':<10} {'Missing':<10} {'Dupes':<8} {'Out-of-order':<14} {'Mean lag':<10} {'P99 lag':<10} {'Max lag':<10}"
+            f.write("\n" + header + "\n")
+            f.write("-" * len(header) + "\n")
+            for port_stats in stats.port_stats:
+                f.write(f"{port_stats.port:<8} {port_stats.samples:<10} {port_stats.missing_frames:<10} "
+                        f"{port_stats.duplicate_samples:<8} {port_stats.out_of_order:<14} "
+                        f"{port_stats.mean_lag_ms:<10.2f} {port_stats.p99_lag_ms:<10.2f} {port_stats.max_lag_ms:<10.2f}\n")
+
+        if output_file:
+            f.close()
+            print(f"Report written to {output_file}")
+
+    def write_json(self, filename: str):
+        """Write the alignment statistics as JSON"""
+        with open(filename, 'w') as f:
+            json.dump([stats.to_dict() for stats in self.results], f, indent=2)
+        print(f"Statistics written to {filename}")
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description='Inter-Port Skew and Frame Alignment Analyzer')
+    parser.add_argument('input_file', help='Input capture file (.dmp or .raw)')
+    parser.add_argument('--output', '-o', help='Output file (default: stdout)')
+    parser.add_argument('--device', choices=sorted(DEVICE_PORT_SETS.keys()),
+                       help='Analyze only this device (default: all devices with data)')
+    parser.add_argument('--ports', type=str,
+                       help='Comma-separated custom port set in send order (e.g., 50038,50039,50040)')
+    parser.add_argument('--target', type=float, default=99.9,
+                       help='Target frame completeness in percent (default: 99.9)')
+    parser.add_argument('--gap-ms', type=float,
+                       help='Gap that starts a new frame in ms (default: half the frame period)')
+    parser.add_argument('--json', type=str, help='Also write statistics as JSON to this file')
+
+    args = parser.parse_args()
+
+    if args.ports:
+        port_sets = {'custom': [int(port.strip()) for port in args.ports.split(',')]}
+    elif args.device:
+        port_sets = {args.device: DEVICE_PORT_SETS[args.device]}
+    else:
+        port_sets = DEVICE_PORT_SETS
+
+    analyzer = PortSkewAnalyzer(target_completeness=args.target / 100.0, gap_ms=args.gap_ms)
+    analyzer.load_data(args.input_file)
+    analyzer.analyze(port_sets)
+    analyzer.generate_report(args.output)
+
+    if args.json:
+        analyzer.write_json(args.json)
+
+if __name__ == "__main__":
+    main()
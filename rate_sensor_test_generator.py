@@ -9,17 +9,33 @@ of the Honeywell specification and converts JSON data to the proper serial forma
 Based on Honeywell HG4934 specification DS36134-60, section 3.2.4 - Serial Data Output Protocol
 """
 
+import os
 import json
 import struct
 import time
 import threading
 from datetime import datetime
-from typing import Dict, Any, Optional, List
-from dataclasses import dataclass, asdict
+from typing import Dict, Any, Optional, List, Callable
+from dataclasses import dataclass, asdict, fields, replace
 from flask import Flask, request, jsonify, render_template_string
 import serial
 import logging
 
+from performance_monitor import LatencyHistogram
+
+try:
+    # Scenario timelines are compiled with numpy
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+try:
+    # Registers pty:// ports (pseudo-terminal stand-ins) with pyserial
+    import output_transmitters.protocol_pty  # noqa: F401
+except ImportError:
+    pass
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -51,6 +67,17 @@ class RateSensorData:
     timestamp: float = 0.0
     message_counter: int = 0
 
+DATA_FIELDS = {f.name for f in fields(RateSensorData)}
+
+# Highest streaming rate accepted by /api/stream (Hz)
+MAX_STREAM_RATE_HZ = 1000.0
+
+# Scenario timeline files (*.json keyframes, *.npz per-frame arrays)
+SCENARIO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scenarios')
+RATE_FIELDS = ('angular_rate_x', 'angular_rate_y', 'angular_rate_z')
+ANGLE_FIELDS = ('summed_angle_x', 'summed_angle_y', 'summed_angle_z')
+STATUS_WORD_FIELDS = ('status_word_1', 'status_word_2', 'status_word_3')
+
 class StatusWordBuilder:
     """Helper class for building status words according to Honeywell specification"""
     
@@ -166,6 +193,16 @@ class StatusWordBuilder:
             word |= (1 << 15)
             
         return word & 0xFFFF
+    
+    @classmethod
+    def build_status_words(cls, status_words: Dict[str, Dict[str, Any]]) -> Dict[str, int]:
+        """Status word values from per-bit parameters for any of status_word_1/2/3"""
+        builders = {
+            'status_word_1': cls.build_status_word_1,
+            'status_word_2': cls.build_status_word_2,
+            'status_word_3': cls.build_status_word_3
+        }
+        return {name: builder(**status_words[name]) for name, builder in builders.items() if name in status_words}
 
 class MessageEncoder:
     """Encodes rate sensor data into Honeywell protocol format"""
@@ -226,6 +263,202 @@ class MessageEncoder:
         message.extend(struct.pack('<H', checksum))
         
         return bytes(message)
+    
+    @classmethod
+    def encode_frames(cls, samples: Dict[str, "np.ndarray"]) -> "np.ndarray":
+        """
+        Encode many messages at once; the same bytes as encode_message per row
+        
+        samples maps RateSensorData field names to equal-length arrays; missing
+        fields take the RateSensorData defaults. Returns (N, MESSAGE_SIZE) uint8.
+        """
+        count = max(len(values) for values in samples.values())
+        frames = np.zeros(count, dtype=FRAME_DTYPE)
+        frames['sync'] = 0xAA
+        for axis, name in enumerate(RATE_FIELDS):
+            lsb = np.trunc(np.asarray(samples.get(name, 0.0), dtype=np.float64) / cls.ANGULAR_RATE_SCALE)
+            frames['rates'][:, axis] = np.clip(lsb, -32768, 32767)
+        for index, name in enumerate(STATUS_WORD_FIELDS):
+            frames['status_words'][:, index] = np.asarray(samples.get(name, 0), dtype=np.int64) & 0xFFFF
+        for axis, name in enumerate(ANGLE_FIELDS):
+            lsb = np.trunc(np.asarray(samples.get(name, 0.0), dtype=np.float64) / cls.ANGLE_SCALE)
+            frames['angles'][:, axis] = np.clip(lsb, -2147483648, 2147483647)
+        
+        encoded = frames.view(np.uint8).reshape(count, MESSAGE_SIZE)
+        checksums = encoded[:, 1:-2].sum(axis=1, dtype=np.uint32) & 0xFFFF
+        encoded[:, -2] = checksums & 0xFF
+        encoded[:, -1] = checksums >> 8
+        return encoded
+    
+    @staticmethod
+    def with_counter(message: bytes, counter: int) -> bytes:
+        """Message with the Status Word 1 counter (bits 0-1) replaced and the checksum adjusted"""
+        patched = bytearray(message)
+        previous = patched[7] & 0x03
+        patched[7] = (patched[7] & 0xFC) | (counter & 0x03)
+        checksum = (struct.unpack_from('<H', patched, 25)[0] - previous + (counter & 0x03)) & 0xFFFF
+        struct.pack_into('<H', patched, 25, checksum)
+        return bytes(patched)
+
+# Encoded message layout: sync, 3 rates, 3 status words, 3 angles, checksum
+MESSAGE_SIZE = 27
+if NUMPY_AVAILABLE:
+    FRAME_DTYPE = np.dtype([('sync', 'u1'), ('rates', '<i2', (3,)), ('status_words', '<u2', (3,)),
+                            ('angles', '<i4', (3,)), ('checksum', '<u2')])
+
+@dataclass
+class ScenarioTimeline:
+    """A time-varying scenario compiled into one pre-encoded message per frame"""
+    name: str
+    rate_hz: float
+    frames: bytes  # frame_count encoded messages back to back
+    frame_count: int
+    description: str = ''
+    loop: bool = False
+    source: str = ''
+    source_mtime: float = 0.0
+    
+    @property
+    def duration_s(self) -> float:
+        return self.frame_count / self.rate_hz
+    
+    def frame(self, position: int) -> bytes:
+        """Encoded message of one frame"""
+        start = position * MESSAGE_SIZE
+        return self.frames[start:start + MESSAGE_SIZE]
+    
+    def info(self) -> Dict[str, Any]:
+        """JSON-serializable summary"""
+        return {
+            'name': self.name,
+            'description': self.description,
+            'rate_hz': self.rate_hz,
+            'frames': self.frame_count,
+            'duration_s': self.duration_s,
+            'loop': self.loop
+        }
+
+def sample_keyframes(spec: Dict[str, Any], rate_hz: float) -> Dict[str, "np.ndarray"]:
+    """
+    Per-frame field arrays from a keyframe scenario
+    
+    Rates and angles are interpolated linearly between keyframes; status
+    words hold their value until the next keyframe that sets them. With
+    "integrate_angles", summed angles accumulate the rates from the first
+    keyframe's angles instead.
+    """
+    keyframes = sorted(spec.get('keyframes', []), key=lambda keyframe: keyframe.get('t', 0.0))
+    if not keyframes:
+        raise ValueError("Scenario has no keyframes")
+    duration = float(spec.get('duration_s', keyframes[-1].get('t', 0.0)))
+    times = np.arange(max(1, int(round(duration * rate_hz)))) / rate_hz
+    
+    samples = {}
+    for name in RATE_FIELDS + ANGLE_FIELDS:
+        points = [(keyframe.get('t', 0.0), keyframe['data'][name])
+                  for keyframe in keyframes if name in keyframe.get('data', {})]
+        if points:
+            key_times, values = zip(*points)
+            samples[name] = np.interp(times, key_times, values)
+    
+    defaults = RateSensorData()
+    for name in STATUS_WORD_FIELDS:
+        key_times, values = [0.0], [getattr(defaults, name)]
+        for keyframe in keyframes:
+            words = keyframe.get('status_words', {})
+            if name in words:
+                word = words[name]
+                built = word if isinstance(word, int) else StatusWordBuilder.build_status_words({name: word})[name]
+                key_times.append(keyframe.get('t', 0.0))
+                values.append(built)
+        steps = np.searchsorted(key_times, times, side='right') - 1
+        samples[name] = np.asarray(values, dtype=np.int64)[steps]
+    
+    if spec.get('integrate_angles'):
+        start = keyframes[0].get('data', {})
+        for rate_name, angle_name in zip(RATE_FIELDS, ANGLE_FIELDS):
+            rates = samples.get(rate_name, np.zeros(len(times)))
+            samples[angle_name] = start.get(angle_name, 0.0) + np.cumsum(rates) / rate_hz
+    return samples
+
+def compile_timeline(path: str) -> ScenarioTimeline:
+    """
+    Compile a scenario file into a ScenarioTimeline
+    
+    JSON files hold keyframes (see sample_keyframes) plus rate_hz,
+    duration_s, description and loop. NPZ files hold one array per
+    RateSensorData field with one value per frame, and a scalar rate_hz.
+    """
+    if not NUMPY_AVAILABLE:
+        raise RuntimeError("Scenario timelines need numpy")
+    name, extension = os.path.splitext(os.path.basename(path))
+    if extension == '.json':
+        with open(path, 'r') as f:
+            spec = json.load(f)
+        rate_hz = float(spec.get('rate_hz', 200.0))
+        samples = sample_keyframes(spec, rate_hz)
+    elif extension == '.npz':
+        with np.load(path) as archive:
+            spec = {key: archive[key].item() for key in ('description', 'loop') if key in archive}
+            rate_hz = float(archive['rate_hz']) if 'rate_hz' in archive else 200.0
+            samples = {key: archive[key] for key in RATE_FIELDS + ANGLE_FIELDS + STATUS_WORD_FIELDS if key in archive}
+        if not samples or len({len(values) for values in samples.values()}) != 1:
+            raise ValueError(f"{path}: needs per-frame arrays of one length")
+    else:
+        raise ValueError(f"{path}: scenario files are .json or .npz")
+    if not 0 < rate_hz <= MAX_STREAM_RATE_HZ:
+        raise ValueError(f"{path}: rate_hz must be in (0, {MAX_STREAM_RATE_HZ:g}]")
+    
+    # Bake in the Status Word 1 counter for playback from frame 0
+    count = max(len(values) for values in samples.values())
+    status_word_1 = np.broadcast_to(np.asarray(samples.get('status_word_1', 0), dtype=np.int64), count)
+    samples['status_word_1'] = (status_word_1 & ~0x03) | (np.arange(count) & 0x03)
+    frames = MessageEncoder.encode_frames(samples)
+    return ScenarioTimeline(
+        name=name,
+        rate_hz=rate_hz,
+        frames=frames.tobytes(),
+        frame_count=count,
+        description=str(spec.get('description', '')),
+        loop=bool(spec.get('loop', False)),
+        source=path,
+        source_mtime=os.path.getmtime(path)
+    )
+
+class TimelinePlayback:
+    """Playhead over a ScenarioTimeline, advanced one frame per streamed frame"""
+    
+    def __init__(self, timeline: ScenarioTimeline, position: int = 0):
+        self.timeline = timeline
+        self.position = position
+    
+    @property
+    def finished(self) -> bool:
+        return not self.timeline.loop and self.position >= self.timeline.frame_count
+    
+    def next_frame(self, frame_index: int) -> bytes:
+        """Message for stream slot frame_index; the last frame repeats once a one-shot timeline ends"""
+        timeline = self.timeline
+        position = self.position
+        if position >= timeline.frame_count:
+            position = 0 if timeline.loop else timeline.frame_count - 1
+        self.position = position + 1
+        message = timeline.frame(position)
+        if (position ^ frame_index) & 0x03:
+            # Keep the counter continuous across scrubs and loop wraps
+            message = MessageEncoder.with_counter(message, frame_index)
+        return message
+    
+    def state(self) -> Dict[str, Any]:
+        """Timeline, playhead and whether a one-shot timeline has ended"""
+        position = min(self.position, self.timeline.frame_count)
+        return {
+            'timeline': self.timeline.name,
+            'frame': position,
+            'position_s': position / self.timeline.rate_hz,
+            'duration_s': self.timeline.duration_s,
+            'finished': self.finished
+        }
 
 class SerialTransmitter:
     """Handles serial communication for sending encoded messages"""
@@ -239,11 +472,22 @@ class SerialTransmitter:
         self.message_queue: List[bytes] = []
         self.queue_lock = threading.Lock()
         
+        # Streaming mode statistics
+        self.streaming = False  # The running transmission is a stream, not the message queue
+        self.stream_rate_hz = 0.0
+        self.stream_stats = {'frames': 0, 'skipped': 0}
+        self.stream_jitter = LatencyHistogram()  # Lateness of each frame behind its deadline
+        self.stream_started = 0.0
+        self.stream_stopped: Optional[float] = None
+        
     def connect(self) -> bool:
         """Connect to serial port"""
+        if self.serial_conn and self.serial_conn.is_open:
+            return True
         try:
-            self.serial_conn = serial.Serial(
-                port=self.port,
+            open_port = serial.serial_for_url if '://' in self.port else serial.Serial
+            self.serial_conn = open_port(
+                self.port,
                 baudrate=self.baud_rate,
                 bytesize=8,
                 parity='N',
@@ -281,6 +525,7 @@ class SerialTransmitter:
     def stop_transmission(self):
         """Stop message transmission"""
         self.is_transmitting = False
+        self.streaming = False
         if self.transmit_thread:
             self.transmit_thread.join(timeout=1.0)
         logger.info("Stopped message transmission")
@@ -301,16 +546,234 @@ class SerialTransmitter:
             except Exception as e:
                 logger.error(f"Transmission error: {e}")
                 break
+    
+    def start_streaming(self, frame_source: Callable[[int], bytes], rate_hz: float = 200.0):
+        """
+        Transmit frame_source(frame_index) at a fixed rate on a dedicated timing thread
+        
+        Frames are sent on absolute deadlines (start + index / rate), so a late
+        frame does not push back the ones after it. A frame more than a whole
+        period late is skipped and counted instead of sent in a burst.
+        """
+        if self.is_transmitting:
+            return
+        
+        self.stream_rate_hz = rate_hz
+        self.stream_stats = {'frames': 0, 'skipped': 0}
+        self.stream_jitter = LatencyHistogram()
+        self.stream_started = time.perf_counter()
+        self.stream_stopped = None
+        self.is_transmitting = True
+        self.streaming = True
+        self.transmit_thread = threading.Thread(target=self._stream_loop, args=(frame_source, rate_hz), daemon=True)
+        self.transmit_thread.start()
+        logger.info(f"Started streaming at {rate_hz:g} Hz")
+    
+    def _stream_loop(self, frame_source: Callable[[int], bytes], rate_hz: float):
+        """Timing loop of the streaming mode"""
+        period_ns = int(1e9 / rate_hz)
+        start_ns = time.perf_counter_ns()
+        frame_index = 0
+        while self.is_transmitting and self.serial_conn and self.serial_conn.is_open:
+            deadline_ns = start_ns + frame_index * period_ns
+            remaining_ns = deadline_ns - time.perf_counter_ns()
+            if remaining_ns > 0:
+                time.sleep(remaining_ns / 1e9)
+            
+            late_ns = time.perf_counter_ns() - deadline_ns
+            if late_ns >= period_ns:
+                missed = late_ns // period_ns
+                self.stream_stats['skipped'] += missed
+                frame_index += missed
+                late_ns -= missed * period_ns
+            self.stream_jitter.record(late_ns)
+            
+            try:
+                self.serial_conn.write(frame_source(frame_index))
+            except Exception as e:
+                logger.error(f"Streaming error: {e}")
+                break
+            self.stream_stats['frames'] += 1
+            frame_index += 1
+        self.streaming = False
+        self.stream_stopped = time.perf_counter()
+    
+    def get_stream_stats(self) -> Dict[str, Any]:
+        """Configured and achieved rate, frame counts and deadline jitter of the streaming mode"""
+        elapsed = (self.stream_stopped or time.perf_counter()) - self.stream_started
+        frames = self.stream_stats['frames']
+        return {
+            'streaming': self.streaming,
+            'rate_hz': self.stream_rate_hz,
+            'achieved_rate_hz': frames / elapsed if frames and elapsed > 0 else 0.0,
+            'frames': frames,
+            'skipped': self.stream_stats['skipped'],
+            'jitter': self.stream_jitter.summary()
+        }
+
+# Predefined static scenarios; each is compiled into a data update once
+TEST_SCENARIOS = {
+    'normal_operation': {
+        'description': 'Normal sensor operation with typical rates',
+        'data': {
+            'angular_rate_x': 0.01,
+            'angular_rate_y': -0.005,
+            'angular_rate_z': 0.02,
+            'summed_angle_x': 0.1,
+            'summed_angle_y': -0.05,
+            'summed_angle_z': 0.2
+        },
+        'status_words': {
+            'status_word_1': {'counter': 0, 'bit_mode': 1, 'rate_sensor_failed': False, 'gyro_failed': False, 'agc_voltage_failed': False},
+            'status_word_2': {'gyro_temperature_a': 25, 'motor_bias_voltage_failed': False, 'start_data_flag': False, 'processor_failed': False, 'memory_failed': False},
+            'status_word_3': {'gyro_a_start_run': True, 'gyro_b_start_run': True, 'gyro_c_start_run': True, 'gyro_a_fdc': False, 'gyro_b_fdc': False, 'gyro_c_fdc': False, 'fdc_failed': False, 'rs_ok': True}
+        }
+    },
+    'high_rate_test': {
+        'description': 'High angular rate test',
+        'data': {
+            'angular_rate_x': 1.0,
+            'angular_rate_y': -0.5,
+            'angular_rate_z': 0.8,
+            'summed_angle_x': 10.0,
+            'summed_angle_y': -5.0,
+            'summed_angle_z': 8.0
+        },
+        'status_words': {
+            'status_word_1': {'counter': 1, 'bit_mode': 1, 'rate_sensor_failed': False, 'gyro_failed': False, 'agc_voltage_failed': False},
+            'status_word_2': {'gyro_temperature_a': 30, 'motor_bias_voltage_failed': False, 'start_data_flag': False, 'processor_failed': False, 'memory_failed': False},
+            'status_word_3': {'gyro_a_start_run': True, 'gyro_b_start_run': True, 'gyro_c_start_run': True, 'gyro_a_fdc': False, 'gyro_b_fdc': False, 'gyro_c_fdc': False, 'fdc_failed': False, 'rs_ok': True}
+        }
+    },
+    'fault_condition': {
+        'description': 'Fault condition test',
+        'data': {
+            'angular_rate_x': 0.0,
+            'angular_rate_y': 0.0,
+            'angular_rate_z': 0.0,
+            'summed_angle_x': 0.0,
+            'summed_angle_y': 0.0,
+            'summed_angle_z': 0.0
+        },
+        'status_words': {
+            'status_word_1': {'counter': 2, 'bit_mode': 1, 'rate_sensor_failed': True, 'gyro_failed': True, 'agc_voltage_failed': True},
+            'status_word_2': {'gyro_temperature_a': 50, 'motor_bias_voltage_failed': True, 'start_data_flag': False, 'processor_failed': True, 'memory_failed': True},
+            'status_word_3': {'gyro_a_start_run': False, 'gyro_b_start_run': False, 'gyro_c_start_run': False, 'gyro_a_fdc': True, 'gyro_b_fdc': True, 'gyro_c_fdc': True, 'fdc_failed': True, 'rs_ok': False}
+        }
+    }
+}
 
 class RateSensorTestGenerator:
     """Main test generator class with REST API"""
     
-    def __init__(self, serial_port: str = '/dev/ttyUSB0', serial_baud: int = 115200):
+    def __init__(self, serial_port: str = '/dev/ttyUSB0', serial_baud: int = 115200, scenario_dir: str = SCENARIO_DIR):
         self.serial_transmitter = SerialTransmitter(serial_port, serial_baud)
         self.current_data = RateSensorData()
         self.message_counter = 0
+        self.data_lock = threading.Lock()  # Serializes updates; the stream reads current_data without it
+        self.stream_data: Optional[RateSensorData] = None
+        self.stream_frames: List[bytes] = []
+        
+        # Static scenarios as ready-made updates; timelines compiled on first load
+        self.scenario_changes = {name: self._scenario_changes(scenario) for name, scenario in TEST_SCENARIOS.items()}
+        self.scenario_dir = scenario_dir
+        self.timelines: Dict[str, ScenarioTimeline] = {}
+        self.playback: Optional[TimelinePlayback] = None  # Replaced, never modified, by the API
         self.app = Flask(__name__)
         self._setup_routes()
+    
+    def update_data(self, changes: Dict[str, Any], new_message: bool = True) -> RateSensorData:
+        """
+        Replace current_data with a copy that has the changes applied
+        
+        The streaming thread reads current_data once per frame, so swapping in
+        a complete copy means each frame has all of an update or none of it,
+        and the stream never waits for the API.
+        """
+        with self.data_lock:
+            if new_message:
+                changes = dict(changes, timestamp=time.time(), message_counter=self.message_counter)
+                self.message_counter += 1
+            self.current_data = replace(self.current_data, **changes)
+            return self.current_data
+    
+    @staticmethod
+    def _scenario_changes(scenario: Dict[str, Any]) -> Dict[str, Any]:
+        """Data update that loads a static scenario"""
+        changes = {key: value for key, value in scenario.get('data', {}).items() if key in DATA_FIELDS}
+        changes.update(StatusWordBuilder.build_status_words(scenario.get('status_words', {})))
+        return changes
+    
+    def timeline_files(self) -> Dict[str, str]:
+        """Scenario timeline files in scenario_dir by name"""
+        if not os.path.isdir(self.scenario_dir):
+            return {}
+        return {os.path.splitext(entry)[0]: os.path.join(self.scenario_dir, entry)
+                for entry in sorted(os.listdir(self.scenario_dir)) if entry.endswith(('.json', '.npz'))}
+    
+    def get_timeline(self, name: str) -> ScenarioTimeline:
+        """Compiled timeline, recompiled only when its file has changed"""
+        path = self.timeline_files().get(name)
+        if path is None:
+            raise KeyError(f"No scenario timeline '{name}' in {self.scenario_dir}")
+        timeline = self.timelines.get(name)
+        if timeline is None or timeline.source != path or timeline.source_mtime != os.path.getmtime(path):
+            timeline = compile_timeline(path)
+            self.timelines[name] = timeline
+            logger.info(f"Compiled timeline {name}: {timeline.frame_count} frames at {timeline.rate_hz:g} Hz")
+        return timeline
+    
+    def play_timeline(self, name: str, position_s: float = 0.0, stream: bool = True) -> ScenarioTimeline:
+        """
+        Play a timeline from position_s
+        
+        Streaming sends one timeline frame per stream frame. With stream, the
+        stream is (re)started at the timeline's rate.
+        """
+        timeline = self.get_timeline(name)
+        self.playback = TimelinePlayback(timeline, self._timeline_frame(timeline, position_s))
+        transmitter = self.serial_transmitter
+        if stream and (not transmitter.streaming or transmitter.stream_rate_hz != timeline.rate_hz):
+            transmitter.stop_transmission()
+            if not self.start_streaming(timeline.rate_hz):
+                raise RuntimeError("Failed to connect to serial port")
+        return timeline
+    
+    def scrub_timeline(self, position_s: float):
+        """Move the playhead of the playing timeline"""
+        playback = self.playback
+        if playback is None:
+            raise ValueError("No timeline is playing")
+        self.playback = TimelinePlayback(playback.timeline, self._timeline_frame(playback.timeline, position_s))
+    
+    @staticmethod
+    def _timeline_frame(timeline: ScenarioTimeline, position_s: float) -> int:
+        """Frame at a timeline position"""
+        if not 0 <= position_s <= timeline.duration_s:
+            raise ValueError(f"position_s must be in [0, {timeline.duration_s:g}]")
+        return min(int(round(position_s * timeline.rate_hz)), timeline.frame_count - 1)
+    
+    def _stream_frame(self, frame_index: int) -> bytes:
+        """Encoded frame for a stream slot, with the Status Word 1 counter rolling over 0-3"""
+        playback = self.playback
+        if playback is not None:
+            return playback.next_frame(frame_index)
+        
+        data = self.current_data
+        if data is not self.stream_data:
+            # Encode each update once, as one frame per counter value
+            base = data.status_word_1 & ~0x03
+            self.stream_frames = [MessageEncoder.encode_message(replace(data, status_word_1=base | counter))
+                                  for counter in range(4)]
+            self.stream_data = data
+        return self.stream_frames[frame_index & 0x03]
+    
+    def start_streaming(self, rate_hz: float = 200.0) -> bool:
+        """Connect and stream the current data at rate_hz until the transmission is stopped"""
+        if not self.serial_transmitter.connect():
+            return False
+        self.serial_transmitter.start_streaming(self._stream_frame, rate_hz)
+        return True
         
     def _setup_routes(self):
         """Setup REST API routes"""
@@ -336,20 +799,13 @@ class RateSensorTestGenerator:
                 if not data:
                     return jsonify({'status': 'error', 'message': 'No JSON data provided'}), 400
                 
-                # Update current data with provided values
-                for key, value in data.items():
-                    if hasattr(self.current_data, key):
-                        setattr(self.current_data, key, value)
-                
-                # Update timestamp and counter
-                self.current_data.timestamp = time.time()
-                self.current_data.message_counter = self.message_counter
-                self.message_counter += 1
+                # Update current data with provided values, timestamp and counter
+                updated = self.update_data({key: value for key, value in data.items() if key in DATA_FIELDS})
                 
                 return jsonify({
                     'status': 'success',
                     'message': 'Data updated successfully',
-                    'data': asdict(self.current_data)
+                    'data': asdict(updated)
                 })
                 
             except Exception as e:
@@ -364,25 +820,15 @@ class RateSensorTestGenerator:
                     return jsonify({'status': 'error', 'message': 'No JSON data provided'}), 400
                 
                 # Build status words
-                if 'status_word_1' in data:
-                    sw1_params = data['status_word_1']
-                    self.current_data.status_word_1 = StatusWordBuilder.build_status_word_1(**sw1_params)
-                
-                if 'status_word_2' in data:
-                    sw2_params = data['status_word_2']
-                    self.current_data.status_word_2 = StatusWordBuilder.build_status_word_2(**sw2_params)
-                
-                if 'status_word_3' in data:
-                    sw3_params = data['status_word_3']
-                    self.current_data.status_word_3 = StatusWordBuilder.build_status_word_3(**sw3_params)
+                updated = self.update_data(StatusWordBuilder.build_status_words(data), new_message=False)
                 
                 return jsonify({
                     'status': 'success',
                     'message': 'Status words updated successfully',
                     'status_words': {
-                        'status_word_1': f'0x{self.current_data.status_word_1:04X}',
-                        'status_word_2': f'0x{self.current_data.status_word_2:04X}',
-                        'status_word_3': f'0x{self.current_data.status_word_3:04X}'
+                        'status_word_1': f'0x{updated.status_word_1:04X}',
+                        'status_word_2': f'0x{updated.status_word_2:04X}',
+                        'status_word_3': f'0x{updated.status_word_3:04X}'
                     }
                 })
                 
@@ -448,106 +894,139 @@ class RateSensorTestGenerator:
             except Exception as e:
                 return jsonify({'status': 'error', 'message': str(e)}), 500
         
+        @self.app.route('/api/stream', methods=['POST'])
+        def start_stream():
+            """Start streaming the current data at a fixed rate"""
+            try:
+                data = request.get_json(silent=True) or {}
+                rate_hz = float(data.get('rate_hz', 200.0))
+                if not 0 < rate_hz <= MAX_STREAM_RATE_HZ:
+                    return jsonify({'status': 'error', 'message': f'rate_hz must be in (0, {MAX_STREAM_RATE_HZ:g}]'}), 400
+                if self.serial_transmitter.is_transmitting:
+                    return jsonify({'status': 'error', 'message': 'Transmission already running'}), 409
+                
+                if not self.start_streaming(rate_hz):
+                    return jsonify({'status': 'error', 'message': 'Failed to connect to serial port'}), 500
+                
+                return jsonify({
+                    'status': 'success',
+                    'message': f'Streaming started at {rate_hz:g} Hz',
+                    'rate_hz': rate_hz
+                })
+                
+            except Exception as e:
+                return jsonify({'status': 'error', 'message': str(e)}), 500
+        
+        @self.app.route('/api/stream', methods=['GET'])
+        def get_stream_stats():
+            """Get achieved rate and jitter of the stream"""
+            return jsonify({
+                'status': 'success',
+                'stream': self.serial_transmitter.get_stream_stats()
+            })
+        
+        @self.app.route('/api/stream', methods=['DELETE'])
+        def stop_stream():
+            """Stop streaming"""
+            try:
+                self.serial_transmitter.stop_transmission()
+                self.serial_transmitter.disconnect()
+                
+                return jsonify({
+                    'status': 'success',
+                    'message': 'Streaming stopped',
+                    'stream': self.serial_transmitter.get_stream_stats()
+                })
+                
+            except Exception as e:
+                return jsonify({'status': 'error', 'message': str(e)}), 500
+        
+        @self.app.route('/api/timelines', methods=['GET'])
+        def list_timelines():
+            """List scenario timeline files and the playback state"""
+            timelines = []
+            for name, path in self.timeline_files().items():
+                compiled = self.timelines.get(name)
+                timelines.append(compiled.info() if compiled else {'name': name})
+                timelines[-1]['file'] = os.path.basename(path)
+            playback = self.playback
+            
+            return jsonify({
+                'status': 'success',
+                'timelines': timelines,
+                'playback': playback.state() if playback else None
+            })
+        
+        @self.app.route('/api/timelines/<timeline_name>/load', methods=['POST'])
+        def load_timeline(timeline_name: str):
+            """Compile a scenario timeline and play it"""
+            try:
+                data = request.get_json(silent=True) or {}
+                timeline = self.play_timeline(timeline_name, float(data.get('position_s', 0.0)),
+                                              bool(data.get('stream', True)))
+                
+                return jsonify({
+                    'status': 'success',
+                    'message': f'Timeline {timeline_name} loaded',
+                    'timeline': timeline.info(),
+                    'playback': self.playback.state()
+                })
+                
+            except KeyError as e:
+                return jsonify({'status': 'error', 'message': str(e.args[0])}), 404
+            except ValueError as e:
+                return jsonify({'status': 'error', 'message': str(e)}), 400
+            except Exception as e:
+                return jsonify({'status': 'error', 'message': str(e)}), 500
+        
+        @self.app.route('/api/timelines/scrub', methods=['POST'])
+        def scrub_timeline():
+            """Move the playhead of the playing timeline"""
+            try:
+                data = request.get_json(silent=True) or {}
+                if 'position_s' not in data:
+                    return jsonify({'status': 'error', 'message': 'position_s is required'}), 400
+                self.scrub_timeline(float(data['position_s']))
+                
+                return jsonify({
+                    'status': 'success',
+                    'playback': self.playback.state()
+                })
+                
+            except ValueError as e:
+                return jsonify({'status': 'error', 'message': str(e)}), 400
+        
+        @self.app.route('/api/timelines/playback', methods=['DELETE'])
+        def stop_timeline():
+            """Stop timeline playback; the stream returns to the current data"""
+            self.playback = None
+            return jsonify({
+                'status': 'success',
+                'message': 'Timeline playback stopped'
+            })
+        
         @self.app.route('/api/test_scenarios', methods=['GET'])
         def get_test_scenarios():
             """Get available test scenarios"""
-            scenarios = {
-                'normal_operation': {
-                    'description': 'Normal sensor operation with typical rates',
-                    'data': {
-                        'angular_rate_x': 0.01,
-                        'angular_rate_y': -0.005,
-                        'angular_rate_z': 0.02,
-                        'summed_angle_x': 0.1,
-                        'summed_angle_y': -0.05,
-                        'summed_angle_z': 0.2
-                    },
-                    'status_words': {
-                        'status_word_1': {'counter': 0, 'bit_mode': 1, 'rate_sensor_failed': False, 'gyro_failed': False, 'agc_voltage_failed': False},
-                        'status_word_2': {'gyro_temperature_a': 25, 'motor_bias_voltage_failed': False, 'start_data_flag': False, 'processor_failed': False, 'memory_failed': False},
-                        'status_word_3': {'gyro_a_start_run': True, 'gyro_b_start_run': True, 'gyro_c_start_run': True, 'gyro_a_fdc': False, 'gyro_b_fdc': False, 'gyro_c_fdc': False, 'fdc_failed': False, 'rs_ok': True}
-                    }
-                },
-                'high_rate_test': {
-                    'description': 'High angular rate test',
-                    'data': {
-                        'angular_rate_x': 1.0,
-                        'angular_rate_y': -0.5,
-                        'angular_rate_z': 0.8,
-                        'summed_angle_x': 10.0,
-                        'summed_angle_y': -5.0,
-                        'summed_angle_z': 8.0
-                    },
-                    'status_words': {
-                        'status_word_1': {'counter': 1, 'bit_mode': 1, 'rate_sensor_failed': False, 'gyro_failed': False, 'agc_voltage_failed': False},
-                        'status_word_2': {'gyro_temperature_a': 30, 'motor_bias_voltage_failed': False, 'start_data_flag': False, 'processor_failed': False, 'memory_failed': False},
-                        'status_word_3': {'gyro_a_start_run': True, 'gyro_b_start_run': True, 'gyro_c_start_run': True, 'gyro_a_fdc': False, 'gyro_b_fdc': False, 'gyro_c_fdc': False, 'fdc_failed': False, 'rs_ok': True}
-                    }
-                },
-                'fault_condition': {
-                    'description': 'Fault condition test',
-                    'data': {
-                        'angular_rate_x': 0.0,
-                        'angular_rate_y': 0.0,
-                        'angular_rate_z': 0.0,
-                        'summed_angle_x': 0.0,
-                        'summed_angle_y': 0.0,
-                        'summed_angle_z': 0.0
-                    },
-                    'status_words': {
-                        'status_word_1': {'counter': 2, 'bit_mode': 1, 'rate_sensor_failed': True, 'gyro_failed': True, 'agc_voltage_failed': True},
-                        'status_word_2': {'gyro_temperature_a': 50, 'motor_bias_voltage_failed': True, 'start_data_flag': False, 'processor_failed': True, 'memory_failed': True},
-                        'status_word_3': {'gyro_a_start_run': False, 'gyro_b_start_run': False, 'gyro_c_start_run': False, 'gyro_a_fdc': True, 'gyro_b_fdc': True, 'gyro_c_fdc': True, 'fdc_failed': True, 'rs_ok': False}
-                    }
-                }
-            }
-            
             return jsonify({
                 'status': 'success',
-                'scenarios': scenarios
+                'scenarios': TEST_SCENARIOS
             })
         
         @self.app.route('/api/load_scenario/<scenario_name>', methods=['POST'])
         def load_scenario(scenario_name: str):
             """Load a predefined test scenario"""
             try:
-                # Get scenarios
-                scenarios_response = get_test_scenarios()
-                scenarios_data = scenarios_response.get_json()
-                
-                if scenario_name not in scenarios_data['scenarios']:
+                if scenario_name not in self.scenario_changes:
                     return jsonify({'status': 'error', 'message': f'Scenario {scenario_name} not found'}), 404
                 
-                scenario = scenarios_data['scenarios'][scenario_name]
-                
-                # Load data
-                if 'data' in scenario:
-                    for key, value in scenario['data'].items():
-                        if hasattr(self.current_data, key):
-                            setattr(self.current_data, key, value)
-                
-                # Load status words
-                if 'status_words' in scenario:
-                    status_words = scenario['status_words']
-                    
-                    if 'status_word_1' in status_words:
-                        self.current_data.status_word_1 = StatusWordBuilder.build_status_word_1(**status_words['status_word_1'])
-                    
-                    if 'status_word_2' in status_words:
-                        self.current_data.status_word_2 = StatusWordBuilder.build_status_word_2(**status_words['status_word_2'])
-                    
-                    if 'status_word_3' in status_words:
-                        self.current_data.status_word_3 = StatusWordBuilder.build_status_word_3(**status_words['status_word_3'])
-                
-                # Update metadata
-                self.current_data.timestamp = time.time()
-                self.current_data.message_counter = self.message_counter
-                self.message_counter += 1
+                # Load data and status words as one update, with new metadata
+                updated = self.update_data(self.scenario_changes[scenario_name])
                 
                 return jsonify({
                     'status': 'success',
                     'message': f'Scenario {scenario_name} loaded successfully',
-                    'data': asdict(self.current_data)
+                    'data': asdict(updated)
                 })
                 
             except Exception as e:
@@ -648,6 +1127,58 @@ API_DOCUMENTATION_TEMPLATE = """
         <p>Stop serial transmission</p>
     </div>
     
+    <div class="endpoint">
+        <div class="method">POST</div>
+        <div class="url">/api/stream</div>
+        <p>Stream the current data at a fixed rate; updates take effect on the next frame and the Status Word 1 counter rolls over 0-3</p>
+        <pre>{
+  "rate_hz": 200
+}</pre>
+    </div>
+    
+    <div class="endpoint">
+        <div class="method">GET</div>
+        <div class="url">/api/stream</div>
+        <p>Get the configured and achieved rate, skipped frames and jitter of the stream</p>
+    </div>
+    
+    <div class="endpoint">
+        <div class="method">DELETE</div>
+        <div class="url">/api/stream</div>
+        <p>Stop streaming</p>
+    </div>
+    
+    <div class="endpoint">
+        <div class="method">GET</div>
+        <div class="url">/api/timelines</div>
+        <p>List scenario timeline files (scenarios/*.json, *.npz) and the playback state</p>
+    </div>
+    
+    <div class="endpoint">
+        <div class="method">POST</div>
+        <div class="url">/api/timelines/{timeline_name}/load</div>
+        <p>Compile a timeline into pre-encoded frames and stream it at its rate</p>
+        <pre>{
+  "position_s": 0.0,
+  "stream": true
+}</pre>
+    </div>
+    
+    <div class="endpoint">
+        <div class="method">POST</div>
+        <div class="url">/api/timelines/scrub</div>
+        <p>Move the playhead of the playing timeline</p>
+        <pre>{
+  "position_s": 2.5
+}</pre>
+    </div>
+    
+    <div class="endpoint">
+        <div class="method">DELETE</div>
+        <div class="url">/api/timelines/playback</div>
+        <p>Stop timeline playback and stream the current data again</p>
+    </div>
+    
     <div class="endpoint">
         <div class="method">GET</div>
         <div class="url">/api/test_scenarios</div>
@@ -678,12 +1209,15 @@ def main():
     parser.add_argument('--port', type=int, default=5000, help='API port')
     parser.add_argument('--serial-port', default='/dev/ttyUSB0', help='Serial port for transmission')
     parser.add_argument('--serial-baud', type=int, default=115200, help='Serial baud rate')
+    parser.add_argument('--stream-rate', type=float, help='Start streaming at this rate (Hz), e.g. 100, 200 or 400')
     parser.add_argument('--debug', action='store_true', help='Enable debug mode')
     
     args = parser.parse_args()
     
     # Create and run test generator
     generator = RateSensorTestGenerator(args.serial_port, args.serial_baud)
+    if args.stream_rate and not generator.start_streaming(args.stream_rate):
+        logger.error(f"Could not start streaming on {args.serial_port}")
     
     try:
         generator.run(args.host, args.port, args.debug)
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Reaction Wheel Command Responder
+
+The reaction wheel assembly (ICD64020011) is command/response: the flight
+computer sends an opcode to a wheel address on the RS485 bus and the wheel
+answers with the matching telemetry message. Commands and replies share one
+frame layout, with the CRC the XOR of every byte after the address:
+
+    [ADR][OC][DAT...][CRC]
+
+In responder mode the simulator listens on the bus for one or more wheel
+addresses and answers Health & Status (0x15), Speed (0x16) and Current (0x17)
+requests. Replies are pre-encoded whenever a new MATLAB frame arrives; the
+CRC does not cover the address, so one encoding serves every address with
+only the first byte swapped, and answering a command is a dictionary lookup.
+
+The reply goes out a configurable turnaround time after the command's last
+byte arrived. The time from command arrival to the end of the reply write is
+recorded per address and overall in latency histograms and as the
+"reaction_wheel_command_response" performance component. Commands for other
+addresses on the bus are ignored; commands with an unknown opcode or a bad
+CRC, and partial frames followed by a silent gap, are dropped and counted as
+malformed. Temperature (0x18) requests are valid but have no telemetry
+encoder, so they are counted as unanswered.
+"""
+
+import time
+import threading
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from device_encoders.reaction_wheel_encoder import ReactionWheelEncoder, RWATelemetryType
+from performance_monitor import LatencyHistogram, performance_monitor
+from latency_tracer import emission_tracer
+
+logger = logging.getLogger(__name__)
+
+FRAME_GAP = 0.05  # Seconds of silence after which a partial command is discarded
+
+# Command data length per opcode; the telemetry requests carry no data
+COMMAND_DATA_LENGTHS = {
+    RWATelemetryType.HEALTH_STATUS.value: 0,
+    RWATelemetryType.SPEED_TELEMETRY.value: 0,
+    RWATelemetryType.CURRENT_TELEMETRY.value: 0,
+    RWATelemetryType.TEMPERATURE_TELEMETRY.value: 0,
+}
+MIN_COMMAND_SIZE = 3  # ADR, OC, CRC
+
+def xor_crc(data: bytes) -> int:
+    """CRC per ICD64020011: bitwise XOR of the bytes"""
+    crc = 0
+    for byte in data:
+        crc ^= byte
+    return crc
+
+@dataclass
+class RWCommand:
+    """A decoded command from the flight computer"""
+    address: int
+    opcode: int
+    data: bytes
+    arrival_ns: int  # perf_counter_ns when its last byte was read
+
+def decode_command(message: bytes, arrival_ns: int = 0) -> Optional[RWCommand]:
+    """Decode one complete command; None if its opcode, length or CRC is wrong"""
+    if len(message) < MIN_COMMAND_SIZE:
+        return None
+    data_length = COMMAND_DATA_LENGTHS.get(message[1])
+    if data_length is None or len(message) != MIN_COMMAND_SIZE + data_length:
+        return None
+    if xor_crc(message[1:-1]) != message[-1]:
+        return None
+    return RWCommand(message[0], message[1], bytes(message[2:-1]), arrival_ns)
+
+class CommandFramer:
+    """Splits an RS485 byte stream into commands, resynchronizing on bad bytes"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.last_byte_time = 0.0
+        self.malformed = 0
+
+    def feed(self, data: bytes, arrival_ns: int) -> List[RWCommand]:
+        """Add received bytes and return the commands they complete"""
+        now = time.monotonic()
+        if self.buffer and data and now - self.last_byte_time > FRAME_GAP:
+            # A partial command followed by silence never completes
+            self.buffer.clear()
+            self.malformed += 1
+        if data:
+            self.buffer += data
+            self.last_byte_time = now
+
+        commands = []
+        while len(self.buffer) >= MIN_COMMAND_SIZE:
+            data_length = COMMAND_DATA_LENGTHS.get(self.buffer[1])
+            if data_length is None:
+                self._resync()
+                continue
+            size = MIN_COMMAND_SIZE + data_length
+            if len(self.buffer) < size:
+                break
+            command = decode_command(self.buffer[:size], arrival_ns)
+            if command is None:
+                self._resync()
+                continue
+            commands.append(command)
+            del self.buffer[:size]
+        return commands
+
+    def expire(self):
+        """Drop a partial command that has been silent for longer than the frame gap"""
+        if self.buffer and time.monotonic() - self.last_byte_time > FRAME_GAP:
+            self.buffer.clear()
+            self.malformed += 1
+
+    def _resync(self):
+        del self.buffer[:1]
+        self.malformed += 1
+
+@dataclass
+class RWResponderConfig:
+    """Reaction wheel responder configuration"""
+    port: str = "/dev/ttyUSB2"  # Serial port or pyserial URL (e.g. pty://reaction_wheel)
+    baud_rate: int = 115200
+    addresses: List[int] = field(default_factory=lambda: [0x01])  # Wheel addresses answered on this bus
+    turnaround_ms: float = 1.0  # Delay from the end of a command to the start of its reply
+
+class ReactionWheelResponder:
+    """Answers reaction wheel telemetry commands from replies pre-encoded per MATLAB frame"""
+
+    def __init__(self, config: RWResponderConfig, device_name: str = "reaction_wheel"):
+        self.config = config
+        self.device_name = device_name
+        self.encoder = ReactionWheelEncoder()
+        self.turnaround_ns = int(config.turnaround_ms * 1e6)
+        # Address -> {opcode: reply}; each address's dict is replaced as a whole on update
+        self.replies: Dict[int, Dict[int, bytes]] = {address: {} for address in config.addresses}
+        self.ingest_ns: Dict[int, Optional[Tuple[int, int]]] = {address: None for address in config.addresses}
+        self.response_latency = LatencyHistogram()
+        self.address_latency = {address: LatencyHistogram() for address in config.addresses}
+        self.address_stats = {address: {'commands': 0, 'replies': 0} for address in config.addresses}
+        self.framer = CommandFramer()
+        self.stats = {
+            'frames_encoded': 0,
+            'commands': 0,
+            'replies': 0,
+            'unanswered': 0,  # Valid commands with no reply yet (no MATLAB frame) or no reply defined
+            'other_address': 0,  # Well-formed commands for wheels this responder does not serve
+            'malformed': 0
+        }
+        self.link = None
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+
+    def serve(self, addresses: List[int]):
+        """Answer commands for more wheel addresses on this bus"""
+        for address in addresses:
+            if address in self.replies:
+                continue
+            self.config.addresses.append(address)
+            self.replies[address] = {}
+            self.ingest_ns[address] = None
+            self.address_latency[address] = LatencyHistogram()
+            self.address_stats[address] = {'commands': 0, 'replies': 0}
+
+    def update(self, matlab_data: List[float], ingest_ns: Optional[Tuple[int, int]] = None,
+               addresses: Optional[List[int]] = None) -> bool:
+        """Pre-encode the replies for a new MATLAB frame, for the given addresses or all of them"""
+        packet = self.encoder.convert_matlab_data(matlab_data)
+        if packet is None:
+            return False
+        encoded = {
+            RWATelemetryType.HEALTH_STATUS.value: self.encoder.encode_health_status(packet),
+            RWATelemetryType.SPEED_TELEMETRY.value: self.encoder.encode_speed_telemetry(packet),
+            RWATelemetryType.CURRENT_TELEMETRY.value: self.encoder.encode_current_telemetry(packet),
+        }
+        for wheel_address in self.config.addresses if addresses is None else addresses:
+            if wheel_address not in self.replies:
+                continue
+            # The CRC skips the address byte, so only that byte differs between wheels
+            prefix = bytes([wheel_address])
+            self.replies[wheel_address] = {opcode: prefix + reply[1:] for opcode, reply in encoded.items()}
+            self.ingest_ns[wheel_address] = ingest_ns
+        self.stats['frames_encoded'] += 1
+        return True
+
+    def reply_for(self, command: RWCommand) -> Optional[bytes]:
+        """Reply bytes for a command, or None if it takes no reply"""
+        replies = self.replies.get(command.address)
+        return replies.get(command.opcode) if replies else None
+
+    def start(self) -> bool:
+        """Open the RS485 link and start answering commands"""
+        try:
+            import serial
+            try:
+                import output_transmitters.protocol_pty  # noqa: F401  Registers pty:// ports
+            except ImportError:
+                pass
+            self.link = serial.serial_for_url(self.config.port, baudrate=self.config.baud_rate,
+                                              timeout=FRAME_GAP / 5)
+        except Exception as e:
+            logger.error(f"Failed to open {self.device_name} responder link: {e}")
+            return False
+
+        self.running = True
+        self.thread = threading.Thread(target=self._serial_loop, daemon=True)
+        self.thread.start()
+        addresses = ", ".join(f"0x{address:02X}" for address in self.config.addresses)
+        logger.info(f"{self.device_name} responder answering {addresses} on {self.config.port}")
+        return True
+
+    def stop(self):
+        """Stop answering and close the link"""
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=2.0)
+        if self.link is not None:
+            try:
+                self.link.close()
+            except Exception:
+                pass
+            self.link = None
+
+    def _handle(self, command: RWCommand):
+        if command.address not in self.replies:
+            self.stats['other_address'] += 1
+            return
+        self.stats['commands'] += 1
+        self.address_stats[command.address]['commands'] += 1
+        reply = self.reply_for(command)
+        if reply is None:
+            self.stats['unanswered'] += 1
+            return
+
+        delay = (command.arrival_ns + self.turnaround_ns - time.perf_counter_ns()) / 1e9
+        if delay > 0:
+            time.sleep(delay)
+        self.link.write(reply)
+
+        latency_ns = time.perf_counter_ns() - command.arrival_ns
+        self.response_latency.record(latency_ns)
+        self.address_latency[command.address].record(latency_ns)
+        performance_monitor.record(f"{self.device_name}_command_response", latency_ns)
+        emission_tracer.record_emission(self.device_name, self.ingest_ns[command.address], 0, len(reply))
+        self.stats['replies'] += 1
+        self.address_stats[command.address]['replies'] += 1
+
+    def _serial_loop(self):
+        """Read commands from the RS485 bus and answer them in order"""
+        while self.running:
+            try:
+                data = self.link.read(max(1, self.link.in_waiting))
+                arrival_ns = time.perf_counter_ns()
+                commands = self.framer.feed(data, arrival_ns) if data else []
+                if not data:
+                    self.framer.expire()
+                self.stats['malformed'] = self.framer.malformed
+                for command in commands:
+                    self._handle(command)
+            except Exception as e:
+                if not self.running:
+                    break
+                logger.error(f"Error in {self.device_name} responder: {e}")
+                time.sleep(0.1)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Command counts and reply latency percentiles, overall and per wheel address"""
+        status = dict(self.stats)
+        status['turnaround_ms'] = self.config.turnaround_ms
+        status['response_latency'] = self.response_latency.summary()
+        status['addresses'] = {
+            f"0x{address:02X}": dict(self.address_stats[address],
+                                     response_latency=self.address_latency[address].summary())
+            for address in self.config.addresses
+        }
+        return status
+
+def main():
+    """Run a standalone responder fed with fixed wheel telemetry"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Reaction Wheel Command Responder')
+    parser.add_argument('--port', default='/dev/ttyUSB2', help='Serial port or pty://name')
+    parser.add_argument('--baud', type=int, default=115200, help='Baud rate')
+    parser.add_argument('--addresses', type=lambda value: int(value, 0), nargs='+', default=[0x01],
+                        help='Wheel addresses to answer (e.g. 0x01 0x02)')
+    parser.add_argument('--turnaround-ms', type=float, default=1.0, help='Reply turnaround in ms')
+    parser.add_argument('--telemetry', type=float, nargs=4, default=[1500.0, 2.5, 35.0, 28.5],
+                        metavar=('SPEED', 'CURRENT', 'TEMP', 'VOLTAGE'), help='Wheel telemetry to report')
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds to run')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    responder = ReactionWheelResponder(RWResponderConfig(
+        port=args.port, baud_rate=args.baud, addresses=args.addresses, turnaround_ms=args.turnaround_ms))
+    responder.update(args.telemetry)
+    if not responder.start():
+        return
+    try:
+        time.sleep(args.duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        responder.stop()
+    status = responder.get_status()
+    latency = status['response_latency']
+    print(f"🛞 {status['commands']} commands, {status['replies']} replies, {status['malformed']} malformed")
+    print(f"⏱️  Reply latency p50 {latency['p50_ms']:.3f}ms, p99 {latency['p99_ms']:.3f}ms, max {latency['max_ms']:.3f}ms")
+
+if __name__ == '__main__':
+    main()
@@ -2,88 +2,109 @@
 """
 Realistic Satellite Movement Visualization
 Shows actual satellite model with realistic 3D orientation changes
-Uses ports 50038=x, 50039=y, 50040=z for satellite attitude
+Attitude is propagated as quaternions from the ARS rates (prime ports
+50038-50040 or redundant 50041-50043); the legacy Euler mode treats ports
+50038=x, 50039=y, 50040=z as roll/pitch/yaw scaled x100 for visibility
 """
 
-import re
 import numpy as np
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
 import matplotlib.animation as animation
-from datetime import datetime
 import argparse
 from collections import defaultdict
 import struct
 from matplotlib.patches import FancyBboxPatch
 from mpl_toolkits.mplot3d.art3d import Poly3DCollection
 
+from capture_store import load_capture, format_timestamp_ns, NS_PER_SECOND
+from parallel_render import render_parallel
+from attitude_propagator import load_ars_channel, propagate_attitude, quaternion_to_euler, quaternion_to_rotation_matrix
+
+# Faces of each satellite part as indices into its vertex array
+MODEL_FACES = {
+    'body': [
+        [0, 1, 2, 3],  # Bottom
+        [4, 5, 6, 7],  # Top
+        [0, 1, 5, 4],  # Front
+        [2, 3, 7, 6],  # Back
+        [0, 3, 7, 4],  # Left
+        [1, 2, 6, 5]   # Right
+    ],
+    'panel1': [[0, 1, 2, 3]],
+    'panel2': [[0, 1, 2, 3]],
+    'antenna': [[0, 1, 2, 3]]
+}
+
+PART_STYLES = {
+    'body': {'alpha': 0.8, 'facecolor': 'lightgray'},
+    'panel1': {'alpha': 0.9, 'facecolor': 'darkblue'},
+    'panel2': {'alpha': 0.9, 'facecolor': 'darkblue'},
+    'antenna': {'alpha': 0.9, 'facecolor': 'red'}
+}
+
 class RealisticSatelliteVisualizer:
-    def __init__(self, input_file):
+    def __init__(self, input_file, attitude_source='rates', channel='prime'):
         self.input_file = input_file
-        self.x_data = []  # Port 50038 - Roll
-        self.y_data = []  # Port 50039 - Pitch  
-        self.z_data = []  # Port 50040 - Yaw
+        self.attitude_source = attitude_source  # 'rates' (propagated) or 'euler' (legacy)
+        self.channel = channel  # ARS channel for 'rates': prime or redundant
+        self.x_data = []  # Roll
+        self.y_data = []  # Pitch  
+        self.z_data = []  # Yaw
         self.timestamps = []
+        self.quaternions = None  # Propagated attitude, N x 4
         
     def parse_data(self):
-        """Parse the .dmp file and extract x, y, z coordinates"""
-        print(f"Parsing data from {self.input_file}...")
-        
-        with open(self.input_file, 'r') as f:
-            for line_num, line in enumerate(f, 1):
-                if line.strip().startswith('📊'):  # Skip summary lines
-                    continue
-                    
-                parsed = self.parse_line(line)
-                if parsed:
-                    port, timestamp, hex_data, float_value = parsed
-                    
-                    if port == 50038:  # Roll (X-axis rotation)
-                        self.x_data.append(float_value)
-                        self.timestamps.append(timestamp)
-                    elif port == 50039:  # Pitch (Y-axis rotation)
-                        self.y_data.append(float_value)
-                    elif port == 50040:  # Yaw (Z-axis rotation)
-                        self.z_data.append(float_value)
-                
-                if line_num % 1000 == 0:
-                    print(f"Processed {line_num} lines...")
+        """Load the attitude samples from the capture's columnar store"""
+        print(f"Loading data from {self.input_file}...")
+        
+        if self.attitude_source == 'rates':
+            self._propagate_from_rates()
+            return
+        
+        store = load_capture(self.input_file, verbose=True)
+        missing_ports = [port for port in (50038, 50039, 50040) if port not in store]
+        if missing_ports:
+            print(f"Ports {missing_ports} not present in capture")
+            return
+        
+        timestamps, roll = store.port(50038)    # Roll (X-axis rotation)
+        pitch = store.values(50039)             # Pitch (Y-axis rotation)
+        yaw = store.values(50040)               # Yaw (Z-axis rotation)
         
         # Ensure all arrays have the same length
-        min_length = min(len(self.x_data), len(self.y_data), len(self.z_data))
-        self.x_data = self.x_data[:min_length]
-        self.y_data = self.y_data[:min_length]
-        self.z_data = self.z_data[:min_length]
-        self.timestamps = self.timestamps[:min_length]
+        min_length = min(len(roll), len(pitch), len(yaw))
+        self.x_data = roll[:min_length]
+        self.y_data = pitch[:min_length]
+        self.z_data = yaw[:min_length]
+        self.timestamps = timestamps[:min_length]
         
         print(f"Extracted {min_length} attitude data points")
-        print(f"Roll (X) range: {min(self.x_data):.6f} to {max(self.x_data):.6f} rad")
-        print(f"Pitch (Y) range: {min(self.y_data):.6f} to {max(self.y_data):.6f} rad")
-        print(f"Yaw (Z) range: {min(self.z_data):.6f} to {max(self.z_data):.6f} rad")
+        if min_length:
+            print(f"Roll (X) range: {self.x_data.min():.6f} to {self.x_data.max():.6f} rad")
+            print(f"Pitch (Y) range: {self.y_data.min():.6f} to {self.y_data.max():.6f} rad")
+            print(f"Yaw (Z) range: {self.z_data.min():.6f} to {self.z_data.max():.6f} rad")
     
-    def parse_line(self, line):
-        """Parse a data line and extract port, timestamp, hex data, and float value"""
-        # Pattern: PORT:HH:MM:SS.mmm: HEX_DATA    ASCII_DATA    = FLOAT_VALUE
-        pattern = r'^(\d+):(\d{2}):(\d{2}):(\d{2})\.(\d{3}):\s+([0-9A-F\s]+)\s+.*?=\s+([+-]?[\d.]+(?:[eE][+-]?\d+)?)'
-        match = re.match(pattern, line.strip())
-        
-        if not match:
-            return None
-            
-        port = int(match.group(1))
-        hour = int(match.group(2))
-        minute = int(match.group(3))
-        second = int(match.group(4))
-        millisecond = int(match.group(5))
-        hex_data = match.group(6)
-        float_value = float(match.group(7))
-        
-        # Create timestamp
-        timestamp = datetime.now().replace(
-            hour=hour, minute=minute, second=second, microsecond=millisecond * 1000
-        )
-        
-        return port, timestamp, hex_data, float_value
+    def _propagate_from_rates(self):
+        """Propagate quaternion attitude from the ARS rates using the capture timestamps"""
+        try:
+            timestamps, rates, _ = load_ars_channel(self.input_file, self.channel)
+        except ValueError as e:
+            print(e)
+            return
+        
+        self.quaternions = propagate_attitude(timestamps, rates)
+        euler = quaternion_to_euler(self.quaternions)
+        self.x_data = euler[:, 0]
+        self.y_data = euler[:, 1]
+        self.z_data = euler[:, 2]
+        self.timestamps = timestamps
+        
+        print(f"Propagated {len(timestamps)} {self.channel} ARS rate samples")
+        if len(timestamps):
+            print(f"Roll (X) range: {self.x_data.min():.6f} to {self.x_data.max():.6f} rad")
+            print(f"Pitch (Y) range: {self.y_data.min():.6f} to {self.y_data.max():.6f} rad")
+            print(f"Yaw (Z) range: {self.z_data.min():.6f} to {self.z_data.max():.6f} rad")
     
     def create_satellite_model(self):
         """Create a realistic satellite 3D model"""
@@ -114,57 +135,92 @@ class RealisticSatelliteVisualizer:
             'antenna': antenna_vertices
         }
     
+    def rotation_matrices(self, roll, pitch, yaw):
+        """Build the Rz @ Ry @ Rx rotation matrix for every sample in one pass (N x 3 x 3)"""
+        roll = np.asarray(roll, dtype=np.float64)
+        pitch = np.asarray(pitch, dtype=np.float64)
+        yaw = np.asarray(yaw, dtype=np.float64)
+        
+        cr, sr = np.cos(roll), np.sin(roll)
+        cp, sp = np.cos(pitch), np.sin(pitch)
+        cy, sy = np.cos(yaw), np.sin(yaw)
+        
+        R = np.empty(roll.shape + (3, 3))
+        R[..., 0, 0] = cy * cp
+        R[..., 0, 1] = cy * sp * sr - sy * cr
+        R[..., 0, 2] = cy * sp * cr + sy * sr
+        R[..., 1, 0] = sy * cp
+        R[..., 1, 1] = sy * sp * sr + cy * cr
+        R[..., 1, 2] = sy * sp * cr - cy * sr
+        R[..., 2, 0] = -sp
+        R[..., 2, 1] = cp * sr
+        R[..., 2, 2] = cp * cr
+        return R
+    
     def apply_rotation(self, vertices, roll, pitch, yaw):
         """Apply roll, pitch, yaw rotations to vertices"""
-        # Convert to radians if needed (assuming input is already in radians)
-        roll_rad = roll
-        pitch_rad = pitch
-        yaw_rad = yaw
-        
-        # Rotation matrices
-        Rx = np.array([
-            [1, 0, 0],
-            [0, np.cos(roll_rad), -np.sin(roll_rad)],
-            [0, np.sin(roll_rad), np.cos(roll_rad)]
-        ])
-        
-        Ry = np.array([
-            [np.cos(pitch_rad), 0, np.sin(pitch_rad)],
-            [0, 1, 0],
-            [-np.sin(pitch_rad), 0, np.cos(pitch_rad)]
-        ])
-        
-        Rz = np.array([
-            [np.cos(yaw_rad), -np.sin(yaw_rad), 0],
-            [np.sin(yaw_rad), np.cos(yaw_rad), 0],
-            [0, 0, 1]
-        ])
-        
-        # Combined rotation matrix
-        R = Rz @ Ry @ Rx
-        
-        # Apply rotation to all vertices
-        rotated_vertices = vertices @ R.T
-        return rotated_vertices
+        R = self.rotation_matrices(roll, pitch, yaw)
+        return vertices @ R.T
     
-    def create_animation(self, output_file="realistic_satellite_movement.mp4", fps=30):
-        """Create animated 3D visualization of realistic satellite movement"""
-        print(f"Creating realistic satellite animation: {output_file}")
+    def frame_indices(self, fps=30, decimate=False, playback_speed=1.0):
+        """
+        Select the capture sample shown in each video frame
+        
+        Without decimation every sample becomes a frame. With decimation the
+        capture is sampled at the output frame rate, so the video plays in
+        real time (scaled by playback_speed) whatever the capture rate is.
+        """
+        sample_count = len(self.x_data)
+        if not decimate or sample_count < 2:
+            return np.arange(sample_count)
+        
+        # Captures crossing midnight are already unwrapped by the capture store
+        timestamps = np.maximum.accumulate(np.asarray(self.timestamps, dtype=np.int64))
+        frame_interval_ns = NS_PER_SECOND * playback_speed / fps
+        frame_count = int((timestamps[-1] - timestamps[0]) // frame_interval_ns) + 1
+        frame_times = timestamps[0] + np.arange(frame_count) * frame_interval_ns
+        
+        # Latest sample at or before each frame time
+        return np.searchsorted(timestamps, frame_times, side='right') - 1
+    
+    def transform_model(self, rotations):
+        """Rotate every model face for every frame up front (part -> frames x faces x 4 x 3)"""
+        satellite_model = self.create_satellite_model()
+        transformed = {}
+        for part, vertices in satellite_model.items():
+            rotated = np.einsum('nij,vj->nvi', rotations, vertices)
+            transformed[part] = rotated[:, MODEL_FACES[part]]
+        return transformed
+    
+    def prepare_frames(self, fps=30, decimate=False, playback_speed=1.0):
+        """Precompute sample indices, attitudes and transformed model faces for all frames"""
+        indices = self.frame_indices(fps, decimate, playback_speed)
+        
+        if self.quaternions is not None:
+            quaternions = self.quaternions[indices]
+            return {
+                'timestamps': np.asarray(self.timestamps)[indices],
+                'attitude_deg': np.degrees(quaternion_to_euler(quaternions)),
+                'faces': self.transform_model(quaternion_to_rotation_matrix(quaternions)),
+            }
+        
+        # Legacy Euler mode: scale the rotations for better visualization (multiply by 100 for visibility)
+        roll = np.asarray(self.x_data)[indices] * 100
+        pitch = np.asarray(self.y_data)[indices] * 100
+        yaw = np.asarray(self.z_data)[indices] * 100
         
+        return {
+            'timestamps': np.asarray(self.timestamps)[indices],
+            'attitude_deg': np.degrees(np.column_stack((roll, pitch, yaw))),
+            'faces': self.transform_model(self.rotation_matrices(roll, pitch, yaw)),
+        }
+    
+    def setup_figure(self):
+        """Create the figure, axes and one persistent collection per satellite part"""
         # Set up the figure and 3D axis
         fig = plt.figure(figsize=(15, 12))
         ax = fig.add_subplot(111, projection='3d')
         
-        # Convert to numpy arrays
-        roll_data = np.array(self.x_data)
-        pitch_data = np.array(self.y_data)
-        yaw_data = np.array(self.z_data)
-        
-        # Scale the rotations for better visualization (multiply by 100 for visibility)
-        roll_data *= 100
-        pitch_data *= 100
-        yaw_data *= 100
-        
         # Set axis limits
         ax.set_xlim(-2, 2)
         ax.set_ylim(-2, 2)
@@ -176,15 +232,6 @@ class RealisticSatelliteVisualizer:
         ax.set_zlabel('Z Axis (Yaw)', fontsize=12)
         ax.set_title('Realistic Satellite Attitude Control', fontsize=14, fontweight='bold')
         
-        # Create satellite model
-        satellite_model = self.create_satellite_model()
-        
-        # Initialize plot elements
-        body_poly = None
-        panel1_poly = None
-        panel2_poly = None
-        antenna_poly = None
-        
         # Add coordinate system reference
         ax.quiver(0, 0, 0, 1.5, 0, 0, color='red', alpha=0.7, linewidth=2, label='X (Roll)')
         ax.quiver(0, 0, 0, 0, 1.5, 0, color='green', alpha=0.7, linewidth=2, label='Y (Pitch)')
@@ -193,77 +240,54 @@ class RealisticSatelliteVisualizer:
         # Add legend
         ax.legend()
         
+        # Satellite components, updated in place on every frame
+        polys = {}
+        for part, style in PART_STYLES.items():
+            polys[part] = Poly3DCollection([], edgecolor='black', linewidth=1, **style)
+            ax.add_collection3d(polys[part])
+        
+        return fig, ax, polys
+    
+    def draw_frame(self, ax, polys, frames, frame):
+        """Update the persistent artists with one precomputed frame"""
+        for part, poly in polys.items():
+            poly.set_verts(frames['faces'][part][frame])
+        
+        # Update title with attitude information
+        timestamp_str = format_timestamp_ns(frames['timestamps'][frame])
+        roll_deg, pitch_deg, yaw_deg = frames['attitude_deg'][frame]
+        ax.set_title(f'Realistic Satellite Attitude Control\n{timestamp_str}\n'
+                   f'Roll: {roll_deg:.2f}° | Pitch: {pitch_deg:.2f}° | Yaw: {yaw_deg:.2f}°', 
+                   fontsize=12, fontweight='bold')
+        
+        return tuple(polys.values())
+    
+    def create_animation(self, output_file="realistic_satellite_movement.mp4", fps=30, decimate=False, playback_speed=1.0,
+                         parallel=False, workers=None):
+        """Create animated 3D visualization of realistic satellite movement"""
+        print(f"Creating realistic satellite animation: {output_file}")
+        
+        if parallel:
+            render_parallel(self, output_file, fps=fps, bitrate=2000, workers=workers,
+                            frame_kwargs={'fps': fps, 'decimate': decimate, 'playback_speed': playback_speed})
+            print(f"Realistic satellite animation saved as {output_file}")
+            return None
+        
+        # Rotations and model vertices for all frames in one vectorized pass
+        frames = self.prepare_frames(fps, decimate, playback_speed)
+        frame_count = len(frames['timestamps'])
+        if decimate:
+            print(f"Decimated {len(self.x_data)} samples to {frame_count} frames at {fps} fps")
+        
+        fig, ax, polys = self.setup_figure()
+        
         def animate(frame):
             """Animation function"""
-            nonlocal body_poly, panel1_poly, panel2_poly, antenna_poly
-            
-            if frame >= len(roll_data):
-                return
-            
-            # Clear previous satellite
-            if body_poly:
-                body_poly.remove()
-            if panel1_poly:
-                panel1_poly.remove()
-            if panel2_poly:
-                panel2_poly.remove()
-            if antenna_poly:
-                antenna_poly.remove()
-            
-            # Get current attitude
-            current_roll = roll_data[frame]
-            current_pitch = pitch_data[frame]
-            current_yaw = yaw_data[frame]
-            
-            # Apply rotations to satellite components
-            rotated_body = self.apply_rotation(satellite_model['body'], current_roll, current_pitch, current_yaw)
-            rotated_panel1 = self.apply_rotation(satellite_model['panel1'], current_roll, current_pitch, current_yaw)
-            rotated_panel2 = self.apply_rotation(satellite_model['panel2'], current_roll, current_pitch, current_yaw)
-            rotated_antenna = self.apply_rotation(satellite_model['antenna'], current_roll, current_pitch, current_yaw)
-            
-            # Create faces for the satellite body
-            body_faces = [
-                [rotated_body[0], rotated_body[1], rotated_body[2], rotated_body[3]],  # Bottom
-                [rotated_body[4], rotated_body[5], rotated_body[6], rotated_body[7]],  # Top
-                [rotated_body[0], rotated_body[1], rotated_body[5], rotated_body[4]],  # Front
-                [rotated_body[2], rotated_body[3], rotated_body[7], rotated_body[6]],  # Back
-                [rotated_body[0], rotated_body[3], rotated_body[7], rotated_body[4]],  # Left
-                [rotated_body[1], rotated_body[2], rotated_body[6], rotated_body[5]]   # Right
-            ]
-            
-            # Draw satellite components
-            body_poly = Poly3DCollection(body_faces, alpha=0.8, facecolor='lightgray', edgecolor='black', linewidth=1)
-            ax.add_collection3d(body_poly)
-            
-            # Draw solar panels
-            panel1_faces = [[rotated_panel1[0], rotated_panel1[1], rotated_panel1[2], rotated_panel1[3]]]
-            panel1_poly = Poly3DCollection(panel1_faces, alpha=0.9, facecolor='darkblue', edgecolor='black', linewidth=1)
-            ax.add_collection3d(panel1_poly)
-            
-            panel2_faces = [[rotated_panel2[0], rotated_panel2[1], rotated_panel2[2], rotated_panel2[3]]]
-            panel2_poly = Poly3DCollection(panel2_faces, alpha=0.9, facecolor='darkblue', edgecolor='black', linewidth=1)
-            ax.add_collection3d(panel2_poly)
-            
-            # Draw antenna
-            antenna_faces = [[rotated_antenna[0], rotated_antenna[1], rotated_antenna[2], rotated_antenna[3]]]
-            antenna_poly = Poly3DCollection(antenna_faces, alpha=0.9, facecolor='red', edgecolor='black', linewidth=1)
-            ax.add_collection3d(antenna_poly)
-            
-            # Update title with attitude information
-            if frame < len(self.timestamps):
-                timestamp_str = self.timestamps[frame].strftime("%H:%M:%S.%f")[:-3]
-                roll_deg = np.degrees(current_roll)
-                pitch_deg = np.degrees(current_pitch)
-                yaw_deg = np.degrees(current_yaw)
-                ax.set_title(f'Realistic Satellite Attitude Control\n{timestamp_str}\n'
-                           f'Roll: {roll_deg:.2f}° | Pitch: {pitch_deg:.2f}° | Yaw: {yaw_deg:.2f}°', 
-                           fontsize=12, fontweight='bold')
-            
-            return body_poly, panel1_poly, panel2_poly, antenna_poly
+            return self.draw_frame(ax, polys, frames, frame)
         
         # Create animation
         anim = animation.FuncAnimation(
-            fig, animate, frames=len(roll_data), 
+            fig, animate, frames=frame_count, 
             interval=1000//fps, blit=False, repeat=True
         )
         
@@ -337,23 +361,35 @@ def main():
     parser.add_argument('input_file', help='Input .dmp file')
     parser.add_argument('--video', '-v', help='Output video file (default: realistic_satellite_movement.mp4)')
     parser.add_argument('--fps', type=int, default=30, help='Video FPS (default: 30)')
+    parser.add_argument('--parallel', action='store_true',
+                       help='Render frame chunks in a process pool and encode them with ffmpeg')
+    parser.add_argument('--workers', type=int, help='Worker processes for --parallel (default: CPU count)')
     parser.add_argument('--attitude', '-a', action='store_true', help='Create attitude analysis plots')
+    parser.add_argument('--decimate', '-d', action='store_true',
+                       help='Sample the capture at the output fps so the video plays in real time')
+    parser.add_argument('--speed', type=float, default=1.0,
+                       help='Playback speed multiplier when decimating (default: 1.0)')
+    parser.add_argument('--source', choices=['rates', 'euler'], default='rates',
+                       help='Attitude from propagated ARS rates or legacy x100 Euler ports (default: rates)')
+    parser.add_argument('--channel', choices=['prime', 'redundant'], default='prime',
+                       help='ARS channel to propagate (default: prime)')
     
     args = parser.parse_args()
     
     # Create visualizer
-    visualizer = RealisticSatelliteVisualizer(args.input_file)
+    visualizer = RealisticSatelliteVisualizer(args.input_file, attitude_source=args.source, channel=args.channel)
     
     # Parse data
     visualizer.parse_data()
     
-    if not visualizer.x_data:
-        print("No data found! Check that ports 50038, 50039, 50040 exist in the file.")
+    if len(visualizer.x_data) == 0:
+        print("No data found! Check that the ARS rate ports exist in the file.")
         return
     
     # Create visualizations
     output_video = args.video or "realistic_satellite_movement.mp4"
-    visualizer.create_animation(output_video, args.fps)
+    visualizer.create_animation(output_video, args.fps, decimate=args.decimate, playback_speed=args.speed,
+                                parallel=args.parallel, workers=args.workers)
     
     if args.attitude:
         visualizer.create_attitude_plot()
@@ -5,16 +5,17 @@ Creates a 3D video from TCP data dumper capture file
 Uses ports 50038=x, 50039=y, 50040=z for satellite position
 """
 
-import re
 import numpy as np
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
 import matplotlib.animation as animation
-from datetime import datetime
 import argparse
 from collections import defaultdict
 import struct
 
+from capture_store import load_capture, format_timestamp_ns
+from parallel_render import render_parallel
+
 class SatelliteVisualizer:
     def __init__(self, input_file):
         self.input_file = input_file
@@ -24,69 +25,49 @@ class SatelliteVisualizer:
         self.timestamps = []
         
     def parse_data(self):
-        """Parse the .dmp file and extract x, y, z coordinates"""
-        print(f"Parsing data from {self.input_file}...")
-        
-        with open(self.input_file, 'r') as f:
-            for line_num, line in enumerate(f, 1):
-                if line.strip().startswith('📊'):  # Skip summary lines
-                    continue
-                    
-                parsed = self.parse_line(line)
-                if parsed:
-                    port, timestamp, hex_data, float_value = parsed
-                    
-                    if port == 50038:  # X coordinate
-                        self.x_data.append(float_value)
-                        self.timestamps.append(timestamp)
-                    elif port == 50039:  # Y coordinate
-                        self.y_data.append(float_value)
-                    elif port == 50040:  # Z coordinate
-                        self.z_data.append(float_value)
-                
-                if line_num % 1000 == 0:
-                    print(f"Processed {line_num} lines...")
+        """Load x, y, z coordinates from the capture's columnar store"""
+        print(f"Loading data from {self.input_file}...")
+        
+        store = load_capture(self.input_file, verbose=True)
+        missing_ports = [port for port in (50038, 50039, 50040) if port not in store]
+        if missing_ports:
+            print(f"Ports {missing_ports} not present in capture")
+            return
+        
+        timestamps, x = store.port(50038)  # X coordinate
+        y = store.values(50039)            # Y coordinate
+        z = store.values(50040)            # Z coordinate
         
         # Ensure all arrays have the same length
-        min_length = min(len(self.x_data), len(self.y_data), len(self.z_data))
-        self.x_data = self.x_data[:min_length]
-        self.y_data = self.y_data[:min_length]
-        self.z_data = self.z_data[:min_length]
-        self.timestamps = self.timestamps[:min_length]
+        min_length = min(len(x), len(y), len(z))
+        self.x_data = x[:min_length]
+        self.y_data = y[:min_length]
+        self.z_data = z[:min_length]
+        self.timestamps = timestamps[:min_length]
         
         print(f"Extracted {min_length} data points")
-        print(f"X range: {min(self.x_data):.6f} to {max(self.x_data):.6f}")
-        print(f"Y range: {min(self.y_data):.6f} to {max(self.y_data):.6f}")
-        print(f"Z range: {min(self.z_data):.6f} to {max(self.z_data):.6f}")
+        if min_length:
+            print(f"X range: {self.x_data.min():.6f} to {self.x_data.max():.6f}")
+            print(f"Y range: {self.y_data.min():.6f} to {self.y_data.max():.6f}")
+            print(f"Z range: {self.z_data.min():.6f} to {self.z_data.max():.6f}")
     
-    def parse_line(self, line):
-        """Parse a data line and extract port, timestamp, hex data, and float value"""
-        # Pattern: PORT:HH:MM:SS.mmm: HEX_DATA    ASCII_DATA    = FLOAT_VALUE
-        pattern = r'^(\d+):(\d{2}):(\d{2}):(\d{2})\.(\d{3}):\s+([0-9A-F\s]+)\s+.*?=\s+([+-]?[\d.]+(?:[eE][+-]?\d+)?)'
-        match = re.match(pattern, line.strip())
-        
-        if not match:
-            return None
-            
-        port = int(match.group(1))
-        hour = int(match.group(2))
-        minute = int(match.group(3))
-        second = int(match.group(4))
-        millisecond = int(match.group(5))
-        hex_data = match.group(6)
-        float_value = float(match.group(7))
-        
-        # Create timestamp
-        timestamp = datetime.now().replace(
-            hour=hour, minute=minute, second=second, microsecond=millisecond * 1000
-        )
+    def prepare_frames(self):
+        """Collect the per-frame arrays the animation draws from"""
+        # Convert to numpy arrays
+        x = np.array(self.x_data)
+        y = np.array(self.y_data)
+        z = np.array(self.z_data)
         
-        return port, timestamp, hex_data, float_value
+        return {
+            'x': x,
+            'y': y,
+            'z': z,
+            'timestamps': np.asarray(self.timestamps)[:len(x)],
+            'trail_length': min(50, len(x) // 10)  # Show last 50 points or 10% of data
+        }
     
-    def create_animation(self, output_file="satellite_movement.mp4", fps=30):
-        """Create animated 3D visualization of satellite movement"""
-        print(f"Creating animation: {output_file}")
-        
+    def setup_figure(self):
+        """Create the figure, axes and trajectory artists"""
         # Set up the figure and 3D axis
         fig = plt.figure(figsize=(12, 10))
         ax = fig.add_subplot(111, projection='3d')
@@ -124,39 +105,49 @@ class SatelliteVisualizer:
         # Add legend
         ax.legend()
         
-        # Animation parameters
-        trail_length = min(50, len(x) // 10)  # Show last 50 points or 10% of data
+        return fig, ax, (line, point, trail)
+    
+    def draw_frame(self, ax, artists, frames, frame):
+        """Update the trajectory artists for one frame"""
+        line, point, trail = artists
+        x, y, z = frames['x'], frames['y'], frames['z']
+        
+        # Update trajectory line (from start to current)
+        line.set_data_3d(x[:frame+1], y[:frame+1], z[:frame+1])
+        
+        # Update current position point
+        point.set_data_3d([x[frame]], [y[frame]], [z[frame]])
+        
+        # Update trail (recent points)
+        start_idx = max(0, frame - frames['trail_length'])
+        trail.set_data_3d(x[start_idx:frame+1], y[start_idx:frame+1], z[start_idx:frame+1])
+        
+        # Update title with timestamp
+        if frame < len(frames['timestamps']):
+            timestamp_str = format_timestamp_ns(frames['timestamps'][frame])
+            ax.set_title(f'Satellite Movement - {timestamp_str}')
+        
+        return line, point, trail
+    
+    def create_animation(self, output_file="satellite_movement.mp4", fps=30, parallel=False, workers=None):
+        """Create animated 3D visualization of satellite movement"""
+        print(f"Creating animation: {output_file}")
+        
+        if parallel:
+            render_parallel(self, output_file, fps=fps, bitrate=1800, workers=workers)
+            print(f"Animation saved as {output_file}")
+            return None
+        
+        frames = self.prepare_frames()
+        fig, ax, artists = self.setup_figure()
         
         def animate(frame):
             """Animation function"""
-            if frame >= len(x):
-                return line, point, trail
-            
-            # Current position
-            current_x = x[frame]
-            current_y = y[frame]
-            current_z = z[frame]
-            
-            # Update trajectory line (from start to current)
-            line.set_data_3d(x[:frame+1], y[:frame+1], z[:frame+1])
-            
-            # Update current position point
-            point.set_data_3d([current_x], [current_y], [current_z])
-            
-            # Update trail (recent points)
-            start_idx = max(0, frame - trail_length)
-            trail.set_data_3d(x[start_idx:frame+1], y[start_idx:frame+1], z[start_idx:frame+1])
-            
-            # Update title with timestamp
-            if frame < len(self.timestamps):
-                timestamp_str = self.timestamps[frame].strftime("%H:%M:%S.%f")[:-3]
-                ax.set_title(f'Satellite Movement - {timestamp_str}')
-            
-            return line, point, trail
+            return self.draw_frame(ax, artists, frames, frame)
         
         # Create animation
         anim = animation.FuncAnimation(
-            fig, animate, frames=len(x), 
+            fig, animate, frames=len(frames['x']), 
             interval=1000//fps, blit=False, repeat=True
         )
         
@@ -263,6 +254,9 @@ def main():
     parser.add_argument('input_file', help='Input .dmp file')
     parser.add_argument('--video', '-v', help='Output video file (default: satellite_movement.mp4)')
     parser.add_argument('--fps', type=int, default=30, help='Video FPS (default: 30)')
+    parser.add_argument('--parallel', action='store_true',
+                       help='Render frame chunks in a process pool and encode them with ffmpeg')
+    parser.add_argument('--workers', type=int, help='Worker processes for --parallel (default: CPU count)')
     parser.add_argument('--static', '-s', help='Create static plot only')
     parser.add_argument('--projections', '-p', action='store_true', help='Create 2D projections')
     
@@ -274,7 +268,7 @@ def main():
     # Parse data
     visualizer.parse_data()
     
-    if not visualizer.x_data:
+    if len(visualizer.x_data) == 0:
         print("No data found! Check that ports 50038, 50039, 50040 exist in the file.")
         return
     
@@ -283,7 +277,7 @@ def main():
         visualizer.create_static_plot(args.static)
     else:
         output_video = args.video or "satellite_movement.mp4"
-        visualizer.create_animation(output_video, args.fps)
+        visualizer.create_animation(output_video, args.fps, parallel=args.parallel, workers=args.workers)
     
     if args.projections:
         visualizer.create_2d_projections()
@@ -3,128 +3,155 @@
 TCP Data Dumper Timestamp Correlation Tool
 
 Analyzes TCP data dumper capture files to correlate timestamps across all ports
-and group data within 10ms time windows.
+and group data within 10ms time windows. Correlation streams a k-way merge of
+the per-port columns with a sliding window, so it runs in O(n log k) time and
+bounded memory on captures larger than RAM.
 """
 
-import re
 import sys
-from datetime import datetime, timedelta
-from collections import defaultdict, deque
-from typing import Dict, List, Tuple, Optional
+import heapq
+from collections import deque
+from operator import itemgetter
+from typing import Dict, Iterator, List, Tuple, Optional
 import argparse
 
+import numpy as np
+
+from capture_store import CaptureStore, load_capture, format_timestamp_ns, NS_PER_SECOND
+
 class TimestampCorrelator:
     """Correlates timestamps across multiple ports"""
     
-    def __init__(self, time_window_ms: float = 10.0):
+    def __init__(self, time_window_ms: float = 10.0, max_groups: Optional[int] = 100):
         self.time_window_ms = time_window_ms
         self.time_window_seconds = time_window_ms / 1000.0
-        self.port_data = defaultdict(list)  # port -> [(timestamp, data_line)]
+        self.max_groups = max_groups  # Groups kept for the report rows (None keeps all)
+        self.store: Optional[CaptureStore] = None
+        self.port_data: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}  # port -> (timestamps_ns, values)
         self.correlated_groups = []
         
-    def parse_line(self, line: str) -> Optional[Tuple[int, datetime, str]]:
-        """Parse a data line and extract port, timestamp, and data"""
-        # Pattern: PORT:HH:MM:SS.mmm: DATA...
-        pattern = r'^(\d+):(\d{2}):(\d{2}):(\d{2})\.(\d{3}):(.+)$'
-        match = re.match(pattern, line.strip())
+        # Running aggregates over every correlated group, including those not kept
+        self.total_groups = 0
+        self.group_ports = set()
+        self.max_diff_sum_ms = 0.0
+        self.max_diff_max_ms = None
+        self.max_diff_min_ms = None
         
-        if not match:
-            return None
-            
-        port = int(match.group(1))
-        hour = int(match.group(2))
-        minute = int(match.group(3))
-        second = int(match.group(4))
-        millisecond = int(match.group(5))
-        data = match.group(6)
-        
-        # Create datetime object (using today's date)
-        today = datetime.now().date()
-        timestamp = datetime.combine(today, datetime.min.time().replace(
-            hour=hour, minute=minute, second=second, microsecond=millisecond * 1000
-        ))
-        
-        return port, timestamp, data
-    
     def load_data(self, filename: str):
-        """Load data from capture file"""
+        """Load data from capture file through the columnar capture store"""
         print(f"Loading data from {filename}...")
         
-        with open(filename, 'r') as f:
-            for line_num, line in enumerate(f, 1):
-                if line.strip().startswith('📊'):  # Skip summary lines
-                    continue
-                    
-                parsed = self.parse_line(line)
-                if parsed:
-                    port, timestamp, data = parsed
-                    self.port_data[port].append((timestamp, data))
-                    
-                if line_num % 1000 == 0:
-                    print(f"Processed {line_num} lines...")
+        self.store = load_capture(filename, verbose=True)
+        for port in self.store.ports:
+            self.port_data[port] = self.store.port(port)
         
         print(f"Loaded data for {len(self.port_data)} ports")
         for port in sorted(self.port_data.keys()):
-            print(f"  Port {port}: {len(self.port_data[port])} entries")
+            print(f"  Port {port}: {len(self.port_data[port][0])} entries")
+    
+    def _port_stream(self, port: int, chunk_size: int = 65536) -> Iterator[Tuple[int, int, float]]:
+        """Yield (timestamp_ns, port, value) for one port in time order, chunk by chunk"""
+        timestamps, values = self.port_data[port]
+        
+        # Captures are written in arrival order, so ports are normally already
+        # sorted; only an out-of-order port is sorted (stably) in memory
+        is_sorted = True
+        for start in range(0, len(timestamps), chunk_size):
+            chunk = timestamps[start:start + chunk_size + 1]  # One overlap to check across chunks
+            if np.any(chunk[1:] < chunk[:-1]):
+                is_sorted = False
+                break
+        if not is_sorted:
+            order = np.argsort(timestamps, kind='stable')
+            timestamps, values = timestamps[order], values[order]
+        
+        for start in range(0, len(timestamps), chunk_size):
+            chunk_timestamps = timestamps[start:start + chunk_size].tolist()
+            chunk_values = values[start:start + chunk_size].tolist()
+            for timestamp, value in zip(chunk_timestamps, chunk_values):
+                yield timestamp, port, value
     
     def correlate_timestamps(self):
-        """Correlate timestamps across all ports"""
+        """
+        Correlate timestamps across all ports
+        
+        Streams a k-way merge of the per-port sorted columns. Unique timestamps
+        are grouped greedily: a group starts at the first unseen timestamp and
+        takes every later one within the window. Each port keeps a sliding
+        window of its entries no older than one window before the current
+        group start, so a closed group only scans nearby entries and memory
+        stays bounded by the window size.
+        """
         print(f"Correlating timestamps with {self.time_window_ms}ms window...")
-        
-        # Get all unique timestamps
-        all_timestamps = set()
-        for port_data in self.port_data.values():
-            for timestamp, _ in port_data:
-                all_timestamps.add(timestamp)
-        
-        all_timestamps = sorted(all_timestamps)
-        print(f"Found {len(all_timestamps)} unique timestamps")
-        
-        # Group timestamps within the time window
-        groups = []
-        current_group = []
-        
-        for timestamp in all_timestamps:
-            if not current_group:
-                current_group = [timestamp]
-            else:
-                # Check if this timestamp is within the time window of the group
-                time_diff = (timestamp - current_group[0]).total_seconds()
-                if time_diff <= self.time_window_seconds:
-                    current_group.append(timestamp)
+        window_ns = int(round(self.time_window_seconds * NS_PER_SECOND))
+        ports = sorted(self.port_data.keys())
+        windows: Dict[int, deque] = {port: deque() for port in ports}
+        merged = heapq.merge(*(self._port_stream(port) for port in ports), key=itemgetter(0))
+        
+        unique_timestamps = 0
+        timestamp_groups = 0
+        group_start = None
+        group_size = 0  # Unique timestamps in the current group
+        last_timestamp = None
+        
+        for timestamp, port, value in merged:
+            if timestamp != last_timestamp:
+                unique_timestamps += 1
+                last_timestamp = timestamp
+                if group_start is not None and timestamp - group_start <= window_ns:
+                    group_size += 1
                 else:
-                    # Start a new group
-                    if len(current_group) > 1:  # Only save groups with multiple timestamps
-                        groups.append(current_group)
-                    current_group = [timestamp]
+                    if group_start is not None and group_size > 1:  # Only groups with multiple timestamps
+                        timestamp_groups += 1
+                        self._close_group(group_start, ports, windows, window_ns)
+                    group_start = timestamp
+                    group_size = 1
+                    
+                    # Later groups start here or after, so older entries are never needed again
+                    horizon = timestamp - window_ns
+                    for port_window in windows.values():
+                        while port_window and port_window[0][0] < horizon:
+                            port_window.popleft()
+            
+            windows[port].append((timestamp, value))
         
         # Don't forget the last group
-        if len(current_group) > 1:
-            groups.append(current_group)
-        
-        print(f"Found {len(groups)} correlated timestamp groups")
+        if group_start is not None and group_size > 1:
+            timestamp_groups += 1
+            self._close_group(group_start, ports, windows, window_ns)
         
-        # For each group, collect data from all ports
-        for group_idx, timestamp_group in enumerate(groups):
-            group_data = {}
-            group_start_time = timestamp_group[0]
-            
-            for port in sorted(self.port_data.keys()):
-                port_entries = []
-                for timestamp, data in self.port_data[port]:
-                    time_diff = (timestamp - group_start_time).total_seconds()
-                    if abs(time_diff) <= self.time_window_seconds:
-                        port_entries.append((timestamp, data, time_diff))
-                
-                if port_entries:
-                    # Sort by time difference and take the closest one
-                    port_entries.sort(key=lambda x: abs(x[2]))
-                    group_data[port] = port_entries[0]
-            
-            if len(group_data) >= 2:  # Only include groups with data from multiple ports
-                self.correlated_groups.append((group_start_time, group_data))
+        print(f"Found {unique_timestamps} unique timestamps")
+        print(f"Found {timestamp_groups} correlated timestamp groups")
+        print(f"Created {self.total_groups} correlated groups")
+    
+    def _close_group(self, group_start: int, ports: List[int], windows: Dict[int, deque], window_ns: int):
+        """Pick each port's closest entry to a group start and record the group"""
+        group_data = {}
+        for port in ports:
+            best = None
+            best_distance = None
+            for timestamp, value in windows[port]:
+                if timestamp > group_start + window_ns:
+                    break
+                distance = abs(timestamp - group_start)
+                # Strictly closer only, so the first entry wins ties
+                if distance <= window_ns and (best_distance is None or distance < best_distance):
+                    best = (timestamp, value)
+                    best_distance = distance
+            if best is not None:
+                group_data[port] = (best[0], best[1], (best[0] - group_start) / NS_PER_SECOND)
+        
+        if len(group_data) < 2:  # Only include groups with data from multiple ports
+            return
         
-        print(f"Created {len(self.correlated_groups)} correlated groups")
+        max_diff_ms = max(abs(time_diff) for _, _, time_diff in group_data.values()) * 1000
+        self.total_groups += 1
+        self.group_ports.update(group_data.keys())
+        self.max_diff_sum_ms += max_diff_ms
+        self.max_diff_max_ms = max_diff_ms if self.max_diff_max_ms is None else max(self.max_diff_max_ms, max_diff_ms)
+        self.max_diff_min_ms = max_diff_ms if self.max_diff_min_ms is None else min(self.max_diff_min_ms, max_diff_ms)
+        if self.max_groups is None or len(self.correlated_groups) < self.max_groups:
+            self.correlated_groups.append((group_start, group_data))
     
     def generate_report(self, output_file: Optional[str] = None):
         """Generate correlation report"""
@@ -143,7 +170,7 @@ class TimestampCorrelator:
             print("="*120)
         
         # Header
-        ports = sorted(set(port for _, group_data in self.correlated_groups for port in group_data.keys()))
+        ports = sorted(self.group_ports)
         header = f"{'Timestamp':<20} {'Max Diff (ms)':<12}"
         for port in ports:
             header += f" {f'Port {port}':<15}"
@@ -151,7 +178,7 @@ class TimestampCorrelator:
         f.write("-" * len(header) + "\n")
         
         # Data rows
-        for group_start_time, group_data in self.correlated_groups[:100]:  # Limit to first 100 groups
+        for group_start_time, group_data in self.correlated_groups:  # Only the first max_groups are kept
             # Calculate time differences
             time_diffs = []
             port_times = {}
@@ -163,7 +190,7 @@ class TimestampCorrelator:
             max_diff_ms = max(time_diffs) * 1000 if time_diffs else 0
             
             # Format timestamp
-            timestamp_str = group_start_time.strftime("%H:%M:%S.%f")[:-3]
+            timestamp_str = format_timestamp_ns(group_start_time)
             
             # Create row
             row = f"{timestamp_str:<20} {max_diff_ms:<12.1f}"
@@ -179,22 +206,15 @@ class TimestampCorrelator:
         f.write("\n" + "="*120 + "\n")
         f.write("SUMMARY\n")
         f.write("="*120 + "\n")
-        f.write(f"Total correlated groups: {len(self.correlated_groups)}\n")
+        f.write(f"Total correlated groups: {self.total_groups}\n")
         f.write(f"Time window: {self.time_window_ms}ms\n")
         f.write(f"Ports analyzed: {sorted(ports)}\n")
         
-        # Calculate statistics
-        if self.correlated_groups:
-            all_max_diffs = []
-            for _, group_data in self.correlated_groups:
-                time_diffs = [abs(time_diff) for _, _, time_diff in group_data.values()]
-                if time_diffs:
-                    all_max_diffs.append(max(time_diffs) * 1000)
-            
-            if all_max_diffs:
-                f.write(f"Average max time difference: {sum(all_max_diffs)/len(all_max_diffs):.2f}ms\n")
-                f.write(f"Maximum time difference: {max(all_max_diffs):.2f}ms\n")
-                f.write(f"Minimum time difference: {min(all_max_diffs):.2f}ms\n")
+        # Statistics accumulated over every group during correlation
+        if self.total_groups:
+            f.write(f"Average max time difference: {self.max_diff_sum_ms/self.total_groups:.2f}ms\n")
+            f.write(f"Maximum time difference: {self.max_diff_max_ms:.2f}ms\n")
+            f.write(f"Minimum time difference: {self.max_diff_min_ms:.2f}ms\n")
         
         if output_file:
             f.close()
@@ -213,7 +233,7 @@ def main():
     args = parser.parse_args()
     
     # Create correlator
-    correlator = TimestampCorrelator(time_window_ms=args.window)
+    correlator = TimestampCorrelator(time_window_ms=args.window, max_groups=args.max_groups)
     
     # Load and correlate data
     correlator.load_data(args.input_file)
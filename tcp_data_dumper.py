@@ -5,34 +5,312 @@ Multi-Port TCP Data Dumper
 A Python program that listens for data on a range of TCP/IP ports simultaneously
 and dumps the received data in groups of 8 bytes with port identification.
 
+A single selector-based event loop owns every listening socket and any number
+of concurrent clients per port, and reports per-port bytes/s and packets/s.
+Each received buffer is timestamped once, all of its 8-byte words are decoded
+in one pass, and the formatted lines are emitted with a single buffered write.
+With --raw the text formatting is skipped entirely and every buffer is stored
+as a binary record (see iter_raw_records). With --stats the data lines are
+replaced by a per-port table of arrival rates, inter-arrival jitter, gaps and
+value ranges refreshed every second, and a JSON summary is written on exit.
+
 Usage:
     python3 tcp_data_dumper.py --port 5000
     python3 tcp_data_dumper.py --port-range 5000-5010
     python3 tcp_data_dumper.py --ports 5000,5001,5002,6000,6001
+    python3 tcp_data_dumper.py --port-range 50038-50056 --output capture.dmp
+    python3 tcp_data_dumper.py --port-range 50038-50056 --raw --output capture.raw
+    python3 tcp_data_dumper.py --port-range 50038-50056 --stats --stats-json timing.json
 """
 
 import socket
+import selectors
+import signal
 import argparse
 import time
 import threading
 import struct
 import sys
+import json
 from datetime import datetime
 
+# Raw capture layout: RAW_MAGIC, then one record per received buffer made of
+# RAW_RECORD_HEADER (port, receive timestamp in ns since the epoch, payload
+# length) followed by the payload bytes
+RAW_MAGIC = b'FSDUMP01'
+RAW_RECORD_HEADER = struct.Struct('<HqI')
+
+# Printable ASCII passes through, everything else becomes '.'
+_ASCII_TABLE = bytes(b if 32 <= b <= 126 else ord('.') for b in range(256))
+
+def iter_raw_records(filename):
+    """Yield (port, timestamp_ns, payload) records from a --raw capture file"""
+    with open(filename, 'rb') as f:
+        if f.read(len(RAW_MAGIC)) != RAW_MAGIC:
+            raise ValueError(f"{filename} is not a raw dumper capture")
+        header_size = RAW_RECORD_HEADER.size
+        while True:
+            header = f.read(header_size)
+            if len(header) < header_size:
+                break
+            port, timestamp_ns, length = RAW_RECORD_HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                break  # Truncated final record
+            yield port, timestamp_ns, payload
+
+class DumpOutput:
+    """Buffered, thread-safe sink shared by all port handlers"""
+    
+    def __init__(self, filename=None, binary=False, buffer_size=1 << 20, flush_interval=0.5):
+        self.filename = filename
+        self.binary = binary
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.last_flush = time.monotonic()
+        
+        if filename:
+            if binary:
+                self.stream = open(filename, 'wb', buffering=buffer_size)
+                self.stream.write(RAW_MAGIC)
+            else:
+                self.stream = open(filename, 'w', buffering=buffer_size, encoding='utf-8')
+        else:
+            # Console output shares sys.stdout with the status messages so the
+            # two stay in order; each call still becomes one write
+            self.stream = sys.stdout
+    
+    def write(self, chunk):
+        """Write one batch (str in text mode, bytes in binary mode)"""
+        with self.lock:
+            self.stream.write(chunk)
+            if self.filename and time.monotonic() - self.last_flush >= self.flush_interval:
+                self.stream.flush()
+                self.last_flush = time.monotonic()
+    
+    def flush(self):
+        with self.lock:
+            try:
+                self.stream.flush()
+            except ValueError:
+                pass  # Already closed
+            self.last_flush = time.monotonic()
+    
+    def close(self):
+        self.flush()
+        if self.filename:
+            with self.lock:
+                self.stream.close()
+
+class ClientConnection:
+    """State for one client connection served by the event loop"""
+    
+    def __init__(self, sock, address, port):
+        self.sock = sock
+        self.fileno = sock.fileno()
+        self.address = address
+        self.port = port
+        self.pending = b''  # Partial 8-byte word left over from the previous recv
+    
+    def feed(self, data):
+        """Append received bytes and return the complete 8-byte words, if any"""
+        if self.pending:
+            data = self.pending + data
+        aligned = len(data) - len(data) % 8
+        self.pending = data[aligned:]
+        return data[:aligned]
+
+class PortStatistics:
+    """Rolling per-port arrival and value metrics kept in constant memory"""
+    
+    # Log-linear inter-arrival histogram in microseconds: exact below 8 us, then
+    # 8 sub-buckets per power of two (<= 12.5% bucket width) up to ~2^32 us
+    SUB_BUCKETS = 8
+    HISTOGRAM_BUCKETS = SUB_BUCKETS * 31
+    
+    def __init__(self, port, gap_factor=5.0):
+        self.port = port
+        self.gap_factor = gap_factor  # Gap = inter-arrival above gap_factor x mean
+        self.packets = 0
+        self.first_arrival_ns = None
+        self.last_arrival_ns = None
+        self.interarrival_histogram = [0] * self.HISTOGRAM_BUCKETS
+        self.interarrival_count = 0
+        self.interarrival_mean = 0.0  # Welford running mean/M2 in seconds
+        self.interarrival_m2 = 0.0
+        self.max_interarrival_ns = 0
+        self.gaps = 0
+        self.value_count = 0
+        self.value_mean = 0.0  # Welford running mean/M2 of finite values
+        self.value_m2 = 0.0
+        self.value_min = float('inf')
+        self.value_max = float('-inf')
+        self.zeros = 0
+        self.nans = 0
+        self.infs = 0
+        self.repeats = 0  # Values identical to the previous one
+        self.current_run = 0
+        self.longest_repeat_run = 0
+        self.last_value = None
+    
+    @classmethod
+    def bucket_index(cls, microseconds):
+        """Histogram bucket for an inter-arrival time in microseconds"""
+        if microseconds < cls.SUB_BUCKETS:
+            return microseconds
+        msb = microseconds.bit_length() - 1
+        shift = msb - 3
+        index = cls.SUB_BUCKETS * (msb - 2) + (microseconds >> shift) - cls.SUB_BUCKETS
+        return min(index, cls.HISTOGRAM_BUCKETS - 1)
+    
+    @classmethod
+    def bucket_upper_bound(cls, index):
+        """Exclusive upper bound of a histogram bucket in microseconds"""
+        if index < cls.SUB_BUCKETS:
+            return index + 1
+        msb = index // cls.SUB_BUCKETS + 2
+        shift = msb - 3
+        return ((cls.SUB_BUCKETS + index % cls.SUB_BUCKETS) << shift) + (1 << shift)
+    
+    def record_arrival(self, timestamp_ns):
+        """Record one received buffer"""
+        self.packets += 1
+        if self.last_arrival_ns is None:
+            self.first_arrival_ns = timestamp_ns
+        else:
+            delta_ns = max(0, timestamp_ns - self.last_arrival_ns)
+            self.interarrival_histogram[self.bucket_index(delta_ns // 1000)] += 1
+            
+            delta = delta_ns / 1e9
+            if self.interarrival_count >= 10 and delta > self.gap_factor * self.interarrival_mean:
+                self.gaps += 1
+            self.interarrival_count += 1
+            diff = delta - self.interarrival_mean
+            self.interarrival_mean += diff / self.interarrival_count
+            self.interarrival_m2 += diff * (delta - self.interarrival_mean)
+            self.max_interarrival_ns = max(self.max_interarrival_ns, delta_ns)
+        self.last_arrival_ns = timestamp_ns
+    
+    def record_values(self, values):
+        """Record the decoded 8-byte words of one buffer"""
+        for value in values:
+            if value != value:
+                self.nans += 1
+            elif value in (float('inf'), float('-inf')):
+                self.infs += 1
+            else:
+                if value == 0.0:
+                    self.zeros += 1
+                self.value_count += 1
+                diff = value - self.value_mean
+                self.value_mean += diff / self.value_count
+                self.value_m2 += diff * (value - self.value_mean)
+                if value < self.value_min:
+                    self.value_min = value
+                if value > self.value_max:
+                    self.value_max = value
+            
+            # NaN never compares equal, so repeated NaNs are not counted here
+            if value == self.last_value:
+                self.repeats += 1
+                self.current_run += 1
+                self.longest_repeat_run = max(self.longest_repeat_run, self.current_run)
+            else:
+                self.current_run = 0
+            self.last_value = value
+    
+    def interarrival_std(self):
+        """Inter-arrival jitter (standard deviation) in seconds"""
+        if self.interarrival_count < 2:
+            return 0.0
+        return (self.interarrival_m2 / (self.interarrival_count - 1)) ** 0.5
+    
+    def value_std(self):
+        if self.value_count < 2:
+            return 0.0
+        return (self.value_m2 / (self.value_count - 1)) ** 0.5
+    
+    def interarrival_percentile(self, percentile):
+        """Upper bound (seconds) of the histogram bucket holding the percentile"""
+        if not self.interarrival_count:
+            return 0.0
+        target = self.interarrival_count * percentile / 100.0
+        cumulative = 0
+        for bucket, count in enumerate(self.interarrival_histogram):
+            cumulative += count
+            if count and cumulative >= target:
+                return self.bucket_upper_bound(bucket) / 1e6
+        return self.bucket_upper_bound(self.HISTOGRAM_BUCKETS - 1) / 1e6
+    
+    def to_dict(self):
+        """JSON-serializable summary"""
+        duration = 0.0
+        if self.first_arrival_ns is not None:
+            duration = (self.last_arrival_ns - self.first_arrival_ns) / 1e9
+        finite = self.value_count > 0
+        return {
+            "port": self.port,
+            "packets": self.packets,
+            "duration_s": duration,
+            "average_rate_hz": (self.packets - 1) / duration if duration > 0 else 0.0,
+            "interarrival": {
+                "mean_ms": self.interarrival_mean * 1000,
+                "jitter_ms": self.interarrival_std() * 1000,
+                "p50_ms": self.interarrival_percentile(50) * 1000,
+                "p99_ms": self.interarrival_percentile(99) * 1000,
+                "max_ms": self.max_interarrival_ns / 1e6,
+                "gaps": self.gaps,
+                "histogram_us_upper_bounds": {str(self.bucket_upper_bound(bucket)): count
+                                              for bucket, count in enumerate(self.interarrival_histogram) if count}
+            },
+            "values": {
+                "count": self.value_count,
+                "mean": self.value_mean if finite else None,
+                "std": self.value_std() if finite else None,
+                "min": self.value_min if finite else None,
+                "max": self.value_max if finite else None,
+                "zeros": self.zeros,
+                "nans": self.nans,
+                "infs": self.infs,
+                "repeats": self.repeats,
+                "longest_repeat_run": self.longest_repeat_run
+            }
+        }
+
 class MultiPortTCPDataDumper:
     """Multi-port TCP data dumper for debugging and analysis"""
     
-    def __init__(self, host='127.0.0.1', ports=None, hex_output=True, ascii_output=True, float_output=True, endianness='little'):
+    def __init__(self, host='127.0.0.1', ports=None, hex_output=True, ascii_output=True, float_output=True, endianness='little',
+                 output_file=None, raw_output=False, buffer_size=1 << 20, flush_interval=0.5,
+                 rate_interval=1.0, stats_mode=False, stats_json=None):
         self.host = host
         self.ports = ports if ports else [5000]
         self.hex_output = hex_output
         self.ascii_output = ascii_output
         self.float_output = float_output
         self.endianness = endianness  # 'little' or 'big'
+        self.output_file = output_file
+        self.raw_output = raw_output  # Binary records instead of formatted text
+        self.output = DumpOutput(output_file, binary=raw_output, buffer_size=buffer_size,
+                                 flush_interval=flush_interval)
         self.sockets = {}
         self.running = False
-        self.stats = {}  # Per-port statistics
-        self.lock = threading.Lock()
+        self.stats = {port: {'bytes': 0, 'packets': 0, 'connections': 0, 'active_clients': 0}
+                      for port in self.ports}  # Per-port statistics
+        self.rates = {port: (0.0, 0.0) for port in self.ports}  # Latest (bytes/s, packets/s)
+        self.rate_interval = rate_interval  # Seconds between rate reports (0 disables)
+        self.recv_size = 65536
+        self.selector = None
+        self.clients = {}  # fileno -> ClientConnection
+        self._wakeup_recv = None
+        self._wakeup_send = None
+        self._next_report = None
+        self.stats_mode = stats_mode  # Live metrics table instead of data lines
+        self.stats_json = stats_json  # JSON summary written on exit
+        self.port_statistics = {port: PortStatistics(port) for port in self.ports}
+        self._float_prefix = '>' if endianness == 'big' else '<'
+        self._clock_second = None  # Second for which _clock_prefix is valid
+        self._clock_prefix = ''
         
     def bytes_to_float(self, data_bytes):
         """Convert 8 bytes to floating point value with robust error handling"""
@@ -63,10 +341,6 @@ class MultiPortTCPDataDumper:
     def start_server(self):
         """Start the multi-port TCP server"""
         try:
-            # Initialize statistics for each port
-            for port in self.ports:
-                self.stats[port] = {'bytes': 0, 'packets': 0, 'connections': 0}
-            
             print(f"🚀 Multi-Port TCP Data Dumper started")
             print(f"📡 Listening on {self.host} on ports: {', '.join(map(str, self.ports))}")
             output_modes = []
@@ -78,173 +352,316 @@ class MultiPortTCPDataDumper:
                 output_modes.append("FLOAT")
             if not output_modes:
                 output_modes.append("BINARY")
+            if self.raw_output:
+                output_modes = ["RAW RECORDS"]
+            if self.stats_mode:
+                output_modes = ["STATISTICS"] + ([f"{' + '.join(output_modes)} TO FILE"] if self.output_file else [])
             print(f"📊 Output: {' + '.join(output_modes)} ({self.endianness} endian)")
+            if self.output_file:
+                print(f"💾 Writing to: {self.output_file}")
             print(f"⏰ Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
             print(f"📝 Data will be displayed in groups of 8 bytes")
             print(f"🛑 Press Ctrl+C to stop")
             print("-" * 80)
             
             self.running = True
-            
-            # Start a thread for each port
-            threads = []
-            for port in self.ports:
-                thread = threading.Thread(target=self.listen_on_port, args=(port,))
-                thread.daemon = True
-                thread.start()
-                threads.append(thread)
-            
-            # Wait for threads or keyboard interrupt
-            try:
-                while self.running:
-                    time.sleep(0.1)
-            except KeyboardInterrupt:
-                print(f"\n🛑 Stopping server...")
-                self.running = False
+            self.run_event_loop()
                 
         except Exception as e:
             print(f"❌ Failed to start server: {e}")
         finally:
             self.cleanup()
     
-    def listen_on_port(self, port):
-        """Listen on a specific port"""
+    def stop(self):
+        """Ask the event loop to exit (safe to call from any thread or signal handler)"""
+        self.running = False
+        if self._wakeup_send:
+            try:
+                self._wakeup_send.send(b'\0')
+            except OSError:
+                pass  # Wakeup already pending or loop already gone
+    
+    def run_event_loop(self):
+        """Serve every listening socket and client connection from one selector"""
+        self.selector = selectors.DefaultSelector()
+        self._wakeup_recv, self._wakeup_send = socket.socketpair()
+        self._wakeup_recv.setblocking(False)
+        self._wakeup_send.setblocking(False)
+        self.selector.register(self._wakeup_recv, selectors.EVENT_READ, None)
+        
+        for port in self.ports:
+            self.open_listener(port)
+        
+        now = time.monotonic()
+        self._next_report = now + self.rate_interval if self.rate_interval > 0 else None
+        self._rate_snapshot = {port: (stats['bytes'], stats['packets']) for port, stats in self.stats.items()}
+        self._rate_snapshot_time = now
+        
+        try:
+            while self.running:
+                for key, _ in self.selector.select(timeout=self._select_timeout()):
+                    if key.data is None:
+                        # Wakeup from stop()
+                        try:
+                            self._wakeup_recv.recv(4096)
+                        except BlockingIOError:
+                            pass
+                    elif isinstance(key.data, int):
+                        self.accept_client(key.fileobj, key.data)
+                    else:
+                        self.read_client(key.data)
+                self._on_tick(time.monotonic())
+        except KeyboardInterrupt:
+            print(f"\n🛑 Stopping server...")
+            self.running = False
+    
+    def _select_timeout(self):
+        """Sleep until the next rate report or output flush is due (None: until data arrives)"""
+        deadlines = []
+        # A zero flush interval flushes after every batch, so it sets no deadline
+        if self.output.flush_interval > 0:
+            deadlines.append(self.output.last_flush + self.output.flush_interval)
+        if self._next_report is not None:
+            deadlines.append(self._next_report)
+        if not deadlines:
+            return None
+        return max(0.0, min(deadlines) - time.monotonic())
+    
+    def _on_tick(self, now):
+        """Periodic work driven by the event loop: output flushes and rate reports"""
+        if now - self.output.last_flush >= self.output.flush_interval:
+            self.output.flush()
+        if self._next_report is not None and now >= self._next_report:
+            self.update_rates(now)
+            if self.stats_mode:
+                self.print_stats_table()
+            else:
+                self.report_rates()
+            self._next_report = now + self.rate_interval
+    
+    def update_rates(self, now):
+        """Compute per-port bytes/s and packets/s since the previous update"""
+        elapsed = now - self._rate_snapshot_time
+        if elapsed <= 0:
+            return
+        for port in self.ports:
+            stats = self.stats[port]
+            last_bytes, last_packets = self._rate_snapshot.get(port, (0, 0))
+            self.rates[port] = ((stats['bytes'] - last_bytes) / elapsed,
+                                (stats['packets'] - last_packets) / elapsed)
+            self._rate_snapshot[port] = (stats['bytes'], stats['packets'])
+        self._rate_snapshot_time = now
+    
+    def report_rates(self):
+        """Print the latest per-port rates on one line"""
+        parts = []
+        for port in self.ports:
+            byte_rate, packet_rate = self.rates[port]
+            active_clients = self.stats[port]['active_clients']
+            if byte_rate or active_clients:
+                parts.append(f"{port}: {byte_rate:.0f} B/s {packet_rate:.0f} pkt/s ({active_clients} clients)")
+        if parts:
+            print("📈 " + " | ".join(parts), flush=True)
+    
+    def format_stats_table(self):
+        """Compact per-port table of rates, inter-arrival timing and value ranges"""
+        header = (f"{'Port':>6} {'pkt/s':>7} {'mean ms':>8} {'jit ms':>7} {'p99 ms':>7} {'max ms':>8} "
+                  f"{'gaps':>5} {'min':>11} {'max':>11} {'mean':>11} {'std':>10} {'zero':>6} {'nan':>5} {'rep':>6}")
+        lines = [header, "-" * len(header)]
+        for port in self.ports:
+            metrics = self.port_statistics[port]
+            _, packet_rate = self.rates[port]
+            if metrics.value_count:
+                value_columns = (f"{metrics.value_min:>11.5g} {metrics.value_max:>11.5g} "
+                                 f"{metrics.value_mean:>11.5g} {metrics.value_std():>10.4g}")
+            else:
+                value_columns = f"{'--':>11} {'--':>11} {'--':>11} {'--':>10}"
+            lines.append(
+                f"{port:>6} {packet_rate:>7.1f} {metrics.interarrival_mean * 1000:>8.2f} "
+                f"{metrics.interarrival_std() * 1000:>7.2f} {metrics.interarrival_percentile(99) * 1000:>7.2f} "
+                f"{metrics.max_interarrival_ns / 1e6:>8.1f} {metrics.gaps:>5} {value_columns} "
+                f"{metrics.zeros:>6} {metrics.nans:>5} {metrics.repeats:>6}"
+            )
+        return "\n".join(lines)
+    
+    def print_stats_table(self):
+        """Refresh the live statistics table"""
+        table = self.format_stats_table()
+        if sys.stdout.isatty():
+            # Redraw in place instead of scrolling
+            table = "\033[H\033[J" + table
+        print(f"{table}\n⏰ {datetime.now().strftime('%H:%M:%S')}", flush=True)
+    
+    def write_stats_json(self, filename):
+        """Export the per-port metric summaries as JSON"""
+        summary = {
+            "generated_at": datetime.now().isoformat(),
+            "host": self.host,
+            "ports": {str(port): {**self.port_statistics[port].to_dict(),
+                                  "bytes": self.stats[port]['bytes'],
+                                  "connections": self.stats[port]['connections']}
+                      for port in self.ports}
+        }
+        with open(filename, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"📄 Statistics summary written to {filename}")
+    
+    def open_listener(self, port):
+        """Create a non-blocking listening socket for a port and register it"""
         try:
-            # Create socket for this port
             sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             sock.bind((self.host, port))
-            sock.listen(1)
-            
-            with self.lock:
-                self.sockets[port] = sock
-            
-            print(f"✅ Port {port}: Listening for connections...")
-            
-            while self.running:
-                try:
-                    client_socket, client_address = sock.accept()
-                    with self.lock:
-                        self.stats[port]['connections'] += 1
-                    
-                    print(f"🔗 Port {port}: Client connected from {client_address[0]}:{client_address[1]}")
-                    
-                    # Handle client data
-                    self.handle_client(client_socket, client_address, port)
-                    
-                except socket.error as e:
-                    if self.running:
-                        print(f"❌ Port {port}: Socket error: {e}")
-                    break
-                except Exception as e:
-                    if self.running:
-                        print(f"❌ Port {port}: Error: {e}")
-                    break
-                    
+            sock.listen(socket.SOMAXCONN)
+            sock.setblocking(False)
         except Exception as e:
             print(f"❌ Port {port}: Failed to start: {e}")
-        finally:
-            if port in self.sockets:
-                self.sockets[port].close()
-                del self.sockets[port]
+            return False
+        
+        self.sockets[port] = sock
+        self.selector.register(sock, selectors.EVENT_READ, port)
+        print(f"✅ Port {port}: Listening for connections...")
+        return True
     
-    def handle_client(self, client_socket, client_address, port):
-        """Handle data from a connected client"""
+    def accept_client(self, sock, port):
+        """Accept every pending connection on a listening socket"""
+        while True:
+            try:
+                client_socket, client_address = sock.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                if self.running:
+                    print(f"❌ Port {port}: Socket error: {e}")
+                return
+            
+            client_socket.setblocking(False)
+            connection = ClientConnection(client_socket, client_address, port)
+            self.clients[client_socket.fileno()] = connection
+            self.selector.register(client_socket, selectors.EVENT_READ, connection)
+            self.stats[port]['connections'] += 1
+            self.stats[port]['active_clients'] += 1
+            print(f"🔗 Port {port}: Client connected from {client_address[0]}:{client_address[1]}")
+    
+    def read_client(self, connection):
+        """Read whatever a client has sent and hand complete words to process_data"""
+        port = connection.port
         try:
-            while self.running:
-                # Receive data
-                data = client_socket.recv(4096)
-                if not data:
-                    print(f"🔌 Port {port}: Client {client_address[0]}:{client_address[1]} disconnected")
-                    break
-                
-                # Process received data
-                try:
-                    self.process_data(data, client_address, port)
-                except Exception as e:
-                    print(f"⚠️  Port {port}: Error processing data from {client_address}: {e}")
-                    # Continue processing other data
-                
-        except Exception as e:
-            print(f"❌ Port {port}: Error handling client {client_address}: {e}")
-        finally:
-            client_socket.close()
+            data = connection.sock.recv(self.recv_size)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            print(f"❌ Port {port}: Error handling client {connection.address}: {e}")
+            self.close_client(connection)
+            return
+        timestamp_ns = time.time_ns()
+        
+        if not data:
+            print(f"🔌 Port {port}: Client {connection.address[0]}:{connection.address[1]} disconnected")
+            self.close_client(connection)
+            return
+        
+        words = connection.feed(data)
+        if words:
+            try:
+                self.process_data(words, connection.address, port, timestamp_ns)
+            except Exception as e:
+                print(f"⚠️  Port {port}: Error processing data from {connection.address}: {e}")
+                # Continue processing other data
     
-    def process_data(self, data, client_address, port):
-        """Process received data and display it with robust error handling"""
+    def close_client(self, connection):
+        """Unregister a client, emitting any trailing partial word"""
         try:
-            with self.lock:
-                self.stats[port]['packets'] += 1
-                self.stats[port]['bytes'] += len(data)
-        except Exception as e:
-            print(f"⚠️  Port {port}: Error updating stats: {e}")
+            self.selector.unregister(connection.sock)
+        except (KeyError, ValueError):
+            pass
+        self.clients.pop(connection.fileno, None)
+        self.stats[connection.port]['active_clients'] -= 1
+        
+        if connection.pending:
+            try:
+                self.process_data(connection.pending, connection.address, connection.port)
+            except Exception as e:
+                print(f"⚠️  Port {connection.port}: Error processing trailing bytes from {connection.address}: {e}")
+            connection.pending = b''
+        connection.sock.close()
+    
+    def _format_timestamp(self, timestamp_ns):
+        """Format a receive timestamp as HH:MM:SS.mmm, reusing the per-second prefix"""
+        seconds, remainder = divmod(timestamp_ns, 1_000_000_000)
+        if seconds != self._clock_second:
+            self._clock_prefix = time.strftime('%H:%M:%S', time.localtime(seconds))
+            self._clock_second = seconds
+        return f"{self._clock_prefix}.{remainder // 1_000_000:03d}"
+    
+    def _format_float(self, value):
+        """Format a decoded word the same way bytes_to_float based output did"""
+        if value != value or value in (float('inf'), float('-inf')):
+            return " = [parse error]"
+        if abs(value) < 1e10 and abs(value) > 1e-10:
+            # Format with appropriate precision
+            if abs(value) < 1e-3 or abs(value) > 1e3:
+                return f" = {value:.6e}"  # Scientific notation
+            return f" = {value:.6f}"  # Fixed point
+        if value == 0.0:
+            return " = 0.000000"
+        return " = [extreme value]"
+    
+    def format_lines(self, data, port, timestamp_ns):
+        """Format every 8-byte group of a buffer into output lines"""
+        prefix = f"{port}:{self._format_timestamp(timestamp_ns)}: "
+        
+        # Decode all complete words at once
+        floats = ()
+        if self.float_output:
+            floats = struct.unpack_from(f"{self._float_prefix}{len(data) // 8}d", data)
+        
+        lines = []
+        for index, offset in enumerate(range(0, len(data), 8)):
+            chunk = data[offset:offset + 8]
+            fields = []
+            if self.hex_output:
+                fields.append(chunk.hex(' ').upper().ljust(23))  # Pad to align columns
+            if self.ascii_output:
+                fields.append(chunk.translate(_ASCII_TABLE).decode('ascii'))
+            if self.float_output:
+                fields.append(self._format_float(floats[index]) if len(chunk) == 8 else "")
+            if not fields:
+                # Binary output
+                fields.append(' '.join(f'{b:08b}' for b in chunk))
+            lines.append(prefix + '    '.join(fields))
+        return lines
+    
+    def process_data(self, data, client_address, port, timestamp_ns=None):
+        """Process one received buffer and emit it with a single buffered write"""
+        if timestamp_ns is None:
+            timestamp_ns = time.time_ns()
+        
+        # Counters are only touched from the event loop thread
+        stats = self.stats[port]
+        stats['packets'] += 1
+        stats['bytes'] += len(data)
+        
+        if self.stats_mode:
+            metrics = self.port_statistics[port]
+            metrics.record_arrival(timestamp_ns)
+            metrics.record_values(struct.unpack_from(f"{self._float_prefix}{len(data) // 8}d", data))
+            if not self.output_file:
+                return  # Table only, no data lines on the console
+        
+        if self.raw_output:
+            self.output.write(RAW_RECORD_HEADER.pack(port, timestamp_ns, len(data)) + data)
             return
         
-        # Display data in groups of 8 bytes
         try:
-            for i in range(0, len(data), 8):
-                chunk = data[i:i+8]
-                timestamp = datetime.now().strftime('%H:%M:%S.%f')[:-3]
-                
-                # Format hex data
-                hex_str = ' '.join(f'{b:02X}' for b in chunk)
-                hex_str = hex_str.ljust(23)  # Pad to align columns
-                
-                # Format ASCII data
-                ascii_str = ''.join(chr(b) if 32 <= b <= 126 else '.' for b in chunk)
-                
-                # Convert to float if enabled and we have exactly 8 bytes
-                float_str = ""
-                if self.float_output and len(chunk) == 8:
-                    try:
-                        float_value = self.bytes_to_float(chunk)
-                        if float_value is not None:
-                            # Check if it's a reasonable float value for display
-                            if abs(float_value) < 1e10 and abs(float_value) > 1e-10:
-                                # Format with appropriate precision
-                                if abs(float_value) < 1e-3 or abs(float_value) > 1e3:
-                                    float_str = f" = {float_value:.6e}"  # Scientific notation
-                                else:
-                                    float_str = f" = {float_value:.6f}"  # Fixed point
-                            elif abs(float_value) == 0.0:
-                                float_str = f" = 0.000000"
-                            else:
-                                float_str = " = [extreme value]"
-                        else:
-                            float_str = " = [parse error]"
-                    except (OverflowError, ValueError, TypeError) as e:
-                        float_str = f" = [error: {type(e).__name__}]"
-                
-                # Display line in requested format: "port:Timestamp: dataHex    dataAscii    floatValue"
-                if self.hex_output and self.ascii_output and self.float_output:
-                    print(f"{port}:{timestamp}: {hex_str}    {ascii_str}    {float_str}")
-                elif self.hex_output and self.ascii_output:
-                    print(f"{port}:{timestamp}: {hex_str}    {ascii_str}")
-                elif self.hex_output and self.float_output:
-                    print(f"{port}:{timestamp}: {hex_str}    {float_str}")
-                elif self.ascii_output and self.float_output:
-                    print(f"{port}:{timestamp}: {ascii_str}    {float_str}")
-                elif self.hex_output:
-                    print(f"{port}:{timestamp}: {hex_str}")
-                elif self.ascii_output:
-                    print(f"{port}:{timestamp}: {ascii_str}")
-                elif self.float_output:
-                    print(f"{port}:{timestamp}: {float_str}")
-                else:
-                    # Binary output
-                    binary_str = ' '.join(f'{b:08b}' for b in chunk)
-                    print(f"{port}:{timestamp}: {binary_str}")
+            lines = self.format_lines(data, port, timestamp_ns)
             
             # Display summary every 10 packets
-            try:
-                with self.lock:
-                    if self.stats[port]['packets'] % 10 == 0:
-                        total_bytes = self.stats[port]['bytes']
-                        total_packets = self.stats[port]['packets']
-                        print(f"📊 Port {port}: {total_bytes} bytes, {total_packets} packets")
-            except Exception as e:
-                print(f"⚠️  Port {port}: Error displaying summary: {e}")
-                
+            if stats['packets'] % 10 == 0:
+                lines.append(f"📊 Port {port}: {stats['bytes']} bytes, {stats['packets']} packets")
+            
+            lines.append('')
+            self.output.write('\n'.join(lines))
         except Exception as e:
             print(f"⚠️  Port {port}: Error processing data chunk: {e}")
             # Continue processing other data
@@ -252,11 +669,30 @@ class MultiPortTCPDataDumper:
     def cleanup(self):
         """Clean up resources"""
         self.running = False
-        for port, sock in self.sockets.items():
+        for connection in list(self.clients.values()):
+            self.close_client(connection)
+        for port, sock in list(self.sockets.items()):
             try:
                 sock.close()
             except:
                 pass
+        self.sockets.clear()
+        if self.selector:
+            self.selector.close()
+            self.selector = None
+        for sock in (self._wakeup_recv, self._wakeup_send):
+            if sock:
+                sock.close()
+        self._wakeup_recv = self._wakeup_send = None
+        self.output.close()
+        
+        if self.stats_mode:
+            print(self.format_stats_table())
+            if self.stats_json:
+                try:
+                    self.write_stats_json(self.stats_json)
+                except OSError as e:
+                    print(f"❌ Failed to write statistics summary: {e}")
         
         print(f"\n✅ Server stopped")
         print(f"📊 Final stats:")
@@ -301,6 +737,9 @@ Examples:
   python3 tcp_data_dumper.py --ports 5000,6000,7000 --hex --ascii --float
   python3 tcp_data_dumper.py --ports 5000,5001 --float --endianness big
   python3 tcp_data_dumper.py --ports 5000 --no-hex --no-ascii --float
+  python3 tcp_data_dumper.py --port-range 50038-50056 --output capture.dmp
+  python3 tcp_data_dumper.py --port-range 50038-50056 --raw --output capture.raw
+  python3 tcp_data_dumper.py --port-range 50038-50056 --stats
         """
     )
     
@@ -332,9 +771,26 @@ Examples:
                        help='Endianness for float conversion (default: little)')
     parser.add_argument('--binary', action='store_true',
                        help='Display data in binary format instead of hex')
+    parser.add_argument('--output', '-o',
+                       help='Write captured data to this file instead of stdout')
+    parser.add_argument('--raw', action='store_true',
+                       help='Store unformatted binary records (requires --output)')
+    parser.add_argument('--buffer-size', type=int, default=1 << 20,
+                       help='Output buffer size in bytes (default: 1048576)')
+    parser.add_argument('--flush-interval', type=float, default=0.5,
+                       help='Seconds between output file flushes, 0 flushes every batch (default: 0.5)')
+    parser.add_argument('--rate-interval', type=float, default=1.0,
+                       help='Seconds between per-port rate reports, 0 to disable (default: 1.0)')
+    parser.add_argument('--stats', action='store_true',
+                       help='Show a live per-port statistics table instead of data lines')
+    parser.add_argument('--stats-json', metavar='FILE',
+                       help='Write a JSON summary to FILE on exit in --stats mode')
     
     args = parser.parse_args()
     
+    if args.raw and not args.output:
+        parser.error("--raw requires --output")
+    
     # Parse ports
     try:
         if args.port:
@@ -375,9 +831,19 @@ Examples:
         hex_output=hex_output,
         ascii_output=ascii_output,
         float_output=float_output,
-        endianness=args.endianness
+        endianness=args.endianness,
+        output_file=args.output,
+        raw_output=args.raw,
+        buffer_size=args.buffer_size,
+        flush_interval=args.flush_interval,
+        rate_interval=args.rate_interval,
+        stats_mode=args.stats,
+        stats_json=args.stats_json if args.stats else None
     )
     
+    # SIGTERM shuts down as cleanly as Ctrl+C
+    signal.signal(signal.SIGTERM, lambda signum, frame: dumper.stop())
+    
     try:
         dumper.start_server()
     except KeyboardInterrupt:
@@ -6,6 +6,7 @@ Receives 8-byte float data from MATLAB simulator via TCP/IP and distributes
 to device encoders. Supports both server and client modes.
 """
 
+import sys
 import socket
 import struct
 import threading
@@ -14,7 +15,6 @@ import logging
 from typing import Dict, List, Optional, Callable, Tuple, Any
 from dataclasses import dataclass
 from collections import deque
-from queue import Queue, Empty
 
 # Import raw data logger
 try:
@@ -25,6 +25,10 @@ except ImportError:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Kernel receive timestamps (Linux); the socket module does not export the constant
+SO_TIMESTAMPNS = getattr(socket, 'SO_TIMESTAMPNS', 35 if sys.platform.startswith('linux') else None)
+TIMESPEC = struct.Struct('@ll')
+
 @dataclass
 class TCPConfig:
     """Configuration for TCP receiver"""
@@ -35,6 +39,7 @@ class TCPConfig:
     buffer_size: int = 8192
     timeout: float = 1.0
     reconnect_delay: float = 5.0
+    kernel_timestamps: bool = False  # Stamp floats with SO_TIMESTAMPNS instead of time.time_ns()
 
 class TCPPortReceiver:
     """Handles TCP connection for a single port"""
@@ -46,11 +51,11 @@ class TCPPortReceiver:
         self.socket: Optional[socket.socket] = None
         self.is_running = False
         self.thread: Optional[threading.Thread] = None
-        self.data_queue = Queue(maxsize=1000)
         self.stats = {
             'packets_received': 0,
             'bytes_received': 0,
             'parse_errors': 0,
+            'connections': 0,
             'last_receive_time': 0
         }
         
@@ -91,6 +96,8 @@ class TCPPortReceiver:
                         self.socket, addr = server_socket.accept()
                         logger.info(f"Accepted connection from {addr} on port {self.config.port}")
                         self.socket.settimeout(self.config.timeout)
+                        self._enable_kernel_timestamps()
+                        self.stats['connections'] += 1
                         return True
                     except socket.timeout:
                         continue
@@ -104,6 +111,8 @@ class TCPPortReceiver:
                 self.socket.settimeout(self.config.timeout)
                 self.socket.connect((self.config.ip_address, self.config.port))
                 logger.info(f"Connected to {self.config.ip_address}:{self.config.port}")
+                self._enable_kernel_timestamps()
+                self.stats['connections'] += 1
                 return True
                 
         except Exception as e:
@@ -112,6 +121,32 @@ class TCPPortReceiver:
             
         return False
     
+    def _enable_kernel_timestamps(self):
+        """Ask the kernel to stamp received data, falling back to user-space stamps"""
+        if not self.config.kernel_timestamps:
+            return
+        if SO_TIMESTAMPNS is None:
+            logger.warning(f"Kernel timestamps not supported on this platform, port {self.config.port} uses time.time_ns()")
+            self.config.kernel_timestamps = False
+            return
+        try:
+            self.socket.setsockopt(socket.SOL_SOCKET, SO_TIMESTAMPNS, 1)
+        except OSError as e:
+            logger.warning(f"SO_TIMESTAMPNS unavailable on port {self.config.port} ({e}), using time.time_ns()")
+            self.config.kernel_timestamps = False
+    
+    def _recv(self, size: int) -> Tuple[bytes, int]:
+        """Receive up to size bytes with their receive time in ns since the epoch"""
+        if not self.config.kernel_timestamps:
+            return self.socket.recv(size), time.time_ns()
+        
+        chunk, ancdata, _, _ = self.socket.recvmsg(size, socket.CMSG_SPACE(TIMESPEC.size))
+        for level, cmsg_type, cmsg_data in ancdata:
+            if level == socket.SOL_SOCKET and cmsg_type == SO_TIMESTAMPNS and len(cmsg_data) >= TIMESPEC.size:
+                seconds, nanoseconds = TIMESPEC.unpack_from(cmsg_data)
+                return chunk, seconds * 1_000_000_000 + nanoseconds
+        return chunk, time.time_ns()
+    
     def _parse_float(self, data: bytes) -> Optional[float]:
         """Parse 8-byte float with configurable endianness"""
         if len(data) != 8:
@@ -148,8 +183,10 @@ class TCPPortReceiver:
             try:
                 # Read exactly 8 bytes for one float
                 float_bytes = b''
+                receive_ns = 0
                 while len(float_bytes) < 8 and self.is_running:
-                    chunk = self.socket.recv(8 - len(float_bytes))
+                    # The float counts as received when its last byte arrives
+                    chunk, receive_ns = self._recv(8 - len(float_bytes))
                     if not chunk:
                         # Connection closed
                         logger.warning(f"Connection closed on port {self.config.port}")
@@ -171,12 +208,10 @@ class TCPPortReceiver:
                         self.stats['packets_received'] += 1
                         self.stats['last_receive_time'] = time.time()
                         
-                        # Add to queue and call callback
                         try:
-                            self.data_queue.put_nowait(float_value)
-                            self.data_callback(self.port_index, float_value)
-                        except:
-                            pass  # Queue full, drop data
+                            self.data_callback(self.port_index, float_value, receive_ns)
+                        except Exception as e:
+                            logger.error(f"Data callback error on port {self.config.port}: {e}")
                             
             except socket.timeout:
                 continue
@@ -225,6 +260,7 @@ class MATLABTCPReceiver:
         self.device_configs = device_configs
         self.receivers: Dict[str, List[TCPPortReceiver]] = {}
         self.device_data: Dict[str, List[float]] = {}
+        self.device_timestamps: Dict[str, List[int]] = {}  # Receive time (ns) of each port's latest value
         self.data_callbacks: Dict[str, Callable] = {}
         self.is_running = False
         
@@ -242,6 +278,7 @@ class MATLABTCPReceiver:
                 
             self.receivers[device_name] = []
             self.device_data[device_name] = [0.0] * config.get('num_ports', 1)
+            self.device_timestamps[device_name] = [0] * config.get('num_ports', 1)
             
             start_port = config.get('start_port', 5000)
             num_ports = config.get('num_ports', 1)
@@ -251,12 +288,13 @@ class MATLABTCPReceiver:
                     mode=config.get('tcp_mode', 'server'),
                     ip_address=config.get('ip', '0.0.0.0'),
                     port=start_port + i,
-                    is_big_endian=config.get('is_big_endian', False)
+                    is_big_endian=config.get('is_big_endian', False),
+                    kernel_timestamps=config.get('kernel_timestamps', False)
                 )
                 
                 def make_callback(dev_name, port_idx):
-                    def callback(idx, value):
-                        self._on_data_received(dev_name, port_idx, value)
+                    def callback(idx, value, receive_ns=0):
+                        self._on_data_received(dev_name, port_idx, value, receive_ns)
                     return callback
                 
                 receiver = TCPPortReceiver(
@@ -279,9 +317,10 @@ class MATLABTCPReceiver:
         
         logger.info("Stopped all TCP receivers")
     
-    def _on_data_received(self, device_name: str, port_index: int, value: float):
+    def _on_data_received(self, device_name: str, port_index: int, value: float, receive_ns: int = 0):
         """Handle received data"""
         if device_name in self.device_data:
+            self.device_timestamps[device_name][port_index] = receive_ns or time.time_ns()
             self.device_data[device_name][port_index] = value
             
             # Call device-specific callback if registered
@@ -295,6 +334,13 @@ class MATLABTCPReceiver:
         """Get latest data for a device"""
         return self.device_data.get(device_name, [])
     
+    def get_ingest_window(self, device_name: str) -> Optional[Tuple[int, int]]:
+        """(oldest, newest) receive times in ns of the device's current values; None before any data"""
+        stamps = [stamp for stamp in self.device_timestamps.get(device_name, []) if stamp]
+        if not stamps:
+            return None
+        return min(stamps), max(stamps)
+    
     def get_stats(self) -> Dict:
         """Get statistics for all receivers"""
         stats = {}
@@ -318,6 +364,13 @@ class TCPReceiver:
         self.device_data: Dict[str, List[float]] = {}
         self.device_port_mapping: Dict[str, List[int]] = {}
         
+        # Samples replaced by a newer one before get_data read them; the flags
+        # and count of a device change only under its lock (port threads and
+        # the processing thread both touch them)
+        self.unread: Dict[str, List[bool]] = {}
+        self.overwrites: Dict[str, int] = {}
+        self.unread_locks: Dict[str, threading.Lock] = {}
+        
         # Initialize raw data logger
         self.raw_data_logger = None
         if RawDataLogger:
@@ -335,7 +388,8 @@ class TCPReceiver:
                     'ip': self.config.ip_address,
                     'start_port': self.config.port,
                     'num_ports': 1,  # Will be updated by configure_devices
-                    'is_big_endian': self.config.is_big_endian
+                    'is_big_endian': self.config.is_big_endian,
+                    'kernel_timestamps': self.config.kernel_timestamps
                 }
             }
             
@@ -374,7 +428,8 @@ class TCPReceiver:
                 'ip': self.config.ip_address,
                 'start_port': ports[0],
                 'num_ports': len(ports),
-                'is_big_endian': self.config.is_big_endian
+                'is_big_endian': self.config.is_big_endian,
+                'kernel_timestamps': self.config.kernel_timestamps
             }
         
         # Setup raw data logging for each device
@@ -395,6 +450,9 @@ class TCPReceiver:
                 if device_name in self.device_port_mapping:
                     num_ports = len(self.device_port_mapping[device_name])
                     self.device_data[device_name] = [0.0] * num_ports
+                    self.unread[device_name] = [False] * num_ports
+                    self.overwrites[device_name] = 0
+                    self.unread_locks[device_name] = threading.Lock()
                     logger.info(f"📝 Initialized {device_name} device_data with {num_ports} ports")
                 
                 def make_callback(dev_name):
@@ -404,7 +462,12 @@ class TCPReceiver:
                             ports = self.device_port_mapping[dev_name]
                             if port_index < len(ports):
                                 actual_port = ports[port_index]
-                                self.device_data[dev_name][port_index] = value
+                                with self.unread_locks[dev_name]:
+                                    unread = self.unread[dev_name]
+                                    if unread[port_index]:
+                                        self.overwrites[dev_name] += 1
+                                    self.device_data[dev_name][port_index] = value
+                                    unread[port_index] = True
                                 
                                 # Log raw data if logger is available
                                 if self.raw_data_logger:
@@ -432,6 +495,11 @@ class TCPReceiver:
     def get_data(self, device_name: str) -> Optional[List[float]]:
         """Get data for specified device"""
         data = self.device_data.get(device_name)
+        lock = self.unread_locks.get(device_name)
+        if lock:
+            with lock:
+                unread = self.unread[device_name]
+                unread[:] = [False] * len(unread)
         if data:
             non_zero_count = sum(1 for x in data if abs(x) > 1e-10)
             logger.info(f"🔍 get_data({device_name}): {non_zero_count}/12 non-zero values, sample: {[f'{x:.6f}' for x in data[:3]]}")
@@ -439,6 +507,16 @@ class TCPReceiver:
             logger.debug(f"🔍 get_data({device_name}): No data available")
         return data
     
+    def get_overwrites(self, device_name: str) -> int:
+        """Samples of a device replaced by a newer one before get_data read them"""
+        return self.overwrites.get(device_name, 0)
+    
+    def get_ingest_window(self, device_name: str) -> Optional[Tuple[int, int]]:
+        """(oldest, newest) receive times in ns of the values get_data returns for a device"""
+        if not self.matlab_receiver:
+            return None
+        return self.matlab_receiver.get_ingest_window(device_name)
+    
     def get_status(self) -> Dict[str, Any]:
         """Get receiver status"""
         if self.matlab_receiver:
@@ -19,6 +19,9 @@ import tempfile
 import os
 import json
 import logging
+import socket
+import struct
+import numpy as np
 from unittest.mock import Mock, patch, MagicMock
 from typing import Dict, List, Any
 
@@ -33,14 +36,35 @@ from device_encoders.reaction_wheel_status_manager import RWAStatusManager
 from output_transmitters.serial_transmitter import SerialTransmitter, SerialConfig
 from output_transmitters.can_transmitter import CANTransmitter, CANConfig
 from output_transmitters.tcp_transmitter import TCPTransmitter, TCPConfig
+from output_transmitters.protocol_pty import get_pty_pair, close_pty_pair, parse_url
 
-from tcp_receiver import TCPReceiver, TCPConfig as TCPReceiverConfig
+from tcp_receiver import TCPReceiver, MATLABTCPReceiver, TCPConfig as TCPReceiverConfig
 from packet_logger import PacketLogger
-from usb_loopback_tester import USBLoopbackTester, USBPortConfig
+from usb_loopback_tester import USBLoopbackTester, USBPortConfig, LoopbackMatcher
 from error_handler import ErrorHandler, ErrorType, ErrorSeverity
-from performance_monitor import PerformanceMonitor
+from performance_monitor import PerformanceMonitor, LatencyHistogram
+from capture_store import convert_capture, load_capture, format_timestamp_ns
+from tcp_correlation_tool import TimestampCorrelator
+from port_skew_analyzer import PortSkewAnalyzer
+from realistic_satellite_visualizer import RealisticSatelliteVisualizer
+from satellite_visualizer import SatelliteVisualizer
+from parallel_render import render_parallel
+from attitude_propagator import (propagate_attitude, quaternion_multiply, quaternion_to_euler,
+                                  quaternion_to_rotation_matrix, check_consistency)
+from metrics_server import MetricsServer, format_prometheus
+from latency_tracer import EmissionTracer
+from magnetometer_responder import MagnetometerPollResponder, ResponderConfig, ReplyTemplate, RequestFramer
+from reaction_wheel_responder import ReactionWheelResponder, RWResponderConfig, CommandFramer, xor_crc
+from honeywell_magnetometer import HoneywellMagnetometer, MessageType, MagnetometerReading, MagnetometerStatus, calculate_crc16
+from magnetometer_calibration import CalibrationSet, fit_ellipsoid, save_calibration, load_calibration, list_calibrations
+from magnetometer_ring import ReadingRing
+from rate_sensor_test_generator import RateSensorTestGenerator, RateSensorData, MessageEncoder
+from attitude_tap import AttitudeTap, TapSubscriber, SampleRing, encode_frame, decode_frame
+from tcp_data_dumper import MultiPortTCPDataDumper, PortStatistics, iter_raw_records
+from benchmarks.sinks import TCPSink, PtySink, CANSink
+from benchmarks.run_benchmarks import compare_to_baseline, summarize
 
-from flatsat_device_simulator import FlatSatDeviceSimulator, DeviceConfig, SimulatorConfig
+from flatsat_device_simulator import FlatSatDeviceSimulator, DeviceConfig, SimulatorConfig, expand_instances
 
 # Configure logging for tests
 logging.basicConfig(level=logging.WARNING)  # Reduce noise during tests
@@ -204,6 +228,109 @@ class TestTCPReceiver(unittest.TestCase):
         self.assertEqual(receiver.config.mode, "server")
         self.assertEqual(receiver.config.ip_address, "127.0.0.1")
         self.assertEqual(receiver.config.port, 5000)
+    
+    def test_receive_drops_count_overwrites(self):
+        """Test only samples replaced before get_data read them count as drops"""
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        receiver = TCPReceiver(TCPReceiverConfig(mode="server", ip_address="127.0.0.1", port=port))
+        receiver.raw_data_logger = None
+        receiver.configure_devices({'test_device': {'enabled': True, 'matlab_ports': [port]}})
+        try:
+            time.sleep(0.2)
+            with socket.create_connection(('127.0.0.1', port)) as client:
+                # A reader keeping up: 1200 samples, each read before the next arrives
+                for index in range(1200):
+                    client.sendall(struct.pack('<d', float(index + 1)))
+                    deadline = time.time() + 2.0
+                    while receiver.device_data['test_device'][0] != index + 1 and time.time() < deadline:
+                        time.sleep(0.0002)
+                    self.assertEqual(receiver.get_data('test_device')[0], index + 1)
+                self.assertEqual(receiver.get_overwrites('test_device'), 0)
+                
+                # Three samples before the next read: two were never seen
+                client.sendall(b"".join(struct.pack('<d', value) for value in (-1.0, -2.0, -3.0)))
+                deadline = time.time() + 2.0
+                while receiver.device_data['test_device'][0] != -3.0 and time.time() < deadline:
+                    time.sleep(0.001)
+        finally:
+            receiver.stop()
+        
+        self.assertEqual(receiver.get_overwrites('test_device'), 2)
+        port_stats = receiver.matlab_receiver.get_stats()['test_device'][0]
+        self.assertEqual(port_stats['packets_received'], 1203)
+    
+    def test_receive_drops_counted_across_port_threads(self):
+        """Test overwrites from concurrent port threads are all counted"""
+        ports = []
+        for _ in range(2):
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+                sock.bind(('127.0.0.1', 0))
+                ports.append(sock.getsockname()[1])
+        receiver = TCPReceiver(TCPReceiverConfig(mode="server", ip_address="127.0.0.1", port=ports[0]))
+        receiver.raw_data_logger = None
+        receiver.configure_devices({'test_device': {'enabled': True, 'matlab_ports': ports}})
+        try:
+            callback = receiver.matlab_receiver.data_callbacks['test_device']
+            writers = [threading.Thread(target=lambda index=index: [callback(index, float(value), [])
+                                                                    for value in range(20000)])
+                       for index in range(len(ports))]
+            for writer in writers:
+                writer.start()
+            for writer in writers:
+                writer.join()
+        finally:
+            receiver.stop()
+        
+        self.assertEqual(receiver.get_overwrites('test_device'), len(ports) * 19999)
+        receiver.get_data('test_device')
+        callback(0, 1.0, [])
+        self.assertEqual(receiver.get_overwrites('test_device'), len(ports) * 19999)
+
+class TestPtySerial(unittest.TestCase):
+    """Test pty:// serial stand-ins"""
+    
+    def test_parse_url(self):
+        """Test pty URLs name the pair and can turn off throttling"""
+        self.assertEqual(parse_url("pty://ars"), ("ars", True))
+        self.assertEqual(parse_url("pty://ars?throttle=0"), ("ars", False))
+        with self.assertRaises(ValueError):
+            parse_url("pty://ars?speed=1")
+    
+    def _transmit(self, port: str, frames: List[bytes], baud_rate: int) -> tuple:
+        pair = get_pty_pair(parse_url(port)[0])
+        transmitter = SerialTransmitter(SerialConfig(port=port, baud_rate=baud_rate))
+        self.assertTrue(transmitter.connect())
+        received = b""
+        expected = sum(len(frame) for frame in frames)
+        try:
+            transmitter.start_transmission()
+            start = time.perf_counter()
+            for frame in frames:
+                transmitter.send_data(frame, "ars")
+            deadline = time.time() + 5.0
+            while len(received) < expected and time.time() < deadline:
+                received += pair.read(timeout=0.1)
+            elapsed = time.perf_counter() - start
+        finally:
+            transmitter.disconnect()
+            close_pty_pair(pair.name)
+        return received, elapsed
+    
+    def test_serial_transmitter_throughput(self):
+        """Test frames cross the pty intact at the emulated line rate"""
+        frames = [bytes([0xA5, n]) + bytes(98) for n in range(20)]
+        received, elapsed = self._transmit("pty://throttled", frames, baud_rate=57600)
+        
+        self.assertEqual(received, b"".join(frames))
+        # 2000 bytes at 10 bits per character take 0.35 s on a 57600 baud line
+        self.assertGreater(elapsed, 0.3)
+        self.assertLess(elapsed, 2.0)
+        
+        received, elapsed = self._transmit("pty://unthrottled?throttle=0", frames, baud_rate=57600)
+        self.assertEqual(received, b"".join(frames))
+        self.assertLess(elapsed, 0.3)
 
 class TestPacketLogger(unittest.TestCase):
     """Test packet logging functionality"""
@@ -247,6 +374,64 @@ class TestUSBLoopbackTester(unittest.TestCase):
         
         tester = USBLoopbackTester(configs)
         self.assertIn("test_device", tester.device_configs)
+    
+    def _frame(self, n: int) -> bytes:
+        return bytes([0xA5, n]) + bytes(range(10))
+    
+    def test_matcher_pipelined_echo(self):
+        """Test in-flight frames are matched in order across partial reads"""
+        matcher = LoopbackMatcher("ars")
+        for n in range(3):
+            matcher.submit(self._frame(n), sent_ns=1000 * n)
+        stream = b"".join(self._frame(n) for n in range(3))
+        
+        results = matcher.feed(stream[:5], 10_000) + matcher.feed(stream[5:], 20_000)
+        self.assertEqual([r.sequence for r in results], [0, 1, 2])
+        self.assertEqual([r.stream_offset for r in results], [0, 12, 24])
+        self.assertTrue(all(r.success for r in results))
+        self.assertEqual(results[2].latency_ms, 0.018)
+        self.assertEqual(matcher.get_stats(20_000)["in_flight"], 0)
+    
+    def test_matcher_mismatch_loss_and_noise(self):
+        """Test corrupted, skipped and stray bytes are told apart"""
+        matcher = LoopbackMatcher("ars", echo_timeout=1.0)
+        for n in range(4):
+            matcher.submit(self._frame(n), sent_ns=0)
+        corrupted = bytearray(self._frame(0))
+        corrupted[3] ^= 0xFF
+        # Frame 0 corrupted, frame 1 never echoed, two stray bytes before frame 2
+        results = matcher.feed(bytes(corrupted) + b"\x00\x00" + self._frame(2) + self._frame(3), 1000)
+        
+        self.assertEqual([(r.sequence, r.success) for r in results], [(0, False), (1, False), (2, True), (3, True)])
+        self.assertEqual(results[0].mismatch_offsets, [3])
+        self.assertEqual(results[1].received_bytes, b"")
+        stats = matcher.get_stats(1000)
+        self.assertEqual((stats["frames_mismatched"], stats["frames_lost"], stats["unexpected_bytes"]), (1, 1, 2))
+        
+        # Frames left unechoed past the timeout and frames pushed out of a full window are lost
+        matcher.submit(self._frame(4), sent_ns=0)
+        self.assertEqual([r.sequence for r in matcher.expire(2_000_000_000)], [4])
+        small = LoopbackMatcher("ars", max_in_flight=1)
+        small.submit(self._frame(0), sent_ns=0)
+        _, evicted = small.submit(self._frame(1), sent_ns=0)
+        self.assertEqual([r.sequence for r in evicted], [0])
+    
+    def test_loopback_over_serial(self):
+        """Test pipelined frames round trip through a persistent loopback port"""
+        tester = USBLoopbackTester({"ars": USBPortConfig(port="loop://")})
+        self.assertTrue(tester.start_testing())
+        try:
+            for n in range(50):
+                self.assertTrue(tester.submit_packet("ars", self._frame(n)))
+            result = tester.test_device_packet("ars", self._frame(50))
+        finally:
+            tester.stop_testing()
+        
+        self.assertTrue(result.success)
+        self.assertEqual(result.sequence, 50)
+        stats = tester.get_status()["ars"]
+        self.assertEqual((stats["frames_matched"], stats["frames_lost"], stats["frames_mismatched"]), (51, 0, 0))
+        self.assertEqual(stats["round_trip"]["count"], 51)
 
 class TestErrorHandler(unittest.TestCase):
     """Test error handling functionality"""
@@ -306,6 +491,1209 @@ class TestPerformanceMonitor(unittest.TestCase):
         self.assertIn("system_metrics", summary)
         self.assertIn("component_metrics", summary)
         self.assertIn("test_component", summary["component_metrics"])
+        self.assertIn("latency_windows", summary["component_metrics"]["test_component"])
+    
+    def test_histogram_buckets(self):
+        """Test log-linear bucket bounds contain their values within 1/32"""
+        for value in (0, 1, 31, 32, 33, 63, 64, 1000, 123456, 10**9):
+            index = LatencyHistogram.bucket_index(value)
+            lower, upper = LatencyHistogram.bucket_bounds(index)
+            self.assertLessEqual(lower, value)
+            self.assertLess(value, upper)
+            self.assertLessEqual(upper - lower, max(1, lower // 32))
+        self.assertEqual(LatencyHistogram.bucket_index(2**50), LatencyHistogram.BUCKETS - 1)
+    
+    def test_histogram_percentiles(self):
+        """Test percentiles stay within bucket precision"""
+        histogram = LatencyHistogram()
+        for value in range(1, 10001):
+            histogram.record(value * 1000)
+        
+        summary = histogram.summary()
+        self.assertEqual(summary["count"], 10000)
+        self.assertAlmostEqual(summary["p50_ms"], 5.0, delta=5.0 / 32)
+        self.assertAlmostEqual(summary["p99_ms"], 9.9, delta=9.9 / 32)
+        self.assertAlmostEqual(summary["p99_9_ms"], 9.99, delta=9.99 / 32)
+        self.assertEqual(summary["max_ms"], 10.0)
+        self.assertAlmostEqual(summary["mean_ms"], 5.0005)
+    
+    def test_thread_shards_merge(self):
+        """Test samples from several threads merge into one histogram"""
+        metrics = self.monitor.get_component_metrics("sharded")
+        
+        def record():
+            for _ in range(1000):
+                metrics.record_ns(5000)
+        
+        threads = [threading.Thread(target=record) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(len(metrics._shards), 4)
+        self.assertEqual(metrics.total_operations, 4000)
+        self.assertEqual(metrics.histogram().percentile_ns(50), 5000)
+    
+    def test_record_registers_shard_once(self):
+        """Test each thread registers one shard per component and reuses it"""
+        for _ in range(3):
+            with self.monitor.measure_latency("cached_component"):
+                pass
+        
+        metrics = self.monitor.get_component_metrics("cached_component")
+        self.assertEqual(len(metrics._shards), 1)
+        self.assertEqual(metrics.total_operations, 3)
+    
+    def test_collection_during_registration(self):
+        """Test summaries stay safe while threads register new components"""
+        errors = []
+        
+        def register(worker):
+            for index in range(50):
+                self.monitor.record(f"component_{worker}_{index}", 1000)
+        
+        def collect():
+            try:
+                for _ in range(20):
+                    self.monitor.get_performance_summary()
+                    self.monitor._snapshot_metrics()
+            except RuntimeError as e:
+                errors.append(e)
+        
+        threads = [threading.Thread(target=register, args=(worker,)) for worker in range(4)]
+        threads.append(threading.Thread(target=collect))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(errors, [])
+        self.assertEqual(len(self.monitor.metrics), 200)
+    
+    def test_windowed_snapshots(self):
+        """Test windows only count samples since the matching snapshot"""
+        metrics = self.monitor.get_component_metrics("windowed")
+        metrics.record_ns(1000)
+        metrics.take_snapshot(time.monotonic_ns() - 2 * 10**9)
+        metrics.record_ns(2000)
+        metrics.record_ns(3000)
+        
+        windows = metrics.windowed_summaries()
+        self.assertEqual(windows["1s"]["count"], 2)
+        self.assertEqual(windows["1m"]["count"], 3)
+        self.assertEqual(windows["total"]["count"], 3)
+        self.assertEqual(windows["total"]["max_ms"], 0.003)
+    
+    def test_export_histograms(self):
+        """Test histogram export lists occupied buckets"""
+        self.monitor.get_component_metrics("exported").record_ns(1500)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            filename = os.path.join(temp_dir, "latency.json")
+            self.monitor.export_histograms(filename)
+            with open(filename) as f:
+                export = json.load(f)
+        
+        component = export["components"]["exported"]
+        self.assertEqual(component["latency_windows"]["total"]["count"], 1)
+        self.assertEqual(len(component["buckets"]), 1)
+        lower, upper, count = component["buckets"][0]
+        self.assertTrue(lower <= 1500 < upper)
+        self.assertEqual(count, 1)
+
+class TestCaptureStore(unittest.TestCase):
+    """Test columnar capture conversion and loading"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.dump_file = os.path.join(self.temp_dir, "capture.dmp")
+        
+        lines = [
+            "✅ Port 50038: Listening for connections...",
+            "50038:23:59:59.998: 2C A1 07 CF 43 28 31 3F    ,...C(1?     = 0.000262",
+            "50039:23:59:59.999: 0C 05 4F 2A 78 AF 02 C0    ..O*x...     = -2.335678",
+            "📊 Port 50039: 16 bytes, 2 packets",
+            "50038:00:00:00.002: 90 81 5F 69 5A E0 26 3F    .._iZ.&?     = 0.000175",
+            "50040:00:00:00.003:  = 1.500000",
+        ]
+        with open(self.dump_file, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+    
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.temp_dir)
+    
+    def test_conversion_and_loading(self):
+        """Test that hex words and printed floats land in per-port columns"""
+        store = load_capture(self.dump_file)
+        
+        self.assertEqual(store.ports, [50038, 50039, 50040])
+        self.assertEqual(store.count(50038), 2)
+        self.assertAlmostEqual(store.values(50039)[0], -2.335678, places=6)
+        self.assertEqual(store.values(50040)[0], 1.5)
+        self.assertEqual(format_timestamp_ns(store.timestamps_ns(50038)[0]), "23:59:59.998")
+    
+    def test_midnight_rollover(self):
+        """Test that timestamps stay monotonic across midnight"""
+        store = load_capture(self.dump_file)
+        timestamps = store.timestamps_ns(50038)
+        
+        self.assertEqual(int(timestamps[1] - timestamps[0]), 4_000_000)
+        self.assertEqual(format_timestamp_ns(timestamps[1]), "00:00:00.002")
+    
+    def test_cached_store_reused(self):
+        """Test that an up-to-date store is not rebuilt"""
+        store_dir = convert_capture(self.dump_file)
+        manifest_mtime = os.path.getmtime(os.path.join(store_dir, "manifest.json"))
+        
+        load_capture(self.dump_file)
+        self.assertEqual(os.path.getmtime(os.path.join(store_dir, "manifest.json")), manifest_mtime)
+
+class TestTimestampCorrelator(unittest.TestCase):
+    """Test streaming cross-port timestamp correlation"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.dump_file = os.path.join(self.temp_dir, "capture.dmp")
+        
+        lines = [
+            "50038:12:00:00.000:  = 1.000000",
+            "50039:12:00:00.004:  = 2.000000",
+            "50040:12:00:00.030:  = 3.000000",
+            "50038:12:00:00.100:  = 4.000000",
+            "50040:12:00:00.103:  = 5.000000",
+            "50039:12:00:00.105:  = 6.000000",
+            "50039:12:00:00.107:  = 7.000000",
+        ]
+        with open(self.dump_file, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+    
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.temp_dir)
+    
+    def test_correlation_groups(self):
+        """Test greedy grouping, closest-entry selection and running statistics"""
+        correlator = TimestampCorrelator(time_window_ms=10.0, max_groups=1)
+        correlator.load_data(self.dump_file)
+        correlator.correlate_timestamps()
+        
+        # The lone 50040 sample at .030 never forms a group
+        self.assertEqual(correlator.total_groups, 2)
+        self.assertEqual(len(correlator.correlated_groups), 1)
+        self.assertEqual(correlator.group_ports, {50038, 50039, 50040})
+        self.assertAlmostEqual(correlator.max_diff_max_ms, 5.0)
+        self.assertAlmostEqual(correlator.max_diff_min_ms, 4.0)
+        
+        group_start, group_data = correlator.correlated_groups[0]
+        self.assertEqual(sorted(group_data), [50038, 50039])
+        self.assertEqual(group_data[50039][1], 2.0)
+        self.assertAlmostEqual(group_data[50039][2], 0.004)
+        
+        report_file = os.path.join(self.temp_dir, "report.txt")
+        correlator.generate_report(report_file)
+        with open(report_file) as f:
+            report = f.read()
+        self.assertIn("Total correlated groups: 2", report)
+        self.assertIn("Average max time difference: 4.50ms", report)
+
+class TestPortSkewAnalyzer(unittest.TestCase):
+    """Test frame reconstruction across a device port set"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.dump_file = os.path.join(self.temp_dir, "capture.dmp")
+        
+        # Four 10ms frames on the magnetometer ports: skews of 2, 1, 3 and 0ms,
+        # 50051 arrives before 50050 in the third frame and is missing in the last
+        lines = [
+            "50050:12:00:00.000:  = 1.000000",
+            "50051:12:00:00.001:  = 1.000000",
+            "50052:12:00:00.002:  = 1.000000",
+            "50050:12:00:00.010:  = 2.000000",
+            "50051:12:00:00.010:  = 2.000000",
+            "50052:12:00:00.011:  = 2.000000",
+            "50051:12:00:00.020:  = 3.000000",
+            "50050:12:00:00.022:  = 3.000000",
+            "50052:12:00:00.023:  = 3.000000",
+            "50050:12:00:00.030:  = 4.000000",
+            "50052:12:00:00.030:  = 4.000000",
+        ]
+        with open(self.dump_file, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+    
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.temp_dir)
+    
+    def test_frame_alignment(self):
+        """Test skew, out-of-order, missing port and wait window statistics"""
+        analyzer = PortSkewAnalyzer(target_completeness=0.5)
+        analyzer.load_data(self.dump_file)
+        stats = analyzer.analyze_ports("magnetometer", [50050, 50051, 50052])
+        
+        self.assertEqual(stats.frames, 4)
+        self.assertEqual(stats.complete_frames, 3)
+        self.assertEqual(stats.out_of_order, 1)
+        self.assertEqual(stats.duplicate_samples, 0)
+        self.assertAlmostEqual(stats.frame_period_ms, 9.5)  # Median of the per-port medians
+        self.assertAlmostEqual(stats.max_skew_ms, 3.0)
+        self.assertEqual(stats.port_stats[1].missing_frames, 1)
+        self.assertEqual(stats.port_stats[1].out_of_order, 1)  # Overtook 50050
+        self.assertEqual(stats.port_stats[0].out_of_order, 0)
+        
+        # Two of four frames complete within 2ms; a 75% target needs 3ms
+        self.assertAlmostEqual(stats.recommended_window_ms, 2.0)
+        self.assertAlmostEqual(stats.completeness_by_window["1"], 0.25)
+        self.assertAlmostEqual(stats.achievable_completeness, 0.75)
+        
+        analyzer.target_completeness = 0.75
+        self.assertAlmostEqual(analyzer.analyze_ports("magnetometer", [50050, 50051, 50052]).recommended_window_ms, 3.0)
+        analyzer.target_completeness = 0.999
+        self.assertIsNone(analyzer.analyze_ports("magnetometer", [50050, 50051, 50052]).recommended_window_ms)
+
+class TestRealisticSatelliteVisualizer(unittest.TestCase):
+    """Test vectorized attitude frame preparation"""
+    
+    def setUp(self):
+        self.visualizer = RealisticSatelliteVisualizer("unused.dmp")
+        # 100 samples at 100 Hz (10ms apart)
+        self.visualizer.timestamps = np.arange(100, dtype=np.int64) * 10_000_000
+        self.visualizer.x_data = np.linspace(0.0, 0.01, 100)
+        self.visualizer.y_data = np.linspace(0.0, -0.005, 100)
+        self.visualizer.z_data = np.linspace(0.0, 0.002, 100)
+    
+    def test_rotation_matrices(self):
+        """Test batched rotations match the per-axis Rz @ Ry @ Rx product"""
+        roll, pitch, yaw = 0.3, -0.7, 1.1
+        Rx = np.array([[1, 0, 0], [0, np.cos(roll), -np.sin(roll)], [0, np.sin(roll), np.cos(roll)]])
+        Ry = np.array([[np.cos(pitch), 0, np.sin(pitch)], [0, 1, 0], [-np.sin(pitch), 0, np.cos(pitch)]])
+        Rz = np.array([[np.cos(yaw), -np.sin(yaw), 0], [np.sin(yaw), np.cos(yaw), 0], [0, 0, 1]])
+        
+        R = self.visualizer.rotation_matrices([roll, 0.0], [pitch, 0.0], [yaw, 0.0])
+        self.assertEqual(R.shape, (2, 3, 3))
+        np.testing.assert_allclose(R[0], Rz @ Ry @ Rx, atol=1e-12)
+        np.testing.assert_allclose(R[1], np.eye(3), atol=1e-12)
+    
+    def test_frame_decimation(self):
+        """Test decimation samples the capture at the output frame rate"""
+        self.assertEqual(len(self.visualizer.frame_indices(fps=25)), 100)
+        
+        indices = self.visualizer.frame_indices(fps=25, decimate=True)
+        np.testing.assert_array_equal(indices, np.arange(0, 100, 4))
+        
+        frames = self.visualizer.prepare_frames(fps=25, decimate=True)
+        self.assertEqual(frames['faces']['body'].shape, (25, 6, 4, 3))
+        self.assertEqual(frames['attitude_deg'].shape, (25, 3))
+
+class TestParallelRender(unittest.TestCase):
+    """Test chunked frame rendering in a process pool"""
+    
+    def test_render_chunks_in_order(self):
+        """Test every frame is written once under its global frame number"""
+        visualizer = SatelliteVisualizer("unused.dmp")
+        visualizer.timestamps = np.arange(5, dtype=np.int64) * 10_000_000
+        visualizer.x_data = np.linspace(0.0, 1.0, 5)
+        visualizer.y_data = np.linspace(0.0, 2.0, 5)
+        visualizer.z_data = np.linspace(0.0, 3.0, 5)
+        
+        with tempfile.TemporaryDirectory() as frames_dir:
+            rendered = render_parallel(visualizer, None, workers=2, chunk_size=2, frames_dir=frames_dir)
+            self.assertEqual(rendered, 5)
+            self.assertEqual(sorted(os.listdir(frames_dir)), [f"frame_{i:07d}.png" for i in range(5)])
+    
+    def test_frames_prepared_once(self):
+        """Test the parent prepares the frames once and workers reuse them"""
+        visualizer = SatelliteVisualizer("unused.dmp")
+        visualizer.timestamps = np.arange(6, dtype=np.int64) * 10_000_000
+        visualizer.x_data = visualizer.y_data = visualizer.z_data = np.linspace(0.0, 1.0, 6)
+        
+        prepare_frames = SatelliteVisualizer.prepare_frames
+        with patch.object(SatelliteVisualizer, 'prepare_frames', autospec=True,
+                               side_effect=prepare_frames) as prepare, \
+             tempfile.TemporaryDirectory() as frames_dir:
+            self.assertEqual(render_parallel(visualizer, None, workers=2, chunk_size=2, frames_dir=frames_dir), 6)
+        self.assertEqual(prepare.call_count, 1)
+
+class TestAttitudePropagator(unittest.TestCase):
+    """Test vectorized quaternion attitude propagation"""
+    
+    def test_constant_rate_uses_timestamp_steps(self):
+        """Test a constant yaw rate over uneven time steps integrates to rate * duration"""
+        timestamps = np.array([0, 10, 25, 30, 100], dtype=np.int64) * 1_000_000
+        rates = np.tile([0.0, 0.0, 0.5], (5, 1))
+        
+        euler = quaternion_to_euler(propagate_attitude(timestamps, rates))
+        np.testing.assert_allclose(euler[:, 2], 0.5 * timestamps / 1e9, atol=1e-12)
+        np.testing.assert_allclose(euler[:, :2], 0.0, atol=1e-12)
+    
+    def test_prefix_scan_matches_sequential_product(self):
+        """Test the batched prefix product equals step-by-step propagation"""
+        rng = np.random.default_rng(7)
+        timestamps = np.cumsum(rng.integers(5_000_000, 15_000_000, 37)).astype(np.int64)
+        rates = rng.normal(0.0, 0.5, (37, 3))
+        q0 = np.array([np.cos(0.2), np.sin(0.2), 0.0, 0.0])
+        
+        quaternions = propagate_attitude(timestamps, rates, q0=q0)
+        
+        q = q0
+        for k in range(1, 37):
+            propagated = propagate_attitude(timestamps[k-1:k+1], rates[k-1:k+1], q0=q)
+            q = propagated[-1]
+        np.testing.assert_allclose(quaternions[-1], q, atol=1e-12)
+    
+    def test_rotation_matrix_matches_visualizer_convention(self):
+        """Test quaternion matrices and Euler angles follow Rz @ Ry @ Rx"""
+        roll, pitch, yaw = 0.3, -0.5, 1.2
+        qx = np.array([np.cos(roll / 2), np.sin(roll / 2), 0, 0])
+        qy = np.array([np.cos(pitch / 2), 0, np.sin(pitch / 2), 0])
+        qz = np.array([np.cos(yaw / 2), 0, 0, np.sin(yaw / 2)])
+        q = quaternion_multiply(quaternion_multiply(qz, qy), qx)
+        
+        expected = RealisticSatelliteVisualizer(None).rotation_matrices(roll, pitch, yaw)
+        np.testing.assert_allclose(quaternion_to_rotation_matrix(q), expected, atol=1e-12)
+        np.testing.assert_allclose(quaternion_to_euler(q), [roll, pitch, yaw], atol=1e-12)
+    
+    def test_consistency_check(self):
+        """Test integrated rates agree with matching summed angles"""
+        timestamps = np.arange(50, dtype=np.int64) * 10_000_000
+        rates = np.column_stack((np.full(50, 0.1), np.linspace(0, 0.2, 50), np.zeros(50)))
+        summed = 5.0 + np.column_stack((0.1 * timestamps / 1e9, 0.1 * (timestamps / 1e9) ** 2 / 0.49, np.zeros(50)))
+        
+        report = check_consistency(timestamps, rates, summed)
+        for axis in 'xyz':
+            self.assertLess(report[axis]["max_abs_diff_rad"], 1e-12)
+
+class TestAttitudeTap(unittest.TestCase):
+    """Test the simulator's live ingest frame tap"""
+    
+    def test_frame_round_trip(self):
+        """Test datagram encoding and malformed datagram rejection"""
+        packet = encode_frame('magnetometer', [1e-5, 2e-5, 3e-5], timestamp_ns=123)
+        self.assertEqual(decode_frame(packet), ('magnetometer', 123, (1e-5, 2e-5, 3e-5)))
+        self.assertIsNone(decode_frame(packet[:-1]))
+        self.assertIsNone(decode_frame(b'XXXX' + packet[4:]))
+    
+    def test_sample_ring_wraps(self):
+        """Test the ring keeps the newest samples in time order"""
+        ring = SampleRing(capacity=4, width=2)
+        for i in range(6):
+            ring.append(i, [i, -i])
+        
+        timestamps, values = ring.latest()
+        np.testing.assert_array_equal(timestamps, [2, 3, 4, 5])
+        np.testing.assert_array_equal(values[:, 1], [-2, -3, -4, -5])
+        np.testing.assert_array_equal(ring.latest(max_samples=2)[0], [4, 5])
+    
+    def test_publish_and_subscribe(self):
+        """Test frames reach a subscriber and publishing never raises without one"""
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        
+        tap = AttitudeTap(port=port)
+        tap.publish('ars', [0.0] * 12)  # Nobody listening yet
+        
+        subscriber = TapSubscriber(port=port)
+        subscriber.start()
+        try:
+            for i in range(3):
+                tap.publish('ars', [float(i)] * 12)
+            deadline = time.time() + 2.0
+            while subscriber.rings['ars'].count < 3 and time.time() < deadline:
+                time.sleep(0.01)
+            
+            timestamps, values = subscriber.rings['ars'].latest()
+            np.testing.assert_array_equal(values[:, 0], [0.0, 1.0, 2.0])
+        finally:
+            subscriber.stop()
+            tap.close()
+    
+    def test_publish_counts_from_many_threads(self):
+        """Test frames published from several threads are all counted"""
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        
+        tap = AttitudeTap(port=port)
+        try:
+            publishers = [threading.Thread(target=lambda: [tap.publish('magnetometer', [0.0] * 3) for _ in range(2000)])
+                          for _ in range(4)]
+            for publisher in publishers:
+                publisher.start()
+            for publisher in publishers:
+                publisher.join()
+        finally:
+            tap.close()
+        
+        status = tap.get_status()
+        self.assertEqual(status["frames_sent"] + status["frames_dropped"], 8000)
+
+class TestMetricsServer(unittest.TestCase):
+    """Test the Prometheus/JSON metrics endpoint"""
+    
+    def setUp(self):
+        self.snapshot = {
+            "uptime_seconds": 12.5,
+            "devices": {"ars": {"ingest_rate_hz": 120.0, "samples_received": 1440, "output_connected": True}},
+            "latency": {"ars_encoder": {"count": 3, "sum_seconds": 0.003, "quantiles": {"0.5": 0.001}}},
+            "errors": {"error_types": {"encoding": {"total_errors": 2, "recovered_errors": 1, "failed_recoveries": 1}}}
+        }
+    
+    def test_prometheus_format(self):
+        """Test snapshot rendering in exposition format"""
+        text = format_prometheus(self.snapshot)
+        self.assertIn("# TYPE flatsat_device_ingest_rate_hz gauge", text)
+        self.assertIn('flatsat_device_ingest_rate_hz{device="ars"} 120.0', text)
+        self.assertIn('flatsat_device_output_connected{device="ars"} 1', text)
+        self.assertIn('flatsat_latency_seconds{component="ars_encoder",quantile="0.5"} 0.001', text)
+        self.assertIn('flatsat_latency_seconds_count{component="ars_encoder"} 3', text)
+        self.assertIn('flatsat_total_errors_total{error_type="encoding"} 2', text)
+        self.assertIn("flatsat_uptime_seconds 12.5", text)
+        self.assertNotIn("frame_completeness", text)
+    
+    def test_scrape_serves_snapshot(self):
+        """Test scrapes return the pre-rendered snapshot in both formats"""
+        import urllib.request
+        import urllib.error
+        
+        server = MetricsServer(lambda: self.snapshot, host='127.0.0.1', port=0, interval=60.0)
+        server.start()
+        try:
+            base = f"http://127.0.0.1:{server.port}"
+            with urllib.request.urlopen(f"{base}/metrics") as response:
+                self.assertIn("text/plain", response.headers["Content-Type"])
+                self.assertIn('device="ars"', response.read().decode())
+            with urllib.request.urlopen(f"{base}/metrics.json") as response:
+                self.assertEqual(json.loads(response.read())["devices"]["ars"]["samples_received"], 1440)
+            with self.assertRaises(urllib.error.HTTPError):
+                urllib.request.urlopen(f"{base}/other")
+            self.assertEqual(server.scrapes, 2)
+            self.assertEqual(server.snapshots_taken, 1)
+        finally:
+            server.stop()
+
+class TestLatencyTracer(unittest.TestCase):
+    """Test ingest-to-emission age tracing"""
+    
+    def _free_port(self):
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.bind(('127.0.0.1', 0))
+            return sock.getsockname()[1]
+    
+    def test_record_emission(self):
+        """Test ages land in per-device histograms and the trace file"""
+        tracer = EmissionTracer(PerformanceMonitor())
+        tracer.record_emission("ars", None)  # Untraced packets are ignored
+        self.assertEqual(tracer.get_summary(), {})
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            trace_path = os.path.join(temp_dir, "trace.csv")
+            tracer.open_trace(trace_path)
+            tracer.record_emission("ars", (1_000_000, 3_000_000), enqueue_ns=4_000_000, size=28, emit_ns=5_000_000)
+            tracer.close_trace()
+            with open(trace_path) as f:
+                lines = f.read().splitlines()
+        
+        self.assertEqual(lines[1], "ars,1000000,3000000,4000000,5000000,28")
+        summary = tracer.get_summary()["ars"]
+        self.assertEqual(summary["oldest_sample"]["max_ms"], 4.0)
+        self.assertEqual(summary["newest_sample"]["max_ms"], 2.0)
+    
+    def test_receiver_stamps_samples(self):
+        """Test every received float is stamped with its receive time"""
+        port = self._free_port()
+        receiver = MATLABTCPReceiver({'test_device': {
+            'tcp_mode': 'server', 'ip': '127.0.0.1', 'start_port': port, 'num_ports': 1,
+            'kernel_timestamps': True
+        }})
+        self.assertIsNone(receiver.get_ingest_window('test_device'))
+        receiver.start()
+        try:
+            time.sleep(0.2)
+            before_ns = time.time_ns()
+            with socket.create_connection(('127.0.0.1', port)) as client:
+                client.sendall(struct.pack('<d', 1.5))
+                deadline = time.time() + 3.0
+                while receiver.device_data['test_device'][0] != 1.5 and time.time() < deadline:
+                    time.sleep(0.01)
+            
+            self.assertEqual(receiver.device_data['test_device'][0], 1.5)
+            oldest_ns, newest_ns = receiver.get_ingest_window('test_device')
+            self.assertEqual(oldest_ns, newest_ns)
+            self.assertLessEqual(before_ns - 10**8, oldest_ns)
+            self.assertLessEqual(oldest_ns, time.time_ns())
+        finally:
+            receiver.stop()
+    
+    def test_transmitter_reports_emission(self):
+        """Test the transmit thread reports ingest stamps after the write"""
+        sink = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sink.bind(('127.0.0.1', 0))
+        sink.listen(1)
+        emissions = []
+        
+        transmitter = TCPTransmitter(TCPConfig(target_ip='127.0.0.1', target_port=sink.getsockname()[1]))
+        transmitter.emission_callback = lambda *args: emissions.append(args)
+        try:
+            self.assertTrue(transmitter.connect())
+            connection, _ = sink.accept()
+            transmitter.start_transmission()
+            self.assertTrue(transmitter.send_data(b"frame", "reaction_wheel", ingest_ns=(10, 20)))
+            self.assertEqual(connection.recv(16), b"frame")
+            deadline = time.time() + 2.0
+            while not emissions and time.time() < deadline:
+                time.sleep(0.01)
+            connection.close()
+        finally:
+            transmitter.disconnect()
+            sink.close()
+        
+        device_name, ingest_ns, enqueue_ns, size = emissions[0]
+        self.assertEqual((device_name, ingest_ns, size), ("reaction_wheel", (10, 20), 5))
+        self.assertGreater(enqueue_ns, 0)
+
+class TestBenchmarks(unittest.TestCase):
+    """Test benchmark sinks and baseline comparison"""
+    
+    def _device_result(self, throughput=500.0, p99=5.0, drop_rate=0.0, cpu=5.0):
+        return {"throughput_pps": throughput, "drop_rate": drop_rate, "cpu_percent": cpu,
+                "age_at_emission_ms": {"p99_ms": p99}}
+    
+    def test_compare_to_baseline(self):
+        """Test regressions are flagged only beyond the tolerance"""
+        baseline = {"devices": {"ars": self._device_result()}}
+        self.assertEqual(compare_to_baseline({"devices": {"ars": self._device_result(throughput=450.0, p99=5.5)}}, baseline), [])
+        
+        regressions = compare_to_baseline({"devices": {"ars": self._device_result(
+            throughput=300.0, p99=10.0, drop_rate=0.05, cpu=20.0)}}, baseline)
+        self.assertEqual(len(regressions), 4)
+        self.assertEqual(compare_to_baseline({"devices": {}}, baseline), ["ars: missing from results"])
+    
+    def test_instances_share_type_cpu(self):
+        """Test a type's processing thread CPU is split between its instances"""
+        def moment(at, cpu):
+            counters = {"frames_processed": 0, "encode_failures": 0, "frames_sent": 0, "send_drops": 0}
+            names = ["ars", "reaction_wheel[0]", "reaction_wheel[1]"]
+            return {"time": at, "process_cpu": cpu, "rss": None,
+                    "counters": {name: dict(counters) for name in names},
+                    "sinks": {name: {"bytes_received": 0} for name in names},
+                    "cpu": {"ars": cpu, "reaction_wheel": 2 * cpu},
+                    "ages": {name: LatencyHistogram() for name in names}}
+        
+        devices = summarize(moment(0.0, 0.0), moment(10.0, 1.0))["devices"]
+        self.assertEqual({name: device["cpu_seconds"] for name, device in devices.items()},
+                         {"ars": 1.0, "reaction_wheel[0]": 1.0, "reaction_wheel[1]": 1.0})
+    
+    def test_sinks_receive_output(self):
+        """Test each sink counts what the matching transmitter sends"""
+        tcp_sink, pty_sink, can_sink = TCPSink(), PtySink(), CANSink(channel="flatsat_test_sink")
+        transmitters = [
+            TCPTransmitter(TCPConfig(**tcp_sink.output_config())),
+            SerialTransmitter(SerialConfig(**pty_sink.output_config())),
+            CANTransmitter(CANConfig(**can_sink.output_config()))
+        ]
+        sinks = [tcp_sink, pty_sink, can_sink]
+        for sink in sinks:
+            sink.start()
+        try:
+            for transmitter in transmitters:
+                self.assertTrue(transmitter.connect())
+                transmitter.start_transmission()
+            transmitters[0].send_data(b"12345678", "reaction_wheel")
+            transmitters[1].send_data(b"12345678", "ars")
+            transmitters[2].send_message(0x100, b"12345678", "magnetometer")
+            deadline = time.time() + 3.0
+            while any(sink.bytes_received < 8 for sink in sinks) and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            for transmitter in transmitters:
+                transmitter.disconnect()
+            for sink in sinks:
+                sink.stop()
+        
+        self.assertEqual([sink.bytes_received for sink in sinks], [8, 8, 8])
+
+class TestMagnetometerResponder(unittest.TestCase):
+    """Test the magnetometer poll responder"""
+    
+    def test_reply_template_crc(self):
+        """Test sequence-patched replies carry the CRC of the full message"""
+        template = ReplyTemplate(MessageType.MAGDATA.value, HoneywellMagnetometer.CMD_MAGDATA, bytes(range(17)))
+        for sequence in (0, 1, 0xFF, 0x100, 0xBEEF, 0xFFFF):
+            reply = template.render(sequence)
+            self.assertEqual(struct.unpack('<H', reply[2:4])[0], sequence)
+            self.assertEqual(calculate_crc16(reply[:-2]), struct.unpack('<H', reply[-2:])[0])
+    
+    def test_framer_resyncs(self):
+        """Test requests are split from a stream with noise and corrupted frames"""
+        poll = lambda command, sequence: ReplyTemplate(command, command, b"").render(sequence)
+        corrupted = bytearray(poll(HoneywellMagnetometer.CMD_STATUS, 2))
+        corrupted[-1] ^= 0xFF
+        framer = RequestFramer()
+        stream = b"\xff\x00" + poll(HoneywellMagnetometer.CMD_MAGDATA, 1) + bytes(corrupted) + poll(HoneywellMagnetometer.CMD_MAGTEMP, 3)
+        requests = framer.feed(stream[:9], 0) + framer.feed(stream[9:], 0)
+        
+        self.assertEqual([(r.command, r.sequence) for r in requests],
+                         [(HoneywellMagnetometer.CMD_MAGDATA, 1), (HoneywellMagnetometer.CMD_MAGTEMP, 3)])
+        self.assertGreater(framer.malformed, 0)
+    
+    def test_serial_polls(self):
+        """Test polls over a pty are answered after the turnaround with the latest frame"""
+        responder = MagnetometerPollResponder(ResponderConfig(port="pty://mag_responder?throttle=0", turnaround_ms=5.0))
+        pair = get_pty_pair("mag_responder")
+        self.assertTrue(responder.start())
+        try:
+            poll = ReplyTemplate(MessageType.MAGDATA.value, HoneywellMagnetometer.CMD_MAGDATA, b"").render(7)
+            pair.write(poll)
+            time.sleep(0.1)
+            self.assertEqual(responder.get_status()["unanswered"], 1)  # No MATLAB frame yet
+            
+            responder.update([25000.0, -5000.0, 40000.0])
+            start = time.perf_counter()
+            pair.write(poll)
+            reply = b""
+            while len(reply) < 24 and time.perf_counter() - start < 2.0:
+                reply += pair.read(timeout=0.1)
+            elapsed = time.perf_counter() - start
+        finally:
+            responder.stop()
+            close_pty_pair("mag_responder")
+        
+        self.assertGreaterEqual(elapsed, 0.005)
+        self.assertEqual(struct.unpack('<H', reply[2:4])[0], 7)
+        self.assertEqual(struct.unpack('<fff', reply[5:17]), (25000.0, -5000.0, 40000.0))
+        self.assertEqual(calculate_crc16(reply[:-2]), struct.unpack('<H', reply[-2:])[0])
+        latency = responder.get_status()["response_latency"]
+        self.assertEqual(latency["count"], 1)
+        self.assertGreaterEqual(latency["max_ms"], 5.0)
+    
+    def test_driver_polls_over_can(self):
+        """Test the HoneywellMagnetometer driver reads the simulated field over CAN"""
+        responder = MagnetometerPollResponder(ResponderConfig(link="can", interface="virtual",
+                                                              channel="mag_responder_test", turnaround_ms=1.0))
+        responder.update([25000.0, -5000.0, 40000.0])
+        self.assertTrue(responder.start())
+        driver = HoneywellMagnetometer("CAN", channel="mag_responder_test", interface="virtual")
+        try:
+            self.assertTrue(driver.connect())
+            reading = driver.read_data()
+        finally:
+            driver.disconnect()
+            responder.stop()
+        
+        self.assertEqual((reading.x_field, reading.y_field, reading.z_field), (25000.0, -5000.0, 40000.0))
+        self.assertEqual(responder.get_status()["replies"], 1)
+    
+    def test_driver_matches_replies_by_sequence(self):
+        """Test out-of-order replies resolve their own requests and silence times out"""
+        import can
+        flight = can.Bus(interface="virtual", channel="mag_pipeline_test")
+        driver = HoneywellMagnetometer("CAN", channel="mag_pipeline_test", interface="virtual",
+                                       max_outstanding=4, request_timeout=0.3)
+        try:
+            self.assertTrue(driver.connect())
+            futures = [driver.submit_request(HoneywellMagnetometer.CMD_MAGTEMP, message_type=MessageType.MAGTEMP)
+                       for _ in range(3)]
+            sequences = []
+            while len(sequences) < 3:
+                message = flight.recv(timeout=1.0)
+                if message.data[0] == MessageType.MAGTEMP.value:  # Skip the connect probe
+                    sequences.append(struct.unpack('<H', bytes(message.data[2:4]))[0])
+            self.assertEqual(len(set(sequences)), 3)
+            
+            # Answer the last two in reverse order and leave the first unanswered
+            for index in (2, 1):
+                reply = ReplyTemplate(MessageType.MAGTEMP.value, HoneywellMagnetometer.CMD_MAGTEMP,
+                                      struct.pack('<fB', 20.0 + index, 0)).render(sequences[index])
+                flight.send(can.Message(arbitration_id=HoneywellMagnetometer.CAN_DATA_ID, data=reply,
+                                        is_extended_id=False, is_fd=True))
+            results = [future.result(timeout=2.0) for future in futures]
+        finally:
+            driver.disconnect()
+            flight.shutdown()
+        
+        self.assertIsNone(results[0])
+        for index in (1, 2):
+            self.assertEqual(struct.unpack('<f', results[index][5:9])[0], 20.0 + index)
+        stats = driver.get_pipeline_stats()
+        self.assertEqual((stats["replies"], stats["timeouts"], stats["outstanding"]), (2, 1, 0))
+    
+    def test_driver_streaming(self):
+        """Test streaming keeps polls in flight so readings arrive at the sensor's reply rate"""
+        responder = MagnetometerPollResponder(ResponderConfig(link="can", interface="virtual",
+                                                              channel="mag_streaming_test", turnaround_ms=5.0))
+        responder.update([25000.0, -5000.0, 40000.0])
+        self.assertTrue(responder.start())
+        driver = HoneywellMagnetometer("CAN", channel="mag_streaming_test", interface="virtual", max_outstanding=4)
+        try:
+            self.assertTrue(driver.connect())
+            driver.start_streaming()
+            time.sleep(0.5)
+            driver.stop_continuous_reading()
+            readings = driver.get_all_readings()
+        finally:
+            driver.disconnect()
+            responder.stop()
+        
+        # The responder answers one poll per 5 ms turnaround: at most 100 readings in 0.5 s
+        self.assertGreater(len(readings), 80)
+        self.assertEqual(readings[-1].x_field, 25000.0)
+        self.assertEqual(driver.get_pipeline_stats()["unmatched"], 0)
+    
+    def test_driver_streaming_backs_off_on_link_errors(self):
+        """Test streaming refuses to start disconnected and backs off when writes fail"""
+        driver = HoneywellMagnetometer("CAN", channel="mag_backoff_test", interface="virtual")
+        self.assertFalse(driver.start_streaming())
+        try:
+            self.assertTrue(driver.connect())
+            with patch.object(driver, '_write', side_effect=OSError("adapter unplugged")) as write:
+                self.assertTrue(driver.start_streaming())
+                time.sleep(0.5)
+                driver.stop_continuous_reading()
+        finally:
+            driver.disconnect()
+        
+        # Backing off 50, 100, 200, 400 ms allows a handful of attempts, not a busy loop
+        self.assertLessEqual(write.call_count, 5)
+        self.assertEqual(driver.get_pipeline_stats()["outstanding"], 0)
+
+class TestMagnetometerCalibration(unittest.TestCase):
+    """Test the vectorized magnetometer calibration"""
+    
+    def setUp(self):
+        # Unit-sphere directions seen through a soft-iron distortion plus a hard-iron offset
+        rng = np.random.default_rng(3)
+        directions = rng.normal(size=(500, 3))
+        self.true_fields = 50000.0 * directions / np.linalg.norm(directions, axis=1, keepdims=True)
+        self.distortion = np.array([[1.2, 0.1, 0.0], [0.1, 0.9, 0.05], [0.0, 0.05, 1.1]])
+        self.hard_iron = np.array([3000.0, -1500.0, 800.0])
+        self.raw = self.true_fields @ self.distortion.T + self.hard_iron
+    
+    def test_ellipsoid_fit(self):
+        """Test the fit maps distorted samples back onto a sphere of the field strength"""
+        calibration = fit_ellipsoid(self.raw, field_strength=50000.0)
+        magnitudes = np.linalg.norm(calibration.apply(self.raw), axis=1)
+        
+        self.assertLess(np.abs(magnitudes - 50000.0).max(), 1.0)
+        self.assertLess(calibration.residual_rms, 1.0)
+        self.assertEqual(calibration.samples, 500)
+        with self.assertRaises(ValueError):
+            fit_ellipsoid(np.outer(np.arange(20.0), [1.0, 2.0, 3.0]))  # Collinear
+    
+    def test_named_sets(self):
+        """Test calibration sets are saved by name and round-trip exactly"""
+        calibration = fit_ellipsoid(self.raw)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "calibration.json")
+            save_calibration(path, calibration, "flight")
+            save_calibration(path, CalibrationSet(offset=[1.0, 2.0, 3.0]), "bench")
+            loaded = load_calibration(path, "flight")
+            self.assertEqual(list_calibrations(path), ["bench", "flight"])
+            with self.assertRaises(KeyError):
+                load_calibration(path, "missing")
+        
+        np.testing.assert_array_equal(loaded.apply(self.raw), calibration.apply(self.raw))
+    
+    def test_driver_calibrates_in_blocks(self):
+        """Test the driver composes fits and calibrates queued readings a block at a time"""
+        driver = HoneywellMagnetometer("RS485", port="pty://mag_calibration_test")
+        self.addCleanup(close_pty_pair, "mag_calibration_test")
+        readings = [MagnetometerReading(0.0, x, y, z, 20.0, MagnetometerStatus.NORMAL) for x, y, z in self.raw]
+        self.assertTrue(driver.calibrate(readings, field_strength=50000.0))
+        
+        # Readings calibrated by the first fit need no further correction
+        calibrated = driver.get_calibration().apply(self.raw)
+        linear = driver.get_calibration().linear()
+        self.assertTrue(driver.calibrate(calibrated, field_strength=50000.0))
+        np.testing.assert_allclose(driver.get_calibration().linear(), linear, rtol=1e-6, atol=1e-9)
+        
+        driver.calibration_block_size = 4
+        for reading in readings[:6]:
+            driver._queue_reading(MagnetometerReading(0.0, reading.x_field, reading.y_field, reading.z_field, 20.0,
+                                                      MagnetometerStatus.NORMAL))
+        self.assertEqual(driver.readings.count, 4)  # The first full block
+        queued = driver.get_all_readings()  # Flushes the partial block
+        
+        self.assertEqual(len(queued), 6)
+        np.testing.assert_allclose([[r.x_field, r.y_field, r.z_field] for r in queued], calibrated[:6])
+
+class TestReadingRing(unittest.TestCase):
+    """Test the bounded magnetometer reading store"""
+    
+    def test_overwrite_oldest(self):
+        """Test a full ring overwrites the oldest readings and returns contiguous views across the wrap"""
+        ring = ReadingRing(capacity=8)
+        for seq in range(5):
+            self.assertEqual(ring.append(float(seq), seq, -seq, 2 * seq, 20.0, 0), seq)
+        ring.extend(np.arange(5.0, 13.0), np.column_stack([np.arange(5, 13), -np.arange(5, 13), 2 * np.arange(5, 13)]),
+                    [20.0] * 8, [1] * 8)
+        
+        self.assertEqual((len(ring), ring.count, ring.dropped), (8, 13, 5))
+        self.assertEqual(ring.extend([], np.empty((0, 3)), [], []), 13)  # Empty blocks append nothing
+        self.assertEqual(ring.count, 13)
+        records, next_seq = ring.read_since(0)  # Readings 0-4 are gone
+        self.assertEqual(list(records['seq']), list(range(5, 13)))
+        self.assertEqual(list(records['y']), [-float(seq) for seq in range(5, 13)])
+        self.assertEqual(next_seq, 13)
+        self.assertTrue(np.shares_memory(records, ring.records))  # A view, not a copy
+        
+        records, next_seq = ring.read_since(11)
+        self.assertEqual(list(records['seq']), [11, 12])
+        self.assertEqual(len(ring.read_since(next_seq)[0]), 0)
+        self.assertEqual(int(ring.latest()['seq']), 12)
+    
+    def test_raw_bytes(self):
+        """Test raw messages are kept until the byte ring wraps past them"""
+        ring = ReadingRing(capacity=8, raw_capacity=10)
+        ring.append(0.0, 0, 0, 0, 20.0, 0, raw=b"abcd")
+        ring.append(1.0, 0, 0, 0, 20.0, 0, raw=b"efghij")
+        ring.append(2.0, 0, 0, 0, 20.0, 0)
+        records, _ = ring.read_since(0)
+        self.assertEqual([ring.raw_bytes(r) for r in records], [b"abcd", b"efghij", None])
+        
+        ring.append(3.0, 0, 0, 0, 20.0, 0, raw=b"klm")  # Wraps over "abc"
+        records, _ = ring.read_since(0)
+        self.assertEqual([ring.raw_bytes(r) for r in records], [None, b"efghij", None, b"klm"])
+    
+    def test_driver_store_is_bounded(self):
+        """Test the driver keeps the newest buffer_capacity readings and counts the rest as dropped"""
+        driver = HoneywellMagnetometer("RS485", port="pty://mag_ring_test", buffer_capacity=16, raw_capacity=256)
+        self.addCleanup(close_pty_pair, "mag_ring_test")
+        driver.calibration_block_size = 5
+        for index in range(40):
+            driver._queue_reading(MagnetometerReading(float(index), float(index), 0.0, 0.0, 20.0,
+                                                      MagnetometerStatus.WARNING, raw_data=bytes([index])))
+        
+        first = driver.get_latest_reading()
+        self.assertEqual((first.timestamp, first.status, first.raw_data), (24.0, MagnetometerStatus.WARNING, bytes([24])))
+        self.assertEqual(driver.get_buffer_stats()["unread"], 15)
+        self.assertEqual([r.x_field for r in driver.get_all_readings()], [float(i) for i in range(25, 40)])
+        self.assertEqual(driver.get_all_readings(), [])
+        stats = driver.get_buffer_stats()
+        self.assertEqual((stats["buffered"], stats["dropped"], stats["unread"]), (16, 24, 0))
+        records, _ = driver.read_since(30)
+        self.assertEqual(list(records['x']), [float(i) for i in range(30, 40)])
+
+class TestRateSensorStreaming(unittest.TestCase):
+    """Test the fixed-rate streaming mode of the rate sensor test generator"""
+    
+    def test_stream_applies_updates_between_frames(self):
+        """Test streamed frames roll the counter and show each API update whole from one frame on"""
+        generator = RateSensorTestGenerator("pty://rate_stream?throttle=0")
+        pair = get_pty_pair("rate_stream")
+        client = generator.app.test_client()
+        self.assertEqual(client.post('/api/stream', json={'rate_hz': 5000}).status_code, 400)
+        try:
+            self.assertEqual(client.post('/api/stream', json={'rate_hz': 200}).status_code, 200)
+            self.assertEqual(client.post('/api/stream', json={'rate_hz': 200}).status_code, 409)
+            time.sleep(0.2)
+            client.post('/api/data', json={'angular_rate_x': 0.5, 'angular_rate_y': -0.25})
+            time.sleep(0.3)
+            stats = client.get('/api/stream').get_json()['stream']
+        finally:
+            client.delete('/api/stream')
+            stream = pair.read(timeout=0.2)
+            while True:
+                data = pair.read(timeout=0.1)
+                if not data:
+                    break
+                stream += data
+            close_pty_pair("rate_stream")
+        
+        frames = [stream[i:i + 27] for i in range(0, len(stream) - 26, 27)]
+        self.assertGreater(len(frames), 60)
+        self.assertGreater(stats['achieved_rate_hz'], 150.0)
+        self.assertEqual(stats['jitter']['count'], stats['frames'])
+        
+        rates = []
+        counters = []
+        for frame in frames:
+            self.assertEqual(frame[0], 0xAA)
+            self.assertEqual(struct.unpack('<H', frame[-2:])[0], sum(frame[1:-2]) & 0xFFFF)
+            rates.append(struct.unpack('<hh', frame[1:5]))
+            counters.append(struct.unpack('<H', frame[7:9])[0] & 0x03)
+        
+        new = (struct.unpack('<h', MessageEncoder.encode_angular_rate(0.5))[0],
+               struct.unpack('<h', MessageEncoder.encode_angular_rate(-0.25))[0])
+        self.assertEqual(set(rates), {(0, 0), new})
+        switch = rates.index(new)
+        self.assertGreater(switch, 0)
+        self.assertTrue(all(rate == new for rate in rates[switch:]))
+        if stats['skipped'] == 0:
+            self.assertEqual(counters, [index & 0x03 for index in range(len(frames))])
+    
+    def test_encode_frames_matches_encoder(self):
+        """Test vectorized encoding gives encode_message's bytes, including clamping and truncation"""
+        rng = np.random.default_rng(5)
+        samples = {
+            'angular_rate_x': rng.uniform(-1.0, 1.0, 50),
+            'angular_rate_y': np.linspace(-0.7, 0.7, 50),  # Beyond the 16-bit range at both ends
+            'summed_angle_z': rng.uniform(-20.0, 20.0, 50),  # Beyond the 32-bit range at both ends
+            'status_word_1': rng.integers(0, 0x10000, 50),
+            'status_word_3': np.full(50, 0x8700)
+        }
+        frames = MessageEncoder.encode_frames(samples)
+        
+        for index in range(50):
+            data = RateSensorData(angular_rate_x=float(samples['angular_rate_x'][index]),
+                                  angular_rate_y=float(samples['angular_rate_y'][index]),
+                                  summed_angle_z=float(samples['summed_angle_z'][index]),
+                                  status_word_1=int(samples['status_word_1'][index]), status_word_3=0x8700)
+            self.assertEqual(frames[index].tobytes(), MessageEncoder.encode_message(data))
+            data.status_word_1 = (data.status_word_1 & ~0x03) | 2
+            self.assertEqual(MessageEncoder.with_counter(frames[index].tobytes(), 2), MessageEncoder.encode_message(data))
+    
+    def test_timeline_playback(self):
+        """Test timelines compile once, stream at their rate, and scrub with a continuous counter"""
+        with tempfile.TemporaryDirectory() as scenario_dir:
+            with open(os.path.join(scenario_dir, "ramp.json"), 'w') as f:
+                json.dump({'rate_hz': 200, 'duration_s': 0.2, 'keyframes': [
+                    {'t': 0.0, 'data': {'angular_rate_x': 0.0}},
+                    {'t': 0.1, 'data': {'angular_rate_x': 0.1}, 'status_words': {'status_word_1': {'gyro_failed': True}}},
+                    {'t': 0.2, 'data': {'angular_rate_x': 0.2}}]}, f)
+            np.savez(os.path.join(scenario_dir, "steps.npz"), rate_hz=100.0, loop=True,
+                     angular_rate_z=np.repeat([0.01, 0.02, 0.03], 10))
+            
+            generator = RateSensorTestGenerator("pty://rate_timeline?throttle=0", scenario_dir=scenario_dir)
+            pair = get_pty_pair("rate_timeline")
+            client = generator.app.test_client()
+            listed = client.get('/api/timelines').get_json()['timelines']
+            self.assertEqual([(t['name'], t['file']) for t in listed], [('ramp', 'ramp.json'), ('steps', 'steps.npz')])
+            self.assertEqual(client.post('/api/timelines/missing/load').status_code, 404)
+            self.assertEqual(client.post('/api/timelines/scrub', json={'position_s': 0.0}).status_code, 400)
+            try:
+                response = client.post('/api/timelines/ramp/load').get_json()
+                self.assertEqual(response['timeline']['frames'], 40)
+                time.sleep(0.4)  # Past the end of the one-shot timeline
+                state = client.get('/api/timelines').get_json()['playback']
+                stats = client.get('/api/stream').get_json()['stream']
+            finally:
+                client.delete('/api/stream')
+                stream = b""
+                while True:
+                    data = pair.read(timeout=0.2)
+                    if not data:
+                        break
+                    stream += data
+                close_pty_pair("rate_timeline")
+            
+            timeline = generator.timelines['ramp']
+            self.assertIs(generator.get_timeline('ramp'), timeline)  # Not recompiled
+            self.assertTrue(state['finished'])
+            self.assertEqual(stats['rate_hz'], 200.0)
+            
+            # The stream is the timeline, then its last frame held
+            strip = lambda message: MessageEncoder.with_counter(message, 0)
+            sent = [stream[i:i + 27] for i in range(0, len(stream) - 26, 27)]
+            self.assertEqual([strip(m) for m in sent[:40]], [strip(timeline.frame(i)) for i in range(40)])
+            self.assertTrue(all(strip(m) == strip(timeline.frame(39)) for m in sent[40:]))
+            self.assertEqual(struct.unpack('<H', timeline.frame(25)[7:9])[0] & 0x30, 0x20)  # Gyro failed from 0.1 s
+            
+            # Scrubbing moves the playhead; the counter follows the stream, not the timeline
+            generator.play_timeline('steps', stream=False)
+            generator.scrub_timeline(0.15)
+            frames = [generator._stream_frame(index) for index in range(101, 121)]
+            steps = generator.timelines['steps']
+            self.assertEqual([strip(m) for m in frames], [strip(steps.frame((15 + i) % 30)) for i in range(20)])
+            self.assertEqual([struct.unpack('<H', m[7:9])[0] & 0x03 for m in frames], [i & 0x03 for i in range(101, 121)])
+            with self.assertRaises(ValueError):
+                generator.scrub_timeline(5.0)
+    
+    def test_timeline_replaces_queued_transmission(self):
+        """Test a timeline streams even when queued mode runs after a stream at the same rate"""
+        with tempfile.TemporaryDirectory() as scenario_dir:
+            np.savez(os.path.join(scenario_dir, "hold.npz"), rate_hz=200.0, loop=True,
+                     angular_rate_z=np.full(10, 0.01))
+            generator = RateSensorTestGenerator("pty://rate_timeline_switch?throttle=0", scenario_dir=scenario_dir)
+            pair = get_pty_pair("rate_timeline_switch")
+            transmitter = generator.serial_transmitter
+            try:
+                self.assertTrue(generator.start_streaming(200.0))
+                transmitter.stop_transmission()
+                transmitter.start_transmission()  # Queued mode, stream_rate_hz still 200
+                self.assertFalse(transmitter.get_stream_stats()['streaming'])
+                
+                generator.play_timeline('hold')
+                time.sleep(0.1)
+                stats = transmitter.get_stream_stats()
+            finally:
+                transmitter.disconnect()
+                close_pty_pair("rate_timeline_switch")
+            
+            self.assertTrue(stats['streaming'])
+            self.assertGreater(stats['frames'], 0)
+
+class TestReactionWheelResponder(unittest.TestCase):
+    """Test the reaction wheel command responder"""
+    
+    def _command(self, address, opcode):
+        return bytes([address, opcode, xor_crc(bytes([opcode]))])
+    
+    def test_framer_resyncs(self):
+        """Test commands are split from a stream with noise and a bad CRC"""
+        framer = CommandFramer()
+        stream = b"\x02\x99" + self._command(0x01, 0x15) + b"\x01\x16\x00" + self._command(0x02, 0x17)
+        commands = framer.feed(stream[:4], 0) + framer.feed(stream[4:], 0)
+        
+        self.assertEqual([(c.address, c.opcode) for c in commands], [(0x01, 0x15), (0x02, 0x17)])
+        self.assertGreater(framer.malformed, 0)
+    
+    def test_replies_per_address(self):
+        """Test each wheel address gets its own telemetry with a valid XOR CRC"""
+        responder = ReactionWheelResponder(RWResponderConfig(addresses=[0x01, 0x02]))
+        responder.update([1500.0, 2.5, 35.0, 28.5])
+        responder.update([-800.0, 1.0, 30.0, 28.0], addresses=[0x02])
+        
+        for address, speed in ((0x01, 1500.0), (0x02, -800.0)):
+            command = CommandFramer().feed(self._command(address, 0x16), 0)[0]
+            reply = responder.reply_for(command)
+            self.assertEqual(reply[:2], bytes([address, 0x16]))
+            self.assertEqual(struct.unpack('>f', reply[6:10])[0], speed)
+            self.assertEqual(xor_crc(reply[1:-1]), reply[-1])
+        
+        health = responder.reply_for(CommandFramer().feed(self._command(0x01, 0x15), 0)[0])
+        self.assertEqual(len(health), 23)
+        self.assertIsNone(responder.reply_for(CommandFramer().feed(self._command(0x01, 0x18), 0)[0]))
+    
+    def test_serial_commands(self):
+        """Test commands over a pty are answered for served addresses only"""
+        responder = ReactionWheelResponder(RWResponderConfig(port="pty://rw_responder?throttle=0",
+                                                             addresses=[0x01, 0x02], turnaround_ms=2.0))
+        responder.update([1500.0, 2.5, 35.0, 28.5])
+        pair = get_pty_pair("rw_responder")
+        self.assertTrue(responder.start())
+        try:
+            pair.write(self._command(0x03, 0x16) + self._command(0x02, 0x17) + b"\x01\x42\x00")
+            reply = b""
+            start = time.perf_counter()
+            while len(reply) < 11 and time.perf_counter() - start < 2.0:
+                reply += pair.read(timeout=0.1)
+            time.sleep(0.1)
+        finally:
+            responder.stop()
+            close_pty_pair("rw_responder")
+        
+        self.assertEqual(reply[:2], bytes([0x02, 0x17]))
+        self.assertEqual(struct.unpack('>f', reply[6:10])[0], 2.5)
+        status = responder.get_status()
+        self.assertEqual((status["commands"], status["replies"], status["other_address"]), (1, 1, 1))
+        self.assertGreater(status["malformed"], 0)
+        self.assertEqual(status["addresses"]["0x02"]["response_latency"]["count"], 1)
+        self.assertGreaterEqual(status["response_latency"]["max_ms"], 2.0)
+
+class TestTCPDataDumper(unittest.TestCase):
+    """Test TCP data dumper output engine"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.temp_dir)
+    
+    def test_format_lines(self):
+        """Test that every 8-byte word of a buffer becomes one line"""
+        import struct
+        dumper = MultiPortTCPDataDumper(ports=[5000])
+        data = struct.pack('<2d', 1.5, -2.0)
+        lines = dumper.format_lines(data, 5000, time.time_ns())
+        
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith("5000:"))
+        self.assertIn("00 00 00 00 00 00 F8 3F", lines[0])
+        self.assertTrue(lines[0].endswith(" = 1.500000"))
+        self.assertTrue(lines[1].endswith(" = -2.000000"))
+    
+    def test_select_timeout(self):
+        """Test a zero flush interval never makes the event loop poll"""
+        dumper = MultiPortTCPDataDumper(ports=[5000], flush_interval=0, rate_interval=0)
+        self.assertIsNone(dumper._select_timeout())
+        
+        dumper._next_report = time.monotonic() + 10.0
+        self.assertGreater(dumper._select_timeout(), 9.0)
+        
+        dumper = MultiPortTCPDataDumper(ports=[5000], flush_interval=0.5, rate_interval=0)
+        self.assertLessEqual(dumper._select_timeout(), 0.5)
+    
+    def _free_port(self):
+        import socket
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.bind(("127.0.0.1", 0))
+            return sock.getsockname()[1]
+    
+    def test_concurrent_clients_on_one_port(self):
+        """Test that one event loop serves several clients per port and realigns split words"""
+        import socket
+        import struct
+        port = self._free_port()
+        output_file = os.path.join(self.temp_dir, "capture.dmp")
+        dumper = MultiPortTCPDataDumper(ports=[port], output_file=output_file, rate_interval=0)
+        server = threading.Thread(target=dumper.start_server, daemon=True)
+        server.start()
+        
+        clients = []
+        deadline = time.time() + 5.0
+        while len(clients) < 2 and time.time() < deadline:
+            try:
+                clients.append(socket.create_connection(("127.0.0.1", port)))
+            except ConnectionRefusedError:
+                time.sleep(0.05)
+        self.assertEqual(len(clients), 2)
+        
+        # The second client sends while the first is still connected
+        data = struct.pack('<2d', 1.0, 2.0)
+        clients[0].sendall(data[:5])
+        clients[1].sendall(struct.pack('<d', 3.0))
+        time.sleep(0.1)
+        clients[0].sendall(data[5:])
+        for client in clients:
+            client.close()
+        
+        while dumper.stats[port]['bytes'] < 24 and time.time() < deadline:
+            time.sleep(0.05)
+        dumper.stop()
+        server.join(timeout=5.0)
+        self.assertFalse(server.is_alive())
+        
+        with open(output_file) as f:
+            values = sorted(line.split("=")[-1].strip() for line in f if line.startswith(f"{port}:"))
+        self.assertEqual(values, ["1.000000", "2.000000", "3.000000"])
+        self.assertEqual(dumper.stats[port]['connections'], 2)
+    
+    def test_port_statistics(self):
+        """Test streaming arrival and value metrics"""
+        metrics = PortStatistics(5000)
+        for i in range(20):
+            metrics.record_arrival(i * 10_000_000)  # 100 Hz
+        metrics.record_arrival(19 * 10_000_000 + 100_000_000)  # 100 ms gap
+        metrics.record_values([1.0, 1.0, 1.0, 0.0, float('nan'), -3.0])
+        
+        self.assertEqual(metrics.packets, 21)
+        self.assertEqual(metrics.gaps, 1)
+        self.assertAlmostEqual(metrics.interarrival_percentile(50), 0.01, delta=0.0013)
+        self.assertEqual(metrics.max_interarrival_ns, 100_000_000)
+        self.assertEqual((metrics.value_min, metrics.value_max), (-3.0, 1.0))
+        self.assertEqual((metrics.zeros, metrics.nans, metrics.repeats, metrics.longest_repeat_run), (1, 1, 2, 2))
+        self.assertAlmostEqual(metrics.value_mean, 0.0)
+        self.assertIn("interarrival", metrics.to_dict())
+    
+    def test_raw_records(self):
+        """Test raw record output round trip through the capture store"""
+        import struct
+        output_file = os.path.join(self.temp_dir, "capture.raw")
+        dumper = MultiPortTCPDataDumper(ports=[5000, 5001], output_file=output_file, raw_output=True)
+        dumper.process_data(struct.pack('<2d', 1.0, 2.0), None, 5000, 1_000_000_000)
+        dumper.process_data(struct.pack('<d', 3.0), None, 5001, 2_000_000_000)
+        dumper.output.close()
+        
+        records = list(iter_raw_records(output_file))
+        self.assertEqual([(port, ts, len(payload)) for port, ts, payload in records],
+                         [(5000, 1_000_000_000, 16), (5001, 2_000_000_000, 8)])
+        
+        store = load_capture(output_file)
+        self.assertEqual(list(store.values(5000)), [1.0, 2.0])
+        self.assertEqual(int(store.timestamps_ns(5001)[0] - store.timestamps_ns(5000)[0]), 1_000_000_000)
 
 class TestSimulatorIntegration(unittest.TestCase):
     """Test simulator integration"""
@@ -366,6 +1754,87 @@ class TestSimulatorIntegration(unittest.TestCase):
         
         self.assertIsInstance(simulator, FlatSatDeviceSimulator)
         self.assertIsNotNone(simulator.config)
+    
+    def test_magnetometer_poll_responder(self):
+        """Test a polled magnetometer gets a responder instead of a pushing transmitter"""
+        config = SimulatorConfig(devices={"magnetometer": DeviceConfig(
+            enabled=True, matlab_ports=[5000, 5001, 5002], output_mode="can",
+            output_config={"interface": "virtual", "channel": "sim_responder_test"}, poll_responder=True)})
+        simulator = FlatSatDeviceSimulator(config)
+        
+        self.assertIn("magnetometer", simulator.poll_responders)
+        self.assertNotIn("can_transmitters", simulator.output_transmitters)
+        self.assertEqual(simulator.poll_responders["magnetometer"].config.link, "can")
+    
+    def test_reaction_wheel_responder(self):
+        """Test a commanded reaction wheel gets a responder for its bus addresses"""
+        config = SimulatorConfig(devices={"reaction_wheel": DeviceConfig(
+            enabled=True, matlab_ports=[5000, 5001, 5002, 5003], output_mode="serial",
+            output_config={"port": "pty://sim_rw_test"}, poll_responder=True, rwa_addresses=[0x01, 0x02])})
+        simulator = FlatSatDeviceSimulator(config)
+        
+        self.assertIsInstance(simulator.poll_responders["reaction_wheel"], ReactionWheelResponder)
+        self.assertNotIn("serial_transmitters", simulator.output_transmitters)
+        self.assertEqual(simulator.poll_responders["reaction_wheel"].config.addresses, [0x01, 0x02])
+    
+    def test_expand_instances(self):
+        """Test a device entry with instances becomes one named entry per instance"""
+        expanded = expand_instances("reaction_wheel", {
+            "enabled": True, "output_mode": "serial", "output_config": {"baud_rate": 57600},
+            "instances": [{"rwa_address": 1, "matlab_ports": [7000, 7001, 7002, 7003], "output_config": {"port": "pty://rw0"}},
+                          {"rwa_address": 2, "matlab_ports": [7004, 7005, 7006, 7007], "output_config": {"port": "pty://rw1"}}]})
+        
+        self.assertEqual([name for name, _ in expanded], ["reaction_wheel[0]", "reaction_wheel[1]"])
+        self.assertEqual(expanded[1][1]["rwa_address"], 2)
+        self.assertEqual(expanded[1][1]["output_config"], {"baud_rate": 57600, "port": "pty://rw1"})
+        self.assertNotIn("instances", expanded[0][1])
+        self.assertEqual(expand_instances("ars", {"enabled": True}), [("ars", {"enabled": True})])
+    
+    def test_reaction_wheel_instances(self):
+        """Test wheels on one bus share a responder and keep per-instance counters"""
+        devices = {f"reaction_wheel[{index}]": DeviceConfig(
+            enabled=True, matlab_ports=[7000 + 4 * index + port for port in range(4)], output_mode="serial",
+            output_config={"port": "pty://sim_rw_bus"}, poll_responder=True, rwa_address=index + 1)
+            for index in range(2)}
+        simulator = FlatSatDeviceSimulator(SimulatorConfig(devices=devices))
+        responder = simulator.poll_responders["reaction_wheel[0]"]
+        
+        self.assertIs(simulator.poll_responders["reaction_wheel[1]"], responder)
+        self.assertEqual(responder.config.addresses, [0x01, 0x02])
+        self.assertEqual(simulator.device_encoders["reaction_wheel[1]"].message_encoder.rwa_address, 0x02)
+        
+        simulator.tcp_receiver = Mock()
+        simulator.tcp_receiver.get_data.side_effect = lambda name: [1000.0 * (int(name[-2]) + 1), 2.0, 30.0, 28.0]
+        simulator.tcp_receiver.get_ingest_window.return_value = None
+        simulator.attitude_tap = Mock()
+        for name, config in devices.items():
+            simulator._process_instance(name, config, simulator.device_encoders[name], 1)
+        
+        # Instances publish to the live viewer under their device type
+        self.assertEqual([call.args[0] for call in simulator.attitude_tap.publish.call_args_list],
+                         ["reaction_wheel", "reaction_wheel"])
+        
+        for address, speed in ((0x01, 1000.0), (0x02, 2000.0)):
+            reply = responder.replies[address][0x16]
+            self.assertEqual(reply[0], address)
+            self.assertEqual(struct.unpack('>f', reply[6:10])[0], speed)
+        self.assertEqual([counters["frames_sent"] for counters in simulator.device_counters.values()], [1, 1])
+        simulator.tcp_receiver = None
+        simulator.attitude_tap = None
+        self.assertEqual(list(simulator.collect_metrics()["devices"]), list(devices))
+    
+    def test_collect_metrics(self):
+        """Test the metrics snapshot covers enabled devices and errors"""
+        from flatsat_device_simulator import load_config
+        
+        simulator = FlatSatDeviceSimulator(load_config(self.config_file))
+        snapshot = simulator.collect_metrics()
+        
+        self.assertEqual(list(snapshot["devices"]), ["ars"])
+        self.assertEqual(snapshot["devices"]["ars"]["frames_sent"], 0)
+        self.assertEqual(snapshot["devices"]["ars"]["ingest_rate_hz"], 0.0)
+        self.assertIn("error_types", snapshot["errors"])
+        self.assertIn('device="ars"', format_prometheus(snapshot))
 
 class TestEndToEnd(unittest.TestCase):
     """End-to-end integration tests"""
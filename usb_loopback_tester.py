@@ -4,19 +4,35 @@ USB Loopback Test System for Device Simulator
 
 Creates USB loopback testing for ARS, Magnetometer, and Reaction Wheel devices.
 Each device sends packets to a specific USB port, and we monitor the looped-back data.
+
+The sender and monitor ports stay open for the whole run. Packets are queued
+without blocking the caller; a writer thread puts them on the wire and logs
+each one in a send log with its sequence number and byte offset in the sent
+stream. A reader thread matches the echoed bytes against the window of
+in-flight frames as they arrive, so many frames can be on the loop at once.
+Every frame ends up as a LoopbackTestResult: matched (with its round-trip
+time), mismatched (with the byte offsets that differ), or lost (not echoed
+before the timeout, evicted from a full window, or skipped by the echo).
 """
 
 import serial
 import threading
 import time
 import logging
-from typing import Dict, List, Optional, Callable
-from dataclasses import dataclass
-from queue import Queue, Empty
-import struct
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Callable, Tuple
+from dataclasses import dataclass, field
+from queue import Queue, Empty, Full
+
+from performance_monitor import LatencyHistogram
+import output_transmitters.protocol_pty  # noqa: F401  Registers pty:// ports with pyserial
 
 logger = logging.getLogger(__name__)
 
+READ_TIMEOUT = 0.05  # Monitor read timeout; also how often timed-out frames are expired
+MAX_MISMATCH_OFFSETS = 16  # Differing byte offsets kept per mismatched frame
+MAX_RESULTS = 1000  # Most recent frame results kept by the tester
+
 @dataclass
 class USBPortConfig:
     """Configuration for USB port"""
@@ -25,7 +41,10 @@ class USBPortConfig:
     data_bits: int = 8
     stop_bits: int = 1
     parity: str = "N"
-    timeout: float = 1.0
+    timeout: float = 1.0  # Write timeout
+    monitor_port: str = ""  # Port the echo arrives on (empty: same as port)
+    max_in_flight: int = 256  # Frames awaiting their echo before the oldest is counted lost
+    echo_timeout: float = 2.0  # Seconds before an unechoed frame is counted lost
 
 @dataclass
 class LoopbackTestResult:
@@ -36,124 +55,345 @@ class LoopbackTestResult:
     timestamp: float
     success: bool
     latency_ms: float
+    sequence: int = 0  # Position of the frame in the send log
+    stream_offset: int = 0  # Byte offset of the frame in the sent stream
+    mismatch_offsets: List[int] = field(default_factory=list)  # Frame offsets where the echo differs
+
+@dataclass
+class SentFrame:
+    """A frame in the send log awaiting its echo"""
+    sequence: int
+    stream_offset: int
+    data: bytes
+    sent_ns: int  # perf_counter_ns when the write started
+    timestamp: float
+
+class LoopbackMatcher:
+    """
+    Matches echoed bytes against the in-flight frames of one device
+    
+    Echo bytes are expected in send order. When the bytes at the head of the
+    receive buffer do not match the oldest in-flight frame, the matcher
+    realigns on the earliest in-flight frame that appears intact further on.
+    Frames ahead of it that fit in the bytes before it count as corrupted
+    echoes, the others as lost, and any bytes left over as never sent. If no
+    frame appears intact, the head frame is reported as mismatched once two
+    frames' worth of bytes are buffered or it has timed out.
+    
+    Not thread-safe; callers serialize access.
+    """
+    
+    def __init__(self, device_name: str, max_in_flight: int = 256, echo_timeout: float = 2.0):
+        self.device_name = device_name
+        self.max_in_flight = max_in_flight
+        self.echo_timeout_ns = int(echo_timeout * 1e9)
+        self.in_flight: Deque[SentFrame] = deque()
+        self.rx = bytearray()
+        self.next_sequence = 0
+        self.stream_offset = 0
+        self.start_ns: Optional[int] = None
+        self.rtt = LatencyHistogram()
+        self.stats = {
+            'frames_sent': 0,
+            'bytes_sent': 0,
+            'frames_matched': 0,
+            'frames_mismatched': 0,
+            'frames_lost': 0,
+            'bytes_echoed': 0,
+            'unexpected_bytes': 0
+        }
+    
+    def submit(self, data: bytes, sent_ns: int) -> Tuple[SentFrame, List[LoopbackTestResult]]:
+        """Log a frame about to be written; returns it and any frame evicted from a full window"""
+        results = []
+        if len(self.in_flight) >= self.max_in_flight:
+            results.append(self._lose(self.in_flight.popleft()))
+        
+        frame = SentFrame(self.next_sequence, self.stream_offset, bytes(data), sent_ns, time.time())
+        self.in_flight.append(frame)
+        self.next_sequence += 1
+        self.stream_offset += len(data)
+        self.stats['frames_sent'] += 1
+        self.stats['bytes_sent'] += len(data)
+        if self.start_ns is None:
+            self.start_ns = sent_ns
+        return frame, results
+    
+    def feed(self, data: bytes, now_ns: int) -> List[LoopbackTestResult]:
+        """Add echoed bytes and return the frames they complete"""
+        self.rx += data
+        self.stats['bytes_echoed'] += len(data)
+        return self._match(now_ns)
+    
+    def expire(self, now_ns: int) -> List[LoopbackTestResult]:
+        """Resolve in-flight frames whose echo is overdue"""
+        results = []
+        while self.in_flight and now_ns - self.in_flight[0].sent_ns > self.echo_timeout_ns:
+            results.extend(self._match(now_ns, flush=True))
+            if self.in_flight and now_ns - self.in_flight[0].sent_ns > self.echo_timeout_ns:
+                results.append(self._lose(self.in_flight.popleft()))
+        return results
+    
+    def _match(self, now_ns: int, flush: bool = False) -> List[LoopbackTestResult]:
+        """Consume buffered echo bytes frame by frame"""
+        results = []
+        while self.in_flight:
+            head = self.in_flight[0]
+            size = len(head.data)
+            if len(self.rx) < size:
+                break
+            
+            if self.rx.startswith(head.data):
+                results.append(self._complete(self.in_flight.popleft(), bytes(self.rx[:size]), now_ns))
+                del self.rx[:size]
+                continue
+            
+            # Realign on the earliest in-flight frame echoed intact further on
+            anchor = self._find_anchor()
+            if anchor:
+                index, position = anchor
+                # Frames before it that fit in the bytes ahead were echoed corrupted; the rest were lost
+                consumed = 0
+                for _ in range(index):
+                    frame = self.in_flight.popleft()
+                    if consumed + len(frame.data) <= position:
+                        results.append(self._complete(frame, bytes(self.rx[consumed:consumed + len(frame.data)]), now_ns))
+                        consumed += len(frame.data)
+                    else:
+                        results.append(self._lose(frame))
+                # Whatever is left ahead of the anchor was never sent
+                self.stats['unexpected_bytes'] += position - consumed
+                del self.rx[:position]
+                continue
+            
+            # Wait for enough bytes to tell corruption from misalignment
+            if len(self.rx) < 2 * size and not flush:
+                break
+            
+            results.append(self._complete(self.in_flight.popleft(), bytes(self.rx[:size]), now_ns))
+            del self.rx[:size]
+        
+        if not self.in_flight and self.rx:
+            # Every frame was sent before its echo can arrive, so these are stray bytes
+            self.stats['unexpected_bytes'] += len(self.rx)
+            self.rx.clear()
+        return results
+    
+    def _find_anchor(self) -> Optional[Tuple[int, int]]:
+        """(window index, buffer position) of the earliest in-flight frame found intact, past the head's own slot"""
+        best = None
+        for index, frame in enumerate(self.in_flight):
+            limit = len(self.rx) if best is None else best[1] + len(frame.data)
+            position = self.rx.find(frame.data, 0, limit)
+            if position >= 0 and (index > 0 or position > 0) and (best is None or position < best[1]):
+                best = (index, position)
+        return best
+    
+    def _complete(self, frame: SentFrame, received: bytes, now_ns: int) -> LoopbackTestResult:
+        """Result for a frame whose echo arrived"""
+        rtt_ns = now_ns - frame.sent_ns
+        self.rtt.record(rtt_ns)
+        success = received == frame.data
+        mismatch_offsets = []
+        if success:
+            self.stats['frames_matched'] += 1
+        else:
+            self.stats['frames_mismatched'] += 1
+            mismatch_offsets = [offset for offset, (sent, echoed) in enumerate(zip(frame.data, received))
+                                if sent != echoed][:MAX_MISMATCH_OFFSETS]
+        return LoopbackTestResult(
+            device_name=self.device_name,
+            sent_bytes=frame.data,
+            received_bytes=received,
+            timestamp=frame.timestamp,
+            success=success,
+            latency_ms=rtt_ns / 1e6,
+            sequence=frame.sequence,
+            stream_offset=frame.stream_offset,
+            mismatch_offsets=mismatch_offsets
+        )
+    
+    def _lose(self, frame: SentFrame) -> LoopbackTestResult:
+        """Result for a frame that was never echoed"""
+        self.stats['frames_lost'] += 1
+        return LoopbackTestResult(
+            device_name=self.device_name,
+            sent_bytes=frame.data,
+            received_bytes=b"",
+            timestamp=frame.timestamp,
+            success=False,
+            latency_ms=0.0,
+            sequence=frame.sequence,
+            stream_offset=frame.stream_offset
+        )
+    
+    def get_stats(self, now_ns: Optional[int] = None) -> Dict[str, Any]:
+        """Counters, throughput and round-trip percentiles"""
+        now_ns = time.perf_counter_ns() if now_ns is None else now_ns
+        elapsed = (now_ns - self.start_ns) / 1e9 if self.start_ns is not None else 0.0
+        stats = dict(self.stats)
+        stats['in_flight'] = len(self.in_flight)
+        stats['frames_per_second'] = self.stats['frames_matched'] / elapsed if elapsed > 0 else 0.0
+        stats['echo_bytes_per_second'] = self.stats['bytes_echoed'] / elapsed if elapsed > 0 else 0.0
+        stats['round_trip'] = self.rtt.summary()
+        return stats
 
 class USBLoopbackMonitor:
-    """Monitors USB loopback ports for received data"""
+    """Keeps each device's loopback ports open and matches echoes as they arrive"""
     
-    def __init__(self, port_configs: Dict[str, USBPortConfig]):
+    def __init__(self, port_configs: Dict[str, USBPortConfig],
+                 result_callback: Optional[Callable[[List[LoopbackTestResult]], None]] = None):
         self.port_configs = port_configs
+        self.result_callback = result_callback
+        self.senders: Dict[str, serial.Serial] = {}
         self.monitors: Dict[str, serial.Serial] = {}
-        self.data_queues: Dict[str, Queue] = {}
-        self.monitor_threads: Dict[str, threading.Thread] = {}
+        self.matchers: Dict[str, LoopbackMatcher] = {}
+        self.locks: Dict[str, threading.Lock] = {}
+        self.send_queues: Dict[str, Queue] = {}
+        self.send_drops: Dict[str, int] = {}
+        self.threads: List[threading.Thread] = []
         self.running = False
         
-        # Initialize queues
-        for device_name in port_configs.keys():
-            self.data_queues[device_name] = Queue()
+        # Initialize per-device state
+        for device_name, config in port_configs.items():
+            self.matchers[device_name] = LoopbackMatcher(device_name, config.max_in_flight, config.echo_timeout)
+            self.locks[device_name] = threading.Lock()
+            self.send_queues[device_name] = Queue(maxsize=config.max_in_flight)
+            self.send_drops[device_name] = 0
+    
+    def _open_port(self, port: str, config: USBPortConfig) -> serial.Serial:
+        """Open a port (device path or pyserial URL such as loop:// or pty://name)"""
+        return serial.serial_for_url(
+            port,
+            baudrate=config.baud_rate,
+            bytesize=config.data_bits,
+            stopbits=config.stop_bits,
+            parity=config.parity,
+            timeout=READ_TIMEOUT,
+            write_timeout=config.timeout
+        )
     
     def start_monitoring(self) -> bool:
-        """Start monitoring all USB ports"""
+        """Open every sender and monitor port and start the writer and reader threads"""
         try:
             for device_name, config in self.port_configs.items():
-                # Open serial port for monitoring
-                monitor_port = serial.Serial(
-                    port=config.port,
-                    baudrate=config.baud_rate,
-                    bytesize=config.data_bits,
-                    stopbits=config.stop_bits,
-                    parity=config.parity,
-                    timeout=config.timeout
-                )
-                
-                self.monitors[device_name] = monitor_port
-                
-                # Start monitoring thread
-                thread = threading.Thread(
-                    target=self._monitor_port,
-                    args=(device_name, monitor_port),
-                    daemon=True
-                )
-                thread.start()
-                self.monitor_threads[device_name] = thread
-                
-                logger.info(f"Started monitoring USB port {config.port} for {device_name}")
+                sender = self._open_port(config.port, config)
+                self.senders[device_name] = sender
+                if config.monitor_port and config.monitor_port != config.port:
+                    self.monitors[device_name] = self._open_port(config.monitor_port, config)
+                else:
+                    self.monitors[device_name] = sender
+                logger.info(f"Started loopback on {config.port} -> {config.monitor_port or config.port} for {device_name}")
             
             self.running = True
+            for device_name in self.port_configs:
+                for target in (self._write_loop, self._monitor_port):
+                    thread = threading.Thread(target=target, args=(device_name,), daemon=True)
+                    thread.start()
+                    self.threads.append(thread)
             return True
-            
+        
         except Exception as e:
             logger.error(f"Failed to start USB monitoring: {e}")
+            self._close_ports()
             return False
     
     def stop_monitoring(self):
-        """Stop monitoring all USB ports"""
+        """Stop the threads and close every port"""
         self.running = False
-        
-        # Close all monitor ports
-        for device_name, monitor in self.monitors.items():
+        for thread in self.threads:
+            thread.join(timeout=2.0)
+        self.threads.clear()
+        self._close_ports()
+    
+    def _close_ports(self):
+        for port in set(self.senders.values()) | set(self.monitors.values()):
             try:
-                monitor.close()
-                logger.info(f"Stopped monitoring USB port for {device_name}")
-            except:
+                port.close()
+            except Exception:
                 pass
+        self.senders.clear()
+        self.monitors.clear()
+    
+    def send(self, device_name: str, data: bytes, on_logged: Optional[Callable[[SentFrame], None]] = None) -> bool:
+        """
+        Queue a frame for the loop without blocking; False if the send queue is full
         
-        # Wait for threads to finish
-        for device_name, thread in self.monitor_threads.items():
-            thread.join(timeout=2.0)
+        on_logged, if given, is called with the frame's send log entry just before it is written.
+        """
+        try:
+            self.send_queues[device_name].put_nowait((data, on_logged))
+            return True
+        except Full:
+            self.send_drops[device_name] += 1
+            return False
     
-    def _monitor_port(self, device_name: str, monitor_port: serial.Serial):
-        """Monitor a single USB port for incoming data"""
+    def _write_loop(self, device_name: str):
+        """Log each queued frame in the send log, then write it"""
+        sender = self.senders[device_name]
+        matcher = self.matchers[device_name]
+        send_queue = self.send_queues[device_name]
+        while self.running:
+            try:
+                data, on_logged = send_queue.get(timeout=0.1)
+            except Empty:
+                continue
+            
+            # Logged before the write so the echo can never arrive first
+            with self.locks[device_name]:
+                frame, evicted = matcher.submit(data, time.perf_counter_ns())
+            if on_logged:
+                on_logged(frame)
+            self._publish(evicted)
+            try:
+                sender.write(data)
+            except Exception as e:
+                logger.error(f"Error writing {device_name} loopback frame: {e}")
+                time.sleep(0.1)
+    
+    def _monitor_port(self, device_name: str):
+        """Match echoed bytes against the in-flight frames"""
+        monitor_port = self.monitors[device_name]
+        matcher = self.matchers[device_name]
         logger.info(f"Monitoring USB port {monitor_port.port} for {device_name}")
         
         while self.running:
             try:
-                # Read available data
-                if monitor_port.in_waiting > 0:
-                    data = monitor_port.read(monitor_port.in_waiting)
-                    if data:
-                        # Put data in queue with timestamp
-                        self.data_queues[device_name].put((data, time.time()))
-                        logger.debug(f"{device_name}: Received {len(data)} bytes: {data.hex().upper()}")
-                
-                time.sleep(0.001)  # Small delay to prevent busy waiting
-                
+                data = monitor_port.read(max(1, monitor_port.in_waiting))
+                now_ns = time.perf_counter_ns()
+                with self.locks[device_name]:
+                    results = matcher.feed(data, now_ns) if data else []
+                    results.extend(matcher.expire(now_ns))
+                self._publish(results)
+            
             except Exception as e:
+                if not self.running:
+                    break
                 logger.error(f"Error monitoring {device_name} port: {e}")
                 time.sleep(0.1)
     
-    def get_received_data(self, device_name: str, timeout: float = 1.0) -> Optional[bytes]:
-        """Get received data for a specific device"""
-        try:
-            data, timestamp = self.data_queues[device_name].get(timeout=timeout)
-            return data
-        except Empty:
-            return None
+    def _publish(self, results: List[LoopbackTestResult]):
+        if results and self.result_callback:
+            self.result_callback(results)
     
-    def get_all_received_data(self, timeout: float = 1.0) -> Dict[str, List[bytes]]:
-        """Get all received data from all devices"""
-        results = {}
-        
-        for device_name in self.port_configs.keys():
-            device_data = []
-            while True:
-                data = self.get_received_data(device_name, timeout=0.1)
-                if data is None:
-                    break
-                device_data.append(data)
-            
-            if device_data:
-                results[device_name] = device_data
-        
-        return results
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Matcher statistics per device"""
+        stats = {}
+        for device_name, matcher in self.matchers.items():
+            with self.locks[device_name]:
+                stats[device_name] = matcher.get_stats()
+            stats[device_name]['send_drops'] = self.send_drops[device_name]
+        return stats
 
 class USBLoopbackTester:
     """Main USB loopback test system"""
     
     def __init__(self, device_configs: Dict[str, USBPortConfig]):
         self.device_configs = device_configs
-        self.monitor = USBLoopbackMonitor(device_configs)
-        self.test_results: List[LoopbackTestResult] = []
-        
+        self.monitor = USBLoopbackMonitor(device_configs, self._on_results)
+        self.test_results: Deque[LoopbackTestResult] = deque(maxlen=MAX_RESULTS)
+        self.results_condition = threading.Condition()
+    
     def start_testing(self) -> bool:
         """Start the loopback test system"""
         logger.info("Starting USB Loopback Test System")
@@ -170,95 +410,72 @@ class USBLoopbackTester:
         logger.info("Stopping USB Loopback Test System")
         self.monitor.stop_monitoring()
     
+    def _on_results(self, results: List[LoopbackTestResult]):
+        """Keep results and log the failures"""
+        for result in results:
+            if result.received_bytes and not result.success:
+                logger.warning(f"{result.device_name}: loopback mismatch in frame {result.sequence} "
+                               f"(stream offset {result.stream_offset}) at bytes {result.mismatch_offsets}")
+            elif not result.success:
+                logger.warning(f"{result.device_name}: loopback frame {result.sequence} lost "
+                               f"(stream offset {result.stream_offset})")
+        with self.results_condition:
+            self.test_results.extend(results)
+            self.results_condition.notify_all()
+    
+    def submit_packet(self, device_name: str, packet_data: bytes) -> bool:
+        """
+        Queue a device packet for loopback verification without waiting for the echo
+        
+        Returns False if the device is unknown or its send queue is full.
+        """
+        if device_name not in self.device_configs:
+            logger.error(f"Unknown device: {device_name}")
+            return False
+        return self.monitor.send(device_name, packet_data)
+    
     def test_device_packet(self, device_name: str, packet_data: bytes) -> LoopbackTestResult:
         """
-        Test a device packet by sending it and monitoring the loopback
+        Test a device packet by sending it and waiting for its own result
         
         Args:
             device_name: Name of the device (ars, magnetometer, reaction_wheel)
             packet_data: Packet data to send
-            
+        
         Returns:
             LoopbackTestResult with test results
         """
+        failed = LoopbackTestResult(
+            device_name=device_name,
+            sent_bytes=packet_data,
+            received_bytes=b"",
+            timestamp=time.time(),
+            success=False,
+            latency_ms=0.0
+        )
         if device_name not in self.device_configs:
             logger.error(f"Unknown device: {device_name}")
-            return LoopbackTestResult(
-                device_name=device_name,
-                sent_bytes=packet_data,
-                received_bytes=b"",
-                timestamp=time.time(),
-                success=False,
-                latency_ms=0.0
-            )
+            return failed
         
-        config = self.device_configs[device_name]
-        start_time = time.time()
+        logged: List[SentFrame] = []
+        if not self.monitor.send(device_name, packet_data, logged.append):
+            return failed
         
-        try:
-            # Send packet to USB port
-            with serial.Serial(
-                port=config.port,
-                baudrate=config.baud_rate,
-                bytesize=config.data_bits,
-                stopbits=config.stop_bits,
-                parity=config.parity,
-                timeout=config.timeout
-            ) as sender_port:
-                
-                sender_port.write(packet_data)
-                sender_port.flush()
-                logger.info(f"Sent {len(packet_data)} bytes to {device_name} port {config.port}")
-                logger.info(f"Sent data: {packet_data.hex().upper()}")
-                
-                # Wait for loopback data
-                time.sleep(0.1)  # Allow time for loopback
-                
-                # Get received data
-                received_data = self.monitor.get_received_data(device_name, timeout=2.0)
-                
-                end_time = time.time()
-                latency_ms = (end_time - start_time) * 1000
-                
-                if received_data:
-                    logger.info(f"Received {len(received_data)} bytes from {device_name}")
-                    logger.info(f"Received data: {received_data.hex().upper()}")
-                    
-                    # Check if received data matches sent data
-                    success = received_data == packet_data
-                    
-                    result = LoopbackTestResult(
-                        device_name=device_name,
-                        sent_bytes=packet_data,
-                        received_bytes=received_data,
-                        timestamp=start_time,
-                        success=success,
-                        latency_ms=latency_ms
-                    )
-                    
-                    self.test_results.append(result)
+        def find_result():
+            if not logged:
+                return None
+            for result in reversed(self.test_results):
+                if result.device_name == device_name and result.sequence == logged[0].sequence:
                     return result
-                else:
-                    logger.warning(f"No data received from {device_name} loopback")
-                    return LoopbackTestResult(
-                        device_name=device_name,
-                        sent_bytes=packet_data,
-                        received_bytes=b"",
-                        timestamp=start_time,
-                        success=False,
-                        latency_ms=latency_ms
-                    )
-                    
-        except Exception as e:
-            logger.error(f"Error testing {device_name}: {e}")
-            return LoopbackTestResult(
-                device_name=device_name,
-                sent_bytes=packet_data,
-                received_bytes=b"",
-                timestamp=time.time(),
-                success=False,
-                latency_ms=0.0
-            )
+            return None
+        
+        with self.results_condition:
+            result = None
+            deadline = time.time() + self.device_configs[device_name].echo_timeout + 1.0
+            while result is None and time.time() < deadline:
+                self.results_condition.wait(timeout=0.1)
+                result = find_result()
+        return result or failed
     
     def test_all_devices(self, device_packets: Dict[str, bytes]) -> Dict[str, LoopbackTestResult]:
         """Test all devices with their respective packets"""
@@ -268,30 +485,31 @@ class USBLoopbackTester:
             logger.info(f"Testing {device_name} with {len(packet_data)} bytes")
             result = self.test_device_packet(device_name, packet_data)
             results[device_name] = result
-            
-            # Small delay between tests
-            time.sleep(0.5)
         
         return results
     
+    def get_status(self) -> Dict[str, Dict[str, Any]]:
+        """Loopback statistics per device"""
+        return self.monitor.get_stats()
+    
     def print_test_summary(self):
         """Print summary of all test results"""
         logger.info("=== USB Loopback Test Summary ===")
         
-        for result in self.test_results:
-            status = "PASS" if result.success else "FAIL"
-            logger.info(f"{result.device_name}: {status} - "
-                       f"Sent: {len(result.sent_bytes)} bytes, "
-                       f"Received: {len(result.received_bytes)} bytes, "
-                       f"Latency: {result.latency_ms:.2f}ms")
-            
-            if result.sent_bytes:
-                logger.info(f"  Sent:    {result.sent_bytes.hex().upper()}")
-            if result.received_bytes:
+        for device_name, stats in self.get_status().items():
+            round_trip = stats['round_trip']
+            logger.info(f"{device_name}: {stats['frames_matched']}/{stats['frames_sent']} matched, "
+                       f"{stats['frames_mismatched']} mismatched, {stats['frames_lost']} lost, "
+                       f"{stats['unexpected_bytes']} unexpected bytes, "
+                       f"{stats['frames_per_second']:.1f} frames/s")
+            logger.info(f"  Round trip: p50 {round_trip['p50_ms']:.2f}ms, p99 {round_trip['p99_ms']:.2f}ms, "
+                       f"max {round_trip['max_ms']:.2f}ms")
+        
+        for result in list(self.test_results):
+            if not result.success and result.received_bytes:
+                logger.warning(f"  {result.device_name} frame {result.sequence}: mismatch at bytes {result.mismatch_offsets}")
+                logger.info(f"  Sent:     {result.sent_bytes.hex().upper()}")
                 logger.info(f"  Received: {result.received_bytes.hex().upper()}")
-            
-            if not result.success and result.sent_bytes and result.received_bytes:
-                logger.warning(f"  Data mismatch detected!")
 
 def main():
     """Test USB loopback system"""
@@ -303,14 +521,17 @@ def main():
     parser.add_argument('--rw-port', default='/dev/ttyUSB2', help='Reaction Wheel USB port')
     parser.add_argument('--baud-rate', type=int, default=115200, help='Baud rate')
     parser.add_argument('--test-duration', type=float, default=30.0, help='Test duration in seconds')
+    parser.add_argument('--send-rate', type=float, default=100.0, help='Test frames per second per device')
+    parser.add_argument('--max-in-flight', type=int, default=256, help='Frames awaiting their echo per device')
     
     args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
     
     # Configure USB ports for each device
     device_configs = {
-        'ars': USBPortConfig(port=args.ars_port, baud_rate=args.baud_rate),
-        'magnetometer': USBPortConfig(port=args.mag_port, baud_rate=args.baud_rate),
-        'reaction_wheel': USBPortConfig(port=args.rw_port, baud_rate=args.baud_rate)
+        'ars': USBPortConfig(port=args.ars_port, baud_rate=args.baud_rate, max_in_flight=args.max_in_flight),
+        'magnetometer': USBPortConfig(port=args.mag_port, baud_rate=args.baud_rate, max_in_flight=args.max_in_flight),
+        'reaction_wheel': USBPortConfig(port=args.rw_port, baud_rate=args.baud_rate, max_in_flight=args.max_in_flight)
     }
     
     # Create test system
@@ -318,17 +539,24 @@ def main():
     
     if tester.start_testing():
         try:
-            logger.info(f"USB Loopback Test running for {args.test_duration} seconds")
-            logger.info("Send test packets to the configured USB ports")
+            logger.info(f"USB Loopback Test running for {args.test_duration} seconds at {args.send_rate} frames/s")
             
-            # Run test for specified duration
+            # 28-byte test frames carrying a running counter so consecutive frames differ
             start_time = time.time()
+            counter = 0
             while time.time() - start_time < args.test_duration:
-                time.sleep(1.0)
+                frame = bytes([0xA5]) + counter.to_bytes(4, 'big') + bytes(range(23))
+                for device_name in device_configs:
+                    tester.submit_packet(device_name, frame)
+                counter += 1
+                time.sleep(1.0 / args.send_rate)
+            
+            # Let the last frames come back
+            time.sleep(0.5)
             
             # Print summary
             tester.print_test_summary()
-            
+        
         finally:
             tester.stop_testing()
     else: